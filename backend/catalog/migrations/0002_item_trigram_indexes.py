@@ -0,0 +1,44 @@
+"""
+Триграммные индексы для подбора номенклатуры по артикулу/наименованию
+(procurement/services/sku_matching.py).
+
+Только для PostgreSQL (расширение pg_trgm); на других СУБД миграция ничего не делает,
+подбор идёт через индекс в памяти процесса.
+"""
+
+from django.db import migrations
+
+
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Нормализованный ключ артикула: без разделителей, верхний регистр ('KR-001' -> 'KR001').
+    # Выражение должно совпадать с SKU_KEY_SQL в sku_matching.py, иначе индекс не используется.
+    "CREATE INDEX IF NOT EXISTS catalog_item_sku_key_trgm "
+    "ON catalog_item USING gin ((upper(regexp_replace(sku, '[^[:alnum:]]+', '', 'g'))) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS catalog_item_name_trgm ON catalog_item USING gin (name gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS catalog_item_name_trgm",
+    "DROP INDEX IF EXISTS catalog_item_sku_key_trgm",
+]
+
+
+def _run(sql_list):
+    def inner(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in sql_list:
+            schema_editor.execute(sql)
+    return inner
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
@@ -0,0 +1,180 @@
+"""
+Построчные изменения операционного дашборда (delta) — чтобы клиент не перезапрашивал весь снимок.
+
+- emit(kind, ids): после коммита сигналы (dashboard/signals.py) передают id изменённых документов;
+  текущая строка каждого документа (engine.rows_by_id) сравнивается с предыдущей,
+  запомненной в кэше, и получается delta:
+    added   — документ появился в группе (создан / переоткрыт);
+    removed — документ пропал из группы (закрыт / удалён);
+    changed — строка изменилась (severity, срок, статус, контрагент); prev_severity — прежняя срочность.
+- каждая delta получает курсор (общий счётчик) и пишется в журнал-кольцо на LOG_SIZE последних
+  записей; счётчик сдвигается только после записи журнала (под коротким замком в кэше), иначе
+  читатель между ними не нашёл бы записей и получил бы ложный reset. Затем delta публикуется
+  в группу Channels dashboard_ops_<kind>
+  (websocket, dashboard/consumers.py);
+- since(cursor, kinds): всё, что случилось после курсора, — для догрузки после обрыва websocket
+  и короткого опроса (GET /api/dashboard/ops/changes/: отвечает сразу, без ожидания изменений —
+  ждать их должен websocket, а не воркер HTTP). Если курсор старше журнала или запись журнала потеряна —
+  reset=True: клиенту нужно заново взять снимок GET /api/dashboard/ops/.
+
+Срочность зависит ещё и от даты: при смене дня клиент перезапрашивает снимок сам.
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+
+from procurement.realtime import publish
+
+from . import engine
+
+KEY_PREFIX = f"{engine.KEY_PREFIX}changes:"
+
+# Размер журнала (записей) и время жизни записи (сек.)
+LOG_SIZE = 1000
+LOG_TTL = 24 * 60 * 60
+
+# Сколько помнить последнюю строку документа (сек.)
+STATE_TTL = 7 * 24 * 60 * 60
+
+# Замок записи журнала: время жизни и ожидания (сек.)
+LOCK_TIMEOUT = 5
+
+# Документ не виден в группе (закрыт или удалён)
+_HIDDEN = "-"
+
+
+def group_name(kind: str) -> str:
+    """Имя группы Channels, в которую публикуются изменения группы дашборда."""
+    return f"dashboard_ops_{kind}"
+
+
+def _state_key(kind: str, oid: int) -> str:
+    return f"{KEY_PREFIX}state:{kind}:{oid}"
+
+
+def _entry_key(cursor: int) -> str:
+    return f"{KEY_PREFIX}log:{cursor % LOG_SIZE}"
+
+
+def cursor() -> int:
+    """Курсор последней записанной delta (0 — изменений ещё не было)."""
+    return int(cache.get(f"{KEY_PREFIX}cursor") or 0)
+
+
+def diff(kind: str, ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """Сравнить текущие строки документов с запомненными и запомнить новые."""
+    ids = list(dict.fromkeys(int(i) for i in ids if i))
+    if not ids:
+        return []
+    rows = engine.rows_by_id(kind, ids)
+    keys = {_state_key(kind, oid): oid for oid in ids}
+    prev = cache.get_many(list(keys))
+
+    deltas: List[Dict[str, Any]] = []
+    state: Dict[str, Any] = {}
+    for key, oid in keys.items():
+        old, new = prev.get(key), rows.get(oid)
+        old_row = old if isinstance(old, dict) else None
+        if new is None:
+            if old == _HIDDEN:
+                continue
+            # Неизвестное прежнее состояние тоже даёт removed: для клиента это безопасно
+            op = "removed"
+            state[key] = _HIDDEN
+        elif old_row is None:
+            op = "added"
+            state[key] = new
+        elif old_row != new:
+            op = "changed"
+            state[key] = new
+        else:
+            continue
+        deltas.append({
+            "group": kind,
+            "op": op,
+            "id": oid,
+            "row": new,
+            "severity": new["severity"] if new else None,
+            "prev_severity": old_row["severity"] if old_row else None,
+        })
+    if state:
+        cache.set_many(state, STATE_TTL)
+    return deltas
+
+
+class LogBusy(RuntimeError):
+    """Замок журнала не освободился за LOCK_TIMEOUT — delta не записаны."""
+
+
+@contextmanager
+def _log_lock():
+    """
+    Запись журнала по одному писателю: cache.add атомарен, в замке — токен владельца.
+
+    Замок снимается, только если в нём всё ещё свой токен (истёкший и взятый другим
+    писателем не трогаем). Не дождались — LogBusy: писать без замка нельзя, два писателя
+    выдали бы одинаковые курсоры.
+    """
+    key = f"{KEY_PREFIX}lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(key, token, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise LogBusy("Журнал изменений дашборда занят")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        # Запись журнала занимает миллисекунды при сроке замка LOCK_TIMEOUT — между get и delete
+        # замок не истекает; истёкший во время записи замок уже не наш, его не снимаем
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def record(deltas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Выдать delta курсоры и записать в журнал: сначала записи, затем курсор (LogBusy — замок занят)."""
+    if not deltas:
+        return deltas
+    with _log_lock():
+        first = cursor() + 1
+        for i, d in enumerate(deltas):
+            d["cursor"] = first + i
+        cache.set_many({_entry_key(d["cursor"]): d for d in deltas}, LOG_TTL)
+        cache.set(f"{KEY_PREFIX}cursor", deltas[-1]["cursor"], None)
+    return deltas
+
+
+def emit(kind: str, ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """Посчитать, записать и разослать изменения группы для документов ids."""
+    deltas = record(diff(kind, ids))
+    for d in deltas:
+        publish(group_name(kind), "dashboard.delta", d)
+    return deltas
+
+
+def since(after: int, kinds: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """{cursor, deltas, reset} — изменения с курсором больше after (по группам kinds)."""
+    current = cursor()
+    after = int(after)
+    if after >= current:
+        # after > current — счётчик сброшен (очищен кэш): журналу верить нельзя
+        return {"cursor": current, "deltas": [], "reset": after > current}
+    if current - after > LOG_SIZE:
+        return {"cursor": current, "deltas": [], "reset": True}
+
+    wanted = set(kinds or engine.GROUPS)
+    cursors = range(after + 1, current + 1)
+    got = cache.get_many([_entry_key(c) for c in cursors])
+    deltas = []
+    for c in cursors:
+        d = got.get(_entry_key(c))
+        if not isinstance(d, dict) or d.get("cursor") != c:
+            # Запись вытеснена или перезаписана — пропуск изменений недопустим
+            return {"cursor": current, "deltas": [], "reset": True}
+        if d["group"] in wanted:
+            deltas.append(d)
+    return {"cursor": current, "deltas": deltas, "reset": False}
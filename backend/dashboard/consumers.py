@@ -0,0 +1,63 @@
+"""
+Websocket-consumer операционного дашборда.
+
+DashboardOpsConsumer — построчные изменения групп дашборда:
+    ws/dashboard/ops/
+
+Клиент подписывается сообщениями
+    {"action": "subscribe", "groups": ["pr", "po"]}
+    {"action": "unsubscribe", "groups": ["po"]}
+и получает события dashboard.delta (added / removed / changed, см. dashboard/changes.py).
+В ответ на подписку приходит текущий курсор: снимок GET /api/dashboard/ops/ берётся после него,
+а пропущенное при обрыве соединения догружается через GET /api/dashboard/ops/changes/?since=<cursor>.
+"""
+
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import changes, engine
+
+
+class DashboardOpsConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+        self.groups_joined = set()
+        await self.accept()
+
+    async def disconnect(self, code):
+        for kind in getattr(self, "groups_joined", ()):
+            await self.channel_layer.group_discard(changes.group_name(kind), self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get("action") if isinstance(content, dict) else None
+        kinds = content.get("groups") if isinstance(content, dict) else None
+        if kinds is None:
+            kinds = list(engine.GROUPS)
+        if action not in ("subscribe", "unsubscribe") or not isinstance(kinds, list):
+            await self.send_json({"type": "error", "detail": "Ожидается {action: subscribe|unsubscribe, groups: [...]}"})
+            return
+        unknown = [k for k in kinds if k not in engine.GROUPS]
+        if unknown:
+            await self.send_json({"type": "error", "detail": f"Неизвестные группы: {', '.join(map(str, unknown))}"})
+            return
+
+        for kind in kinds:
+            name = changes.group_name(kind)
+            if action == "subscribe" and kind not in self.groups_joined:
+                await self.channel_layer.group_add(name, self.channel_name)
+                self.groups_joined.add(kind)
+            elif action == "unsubscribe" and kind in self.groups_joined:
+                await self.channel_layer.group_discard(name, self.channel_name)
+                self.groups_joined.discard(kind)
+
+        await self.send_json({
+            "type": "dashboard.subscribed",
+            "groups": sorted(self.groups_joined),
+            "cursor": await sync_to_async(changes.cursor)(),
+        })
+
+    async def dashboard_delta(self, event):
+        await self.send_json({"type": "dashboard.delta", "delta": event["payload"]})
@@ -0,0 +1,259 @@
+"""
+Движок операционного дашборда (GET /api/dashboard/ops/).
+
+Срочность считается в SQL по всем незакрытым документам, а не по последним 200 строкам:
+- у каждой группы явное выражение срока (DEADLINES) и статуса (STATUSES);
+- severity: overdue (срок прошёл) / due_soon (до THRESHOLD_DAYS дней) / ok (позже или без срока) —
+  Case/When в запросе, счётчики — один агрегирующий запрос на группу;
+- строки группы отдаются страницами (offset/limit), сортировка в БД:
+  overdue -> due_soon -> ok, внутри — по сроку, затем по id.
+
+Результат группы кэшируется (snapshot) с версией группы в ключе. Сигналы (dashboard/signals.py)
+меняют версию только затронутой группы — при изменении заказа пересчитываются только «Заказы».
+"""
+
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, DateField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, NullIf, TruncDate
+from django.utils import timezone
+
+THRESHOLD_DAYS = 3
+
+GROUPS = ("pr", "quote", "po", "shipment")
+
+LABELS = {
+    "pr": "Заявки",
+    "quote": "КП",
+    "po": "Заказы",
+    "shipment": "Доставки",
+}
+
+MODELS = {
+    "pr": ("procurement", "PurchaseRequest"),
+    "quote": ("procurement", "Quote"),
+    "po": ("procurement", "PurchaseOrder"),
+    "shipment": ("procurement", "Shipment"),
+}
+
+DONE_STATUSES = {
+    "pr": {"closed", "cancelled", "canceled", "done"},
+    "quote": {"rejected", "closed", "cancelled", "canceled"},
+    "po": {"closed", "cancelled", "canceled"},
+    "shipment": {"delivered", "closed", "cancelled", "canceled"},
+}
+
+# Срок документа (дата, в текущей таймзоне)
+DEADLINES = {
+    "pr": lambda: TruncDate("deadline"),
+    "quote": lambda: TruncDate("purchase_request__deadline"),
+    "po": lambda: Coalesce("planned_delivery_date", "deadline", output_field=DateField()),
+    "shipment": lambda: F("eta_date"),
+}
+
+# Статус документа (у КП — из QuoteMeta, по умолчанию "received", как в QuoteSerializer)
+STATUSES = {
+    "pr": lambda: F("status"),
+    "quote": lambda: Coalesce(NullIf("meta__status", Value("")), Value("received"), output_field=CharField()),
+    "po": lambda: F("status"),
+    "shipment": lambda: F("status"),
+}
+
+# Поля для строк таблицы
+ROW_FIELDS = {
+    "pr": ("project_id", "project__code", "project__name", "project_stage_id", "project_stage__name"),
+    "quote": ("supplier__name",),
+    "po": ("number", "supplier__name"),
+    "shipment": ("number", "order__supplier__name"),
+}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+KEY_PREFIX = "dashboard_ops:"
+
+# Время жизни снимка группы (сек.): верхняя граница устаревания для изменений без сигналов
+SNAPSHOT_TTL = 60
+
+
+# ----------------------------------------------------------------------------
+# Версии снимков
+# ----------------------------------------------------------------------------
+
+def _version(kind: str) -> str:
+    key = f"{KEY_PREFIX}ver:{kind}"
+    ver = cache.get(key)
+    if ver is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        ver = cache.get(key)
+    return ver
+
+
+def invalidate(*kinds: str) -> None:
+    """Снимки указанных групп устарели."""
+    cache.set_many({f"{KEY_PREFIX}ver:{k}": uuid.uuid4().hex for k in kinds}, None)
+
+
+# ----------------------------------------------------------------------------
+# Запросы
+# ----------------------------------------------------------------------------
+
+def _queryset(kind: str, include_done: bool):
+    model = apps.get_model(*MODELS[kind])
+    qs = model.objects.annotate(_deadline=DEADLINES[kind](), _status=STATUSES[kind]())
+    if not include_done:
+        qs = qs.exclude(_status__in=DONE_STATUSES[kind])
+    return qs
+
+
+def _severity_q(today) -> Dict[str, Q]:
+    soon = today + timedelta(days=THRESHOLD_DAYS)
+    return {
+        "overdue": Q(_deadline__lt=today),
+        "due_soon": Q(_deadline__gte=today, _deadline__lte=soon),
+        "ok": Q(_deadline__isnull=True) | Q(_deadline__gt=soon),
+    }
+
+
+def _counts(qs, today) -> Dict[str, int]:
+    agg = qs.aggregate(
+        total=Count("pk"),
+        **{sev: Count("pk", filter=q) for sev, q in _severity_q(today).items()},
+    )
+    return {k: agg[k] or 0 for k in ("overdue", "due_soon", "ok", "total")}
+
+
+def _norm(s: Any) -> str:
+    return str(s or "").strip()
+
+
+def _title(kind: str, r: Dict[str, Any]) -> str:
+    oid = r["id"]
+    if kind == "pr":
+        return f"Заявка #{oid}"
+    if kind == "quote":
+        return f"КП #{oid}"
+    if kind == "po":
+        return _norm(r["number"]) or f"PO #{oid}"
+    return _norm(r["number"]) or f"Доставка #{oid}"
+
+
+def _party(kind: str, r: Dict[str, Any]) -> str:
+    if kind == "pr":
+        parts: List[str] = []
+        code, name = _norm(r["project__code"]), _norm(r["project__name"])
+        if code and name:
+            parts.append(f"{code} — {name}")
+        elif name:
+            parts.append(name)
+        elif r["project_id"]:
+            parts.append(f"Проект #{r['project_id']}")
+        stage = _norm(r["project_stage__name"])
+        if stage:
+            parts.append(stage)
+        elif r["project_stage_id"]:
+            parts.append(f"Этап #{r['project_stage_id']}")
+        return " / ".join(parts)
+    if kind == "shipment":
+        return _norm(r["order__supplier__name"])
+    return _norm(r["supplier__name"])
+
+
+def _frontend_url(kind: str, oid: int) -> str:
+    if kind == "pr":
+        return f"/pr/{oid}/edit"
+    if kind == "quote":
+        return f"/quotes?quote_id={oid}"
+    if kind == "po":
+        return "/purchase-orders"
+    if kind == "shipment":
+        return "/shipments"
+    return "/"
+
+
+def _rows(kind: str, qs, today, offset: int, limit: int, severity: Optional[str]) -> List[Dict[str, Any]]:
+    conds = _severity_q(today)
+    if severity:
+        qs = qs.filter(conds[severity])
+    qs = qs.annotate(
+        _rank=Case(
+            When(conds["overdue"], then=Value(0)),
+            When(conds["due_soon"], then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        ),
+    ).order_by("_rank", F("_deadline").asc(nulls_last=True), "id")
+
+    return [
+        _row(kind, r, today)
+        for r in qs.values("id", "_deadline", "_status", *ROW_FIELDS[kind])[offset:offset + limit]
+    ]
+
+
+def _row(kind: str, r: Dict[str, Any], today) -> Dict[str, Any]:
+    deadline = r["_deadline"]
+    days_left = (deadline - today).days if deadline else None
+    if days_left is None or days_left > THRESHOLD_DAYS:
+        sev = "ok"
+    elif days_left < 0:
+        sev = "overdue"
+    else:
+        sev = "due_soon"
+    return {
+        "type": kind,
+        "id": r["id"],
+        "title": _title(kind, r),
+        "party": _party(kind, r),
+        "status": _norm(r["_status"]) or "—",
+        "deadlineIso": deadline.isoformat() if deadline else None,
+        "daysLeft": days_left,
+        "severity": sev,
+        "frontend_url": _frontend_url(kind, r["id"]),
+    }
+
+
+# ----------------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------------
+
+def group(kind: str, *, include_done: bool = False, offset: int = 0, limit: int = DEFAULT_LIMIT,
+          severity: Optional[str] = None) -> Dict[str, Any]:
+    """Группа дашборда: точные счётчики по всем документам + страница строк (из снимка в кэше)."""
+    today = timezone.localdate()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    offset = max(0, int(offset))
+
+    key = (
+        f"{KEY_PREFIX}{kind}:{_version(kind)}:{today.isoformat()}:"
+        f"{int(include_done)}:{severity or ''}:{offset}:{limit}"
+    )
+    data = cache.get(key)
+    if data is None:
+        qs = _queryset(kind, include_done)
+        counts = _counts(qs, today)
+        rows = _rows(kind, qs, today, offset, limit, severity)
+        shown = counts[severity] if severity else counts["total"]
+        data = {
+            "label": LABELS[kind],
+            "counts": counts,
+            "rows": rows,
+            "offset": offset,
+            "limit": limit,
+            "has_more": offset + len(rows) < shown,
+        }
+        cache.set(key, data, SNAPSHOT_TTL)
+    return data
+
+
+def rows_by_id(kind: str, ids) -> Dict[int, Dict[str, Any]]:
+    """{id: строка} для видимых в группе документов (закрытые и удалённые не попадают) — один запрос."""
+    ids = list(dict.fromkeys(int(i) for i in ids if i))
+    if not ids:
+        return {}
+    today = timezone.localdate()
+    qs = _queryset(kind, include_done=False).filter(pk__in=ids)
+    return {r["id"]: _row(kind, r, today) for r in qs.values("id", "_deadline", "_status", *ROW_FIELDS[kind])}
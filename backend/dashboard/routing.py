@@ -0,0 +1,10 @@
+"""Websocket-маршруты dashboard (подключаются в snab/asgi.py)."""
+
+from django.urls import path
+
+from .consumers import DashboardOpsConsumer
+
+
+websocket_urlpatterns = [
+    path("ws/dashboard/ops/", DashboardOpsConsumer.as_asgi()),
+]
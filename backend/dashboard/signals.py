@@ -0,0 +1,65 @@
+"""
+Сброс снимков дашборда (dashboard/engine.py) при изменении документов.
+
+Меняется версия только затронутых групп:
+- PurchaseRequest — «Заявки» и «КП» (срок КП берётся из заявки);
+- Quote, QuoteMeta (статус КП) — «КП»;
+- PurchaseOrder — «Заказы» и «Доставки» (поставщик доставки — из заказа);
+- Shipment — «Доставки».
+
+После коммита те же документы передаются в changes.emit — построчные изменения
+для websocket-подписчиков и опроса /ops/changes/ (dashboard/changes.py).
+
+Массовые операции без сигналов (bulk_create) вызывают хук явно — quotes_changed(ids)
+(генерация КП по заявке); остальные подхватываются по истечении SNAPSHOT_TTL.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from procurement.models import PurchaseOrder, PurchaseRequest, Quote, QuoteMeta, Shipment
+
+from . import changes, engine
+
+
+def _emit_on_commit(kind, ids_fn):
+    # ids_fn вызывается уже после коммита — связанные документы читаются в итоговом состоянии
+    # robust: сбой рассылки (например, changes.LogBusy) логируется и не ломает уже закоммиченный запрос
+    transaction.on_commit(lambda: changes.emit(kind, ids_fn()), robust=True)
+
+
+@receiver([post_save, post_delete], sender=PurchaseRequest, dispatch_uid="dashboard_pr")
+def _pr_changed(sender, instance, **kwargs):
+    engine.invalidate("pr", "quote")
+    pr_id = instance.pk
+    _emit_on_commit("pr", lambda: [pr_id])
+    _emit_on_commit("quote", lambda: Quote.objects.filter(purchase_request_id=pr_id).values_list("id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Quote, dispatch_uid="dashboard_quote")
+@receiver([post_save, post_delete], sender=QuoteMeta, dispatch_uid="dashboard_quote_meta")
+def _quote_changed(sender, instance, **kwargs):
+    quotes_changed([instance.pk if sender is Quote else instance.quote_id])
+
+
+def quotes_changed(quote_ids):
+    """КП (и их QuoteMeta) изменены в обход post_save — bulk_create / bulk-upsert метаданных."""
+    engine.invalidate("quote")
+    ids = list(quote_ids)
+    _emit_on_commit("quote", lambda: ids)
+
+
+@receiver([post_save, post_delete], sender=PurchaseOrder, dispatch_uid="dashboard_po")
+def _po_changed(sender, instance, **kwargs):
+    engine.invalidate("po", "shipment")
+    po_id = instance.pk
+    _emit_on_commit("po", lambda: [po_id])
+    _emit_on_commit("shipment", lambda: Shipment.objects.filter(order_id=po_id).values_list("id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Shipment, dispatch_uid="dashboard_shipment")
+def _shipment_changed(sender, instance, **kwargs):
+    engine.invalidate("shipment")
+    shipment_id = instance.pk
+    _emit_on_commit("shipment", lambda: [shipment_id])
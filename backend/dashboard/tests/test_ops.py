@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from suppliers.models import Supplier
+from procurement.models import PurchaseOrder, PurchaseRequest, Quote, Shipment
+from procurement.services import quote_meta
+
+URL = "/api/dashboard/ops/"
+
+
+class DashboardOpsTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        self.today = timezone.localdate()
+        now = timezone.now()
+        self.supplier = Supplier.objects.create(name="Supp")
+
+        # самая старая заявка просрочена — раньше выпадала из окна «последние 200»
+        self.old_overdue = PurchaseRequest.objects.create(status="draft", deadline=now - timedelta(days=10))
+        PurchaseRequest.objects.bulk_create([PurchaseRequest(status="draft") for _ in range(210)])
+        self.soon = PurchaseRequest.objects.create(status="open", deadline=now + timedelta(days=2))
+        PurchaseRequest.objects.create(status="closed", deadline=now - timedelta(days=5))
+
+    def _get(self, **params):
+        res = self.client.get(URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        return res.json()["groups"]
+
+    def test_counts_cover_all_open_documents(self):
+        pr = self._get()["pr"]
+        self.assertEqual(pr["counts"], {"overdue": 1, "due_soon": 1, "ok": 210, "total": 212})
+        self.assertEqual([r["id"] for r in pr["rows"][:2]], [self.old_overdue.id, self.soon.id])
+        self.assertEqual(pr["rows"][0]["severity"], "overdue")
+        self.assertEqual(pr["rows"][0]["daysLeft"], -10)
+        self.assertEqual(pr["rows"][1]["daysLeft"], 2)
+        self.assertEqual(len(pr["rows"]), 50)
+        self.assertTrue(pr["has_more"])
+
+        self.assertEqual(self._get(include_done=1)["pr"]["counts"]["overdue"], 2)
+
+    def test_group_pagination_and_severity_filter(self):
+        page = self._get(group="pr", offset=200, limit=50)
+        self.assertEqual(list(page), ["pr"])
+        self.assertEqual(len(page["pr"]["rows"]), 12)
+        self.assertFalse(page["pr"]["has_more"])
+
+        overdue = self._get(group="pr", severity="overdue")["pr"]
+        self.assertEqual([r["id"] for r in overdue["rows"]], [self.old_overdue.id])
+
+        self.assertEqual(self.client.get(URL, {"group": "nope"}).status_code, 400)
+
+    def test_explicit_deadlines_and_incremental_refresh(self):
+        quote = Quote.objects.create(supplier=self.supplier, purchase_request=self.old_overdue)
+        rejected = Quote.objects.create(supplier=self.supplier, purchase_request=self.old_overdue)
+        quote_meta.update(rejected.id, status="rejected")
+        po = PurchaseOrder.objects.create(
+            number="PO-T", supplier=self.supplier, status="sent",
+            deadline=self.today + timedelta(days=30), planned_delivery_date=self.today + timedelta(days=1),
+        )
+        Shipment.objects.create(order=po, eta_date=self.today - timedelta(days=1))
+
+        groups = self._get()
+        self.assertEqual(groups["quote"]["counts"]["total"], 1)
+        self.assertEqual(groups["quote"]["rows"][0]["id"], quote.id)
+        self.assertEqual(groups["quote"]["rows"][0]["severity"], "overdue")   # срок заявки
+        self.assertEqual(groups["quote"]["rows"][0]["status"], "received")
+        self.assertEqual(groups["po"]["rows"][0]["daysLeft"], 1)             # planned_delivery_date
+        self.assertEqual(groups["shipment"]["rows"][0]["party"], "Supp")
+        self.assertEqual(groups["shipment"]["counts"]["overdue"], 1)
+
+        # изменение заказа сбрасывает только его группы
+        po.status = "closed"
+        po.save()
+        with self.assertNumQueries(4):   # «Заказы» и «Доставки»: счётчики + строки
+            groups = self._get()
+        self.assertEqual(groups["po"]["counts"]["total"], 0)
@@ -0,0 +1,148 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from dashboard import changes
+from dashboard.consumers import DashboardOpsConsumer
+from procurement.models import PurchaseRequest
+
+URL = "/api/dashboard/ops/changes/"
+
+IN_MEMORY = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY)
+class DashboardOpsChangesTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.now = timezone.now()
+
+    def _save(self, obj=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            if obj is None:
+                return PurchaseRequest.objects.create(**fields)
+            for k, v in fields.items():
+                setattr(obj, k, v)
+            obj.save()
+            return obj
+
+    def _changes(self, **params):
+        res = self.client.get(URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.assertIn("retry_after", res.json())
+        return res.json()
+
+    def test_row_level_deltas(self):
+        start = self.client.get("/api/dashboard/ops/", {"group": "pr"}).json()["cursor"]
+
+        pr = self._save(status="open", deadline=self.now + timedelta(days=10))
+        self._save(pr, deadline=self.now - timedelta(days=1))
+        self._save(pr, comment="без изменений в строке")
+        self._save(pr, status="closed")
+
+        data = self._changes(since=start)
+        self.assertFalse(data["reset"])
+        ops = [(d["op"], d["id"], d["severity"], d["prev_severity"]) for d in data["deltas"]]
+        self.assertEqual(ops, [
+            ("added", pr.id, "ok", None),
+            ("changed", pr.id, "overdue", "ok"),
+            ("removed", pr.id, None, "overdue"),
+        ])
+        self.assertEqual(data["deltas"][1]["row"]["daysLeft"], -1)
+        self.assertEqual(data["cursor"], data["deltas"][-1]["cursor"])
+
+        # после последнего курсора — пусто; фильтр групп
+        self.assertEqual(self._changes(since=data["cursor"])["deltas"], [])
+        self.assertEqual(self._changes(since=start, groups="po")["deltas"], [])
+        self.assertEqual(self.client.get(URL, {"groups": "nope"}).status_code, 400)
+
+    def test_reset_when_cursor_outside_log(self):
+        pr = self._save(status="open")
+        cur = self._changes()["cursor"]
+        self.assertGreater(cur, 0)
+        self.assertTrue(self._changes(since=cur + 5)["reset"])
+
+        with mock.patch.object(changes, "LOG_SIZE", 2):
+            for days in (1, 2, 5):
+                self._save(pr, deadline=self.now + timedelta(days=days))
+            self.assertTrue(self._changes(since=cur)["reset"])
+
+    def test_cursor_moves_after_log_entries(self):
+        # Читатель, пришедший во время записи журнала, не должен видеть курсор без записей
+        seen = []
+        set_many = cache.set_many
+
+        def spy(data, *args, **kwargs):
+            seen.append(changes.since(0)["reset"])
+            return set_many(data, *args, **kwargs)
+
+        with mock.patch.object(changes.cache, "set_many", side_effect=spy):
+            changes.record([{"group": "pr", "op": "added", "id": 1}])
+        self.assertEqual(seen, [False])
+        self.assertEqual([d["id"] for d in changes.since(0)["deltas"]], [1])
+
+    def test_log_lock_is_not_shared_or_stolen(self):
+        lock = f"{changes.KEY_PREFIX}lock"
+        cache.set(lock, "other", 60)
+        # Замок держит другой писатель — без замка не пишем, курсор не двигается
+        with mock.patch.object(changes, "LOCK_TIMEOUT", 0.05):
+            with self.assertRaises(changes.LogBusy):
+                changes.record([{"group": "pr", "op": "added", "id": 1}])
+        self.assertEqual(changes.cursor(), 0)
+
+        # Свой замок истёк и взят другим писателем — чужой замок не снимаем
+        def steal(data, *args, **kwargs):
+            cache.set(lock, "other", 60)
+            return set_many(data, *args, **kwargs)
+
+        cache.delete(lock)
+        set_many = cache.set_many
+        with mock.patch.object(changes.cache, "set_many", side_effect=steal):
+            changes.record([{"group": "pr", "op": "added", "id": 1}])
+        self.assertEqual(cache.get(lock), "other")
+        self.assertEqual(changes.cursor(), 1)
+
+    def test_websocket_subscribe_and_delta(self):
+        async def scenario():
+            # channels.testing требует daphne, поэтому — ApplicationCommunicator из asgiref напрямую
+            scope = {"type": "websocket", "path": "/ws/dashboard/ops/", "user": self.user, "url_route": {"kwargs": {}}}
+            ws = ApplicationCommunicator(DashboardOpsConsumer.as_asgi(), scope)
+
+            async def send(content):
+                await ws.send_input({"type": "websocket.receive", "text": json.dumps(content)})
+
+            async def receive():
+                return json.loads((await ws.receive_output(2))["text"])
+
+            await ws.send_input({"type": "websocket.connect"})
+            self.assertEqual((await ws.receive_output(2))["type"], "websocket.accept")
+
+            await send({"action": "subscribe", "groups": ["pr"]})
+            ack = await receive()
+            self.assertEqual(ack["groups"], ["pr"])
+
+            pr = await sync_to_async(PurchaseRequest.objects.create)(status="open")
+            await sync_to_async(changes.emit)("pr", [pr.id])
+            msg = await receive()
+            self.assertEqual(msg["type"], "dashboard.delta")
+            self.assertEqual((msg["delta"]["op"], msg["delta"]["id"]), ("added", pr.id))
+
+            await send({"action": "subscribe", "groups": ["nope"]})
+            self.assertEqual((await receive())["type"], "error")
+            await ws.send_input({"type": "websocket.disconnect", "code": 1000})
+            await ws.wait(2)
+
+        async_to_sync(scenario)()
@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import DashboardOpsView
+from .views import DashboardOpsChangesView, DashboardOpsView
 
 urlpatterns = [
     path("ops/", DashboardOpsView.as_view(), name="dashboard-ops"),
+    path("ops/changes/", DashboardOpsChangesView.as_view(), name="dashboard-ops-changes"),
 ]
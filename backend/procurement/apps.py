@@ -4,3 +4,6 @@ class ProcurementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'procurement'
     verbose_name = "Снабжение (закупки и цены)"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+"""
+Websocket-consumer'ы procurement.
+
+ImportJobConsumer — подписка на прогресс фоновой задачи импорта:
+    ws/procurement/import-jobs/<job_id>/
+
+При подключении клиент получает текущее состояние задачи, далее — события import.progress
+(после каждой пачки строк) и финальное событие со статусом done/failed.
+"""
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .models import ImportJob
+from .realtime import import_job_group
+
+
+class ImportJobConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.job_id = int(self.scope["url_route"]["kwargs"]["job_id"])
+        snapshot = await self._snapshot()
+        if snapshot is None:
+            await self.close()
+            return
+
+        self.group_name = import_job_group(self.job_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_json({"type": "import.progress", "job": snapshot})
+
+    async def disconnect(self, code):
+        group = getattr(self, "group_name", None)
+        if group:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def import_progress(self, event):
+        await self.send_json({"type": "import.progress", "job": event["payload"]})
+
+    @database_sync_to_async
+    def _snapshot(self):
+        from .services.import_jobs import job_payload
+
+        job = ImportJob.objects.filter(pk=self.job_id).first()
+        return job_payload(job) if job else None
@@ -0,0 +1,41 @@
+"""
+Приведение значений ячеек и параметров запроса к типам полей.
+
+Общие для импорта прайс-листов (price_list_excel) и фильтров во views.py.
+"""
+
+from decimal import Decimal
+
+
+def to_decimal(val, default=None):
+    """Конвертировать значение в Decimal"""
+    if val in (None, ''):
+        return default
+    try:
+        return Decimal(str(val))
+    except Exception:
+        return default
+
+
+def to_int(val, default=None):
+    """Конвертировать значение в int"""
+    if val in (None, ''):
+        return default
+    try:
+        return int(val)
+    except Exception:
+        return default
+
+
+def to_bool(val, default=None):
+    """Конвертировать значение в bool"""
+    if val is None:
+        return default
+    if isinstance(val, bool):
+        return val
+    s = str(val).strip().lower()
+    if s in ('1', 'true', 'yes', 'да', 'y', 'истина', 'вкл'):
+        return True
+    if s in ('0', 'false', 'no', 'нет', 'n', 'ложь', 'откл'):
+        return False
+    return default
@@ -12,14 +12,15 @@ Resolver для импорта прайсов.
 Возможные стратегии:
 1. По ItemSupplierMapping (если сопоставление уже создано)
 2. По точному совпадению SKU
-3. По нечёткому поиску (contains)
+3. По нечёткому поиску (триграммное сходство артикула/наименования, services/sku_matching.py)
 
 """
 
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from catalog.models import Item
 from suppliers.models import Supplier
 from procurement.models import ItemSupplierMapping
+from procurement.services import price_series, resolution_index, sku_matching
 
 
 def resolve_item_id_by_supplier_context(supplier_name, sku, strategy='auto'):
@@ -31,6 +32,7 @@ def resolve_item_id_by_supplier_context(supplier_name, sku, strategy='auto'):
     - 'mapping': только по ItemSupplierMapping
     - 'sku': только по точному совпадению Item.sku
     - 'fuzzy': нечёткий поиск
+    - 'exact': mapping + sku, без нечёткого поиска
     
     Args:
         supplier_name: название поставщика (str)
@@ -48,39 +50,76 @@ def resolve_item_id_by_supplier_context(supplier_name, sku, strategy='auto'):
         → (None, 0.0)  # ничего не найдено
     """
     
-    if not supplier_name or not sku:
-        return None, 0.0
-    
-    supplier = None
-    try:
-        supplier = Supplier.objects.get(name=supplier_name)
-    except Supplier.DoesNotExist:
-        pass
-    
-    # Стратегия 1: ItemSupplierMapping (самая надёжная)
-    if strategy in ('auto', 'mapping') and supplier:
-        mapping = ItemSupplierMapping.objects.filter(
-            price_list_line__price_list__supplier=supplier,
-            price_list_line__supplier_sku=sku,
-            is_active=True
-        ).first()
-        
-        if mapping:
-            return mapping.item_id, 1.0
-    
-    # Стратегия 2: Точное совпадение Item.sku
-    if strategy in ('auto', 'sku'):
-        item = Item.objects.filter(sku=sku).first()
-        if item:
-            return item.id, 1.0
-    
-    # Стратегия 3: Нечёткий поиск
-    if strategy in ('auto', 'fuzzy'):
-        items = Item.objects.filter(sku__icontains=sku)[:1]
-        if items:
-            return items[0].id, 0.8
-    
-    return None, 0.0
+    return resolve_many([(supplier_name, sku)], strategy=strategy)[0]
+
+
+def load_supplier_ids(names: Iterable[str]) -> Dict[str, int]:
+    """Поставщики по точному названию (при дублях — с меньшим id). Через индекс сопоставления."""
+    return resolution_index.supplier_ids_by_name(names)
+
+
+def resolve_many(pairs: Iterable[Tuple[str, str]], strategy='auto') -> List[Tuple[Optional[int], float]]:
+    """
+    Пакетное сопоставление: то же, что resolve_item_id_by_supplier_context, но для списка строк.
+
+    Все различные пары (поставщик, артикул) разрешаются фиксированным числом запросов,
+    независимо от числа строк:
+    1. поставщики по названию;
+    2. ItemSupplierMapping по (поставщик, артикул) — пакетом на поставщика;
+    3. точное совпадение Item.sku для оставшихся (пакетно);
+    4. нечёткий поиск для оставшихся — триграммный подбор (services/sku_matching.py),
+       один пакетный вызов; принимается лучший кандидат со сходством не ниже AUTO_ACCEPT_SCORE,
+       confidence — из сходства (0.9 для совпадения без учёта разделителей, иначе 0.8 * score).
+
+    Шаги 1–3 идут через индекс сопоставления (services/resolution_index.py):
+    при прогретом индексе запросов к БД нет. Артикулы сравниваются нормализованными
+    (без пробелов по краям, без учёта регистра).
+
+    Args:
+        pairs: [(supplier_name, sku), ...] — порядок и дубли сохраняются
+        strategy: auto/mapping/sku/fuzzy (как у одиночной функции);
+            exact — mapping + sku без нечёткого поиска
+
+    Returns:
+        [(item_id, confidence), ...] — по строке на каждую входную пару
+    """
+    pairs = [(s, k) for s, k in pairs]
+    distinct = {(s, k) for s, k in pairs if s and k}
+    resolved: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    if distinct and strategy in ('auto', 'mapping', 'exact'):
+        supplier_ids = load_supplier_ids(s for s, _ in distinct)
+        by_supplier: Dict[int, set] = {}
+        for s, k in distinct:
+            if supplier_ids.get(s):
+                by_supplier.setdefault(supplier_ids[s], set()).add(k)
+        mapped = {
+            sid: resolution_index.item_ids_by_supplier_sku(sid, skus) for sid, skus in by_supplier.items()
+        }
+        for s, k in distinct:
+            item_id = mapped.get(supplier_ids.get(s), {}).get(resolution_index.normalize_sku(k))
+            if item_id:
+                resolved[(s, k)] = (item_id, 1.0)
+
+    pending = {k for s, k in distinct if (s, k) not in resolved}
+    if pending and strategy in ('auto', 'sku', 'exact'):
+        exact = resolution_index.item_ids_by_sku(pending)
+        for s, k in distinct:
+            item_id = exact.get(resolution_index.normalize_sku(k))
+            if (s, k) not in resolved and item_id:
+                resolved[(s, k)] = (item_id, 1.0)
+
+    pending = {k for s, k in distinct if (s, k) not in resolved}
+    if pending and strategy in ('auto', 'fuzzy'):
+        fuzzy = sku_matching.find_candidates_many(
+            pending, limit=1, min_score=sku_matching.AUTO_ACCEPT_SCORE,
+        )
+        for s, k in distinct:
+            best = fuzzy.get(k)
+            if (s, k) not in resolved and best:
+                resolved[(s, k)] = (best[0]['id'], best[0]['confidence'])
+
+    return [resolved.get((s, k), (None, 0.0)) for s, k in pairs]
 
 
 def find_possible_items_for_sku(sku, supplier_name=None, limit=5):
@@ -139,17 +178,16 @@ def find_possible_items_for_sku(sku, supplier_name=None, limit=5):
     if len(results) >= limit:
         return results[:limit]
     
-    # Попытка 3: Нечёткий поиск (contains)
-    fuzzy_matches = Item.objects.filter(sku__icontains=sku).exclude(
-        id__in=[r['id'] for r in results]
-    )
-    for item in fuzzy_matches[:limit - len(results)]:
+    # Попытка 3: Нечёткий поиск (нормализованный артикул + триграммы по артикулу и наименованию)
+    for cand in sku_matching.find_candidates(
+        sku, limit=limit - len(results), exclude_ids=[r['id'] for r in results],
+    ):
         results.append({
-            'id': item.id,
-            'sku': item.sku,
-            'name': item.name,
-            'confidence': 0.8,
-            'match_type': 'fuzzy_sku'
+            'id': cand['id'],
+            'sku': cand['sku'],
+            'name': cand['name'],
+            'confidence': cand['confidence'],
+            'match_type': cand['match_type'],
         })
     
     return results[:limit]
@@ -213,8 +251,12 @@ def create_or_update_price_records_from_import(price_list_lines, supplier_id=Non
     
     (Опционально, если нужна интеграция с устаревшей моделью PriceRecord)
     
+    Номенклатура сопоставляется одним вызовом resolve_many, запись — bulk_create/bulk_update.
+    Запись за сегодняшний день по (item, supplier) обновляется, иначе создаётся новая.
+    
     Args:
         price_list_lines: список SupplierPriceListLine объектов
+            (желательно с select_related('price_list__supplier'))
         supplier_id: (опционально) ID поставщика
     
     Returns:
@@ -222,34 +264,57 @@ def create_or_update_price_records_from_import(price_list_lines, supplier_id=Non
     """
     
     from procurement.models import PriceRecord
-    from datetime import date
-    
-    count = 0
-    for line in price_list_lines:
-        # Попытаться найти Item
-        item_id = resolve_item_id_by_supplier_context(
-            line.price_list.supplier.name,
-            line.supplier_sku
-        )[0]
-        
-        if not item_id:
-            continue
-        
-        # Создать или обновить PriceRecord
-        price_record, created = PriceRecord.objects.update_or_create(
-            item_id=item_id,
-            supplier=line.price_list.supplier,
-            dt=date.today(),
-            defaults={
-                'price': line.price,
-                'currency': line.price_list.currency,
-                'lead_days': line.lead_time_days,
-                'pack_qty': line.package_quantity,
-                'moq_qty': line.min_quantity,
-                'lot_step': line.quantity_step,
-            }
-        )
-        
-        count += 1
-    
-    return count
+    from django.utils import timezone
+
+    lines = list(price_list_lines)
+    if not lines:
+        return 0
+
+    resolved = resolve_many(
+        (line.price_list.supplier.name, line.supplier_sku) for line in lines
+    )
+
+    # Последняя строка по (item, supplier) побеждает — как при построчном update_or_create
+    by_key = {}
+    for line, (item_id, _conf) in zip(lines, resolved):
+        if item_id:
+            by_key[(item_id, line.price_list.supplier_id)] = line
+    if not by_key:
+        return 0
+
+    # Записи за сегодня обновляем, остальные создаём (2 запроса + 2 пакетные записи)
+    today = timezone.localdate()
+    existing = {}
+    for rec in PriceRecord.objects.filter(
+        item_id__in={i for i, _ in by_key},
+        supplier_id__in={s for _, s in by_key},
+        dt__date=today,
+    ).order_by('id'):
+        existing.setdefault((rec.item_id, rec.supplier_id), rec)
+
+    fields = ['price', 'currency', 'lead_days', 'pack_qty', 'moq_qty', 'lot_step']
+    to_create, to_update = [], []
+    for (item_id, supplier_id), line in by_key.items():
+        values = {
+            'price': line.price,
+            'currency': line.price_list.currency,
+            'lead_days': line.lead_time_days,
+            'pack_qty': line.package_quantity,
+            'moq_qty': line.min_quantity,
+            'lot_step': line.quantity_step,
+        }
+        rec = existing.get((item_id, supplier_id))
+        if rec is None:
+            to_create.append(PriceRecord(item_id=item_id, supplier_id=supplier_id, **values))
+        else:
+            for k, v in values.items():
+                setattr(rec, k, v)
+            to_update.append(rec)
+
+    PriceRecord.objects.bulk_create(to_create)
+    if to_update:
+        PriceRecord.objects.bulk_update(to_update, fields)
+    # bulk-операции не шлют сигналы — ряды истории цен сбрасываем сами
+    price_series.invalidate({i for i, _ in by_key}, {s for _, s in by_key})
+
+    return len(by_key)
@@ -1,27 +1,23 @@
 
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import date
-import io, re
+import re
 
-try:
-    from pdfminer.high_level import extract_text
-except Exception:
-    extract_text = None
+from . import pdf_stream
+from .pdf_stream import PdfLimitError, extract_text
+
+# Версия разбора: менять при изменении разбора — кэш разобранных документов (services/documents.py)
+PARSER_VERSION = "1"
 
 LINE_RE = re.compile(r"^(?P<sku>[A-Za-z0-9_\-./]+)\s+(?P<name>[^0-9]+?)\s+(?P<price>\d+[.,]\d{2})\s*(?P<currency>RUB|RUR|₽|EUR|USD)?", re.I)
 
-def parse_pdf(fileobj, *, supplier_name: str = "", default_currency: str = "RUB") -> Dict[str, Any]:
-    if extract_text is None:
-        return {"ok": False, "errors": ["pdfminer.six не установлен в окружении (добавьте в requirements)."]}
-    # pdfminer требует bytes-like
-    data = fileobj.read()
-    text = extract_text(io.BytesIO(data))
-    if not text:
-        return {"ok": False, "errors": ["PDF пустой или не распознан."]}
 
+def _page_rows(text: str, first_line: int, supplier_name: str, default_currency: str, errors: List[str]):
+    """Строки прайса одной страницы; номера строк — сквозные по документу (как при разборе целиком)."""
+    # \f — конец страницы у pdfminer, splitlines считает его концом строки
+    lines = (text + "\f").splitlines()
     rows: List[Dict[str, Any]] = []
-    errors: List[str] = []
-    for ln_no, line in enumerate(text.splitlines(), start=1):
+    for ln_no, line in enumerate(lines, start=first_line):
         line = line.strip()
         if not line or len(line) < 5:
             continue
@@ -47,4 +43,71 @@ def parse_pdf(fileobj, *, supplier_name: str = "", default_currency: str = "RUB"
             "currency": currency,
             "dt": str(date.today()),
         })
-    return {"ok": True, "preview": True, "rows": rows, "errors": errors}
+    return rows, len(lines)
+
+
+def iter_pdf_rows(
+    fileobj,
+    *,
+    supplier_name: str = "",
+    default_currency: str = "RUB",
+    errors: Optional[List[str]] = None,
+    **engine,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Строки прайса из PDF по мере извлечения страниц (pdf_stream.iter_pages).
+
+    engine — параметры извлечения (workers, pages_per_chunk, max_pages, timeout).
+    Ошибки разбора строк дописываются в errors; лимиты — PdfLimitError.
+    """
+    errors = errors if errors is not None else []
+    line_no = 1
+    for _page, text in pdf_stream.iter_pages(fileobj.read(), **engine):
+        rows, consumed = _page_rows(text, line_no, supplier_name, default_currency, errors)
+        line_no += consumed
+        yield from rows
+
+
+def parse_pdf(
+    fileobj,
+    *,
+    supplier_name: str = "",
+    default_currency: str = "RUB",
+    max_rows: Optional[int] = None,
+    **engine,
+) -> Dict[str, Any]:
+    """
+    Предпросмотр PDF-прайса: {"ok", "preview", "rows", "errors"}.
+
+    max_rows — вернуть только первые строки (truncated=true): оставшиеся страницы не извлекаются.
+    """
+    if extract_text is None:
+        return {"ok": False, "errors": ["pdfminer.six не установлен в окружении (добавьте в requirements)."]}
+
+    rows: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    has_text = False
+    truncated = False
+    line_no = 1
+    pages = pdf_stream.iter_pages(fileobj.read(), **engine)
+    try:
+        for _page, text in pages:
+            has_text = has_text or bool(text.strip())
+            page_rows, consumed = _page_rows(text, line_no, supplier_name, default_currency, errors)
+            line_no += consumed
+            rows.extend(page_rows)
+            if max_rows is not None and len(rows) >= max_rows:
+                truncated = True
+                rows = rows[:max_rows]
+                break
+    except PdfLimitError as e:
+        return {"ok": False, "errors": [str(e)]}
+    finally:
+        # Досрочный выход — оставшиеся диапазоны страниц отменяются
+        pages.close()
+    if not has_text:
+        return {"ok": False, "errors": ["PDF пустой или не распознан."]}
+    result = {"ok": True, "preview": True, "rows": rows, "errors": errors}
+    if truncated:
+        result["truncated"] = True
+    return result
@@ -0,0 +1,220 @@
+"""
+Потоковое извлечение текста PDF по диапазонам страниц.
+
+Раньше весь документ целиком шёл в pdfminer.high_level.extract_text в одном процессе,
+и строки разбирались только после конца извлечения: каталог на 300 страниц занимал
+worker больше минуты. Теперь:
+- документ режется на диапазоны по PAGES_PER_CHUNK страниц; по запросу (workers > 1)
+  диапазоны извлекаются в пуле процессов (pdfminer — чистый Python, потоки не помогают из-за GIL);
+- iter_pages() — генератор (номер страницы, текст) в порядке страниц: первые страницы
+  отдаются, пока остальные ещё извлекаются; закрытие генератора отменяет оставшуюся работу;
+- mode="layout" — вместо текста строки страницы с координатами (для разбора таблиц,
+  importers/pdf_table.py);
+- лимиты: число страниц (проверяется до извлечения, по дереву страниц) и общее время
+  разбора — патологический файл не держит worker бесконечно (PdfLimitError).
+
+По умолчанию (DEFAULT_WORKERS = 1) извлечение последовательное, в текущем процессе: замер
+bench_pdf_import на одноядерной машине выигрыша от пула не показал (4 процесса — 12.2 с
+против 11.0 с у разбора целиком), а запуск процессов веб- и Celery-пути оплачивали бы зря.
+Пул включается явно (workers=N) после замера на многоядерной машине. Мелкие документы
+(один диапазон) и окружения, где дочерние процессы недоступны (например, daemon-процесс),
+тоже извлекаются последовательно — тогда время проверяется между диапазонами.
+"""
+
+import io
+import multiprocessing
+import os
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+try:
+    from pdfminer.converter import PDFPageAggregator, TextConverter
+    from pdfminer.high_level import extract_text
+    from pdfminer.layout import LAParams, LTTextBox, LTTextLine
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+except Exception:
+    extract_text = None
+    PDFPage = None
+
+# Страниц в одном задании пула: меньше — раньше первые строки, больше — меньше накладных расходов
+PAGES_PER_CHUNK = 8
+
+# Процессов по умолчанию: 1 — без пула (см. docstring модуля)
+DEFAULT_WORKERS = 1
+
+# Разумный размер пула для замеров (bench_pdf_import) и явного включения
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Лимиты на документ: страниц и секунд на всё извлечение
+MAX_PAGES = 1000
+TIMEOUT = 120.0
+
+
+class PdfLimitError(ValueError):
+    """PDF превышает лимит страниц или времени извлечения."""
+
+
+def page_count(data: bytes) -> int:
+    """Число страниц (по дереву страниц, без разбора содержимого)."""
+    return sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+
+
+def open_pages(data: bytes) -> list:
+    """Страницы документа (PDFPage): документ разбирается один раз на процесс, а не на каждый диапазон."""
+    return list(PDFPage.create_pages(PDFDocument(PDFParser(io.BytesIO(data)))))
+
+
+def _layout_lines(layout) -> List[Tuple[float, float, float, float, str]]:
+    """Строки текстовых блоков страницы: (x0, y0, x1, y1, текст), y — снизу вверх, как в PDF."""
+    out = []
+    for box in layout:
+        if not isinstance(box, LTTextBox):
+            continue
+        for line in box:
+            if isinstance(line, LTTextLine):
+                text = " ".join(line.get_text().split())
+                if text:
+                    out.append((line.x0, line.y0, line.x1, line.y1, text))
+    return out
+
+
+def extract_layout(pages: list, start: int, stop: int) -> List[List[Tuple[float, float, float, float, str]]]:
+    """Строки с координатами для страниц [start, stop) — по списку на страницу."""
+    rsrcmgr = PDFResourceManager(caching=True)
+    device = PDFPageAggregator(rsrcmgr, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    result = []
+    for page in pages[start:stop]:
+        interpreter.process_page(page)
+        result.append(_layout_lines(device.get_result()))
+    return result
+
+
+def extract_pages(pages: list, start: int, stop: int) -> List[str]:
+    """Тексты страниц [start, stop) — по одному на страницу (как extract_text для каждой из них)."""
+    rsrcmgr = PDFResourceManager(caching=True)
+    out = io.StringIO()
+    device = TextConverter(rsrcmgr, out, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    texts = []
+    try:
+        for page in pages[start:stop]:
+            interpreter.process_page(page)
+            # TextConverter завершает каждую страницу символом \f
+            texts.append(out.getvalue().removesuffix("\f"))
+            out.seek(0)
+            out.truncate(0)
+    finally:
+        device.close()
+    return texts
+
+
+# Документ в процессе пула: передаётся один раз при старте процесса, а не с каждым заданием
+_worker_data: Optional[bytes] = None
+_worker_pages: Optional[list] = None
+
+
+def _init_worker(data: bytes) -> None:
+    global _worker_data, _worker_pages
+    _worker_data, _worker_pages = data, None
+
+
+EXTRACTORS = {"text": extract_pages, "layout": extract_layout}
+
+
+def _extract_range(start: int, stop: int, mode: str = "text") -> List[Any]:
+    """Задание пула: страницы [start, stop) — тексты или строки с координатами."""
+    global _worker_pages
+    if _worker_pages is None:
+        _worker_pages = open_pages(_worker_data)
+    return EXTRACTORS[mode](_worker_pages, start, stop)
+
+
+def _ranges(total: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    step = max(1, pages_per_chunk)
+    return [(start, min(start + step, total)) for start in range(0, total, step)]
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise PdfLimitError("Превышено время разбора PDF")
+    return left
+
+
+def _stop_pool(pool, finished: bool) -> None:
+    if finished:
+        pool.close()
+    else:
+        # Досрочный выход (таймаут, закрытый генератор): Pool.terminate() останавливает и задания
+        # в очереди, и уже запущенные процессы — иначе они доработали бы свой диапазон
+        pool.terminate()
+    pool.join()
+
+
+def _iter_sequential(data, ranges, deadline, mode) -> Iterator[Tuple[int, Any]]:
+    pages = open_pages(data) if ranges else []
+    for start, stop in ranges:
+        _remaining(deadline)
+        for offset, page in enumerate(EXTRACTORS[mode](pages, start, stop)):
+            yield start + offset, page
+
+
+def iter_pages(
+    data: bytes,
+    *,
+    workers: Optional[int] = None,
+    pages_per_chunk: int = PAGES_PER_CHUNK,
+    max_pages: Optional[int] = MAX_PAGES,
+    timeout: Optional[float] = TIMEOUT,
+    mode: str = "text",
+) -> Iterator[Tuple[int, Any]]:
+    """
+    PDF постранично в порядке страниц: (номер страницы с нуля, текст) или, при mode="layout",
+    (номер страницы, [(x0, y0, x1, y1, текст строки), ...]).
+
+    Args:
+        workers: процессов пула (None — DEFAULT_WORKERS; 1 — без пула)
+        pages_per_chunk: страниц в одном задании
+        max_pages: лимит страниц (None — без лимита)
+        timeout: лимит секунд на всё извлечение (None — без лимита)
+
+    Raises:
+        PdfLimitError — документ длиннее max_pages или не уложился в timeout.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    total = page_count(data)
+    if max_pages and total > max_pages:
+        raise PdfLimitError(f"PDF содержит {total} страниц, допустимо не более {max_pages}")
+
+    ranges = _ranges(total, pages_per_chunk)
+    workers = DEFAULT_WORKERS if workers is None else workers
+    if workers <= 1 or len(ranges) <= 1:
+        yield from _iter_sequential(data, ranges, deadline, mode)
+        return
+
+    try:
+        pool = multiprocessing.Pool(min(workers, len(ranges)), initializer=_init_worker, initargs=(data,))
+    except (AssertionError, OSError, RuntimeError):
+        # Дочерние процессы недоступны (daemon-процесс, лимиты ОС) — извлекаем сами
+        yield from _iter_sequential(data, ranges, deadline, mode)
+        return
+
+    finished = False
+    try:
+        results = [pool.apply_async(_extract_range, (start, stop, mode)) for start, stop in ranges]
+        for (start, _stop), result in zip(ranges, results):
+            try:
+                chunk = result.get(timeout=_remaining(deadline))
+            except multiprocessing.TimeoutError:
+                raise PdfLimitError("Превышено время разбора PDF") from None
+            for offset, page in enumerate(chunk):
+                yield start + offset, page
+        finished = True
+    finally:
+        _stop_pool(pool, finished)
@@ -0,0 +1,280 @@
+"""
+Таблицы PDF-прайсов по координатам текста (pdfminer layout).
+
+LINE_RE в pdf_price.py понимает только строки вида «SKU наименование цена [валюта]»;
+настоящие прайсы — многоколоночные таблицы с переносами в наименованиях, единицами,
+MOQ и сроками, и такие строки терялись. Здесь:
+- строки текстовых блоков (LTTextBox -> LTTextLine) с координатами извлекаются по
+  диапазонам страниц (pdf_stream.iter_pages, mode="layout");
+- строки страницы собираются в визуальные строки по вертикали, заголовок таблицы —
+  первая визуальная строка, где не меньше двух ячеек находятся в словаре заголовков
+  (тот же EXPECTED_HEADERS, что у Excel; заголовок, перенесённый на две строки, склеивается);
+- колонки — кластеры по x: пересекающиеся по горизонтали интервалы ячеек заголовка
+  и многоячеечных строк тела сливаются в одну колонку;
+- новая запись начинается строкой с артикулом; строки без артикула сразу под ней —
+  перенос: их ячейки дописываются в соответствующие колонки записи (в т.ч. через
+  границу страницы, если таблица продолжается под повторённым заголовком).
+
+Результат — как у Excel-пути: (headers, генератор (номер, {поле: значение})), поэтому
+PDF идёт в те же import_price_record_rows / import_price_list_rows.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import pdf_stream
+from .price_records_excel import EXPECTED_HEADERS
+
+# Версия разбора: менять при изменении разбора — кэш разобранных документов (services/documents.py)
+PARSER_VERSION = "1"
+
+# Заголовок ищется на первых страницах; дальше таблицы нет — файл не прайс
+HEADER_PAGES = 3
+
+# Число с разделителем тысяч и/или запятой, опционально с обозначением рубля: «1 234,50 ₽»
+NUMBER_RE = re.compile(r"^(-?\d{1,3}(?:[ \u00a0]\d{3})+|-?\d+)(?:[.,](\d+))?\s*(?:₽|руб\.?|р\.)?$", re.I)
+
+Cell = Tuple[float, float, float, float, str]
+
+
+def _norm(text: str) -> str:
+    return " ".join(str(text).lower().split()).rstrip(":")
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    """Число из PDF — в вид, который понимают разборщики Excel-строк («1 234,50» -> «1234.50»)."""
+    if value is None:
+        return None
+    m = NUMBER_RE.match(value.strip())
+    if not m:
+        return value
+    whole = re.sub(r"[ \u00a0]", "", m.group(1))
+    return f"{whole}.{m.group(2)}" if m.group(2) else whole
+
+
+def _overlap(a: Cell, b: Cell) -> float:
+    return min(a[2], b[2]) - max(a[0], b[0])
+
+
+def _visual_lines(cells: List[Cell]) -> List[List[Cell]]:
+    """Ячейки страницы по визуальным строкам сверху вниз, внутри строки — слева направо."""
+    lines: List[List[Cell]] = []
+    mids: List[float] = []
+    for cell in sorted(cells, key=lambda c: -c[3]):
+        mid = (cell[1] + cell[3]) / 2
+        height = cell[3] - cell[1]
+        if lines and abs(mids[-1] - mid) <= height * 0.5:
+            lines[-1].append(cell)
+        else:
+            lines.append([cell])
+            mids.append(mid)
+    return [sorted(line) for line in lines]
+
+
+def _find_header(lines: List[List[Cell]], mapping: Dict[str, str]):
+    """(индекс строки заголовка, строк в заголовке, ячейки заголовка) или None."""
+    for i, line in enumerate(lines):
+        if sum(1 for c in line if _norm(c[4]) in mapping) < 2:
+            continue
+        if i + 1 == len(lines):
+            return i, 1, line
+        # Заголовок колонки, перенесённый на вторую строку: «Срок поставки» + «(дн.)»
+        merged, wrapped = [], False
+        for c in line:
+            below = [d for d in lines[i + 1] if _overlap(c, d) > 0]
+            if below and _norm(c[4]) not in mapping:
+                joined = " ".join([c[4]] + [d[4] for d in below])
+                if _norm(joined) in mapping:
+                    c = (min(c[0], *(d[0] for d in below)), below[-1][1], max(c[2], *(d[2] for d in below)), c[3], joined)
+                    wrapped = True
+            merged.append(c)
+        return (i, 2, merged) if wrapped else (i, 1, line)
+    return None
+
+
+def _clusters(header: List[Cell], body: List[List[Cell]]) -> List[List[float]]:
+    """Колонки: пересекающиеся интервалы x ячеек заголовка и многоячеечных строк тела."""
+    # Строки из одной ячейки (подзаголовки разделов, сноски) могут тянуться через всю таблицу
+    spans = sorted([c[0], c[2]] for c in header + [c for line in body if len(line) > 1 for c in line])
+    clusters: List[List[float]] = []
+    for x0, x1 in spans:
+        if clusters and x0 < clusters[-1][1]:
+            clusters[-1][1] = max(clusters[-1][1], x1)
+        else:
+            clusters.append([x0, x1])
+    return clusters
+
+
+def _column(cell: Cell, clusters: List[List[float]]) -> Optional[int]:
+    mid = (cell[0] + cell[2]) / 2
+    for idx, (x0, x1) in enumerate(clusters):
+        if x0 <= mid <= x1:
+            return idx
+    best = max(range(len(clusters)), key=lambda i: min(cell[2], clusters[i][1]) - max(cell[0], clusters[i][0]), default=None)
+    return best
+
+
+class _Table:
+    """Сборка записей таблицы по страницам (состояние — колонки и незавершённая запись)."""
+
+    def __init__(self, mapping: Dict[str, str], anchor: str, defaults: Dict[str, Any]):
+        self.mapping = mapping
+        self.anchor = anchor
+        self.defaults = defaults
+        self.clusters: Optional[List[List[float]]] = None
+        self.fields: Dict[int, str] = {}
+        self.headers: Dict[str, Any] = {}
+        self.current: Optional[Dict[int, str]] = None
+        self.number = 0
+
+    def _set_header(self, header: List[Cell], body: List[List[Cell]]) -> None:
+        self.clusters = _clusters(header, body)
+        self.fields = {}
+        for c in header:
+            field = self.mapping.get(_norm(c[4]))
+            idx = _column(c, self.clusters)
+            if field and idx is not None and idx not in self.fields and field not in self.fields.values():
+                self.fields[idx] = field
+        if not self.headers:
+            self.headers = {field: idx for idx, field in sorted(self.fields.items())}
+            self.headers.update({f: None for f in self.defaults if f not in self.headers})
+
+    def _values(self, line: List[Cell]) -> Dict[int, str]:
+        values: Dict[int, str] = {}
+        for c in line:
+            idx = _column(c, self.clusters)
+            if idx is not None:
+                values[idx] = f"{values[idx]} {c[4]}" if idx in values else c[4]
+        return values
+
+    def _emit(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        values, self.current = self.current, None
+        # Только артикул без значений — подзаголовок раздела или итоговая строка, не позиция
+        if not any(idx in values for idx, field in self.fields.items() if field != self.anchor):
+            return
+        self.number += 1
+        row = {f: self.defaults[f] for f in self.defaults}
+        for idx, field in self.fields.items():
+            value = values.get(idx)
+            if value is None and field in self.defaults:
+                continue
+            row[field] = value if field == self.anchor else _clean(value)
+        yield self.number, row
+
+    def page(self, cells: List[Cell]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Записи, завершённые на этой странице (последняя может продолжиться на следующей)."""
+        lines = _visual_lines(cells)
+        found = _find_header(lines, self.mapping)
+        if found is not None:
+            i, consumed, header = found
+            body = lines[i + consumed:]
+            self._set_header(header, body)
+        elif self.clusters is None:
+            return
+        else:
+            body = lines
+        anchor_idx = next((idx for idx, f in self.fields.items() if f == self.anchor), None)
+        if anchor_idx is None:
+            return
+
+        # Перенос через границу страницы — только сразу под повторённым заголовком
+        attached = found is not None
+        prev: Optional[List[Cell]] = None
+        for line in body:
+            values = self._values(line)
+            if anchor_idx in values:
+                if self.current is not None:
+                    yield from self._emit()
+                self.current = values
+                attached = True
+            elif self.current is not None and attached and (prev is None or _adjacent(prev, line)):
+                for idx, text in values.items():
+                    self.current[idx] = f"{self.current[idx]} {text}" if idx in self.current else text
+            else:
+                # Разрыв (итоги, сноски, колонтитул): до следующего артикула ничего не дописываем
+                attached = False
+            prev = line
+
+    def finish(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if self.current is not None:
+            yield from self._emit()
+
+
+def _adjacent(upper: List[Cell], lower: List[Cell]) -> bool:
+    """Строка lower идёт сразу под upper (без пустого промежутка больше высоты строки)."""
+    gap = min(c[1] for c in upper) - max(c[3] for c in lower)
+    return gap <= max(c[3] - c[1] for c in lower)
+
+
+def open_pdf_table(
+    file,
+    *,
+    mapping: Dict[str, str] = EXPECTED_HEADERS,
+    anchor: str = "item_sku",
+    defaults: Optional[Dict[str, Any]] = None,
+    **engine,
+) -> Tuple[Dict[str, Any], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Открыть таблицу PDF-прайса (аналог open_price_records_sheet / open_price_list_sheet).
+
+    Args:
+        mapping: заголовок -> поле (EXPECTED_HEADERS или PRICE_LIST_HEADERS)
+        anchor: поле, с которого начинается запись (артикул)
+        defaults: значения полей, которых нет в таблице (например, поставщик прайса)
+        engine: параметры извлечения pdf_stream.iter_pages
+
+    Returns:
+        (headers, rows): найденные колонки (поле -> номер колонки; поля из defaults -> None)
+        и генератор (номер записи, {поле: значение}).
+
+    Raises:
+        pdf_stream.PdfLimitError — лимиты страниц/времени.
+    """
+    if pdf_stream.extract_text is None:
+        raise ValueError("pdfminer.six не установлен в окружении")
+    data = file.read() if hasattr(file, "read") else bytes(file)
+    table = _Table(mapping, anchor, defaults or {})
+    pages = pdf_stream.iter_pages(data, mode="layout", **engine)
+
+    # Страницы до заголовка — разбираются сразу (нужны headers), записи с них отдаются первыми
+    ready: List[Tuple[int, Dict[str, Any]]] = []
+    for page_no, cells in pages:
+        ready.extend(table.page(cells))
+        if table.headers or page_no + 1 >= HEADER_PAGES:
+            break
+
+    def _rows():
+        try:
+            yield from ready
+            if table.headers:
+                for _page_no, cells in pages:
+                    yield from table.page(cells)
+            yield from table.finish()
+        finally:
+            pages.close()
+
+    if not table.headers:
+        pages.close()
+    return dict(table.headers), _rows()
+
+
+def open_price_records_pdf(file, *, supplier_name: str = "", **engine):
+    """PDF-прайс для истории цен: поля EXPECTED_HEADERS; поставщик, если колонки нет, — supplier_name."""
+    return open_pdf_table(
+        file, mapping=EXPECTED_HEADERS, defaults={"supplier": supplier_name} if supplier_name else None, **engine,
+    )
+
+
+def is_pdf(file) -> bool:
+    """Загрузка — PDF (по расширению, типу содержимого или сигнатуре)."""
+    name = (getattr(file, "name", "") or "").lower()
+    ctype = (getattr(file, "content_type", "") or "").lower()
+    if name.endswith(".pdf") or "pdf" in ctype:
+        return True
+    if hasattr(file, "seek"):
+        file.seek(0)
+        head = file.read(5)
+        file.seek(0)
+        return head == b"%PDF-"
+    return False
+
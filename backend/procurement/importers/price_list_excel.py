@@ -0,0 +1,344 @@
+"""
+Потоковый импорт позиций прайс-листа поставщика (SupplierPriceListLine) из Excel.
+
+Используется в SupplierPriceListViewSet.upload.
+
+Отличия от построчной загрузки:
+- книга открывается в read_only-режиме openpyxl и читается построчно (iter_rows),
+  поэтому память не зависит от размера файла;
+- единицы измерения берутся из словаря, загруженного один раз на весь импорт;
+- запись идёт пачками (bulk_create с upsert по уникальному ключу (price_list, supplier_sku)),
+  каждая пачка — в своей короткой транзакции.
+
+Формат строк предпросмотра и отчёт об ошибках совпадают с прежним контрактом upload.
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import openpyxl
+from django.db import transaction
+
+from core.models import Unit
+from procurement.models import SupplierPriceListLine
+from procurement.services import best_offers, price_matrix, resolution_index
+
+from ._coerce import to_bool, to_decimal, to_int
+
+
+# Заголовок в Excel -> поле строки прайс-листа
+PRICE_LIST_HEADERS = {
+    'item_sku': 'item_sku',
+    'description': 'description',
+    'unit': 'unit',
+    'price': 'price',
+    'min_quantity': 'min_quantity',
+    'quantity_step': 'quantity_step',
+    'lead_time_days': 'lead_time_days',
+    'vat_included': 'vat_included',
+    'vat_rate': 'vat_rate',
+    'delivery_cost_fixed': 'delivery_cost_fixed',
+    'delivery_cost_per_unit': 'delivery_cost_per_unit',
+}
+
+REQUIRED_HEADERS = ('item_sku', 'price')
+
+# Версия разбора строк: менять при изменении разбора — кэш разобранных документов (services/documents.py)
+PARSER_VERSION = '1'
+
+# Размер пачки для bulk_create: компромисс между числом запросов и длиной транзакции
+CHUNK_SIZE = 2000
+
+# Поля, которые обновляются при повторной загрузке того же артикула
+UPSERT_FIELDS = [
+    'description',
+    'unit',
+    'price',
+    'min_quantity',
+    'quantity_step',
+    'lead_time_days',
+    'vat_included',
+    'vat_rate',
+    'delivery_cost_fixed',
+    'delivery_cost_per_unit',
+    'updated_at',
+]
+
+DEFAULT_UNIT_NAME = 'шт'
+
+
+def map_headers(header_row: Iterable[Any], mapping: Dict[str, str] = PRICE_LIST_HEADERS) -> Dict[str, int]:
+    """Сопоставить заголовки первой строки с полями (поле -> индекс колонки, с нуля)."""
+    headers: Dict[str, int] = {}
+    for idx, v in enumerate(header_row):
+        if v is None:
+            continue
+        k = str(v).strip().lower()
+        if k in mapping and mapping[k] not in headers:
+            headers[mapping[k]] = idx
+    return headers
+
+
+def open_price_list_sheet(file) -> Tuple[Dict[str, int], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Открыть активный лист книги в потоковом режиме.
+
+    Returns:
+        (headers, rows): headers — найденные колонки (поле -> индекс),
+        rows — генератор (номер строки в Excel, {поле: значение}).
+
+    Raises:
+        Exception — если файл не читается как .xlsx (текст ошибки уходит в ответ API).
+    """
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    ws = wb.active
+    row_iter = ws.iter_rows(values_only=True)
+    try:
+        header_row = next(row_iter)
+    except StopIteration:
+        header_row = ()
+    headers = map_headers(header_row)
+
+    def _rows():
+        try:
+            for r, values in enumerate(row_iter, start=2):
+                yield r, {
+                    field: (values[idx] if idx < len(values) else None)
+                    for field, idx in headers.items()
+                }
+        finally:
+            wb.close()
+
+    return headers, _rows()
+
+
+def _load_units() -> Dict[str, Unit]:
+    """Справочник единиц по наименованию (при дублях побеждает первая по id)."""
+    units: Dict[str, Unit] = {}
+    for u in Unit.objects.order_by('id'):
+        units.setdefault(u.name, u)
+    return units
+
+
+def line_fields(values: Dict[str, Any], unit) -> Dict[str, Any]:
+    """Поля позиции прайса из строки файла (со значениями по умолчанию), кроме price_list и supplier_sku."""
+    return {
+        'description': str(values.get('description') or ''),
+        'unit': unit,
+        'price': to_decimal(values.get('price')),
+        'min_quantity': to_decimal(values.get('min_quantity'), Decimal('1')),
+        'quantity_step': to_decimal(values.get('quantity_step'), Decimal('1')),
+        'lead_time_days': to_int(values.get('lead_time_days'), 14),
+        'vat_included': to_bool(values.get('vat_included'), False),
+        'vat_rate': to_decimal(values.get('vat_rate'), Decimal('20')),
+        'delivery_cost_fixed': to_decimal(values.get('delivery_cost_fixed'), Decimal('0')),
+        'delivery_cost_per_unit': to_decimal(values.get('delivery_cost_per_unit'), Decimal('0')),
+    }
+
+
+def _build_line(price_list, sku: str, row_data: Dict[str, Any], values: Dict[str, Any], unit) -> SupplierPriceListLine:
+    return SupplierPriceListLine(
+        price_list=price_list,
+        supplier_sku=sku,
+        **{**line_fields(values, unit), 'description': row_data['description'], 'price': row_data['price']},
+    )
+
+
+def collect_rows(rows: Iterable[Tuple[int, Dict[str, Any]]]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Строки файла -> {supplier_sku: поля позиции} для сравнения версий (services/price_list_diff.py).
+
+    Проверки те же, что при импорте (пустой артикул пропускается, неверная цена и неизвестная
+    единица — ошибка); при повторе артикула побеждает последняя строка, как в upsert.
+    """
+    units = _load_units()
+    out: Dict[str, Dict[str, Any]] = {}
+    errors: List[str] = []
+    for r, values in rows:
+        sku_raw = values.get('item_sku')
+        if sku_raw in (None, ''):
+            continue
+        sku = str(sku_raw).strip()
+        if to_decimal(values.get('price')) is None:
+            errors.append(f'Строка {r}: {sku} — неверная цена')
+            continue
+        unit_name = str(values.get('unit') or DEFAULT_UNIT_NAME).strip()
+        unit = units.get(unit_name)
+        if unit is None:
+            errors.append(f'Строка {r}: {sku} — неверная единица {unit_name}')
+            continue
+        fields = line_fields(values, unit)
+        fields['unit_id'] = fields.pop('unit').id
+        fields['is_available'] = True
+        out[sku] = fields
+    return out, errors
+
+
+class _Report:
+    """Накопитель результата импорта (формат ответа upload)."""
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+        self.created = 0
+        self.updated = 0
+        self.errors = 0
+        self.errors_detail: List[str] = []
+
+    def fail(self, row_data: Dict[str, Any], key: str, message: str, detail: str):
+        row_data['errors'][key] = message
+        row_data['valid'] = False
+        self.errors += 1
+        self.errors_detail.append(detail)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'errors': self.errors,
+            'errors_detail': self.errors_detail,
+        }
+
+
+def _flush(price_list, batch: List[Tuple[SupplierPriceListLine, Dict[str, Any]]], report: _Report) -> None:
+    """Записать пачку строк одним upsert'ом; при ошибке — построчно, чтобы указать виновную строку."""
+    if not batch:
+        return
+
+    # В одном INSERT ... ON CONFLICT артикул не может встречаться дважды — последняя строка побеждает.
+    # Перезаписанные строки учитываются как обновления, как если бы они попали в разные пачки.
+    by_sku: Dict[str, Tuple[SupplierPriceListLine, Dict[str, Any]]] = {}
+    overwritten: Dict[str, List[Dict[str, Any]]] = {}
+    for line, row_data in batch:
+        if line.supplier_sku in by_sku:
+            overwritten.setdefault(line.supplier_sku, []).append(by_sku[line.supplier_sku][1])
+        by_sku[line.supplier_sku] = (line, row_data)
+
+    existing = set(
+        SupplierPriceListLine.objects.filter(
+            price_list=price_list, supplier_sku__in=list(by_sku.keys())
+        ).values_list('supplier_sku', flat=True)
+    )
+
+    def _count(sku: str) -> None:
+        dups = len(overwritten.get(sku, ()))
+        if sku in existing:
+            report.updated += 1 + dups
+        else:
+            report.created += 1
+            report.updated += dups
+
+    try:
+        with transaction.atomic():
+            SupplierPriceListLine.objects.bulk_create(
+                [line for line, _ in by_sku.values()],
+                update_conflicts=True,
+                unique_fields=['price_list', 'supplier_sku'],
+                update_fields=UPSERT_FIELDS,
+            )
+    except Exception:
+        # Пачка не прошла целиком — повторяем по одной строке, чтобы локализовать ошибку.
+        for sku, (line, row_data) in by_sku.items():
+            try:
+                with transaction.atomic():
+                    SupplierPriceListLine.objects.bulk_create(
+                        [line],
+                        update_conflicts=True,
+                        unique_fields=['price_list', 'supplier_sku'],
+                        update_fields=UPSERT_FIELDS,
+                    )
+            except Exception as e:
+                for failed in (*overwritten.get(sku, ()), row_data):
+                    report.fail(failed, 'create', str(e), f'Строка {failed["row"]}: {sku} — {str(e)}')
+                continue
+            _count(sku)
+        return
+
+    for sku in by_sku:
+        _count(sku)
+
+
+def import_price_list_rows(
+    price_list,
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    *,
+    preview: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    keep_rows: bool = True,
+    on_chunk=None,
+) -> Dict[str, Any]:
+    """
+    Разобрать строки прайс-листа и (если не preview) записать их пачками.
+
+    Args:
+        price_list: SupplierPriceList, в который грузим позиции
+        rows: итерируемое (номер строки, {поле: значение}) — из open_price_list_sheet или другого парсера
+        preview: только проверка, без записи в БД
+        chunk_size: размер пачки для bulk upsert
+        keep_rows: собирать ли строки предпросмотра в результат (фоновой задаче не нужны)
+        on_chunk: (опц.) callback(processed_rows, report) после каждой пачки — для прогресса
+
+    Returns:
+        dict: {'rows', 'created', 'updated', 'errors', 'errors_detail'}
+    """
+    units = _load_units()
+    report = _Report()
+    batch: List[Tuple[SupplierPriceListLine, Dict[str, Any]]] = []
+    processed = 0
+
+    for r, values in rows:
+        sku_raw = values.get('item_sku')
+        if sku_raw in (None, ''):
+            continue
+
+        sku = str(sku_raw).strip()
+        price = to_decimal(values.get('price'))
+
+        row_data = {
+            'row': r,
+            'supplier_sku': sku,
+            'description': str(values.get('description') or ''),
+            'price': price,
+            'valid': price is not None,
+            'errors': {},
+        }
+        if keep_rows:
+            report.rows.append(row_data)
+        processed += 1
+
+        if not row_data['valid']:
+            row_data['errors']['price'] = 'Не найдена или некорректна'
+            report.errors += 1
+            report.errors_detail.append(f'Строка {r}: {sku} — неверная цена')
+            continue
+
+        unit_name = str(values.get('unit') or DEFAULT_UNIT_NAME).strip()
+        unit = units.get(unit_name)
+        if unit is None:
+            report.fail(
+                row_data, 'unit', f'Единица "{unit_name}" не найдена',
+                f'Строка {r}: {sku} — неверная единица {unit_name}',
+            )
+            continue
+
+        if preview:
+            continue
+
+        batch.append((_build_line(price_list, sku, row_data, values, unit), row_data))
+        if len(batch) >= chunk_size:
+            _flush(price_list, batch, report)
+            batch = []
+            if on_chunk is not None:
+                on_chunk(processed, report.as_dict())
+
+    _flush(price_list, batch, report)
+    if not preview:
+        # bulk upsert не шлёт post_save: цены позиций влияют на выбор сопоставления, матрицу цен
+        # и лучшие предложения по сопоставленным позициям
+        resolution_index.invalidate_supplier(price_list.supplier_id)
+        price_matrix.invalidate()
+        best_offers.schedule(best_offers.items_for_price_lists([price_list.id]))
+    if on_chunk is not None:
+        on_chunk(processed, report.as_dict())
+
+    return report.as_dict()
@@ -0,0 +1,266 @@
+"""
+Импорт истории цен (PriceRecord) из Excel-прайса поставщика.
+
+Используется в import_price_excel (синхронно) и в фоновой задаче импорта (ImportJob).
+
+Файл читается потоково (openpyxl read_only), строки обрабатываются пачками:
+разбор -> сопоставление номенклатуры через resolve_many -> запись пачки PriceRecord
+(число запросов на пачку не зависит от числа строк).
+"""
+
+from datetime import date, datetime as dtmod
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import openpyxl
+from django.db import transaction
+
+from suppliers.models import Supplier
+from procurement.models import PriceRecord
+
+from procurement.services import price_series, resolution_index, sku_matching
+
+from ._resolver import load_supplier_ids, resolve_many
+
+
+EXPECTED_HEADERS = {
+    "item_sku":"item_sku", "supplier":"supplier", "price":"price", "currency":"currency",
+    "lead_days":"lead_days", "pack_qty":"pack_qty", "moq_qty":"moq_qty", "mo_amount":"mo_amount",
+    "lot_step":"lot_step", "vat_included":"vat_included", "vat_rate":"vat_rate",
+    "delivery_fixed":"delivery_fixed", "delivery_per_unit":"delivery_per_unit", "dt":"dt",
+    "номенклатура":"item_sku", "поставщик":"supplier", "цена":"price", "валюта":"currency",
+    "срок поставки (дн.)":"lead_days", "кратность упаковки":"pack_qty",
+    "мин. кол-во (moq)":"moq_qty", "мин. сумма заказа":"mo_amount", "кратность заказа поставщика":"lot_step",
+    "цена с ндс":"vat_included", "ставка ндс, %":"vat_rate", "доставка фикс.":"delivery_fixed",
+    "доставка за ед.":"delivery_per_unit", "дата":"dt",
+}
+
+REQUIRED_HEADERS = ["item_sku", "supplier", "price"]
+
+# Версия разбора строк: менять при изменении разбора — кэш разобранных документов (services/documents.py)
+PARSER_VERSION = "1"
+
+CHUNK_SIZE = 1000
+
+
+def _to_bool(val, default=None):
+    if val is None: return default
+    if isinstance(val, bool): return val
+    s = str(val).strip().lower()
+    if s in ("1","true","yes","да","y","истина"): return True
+    if s in ("0","false","no","нет","n","ложь"): return False
+    return default
+
+
+def _to_decimal(val, default=None):
+    if val in (None, ""): return default
+    try: return float(val)
+    except Exception: return default
+
+
+def _to_int(val, default=None):
+    if val in (None, ""): return default
+    try: return int(val)
+    except Exception: return default
+
+
+def _to_date(val, default=None):
+    if val in (None, ""): return default
+    if isinstance(val, dtmod): return val.date()
+    if isinstance(val, date): return val
+    try: return date.fromisoformat(str(val)[:10])
+    except Exception: return default
+
+
+def open_price_records_sheet(file) -> Tuple[Dict[str, int], Iterator[Tuple[int, Dict[str, Any]]]]:
+    """
+    Открыть активный лист прайса в потоковом режиме.
+
+    Returns:
+        (headers, rows): найденные колонки (поле -> индекс с нуля) и генератор
+        (номер строки в Excel, {поле: значение}).
+    """
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    ws = wb.active
+    row_iter = ws.iter_rows(values_only=True)
+    try:
+        header_row = next(row_iter)
+    except StopIteration:
+        header_row = ()
+
+    headers: Dict[str, int] = {}
+    for idx, v in enumerate(header_row):
+        if v is None: continue
+        key = str(v).strip().lower()
+        if key in EXPECTED_HEADERS and EXPECTED_HEADERS[key] not in headers:
+            headers[EXPECTED_HEADERS[key]] = idx
+
+    def _rows():
+        try:
+            for r, values in enumerate(row_iter, start=2):
+                yield r, {f: (values[i] if i < len(values) else None) for f, i in headers.items()}
+        finally:
+            wb.close()
+
+    return headers, _rows()
+
+
+def parse_price_row(r: int, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Разобрать одну строку прайса (без сопоставления номенклатуры). None — пустая строка."""
+    sku_raw = values.get("item_sku")
+    if sku_raw in (None, ""):
+        return None
+    supplier_val = values.get("supplier")
+    today = date.today()
+    return {
+        "row": r,
+        "supplier": str(supplier_val).strip() if supplier_val else "",
+        "item_sku": str(sku_raw).strip(),
+        "price": _to_decimal(values.get("price")),
+        "currency": values.get("currency") or "RUB",
+        "lead_days": _to_int(values.get("lead_days"), 0) if "lead_days" in values else 0,
+        "pack_qty": _to_decimal(values.get("pack_qty"), 1) if "pack_qty" in values else 1,
+        "moq_qty": _to_decimal(values.get("moq_qty"), 0) if "moq_qty" in values else 0,
+        "mo_amount": _to_decimal(values.get("mo_amount"), 0) if "mo_amount" in values else 0,
+        "lot_step": _to_decimal(values.get("lot_step"), 1) if "lot_step" in values else 1,
+        "vat_included": _to_bool(values.get("vat_included"), True) if "vat_included" in values else True,
+        "vat_rate": _to_decimal(values.get("vat_rate"), 20) if "vat_rate" in values else 20,
+        "delivery_fixed": _to_decimal(values.get("delivery_fixed"), 0) if "delivery_fixed" in values else 0,
+        "delivery_per_unit": _to_decimal(values.get("delivery_per_unit"), 0) if "delivery_per_unit" in values else 0,
+        "dt": (_to_date(values.get("dt"), today) if "dt" in values else today).isoformat(),
+    }
+
+
+def _resolve_chunk(parsed: List[Dict[str, Any]], with_candidates: bool = True) -> List[Dict[str, Any]]:
+    """
+    Сопоставить строки пачки с номенклатурой (одним resolve_many) и собрать строки предпросмотра.
+
+    with_candidates — подбирать кандидатов для несопоставленных строк; они нужны только
+    в строках предпросмотра, при записи без них не делается второй триграммный поиск на пачку.
+    """
+    resolved = resolve_many((p["supplier"], p["item_sku"]) for p in parsed)
+    # Кандидаты для несопоставленных строк — одним пакетным подбором
+    unresolved = {p["item_sku"] for p, (item_id, _c) in zip(parsed, resolved) if not item_id}
+    candidates = sku_matching.find_candidates_many(unresolved) if unresolved and with_candidates else {}
+    out = []
+    for p, (item_id, _conf) in zip(parsed, resolved):
+        row_err = {}
+        if p["price"] is None:
+            row_err["price"] = "invalid"
+
+        sku = p["item_sku"]
+        if not item_id:
+            row_err["item_sku"] = f"unmapped: {sku}"
+
+        out.append({
+            "row": p["row"],
+            "valid": len(row_err) == 0,
+            "errors": row_err or None,
+            "supplier": p["supplier"],
+            "item_sku": sku,
+            "item": item_id,
+            "candidates": [
+                {"id": c["id"], "sku": c["sku"], "confidence": c["confidence"]}
+                for c in candidates.get(sku, [])
+            ] if not item_id else [],
+            **{k: p[k] for k in (
+                "price", "currency", "lead_days", "pack_qty", "moq_qty", "mo_amount", "lot_step",
+                "vat_included", "vat_rate", "delivery_fixed", "delivery_per_unit", "dt",
+            )},
+        })
+    return out
+
+
+def _supplier_ids(names) -> Dict[str, int]:
+    """Поставщики по названию; отсутствующие создаются одной пачкой."""
+    ids = load_supplier_ids(names)
+    missing = sorted({n for n in names if n and n not in ids})
+    if missing:
+        Supplier.objects.bulk_create([Supplier(name=n) for n in missing])
+        # bulk_create не шлёт post_save — индекс названий сбрасываем сами
+        resolution_index.invalidate_supplier_names()
+        ids.update(load_supplier_ids(missing))
+    return ids
+
+
+def _write_chunk(valid_rows: List[Dict[str, Any]]) -> int:
+    """Записать валидные строки пачки в PriceRecord одной транзакцией (bulk_create)."""
+    if not valid_rows:
+        return 0
+    with transaction.atomic():
+        supplier_ids = _supplier_ids({r["supplier"] for r in valid_rows})
+        PriceRecord.objects.bulk_create([
+            PriceRecord(
+                item_id=r["item"],
+                supplier_id=supplier_ids[r["supplier"]],
+                price=r["price"],
+                currency=r["currency"],
+                pack_qty=r["pack_qty"],
+                lead_days=r["lead_days"],
+                moq_qty=r["moq_qty"],
+                lot_step=r["lot_step"],
+            )
+            for r in valid_rows
+        ])
+        # bulk_create не шлёт post_save — ряды истории цен сбрасываем сами
+        price_series.invalidate({r["item"] for r in valid_rows}, supplier_ids.values())
+    return len(valid_rows)
+
+
+def import_price_record_rows(
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    *,
+    preview: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    keep_rows: bool = True,
+    on_chunk=None,
+) -> Dict[str, Any]:
+    """
+    Обработать строки прайса пачками.
+
+    Args:
+        rows: (номер строки, {поле: значение}) — из open_price_records_sheet
+        preview: только разбор и сопоставление, без записи
+        chunk_size: размер пачки
+        keep_rows: собирать ли строки предпросмотра в результат (для фоновых задач не нужно)
+        on_chunk: (опц.) callback(processed_rows, result) после каждой пачки
+
+    Returns:
+        dict: {'rows', 'created', 'errors', 'errors_detail'}
+    """
+    result: Dict[str, Any] = {"rows": [], "created": 0, "errors": 0, "errors_detail": []}
+    processed = 0
+    chunk: List[Dict[str, Any]] = []
+
+    def _process(parsed):
+        out = _resolve_chunk(parsed, with_candidates=keep_rows)
+        valid = []
+        for row_out in out:
+            if row_out["valid"]:
+                valid.append(row_out)
+            else:
+                result["errors"] += 1
+                result["errors_detail"].append(
+                    f"Строка {row_out['row']}: {row_out['item_sku']} — " + ", ".join(row_out["errors"].keys())
+                )
+        if keep_rows:
+            result["rows"].extend(out)
+        if not preview:
+            result["created"] += _write_chunk(valid)
+
+    for r, values in rows:
+        parsed = parse_price_row(r, values)
+        if parsed is None:
+            continue
+        chunk.append(parsed)
+        processed += 1
+        if len(chunk) >= chunk_size:
+            _process(chunk)
+            chunk = []
+            if on_chunk is not None:
+                on_chunk(processed, result)
+
+    if chunk:
+        _process(chunk)
+    if on_chunk is not None:
+        on_chunk(processed, result)
+    return result
@@ -0,0 +1,121 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from procurement.importers import pdf_price, pdf_stream
+
+
+def build_pdf(pages) -> bytes:
+    """Минимальный PDF (Helvetica): pages — список страниц, страница — [(x, y, текст ASCII), ...]."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # дерево страниц — после того, как известны номера объектов страниц
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for cells in pages:
+        ops = [f"BT /F1 9 Tf 1 0 0 1 {x} {y} Tm ({text}) Tj ET" for x, y, text in cells]
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_no = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_no
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(pages))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for no, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (no, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def build_price_pdf(pages: int, rows_per_page: int = 40) -> bytes:
+    """Синтетический PDF-прайс: строки «SKU name price RUB», по rows_per_page на страницу."""
+    content = []
+    for page in range(pages):
+        cells = []
+        for i in range(rows_per_page):
+            n = page * rows_per_page + i + 1
+            name = ("Bolt galvanized steel", "Nut hex zinc plated", "Washer flat wide")[n % 3]
+            cells.append((36, 806 - 11 * i, f"SKU-{n:06d} {name} {n % 900 + 10}.{n % 100:02d} RUB"))
+        content.append(cells)
+    return build_pdf(content)
+
+
+def _legacy_parse(data: bytes):
+    """Прежний разбор: весь документ одним extract_text в текущем процессе, затем LINE_RE."""
+    text = pdf_stream.extract_text(io.BytesIO(data))
+    rows, _ = pdf_price._page_rows(text, 1, "", "RUB", [])
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark PDF price extraction: whole-document extract_text in one process (previous parse_pdf) "
+        "vs. page-range extraction in a process pool (pdf_stream.iter_pages). "
+        "Uses a generated multi-page price list unless --file is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=300, help="Pages in the generated PDF.")
+        parser.add_argument("--rows-per-page", type=int, default=40, help="Price rows per generated page.")
+        parser.add_argument("--file", help="Benchmark an existing PDF instead of a generated one.")
+        parser.add_argument(
+            "--workers", type=int, default=pdf_stream.MAX_WORKERS, help="Process pool size for the streaming engine.",
+        )
+        parser.add_argument(
+            "--pages-per-chunk", type=int, default=pdf_stream.PAGES_PER_CHUNK, help="Pages per pool task.",
+        )
+
+    def handle(self, *args, **options):
+        if pdf_stream.extract_text is None:
+            raise CommandError("pdfminer.six is not installed")
+        if options["file"]:
+            with open(options["file"], "rb") as fh:
+                data = fh.read()
+        else:
+            data = build_price_pdf(max(1, options["pages"]), max(1, options["rows_per_page"]))
+        pages = pdf_stream.page_count(data)
+
+        started = time.perf_counter()
+        legacy_rows = _legacy_parse(data)
+        legacy = time.perf_counter() - started
+
+        started = time.perf_counter()
+        first_row = None
+        rows = []
+        for row in pdf_price.iter_pdf_rows(
+            io.BytesIO(data),
+            workers=options["workers"],
+            pages_per_chunk=options["pages_per_chunk"],
+            max_pages=None,
+            timeout=None,
+        ):
+            if first_row is None:
+                first_row = time.perf_counter() - started
+            rows.append(row)
+        streamed = time.perf_counter() - started
+
+        if [(r["row"], r["item_sku"], r["price"]) for r in rows] != [
+            (r["row"], r["item_sku"], r["price"]) for r in legacy_rows
+        ]:
+            raise CommandError("Streaming engine rows differ from the whole-document parse")
+
+        self.stdout.write(f"PDF: {pages} pages, {len(rows)} rows, {len(data) // 1024} KiB")
+        self.stdout.write(f"whole document, 1 process: {legacy:.2f}s")
+        self.stdout.write(
+            f"page ranges, {options['workers']} workers x {options['pages_per_chunk']} pages: "
+            f"{streamed:.2f}s (first row after {first_row or 0:.2f}s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {legacy / max(streamed, 1e-9):.2f}x"))
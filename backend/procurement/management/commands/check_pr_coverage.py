@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+
+from procurement.models import PurchaseRequest, PurchaseRequestCoverage
+from procurement.services import coverage
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare procurement.PurchaseRequestCoverage with a from-scratch computation "
+        "and print differences; --fix rebuilds the ledger for mismatching requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rebuild the ledger for requests that differ.")
+        parser.add_argument("--pr", type=int, action="append", default=None, help="Only this purchase request id (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=coverage.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        qs = PurchaseRequest.objects.order_by("id")
+        if options["pr"]:
+            qs = qs.filter(id__in=options["pr"])
+        pr_ids = list(qs.values_list("id", flat=True))
+
+        batch_size = max(1, options["batch_size"])
+        mismatched = []
+        for start in range(0, len(pr_ids), batch_size):
+            part = pr_ids[start:start + batch_size]
+            live = coverage.compute(part)
+            stored = {pr_id: {} for pr_id in part}
+            for c in PurchaseRequestCoverage.objects.filter(purchase_request_id__in=part):
+                stored[c.purchase_request_id][c.item_id] = {f: getattr(c, f) for f in coverage.QTY_FIELDS}
+
+            for pr_id in part:
+                diffs = self._diff(live[pr_id], stored[pr_id])
+                if not diffs:
+                    continue
+                mismatched.append(pr_id)
+                for line in diffs:
+                    self.stdout.write(f"PR#{pr_id} {line}")
+
+        if options["fix"] and mismatched:
+            coverage.refresh(mismatched)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt coverage for {len(mismatched)} request(s)."))
+        elif mismatched:
+            self.stdout.write(self.style.WARNING(f"Mismatching requests: {len(mismatched)} of {len(pr_ids)}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Coverage ledger is consistent ({len(pr_ids)} request(s))."))
+
+    @staticmethod
+    def _diff(live: dict, stored: dict):
+        zero = {f: 0 for f in coverage.QTY_FIELDS}
+        out = []
+        for item_id in sorted(set(live) | set(stored)):
+            a, b = live.get(item_id, zero), stored.get(item_id)
+            if b is None:
+                out.append(f"item={item_id}: missing in ledger, expected {a}")
+                continue
+            changed = {f: (b[f], a[f]) for f in coverage.QTY_FIELDS if b[f] != a[f]}
+            if item_id not in live:
+                out.append(f"item={item_id}: stale ledger row {b}")
+            elif changed:
+                out.append(f"item={item_id}: " + ", ".join(f"{f} {old} -> {new}" for f, (old, new) in changed.items()))
+        return out
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from procurement.models import ItemBestOffer, ItemSupplierMapping
+from procurement.services import best_offers
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate procurement.ItemBestOffer (preferred / cheapest / fastest offer per item). "
+        "Run daily: price lists start and expire by date without any write to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=best_offers.BATCH_SIZE,
+            help="Items per recalculation batch.",
+        )
+
+    def handle(self, *args, **options):
+        item_ids = set(ItemSupplierMapping.objects.order_by().values_list("item_id", flat=True).distinct())
+        # Позиции, у которых строка есть, а сопоставлений уже нет, — строка удалится при пересчёте
+        item_ids.update(ItemBestOffer.objects.values_list("item_id", flat=True))
+
+        batch_size = max(1, options["batch_size"])
+        ids = sorted(item_ids)
+        total = 0
+        for start in range(0, len(ids), batch_size):
+            total += best_offers.refresh(ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f"Best offers rebuilt: {total} of {len(ids)} items"))
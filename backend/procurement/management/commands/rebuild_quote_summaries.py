@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from procurement.models import Quote, QuoteSummary
+from procurement.services import quote_summary
+
+
+class Command(BaseCommand):
+    help = "Recalculate procurement.QuoteSummary (totals, line counts, lead days, currency) for quotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only quotes that have no summary yet.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=quote_summary.BATCH_SIZE,
+            help="Quotes per recalculation batch.",
+        )
+
+    def handle(self, *args, **options):
+        qs = Quote.objects.order_by("id")
+        if options["missing_only"]:
+            qs = qs.exclude(id__in=QuoteSummary.objects.values("quote_id"))
+
+        batch_size = max(1, options["batch_size"])
+        batch, total = [], 0
+        for quote_id in qs.values_list("id", flat=True).iterator(chunk_size=batch_size):
+            batch.append(quote_id)
+            if len(batch) >= batch_size:
+                total += quote_summary.refresh(batch)
+                batch = []
+        if batch:
+            total += quote_summary.refresh(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Quote summaries rebuilt: {total}"))
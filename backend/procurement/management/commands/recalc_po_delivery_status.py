@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from procurement.models import PurchaseOrder
+from procurement.services import po_delivery
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate purchase order statuses (sent / in_transit / delivered) from shipments "
+        "in batches and print the orders whose status changed; --dry-run only reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report changes without saving.")
+        parser.add_argument("--po", type=int, action="append", default=None, help="Only this purchase order id (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=po_delivery.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        qs = PurchaseOrder.objects.exclude(status="draft").order_by("id")
+        if options["po"]:
+            qs = qs.filter(id__in=options["po"])
+        po_ids = list(qs.values_list("id", flat=True))
+
+        batch_size = max(1, options["batch_size"])
+        changed = {}
+        for start in range(0, len(po_ids), batch_size):
+            part = po_ids[start:start + batch_size]
+            if options["dry_run"]:
+                changed.update({
+                    po_id: (old, new)
+                    for po_id, (old, new) in po_delivery.evaluate(part).items()
+                    if new is not None and new != old
+                })
+            else:
+                changed.update(po_delivery.recalc(part))
+
+        for po_id, (old, new) in sorted(changed.items()):
+            self.stdout.write(f"PO#{po_id}: {old} -> {new}")
+
+        verb = "would change" if options["dry_run"] else "changed"
+        self.stdout.write(self.style.SUCCESS(f"{len(changed)} of {len(po_ids)} order(s) {verb} status."))
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-16 22:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0009_po_shipment_project_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('price_list_lines', 'Позиции прайс-листа'), ('price_records', 'История цен')], max_length=32, verbose_name='Тип импорта')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено'), ('failed', 'Ошибка')], default='queued', max_length=16, verbose_name='Статус')),
+                ('file', models.FileField(upload_to='imports/%Y/%m/', verbose_name='Файл')),
+                ('original_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Имя файла')),
+                ('options', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('created', models.PositiveIntegerField(default=0, verbose_name='Создано')),
+                ('updated', models.PositiveIntegerField(default=0, verbose_name='Обновлено')),
+                ('errors', models.PositiveIntegerField(default=0, verbose_name='Ошибок')),
+                ('errors_detail', models.JSONField(blank=True, default=list, verbose_name='Ошибки (первые)')),
+                ('rows_per_sec', models.FloatField(default=0, verbose_name='Скорость, строк/с')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка выполнения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('price_list', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='procurement.supplierpricelist', verbose_name='Прайс-лист')),
+            ],
+            options={
+                'verbose_name': 'Задача импорта',
+                'verbose_name_plural': 'Задачи импорта',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
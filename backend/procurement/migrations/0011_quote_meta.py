@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-16 22:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0010_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteMeta',
+            fields=[
+                ('quote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='meta', serialize=False, to='procurement.quote', verbose_name='КП')),
+                ('status', models.CharField(blank=True, default='', max_length=32, verbose_name='Статус')),
+                ('notes', models.TextField(blank=True, default='', verbose_name='Примечания')),
+                ('received_at', models.DateTimeField(blank=True, null=True, verbose_name='Получено')),
+                ('delivery_days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Срок поставки, дн.')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Метаданные КП',
+                'verbose_name_plural': 'Метаданные КП',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-16 22:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0011_quote_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteSummary',
+            fields=[
+                ('quote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='procurement.quote', verbose_name='КП')),
+                ('total_price', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=16, verbose_name='Сумма')),
+                ('line_count', models.PositiveIntegerField(default=0, verbose_name='Строк')),
+                ('blocked_line_count', models.PositiveIntegerField(default=0, verbose_name='Исключено строк')),
+                ('max_lead_days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Макс. срок поставки, дн.')),
+                ('currency', models.CharField(default='RUB', max_length=10, verbose_name='Валюта')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Итоги КП',
+                'verbose_name_plural': 'Итоги КП',
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+ORDERED = ["sent", "confirmed", "paid", "in_transit", "delivered", "closed"]
+CONFIRMED = ["confirmed", "paid", "in_transit", "delivered", "closed"]
+
+
+def backfill(apps, schema_editor):
+    """Начальное заполнение журнала (тот же расчёт, что services/coverage.compute)."""
+    PurchaseRequestLine = apps.get_model("procurement", "PurchaseRequestLine")
+    PurchaseOrderLine = apps.get_model("procurement", "PurchaseOrderLine")
+    ShipmentLine = apps.get_model("procurement", "ShipmentLine")
+    Coverage = apps.get_model("procurement", "PurchaseRequestCoverage")
+
+    rows = {}
+
+    def row(pr_id, item_id):
+        return rows.setdefault((pr_id, item_id), Coverage(purchase_request_id=pr_id, item_id=item_id))
+
+    for r in PurchaseRequestLine.objects.filter(item__isnull=False).values("request_id", "item_id").annotate(s=Sum("qty")):
+        row(r["request_id"], r["item_id"]).required_qty = r["s"] or 0
+    for r in (
+        PurchaseOrderLine.objects.filter(order__purchase_request__isnull=False, order__status__in=ORDERED)
+        .values("order__purchase_request_id", "item_id")
+        .annotate(o=Sum("qty"), c=Sum("qty", filter=Q(order__status__in=CONFIRMED)))
+    ):
+        cov = row(r["order__purchase_request_id"], r["item_id"])
+        cov.ordered_qty, cov.confirmed_qty = r["o"] or 0, r["c"] or 0
+    for r in (
+        ShipmentLine.objects.filter(order_line__order__purchase_request__isnull=False, shipment__status="delivered")
+        .values("order_line__order__purchase_request_id", "order_line__item_id")
+        .annotate(s=Sum("qty"))
+    ):
+        row(r["order_line__order__purchase_request_id"], r["order_line__item_id"]).delivered_qty = r["s"] or 0
+
+    Coverage.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_item_trigram_indexes'),
+        ('procurement', '0012_quote_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseRequestCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('required_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Требуется')),
+                ('ordered_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Заказано (sent+)')),
+                ('confirmed_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Подтверждено (confirmed+)')),
+                ('delivered_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Доставлено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.item', verbose_name='Номенклатура')),
+                ('purchase_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage', to='procurement.purchaserequest', verbose_name='Заявка')),
+            ],
+            options={
+                'verbose_name': 'Обеспечение заявки',
+                'verbose_name_plural': 'Обеспечение заявок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='purchaserequestcoverage',
+            constraint=models.UniqueConstraint(fields=('purchase_request', 'item'), name='uniq_pr_coverage_item'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_item_trigram_indexes'),
+        ('procurement', '0013_purchase_request_coverage'),
+        ('suppliers', '0002_supplierpriceline_lead_time_days_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricerecord',
+            index=models.Index(fields=['-dt', '-id'], name='procurement_dt_0a88e0_idx'),
+        ),
+    ]
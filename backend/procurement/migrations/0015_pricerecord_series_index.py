@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_item_trigram_indexes'),
+        ('procurement', '0014_pricerecord_keyset_index'),
+        ('suppliers', '0002_supplierpriceline_lead_time_days_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricerecord',
+            index=models.Index(fields=['item', 'supplier', 'dt'], name='procurement_item_id_de9f26_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_item_trigram_indexes'),
+        ('procurement', '0015_pricerecord_series_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemBestOffer',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='best_offer', serialize=False, to='catalog.item', verbose_name='Номенклатура')),
+                ('cheapest_effective_price', models.DecimalField(blank=True, decimal_places=4, max_digits=16, null=True, verbose_name='Мин. эффективная цена')),
+                ('fastest_lead_time_days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Мин. срок поставки, дн.')),
+                ('offers_count', models.PositiveIntegerField(default=0, verbose_name='Предложений')),
+                ('suppliers_count', models.PositiveIntegerField(default=0, verbose_name='Поставщиков')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('cheapest_mapping', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='procurement.itemsuppliermapping', verbose_name='Самое дешёвое предложение')),
+                ('fastest_mapping', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='procurement.itemsuppliermapping', verbose_name='Самое быстрое предложение')),
+                ('preferred_mapping', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='procurement.itemsuppliermapping', verbose_name='Предпочтительное предложение')),
+            ],
+            options={
+                'verbose_name': 'Лучшее предложение по позиции',
+                'verbose_name_plural': 'Лучшие предложения по позициям',
+            },
+        ),
+    ]
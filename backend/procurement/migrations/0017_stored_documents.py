@@ -0,0 +1,55 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:36
+
+import django.db.models.deletion
+import procurement.models_documents
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0016_item_best_offer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('file', models.FileField(max_length=255, upload_to=procurement.models_documents.document_upload_to, verbose_name='Файл')),
+                ('original_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Имя файла')),
+                ('content_type', models.CharField(blank=True, default='', max_length=100, verbose_name='Тип содержимого')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Загружен')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Документ',
+                'verbose_name_plural': 'Документы',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32, verbose_name='Тип импорта')),
+                ('target', models.CharField(blank=True, default='', max_length=64, verbose_name='Цель')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Итог')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Импортирован')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='procurement.storeddocument', verbose_name='Документ')),
+            ],
+            options={
+                'verbose_name': 'Импорт документа',
+                'verbose_name_plural': 'Импорты документов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='documentimport',
+            constraint=models.UniqueConstraint(fields=('document', 'kind', 'target'), name='uniq_document_import_target'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_item_trigram_indexes'),
+        ('procurement', '0017_stored_documents'),
+        ('projects', '0003_project_delivery_address'),
+        ('suppliers', '0002_supplierpriceline_lead_time_days_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier', 'status'], name='procurement_supplie_b6d45e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderline',
+            index=models.Index(fields=['order', 'item'], name='procurement_order_i_aaa36b_idx'),
+        ),
+    ]
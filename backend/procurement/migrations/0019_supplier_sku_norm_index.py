@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('procurement', '0018_po_reconciliation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplierpricelistline',
+            index=models.Index(django.db.models.functions.text.Upper(django.db.models.functions.text.Trim('supplier_sku')), name='procurement_spll_sku_norm_idx'),
+        ),
+    ]
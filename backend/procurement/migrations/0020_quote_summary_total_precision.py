@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:21
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def recompute_totals(apps, schema_editor):
+    """Сохранённые суммы были округлены до копеек — пересчитать точно (правило services/quote_summary.py)."""
+    Quote = apps.get_model("procurement", "Quote")
+    QuoteLine = apps.get_model("procurement", "QuoteLine")
+    QuoteSummary = apps.get_model("procurement", "QuoteSummary")
+    PurchaseRequestLine = apps.get_model("procurement", "PurchaseRequestLine")
+
+    quote_ids = list(QuoteSummary.objects.values_list("quote_id", flat=True))
+    for start in range(0, len(quote_ids), 500):
+        part = quote_ids[start:start + 500]
+        pr_by_quote = dict(Quote.objects.filter(id__in=part).values_list("id", "purchase_request_id"))
+        pr_ids = {pr_id for pr_id in pr_by_quote.values() if pr_id}
+        qty = {
+            (r["request_id"], r["item_id"]): r["total"] or Decimal("0")
+            for r in PurchaseRequestLine.objects.filter(request_id__in=pr_ids, item_id__isnull=False)
+            .values("request_id", "item_id").annotate(total=Sum("qty"))
+        }
+        totals = {qid: Decimal("0") for qid in pr_by_quote}
+        for quote_id, item_id, price in QuoteLine.objects.filter(quote_id__in=part).values_list(
+            "quote_id", "item_id", "price",
+        ):
+            pr_id = pr_by_quote[quote_id]
+            price = price or Decimal("0")
+            totals[quote_id] += price if pr_id is None else price * qty.get((pr_id, item_id), Decimal("0"))
+        for quote_id, total in totals.items():
+            QuoteSummary.objects.filter(quote_id=quote_id).update(total_price=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0019_supplier_sku_norm_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quotesummary',
+            name='total_price',
+            field=models.DecimalField(db_index=True, decimal_places=8, default=0, max_digits=30, verbose_name='Сумма'),
+        ),
+        migrations.RunPython(recompute_totals, migrations.RunPython.noop),
+    ]
@@ -20,6 +20,7 @@
 """
 
 from django.db import models
+from django.db.models.functions import Trim, Upper
 from django.core.validators import MinValueValidator, MaxValueValidator, DecimalValidator
 from decimal import Decimal
 from datetime import date, timedelta
@@ -227,6 +228,10 @@ class PurchaseOrder(models.Model):
         verbose_name = "Заказ поставщику"
         verbose_name_plural = "Заказы поставщикам"
         ordering = ["-id"]
+        indexes = [
+            # Открытые заказы поставщика (сверка счёта, services/reconciliation.py)
+            models.Index(fields=["supplier", "status"]),
+        ]
 
     def __str__(self):
         return f"PO#{self.number}"
@@ -249,6 +254,9 @@ class PurchaseOrderLine(models.Model):
     class Meta:
         verbose_name = "Строка заказа"
         verbose_name_plural = "Строки заказа"
+        indexes = [
+            models.Index(fields=["order", "item"]),
+        ]
 
     def __str__(self):
         return f"{self.order.number}:{self.item.sku}"
@@ -331,6 +339,10 @@ class PriceRecord(models.Model):
         indexes = [
             models.Index(fields=["item", "-dt"]),
             models.Index(fields=["supplier", "-dt"]),
+            # keyset-пагинация истории цен (?pagination=cursor)
+            models.Index(fields=["-dt", "-id"]),
+            # временные ряды по паре позиция/поставщик (pricerecords/series/)
+            models.Index(fields=["item", "supplier", "dt"]),
         ]
 
     def __str__(self):
@@ -616,6 +628,8 @@ class SupplierPriceListLine(models.Model):
         indexes = [
             models.Index(fields=['price_list', 'is_available']),
             models.Index(fields=['supplier_sku']),
+            # Нормализованный артикул — поиск промахов индекса сопоставления (services/resolution_index.py)
+            models.Index(Upper(Trim('supplier_sku')), name='procurement_spll_sku_norm_idx'),
         ]
         unique_together = [('price_list', 'supplier_sku')]  # В одном прайс-листе артикул уникален
     
@@ -625,14 +639,9 @@ class SupplierPriceListLine(models.Model):
     @property
     def effective_price(self):
         """Эффективная цена с учётом доставки и НДС"""
-        price_with_delivery = self.price + (
-            self.delivery_cost_fixed / self.min_quantity if self.min_quantity > 0 else 0
-        ) + self.delivery_cost_per_unit
-        
-        if not self.vat_included:
-            price_with_delivery *= (1 + self.vat_rate / 100)
-        
-        return price_with_delivery
+        from procurement.services import pricing
+
+        return pricing.effective_price(pricing.LineColumns(self))
     
     def calculate_total_for_quantity(self, quantity):
         """
@@ -644,36 +653,9 @@ class SupplierPriceListLine(models.Model):
         Returns:
             dict: {'valid': bool, 'total': Decimal, 'error': str}
         """
-        # Проверка МОК
-        if quantity < self.min_quantity:
-            return {
-                'valid': False,
-                'error': f'Минимальный заказ {self.min_quantity} {self.unit.name}'
-            }
-        
-        # Проверка кратности
-        if self.quantity_step > 1:
-            remainder = quantity % self.quantity_step
-            if remainder != 0:
-                return {
-                    'valid': False,
-                    'error': f'Количество должно быть кратно {self.quantity_step}'
-                }
-        
-        # Расчёт суммы
-        total = quantity * self.effective_price
-        
-        # Проверка мин. суммы заказа
-        if self.min_order_amount > 0 and total < self.min_order_amount:
-            return {
-                'valid': False,
-                'error': f'Минимальная сумма заказа {self.min_order_amount} {self.price_list.currency}'
-            }
-        
-        return {
-            'valid': True,
-            'total': total
-        }
+        from procurement.services import pricing
+
+        return pricing.evaluate(pricing.LineColumns(self), self.effective_price, quantity)
 
 
 # ============================================================================
@@ -831,3 +813,18 @@ class ItemSupplierMapping(models.Model):
 
 # --- Shipments split (deliveries) ---
 from .models_shipments import Shipment, ShipmentLine  # noqa: E402,F401
+
+# --- Background imports ---
+from .models_imports import ImportJob  # noqa: E402,F401
+
+# --- Quote metadata and totals ---
+from .models_quotes import QuoteMeta, QuoteSummary  # noqa: E402,F401
+
+# --- Purchase request coverage ledger ---
+from .models_coverage import PurchaseRequestCoverage  # noqa: E402,F401
+
+# --- Best current offer per item ---
+from .models_offers import ItemBestOffer  # noqa: E402,F401
+
+# --- Content-addressed document store ---
+from .models_documents import DocumentImport, StoredDocument  # noqa: E402,F401
@@ -0,0 +1,43 @@
+from django.db import models
+
+
+class PurchaseRequestCoverage(models.Model):
+    """
+    Обеспечение заявки по позиции (purchase_request, item):
+    - required_qty  — сколько нужно (сумма строк заявки);
+    - ordered_qty   — заказано заказами в статусах sent и дальше;
+    - confirmed_qty — заказано заказами в статусах confirmed и дальше;
+    - delivered_qty — доставлено (строки доставок в статусе delivered).
+
+    Поддерживается в той же транзакции, что и изменения строк заявки, строк/статусов заказов
+    и доставок (procurement/services/coverage.py, сигналы в procurement/signals.py).
+    Сверка с расчётом «с нуля»: manage.py check_pr_coverage.
+    """
+
+    purchase_request = models.ForeignKey(
+        "procurement.PurchaseRequest",
+        on_delete=models.CASCADE,
+        related_name="coverage",
+        verbose_name="Заявка",
+    )
+    item = models.ForeignKey(
+        "catalog.Item",
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Номенклатура",
+    )
+    required_qty = models.DecimalField("Требуется", max_digits=14, decimal_places=2, default=0)
+    ordered_qty = models.DecimalField("Заказано (sent+)", max_digits=14, decimal_places=2, default=0)
+    confirmed_qty = models.DecimalField("Подтверждено (confirmed+)", max_digits=14, decimal_places=2, default=0)
+    delivered_qty = models.DecimalField("Доставлено", max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Обеспечение заявки"
+        verbose_name_plural = "Обеспечение заявок"
+        constraints = [
+            models.UniqueConstraint(fields=["purchase_request", "item"], name="uniq_pr_coverage_item"),
+        ]
+
+    def __str__(self):
+        return f"PR#{self.purchase_request_id}/{self.item_id}: {self.ordered_qty}/{self.required_qty}"
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import models
+
+
+def document_upload_to(instance, filename):
+    """Путь по содержимому: documents/ab/abcdef...<sha256>.<ext> — одинаковые файлы хранятся один раз."""
+    ext = ""
+    if "." in (filename or ""):
+        ext = "." + filename.rsplit(".", 1)[1].lower()[:10]
+    return f"documents/{instance.sha256[:2]}/{instance.sha256}{ext}"
+
+
+class StoredDocument(models.Model):
+    """
+    Загруженный документ закупки (прайс, счёт) в хранилище по содержимому (SHA-256).
+
+    Повторная загрузка того же файла возвращает существующую запись; результаты разбора
+    кэшируются по хэшу и версии парсера (procurement/services/documents.py).
+    """
+
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    size = models.PositiveBigIntegerField("Размер, байт", default=0)
+    file = models.FileField("Файл", upload_to=document_upload_to, max_length=255)
+    original_name = models.CharField("Имя файла", max_length=255, blank=True, default="")
+    content_type = models.CharField("Тип содержимого", max_length=100, blank=True, default="")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField("Загружен", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Документ"
+        verbose_name_plural = "Документы"
+        ordering = ["-id"]
+
+    def __str__(self) -> str:
+        return f"{self.original_name or self.sha256[:12]} ({self.size} б)"
+
+
+class DocumentImport(models.Model):
+    """
+    Факт импорта документа в цель (история цен, конкретный прайс-лист).
+
+    Повторный импорт того же файла в ту же цель обнаруживается по (document, kind, target)
+    и не выполняется (если не запрошен явно — force=1).
+    """
+
+    document = models.ForeignKey(
+        StoredDocument,
+        on_delete=models.CASCADE,
+        related_name="imports",
+        verbose_name="Документ",
+    )
+    kind = models.CharField("Тип импорта", max_length=32)
+    target = models.CharField("Цель", max_length=64, blank=True, default="")
+    result = models.JSONField("Итог", default=dict, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField("Импортирован", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Импорт документа"
+        verbose_name_plural = "Импорты документов"
+        constraints = [
+            models.UniqueConstraint(fields=["document", "kind", "target"], name="uniq_document_import_target"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.document_id} -> {self.kind}:{self.target}"
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import models
+
+
+class ImportJob(models.Model):
+    """
+    Фоновый импорт файла (прайс-лист поставщика / история цен).
+
+    Файл сохраняется при загрузке, обработку выполняет Celery-задача run_import_job.
+    Прогресс (строки, ошибки, скорость) пишется в модель и рассылается в группу Channels
+    import_job_<id>.
+    """
+
+    class Kind(models.TextChoices):
+        PRICE_LIST_LINES = "price_list_lines", "Позиции прайс-листа"
+        PRICE_RECORDS = "price_records", "История цен"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Завершено"
+        FAILED = "failed", "Ошибка"
+
+    kind = models.CharField("Тип импорта", max_length=32, choices=Kind.choices)
+    status = models.CharField("Статус", max_length=16, choices=Status.choices, default=Status.QUEUED)
+
+    price_list = models.ForeignKey(
+        "procurement.SupplierPriceList",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+        verbose_name="Прайс-лист",
+    )
+    file = models.FileField("Файл", upload_to="imports/%Y/%m/")
+    original_name = models.CharField("Имя файла", max_length=255, blank=True, default="")
+    options = models.JSONField("Параметры", default=dict, blank=True)
+
+    rows_done = models.PositiveIntegerField("Обработано строк", default=0)
+    created = models.PositiveIntegerField("Создано", default=0)
+    updated = models.PositiveIntegerField("Обновлено", default=0)
+    errors = models.PositiveIntegerField("Ошибок", default=0)
+    errors_detail = models.JSONField("Ошибки (первые)", default=list, blank=True)
+    rows_per_sec = models.FloatField("Скорость, строк/с", default=0)
+    error = models.TextField("Ошибка выполнения", blank=True, default="")
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    started_at = models.DateTimeField("Начато", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Задача импорта"
+        verbose_name_plural = "Задачи импорта"
+        ordering = ["-id"]
+
+    def __str__(self) -> str:
+        return f"Import #{self.pk} ({self.kind}, {self.status})"
@@ -0,0 +1,62 @@
+from django.db import models
+
+
+class ItemBestOffer(models.Model):
+    """
+    Лучшие действующие предложения по позиции номенклатуры:
+    - preferred_mapping — первое в порядке выбора КП (предпочтительное, затем по цене прайса);
+    - cheapest_mapping / cheapest_effective_price — минимальная эффективная цена (доставка, НДС);
+    - fastest_mapping / fastest_lead_time_days — минимальный срок поставки;
+    - offers_count / suppliers_count — число действующих предложений и поставщиков.
+
+    Действующее предложение — как в матрице цен (services/price_matrix.active_offers).
+    Пересчитывается точечно при изменении прайс-листов, их позиций и сопоставлений
+    (procurement/services/best_offers.py, сигналы в procurement/signals.py);
+    полный пересчёт (в т.ч. после наступления/окончания дат действия прайсов) — manage.py rebuild_best_offers.
+    """
+
+    item = models.OneToOneField(
+        "catalog.Item",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="best_offer",
+        verbose_name="Номенклатура",
+    )
+    preferred_mapping = models.ForeignKey(
+        "procurement.ItemSupplierMapping",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Предпочтительное предложение",
+    )
+    cheapest_mapping = models.ForeignKey(
+        "procurement.ItemSupplierMapping",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Самое дешёвое предложение",
+    )
+    cheapest_effective_price = models.DecimalField(
+        "Мин. эффективная цена", max_digits=16, decimal_places=4, null=True, blank=True,
+    )
+    fastest_mapping = models.ForeignKey(
+        "procurement.ItemSupplierMapping",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Самое быстрое предложение",
+    )
+    fastest_lead_time_days = models.PositiveIntegerField("Мин. срок поставки, дн.", null=True, blank=True)
+    offers_count = models.PositiveIntegerField("Предложений", default=0)
+    suppliers_count = models.PositiveIntegerField("Поставщиков", default=0)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Лучшее предложение по позиции"
+        verbose_name_plural = "Лучшие предложения по позициям"
+
+    def __str__(self):
+        return f"{self.item_id}: {self.cheapest_effective_price} ({self.offers_count})"
@@ -0,0 +1,65 @@
+from django.db import models
+
+
+class QuoteMeta(models.Model):
+    """
+    Метаданные коммерческого предложения, которые задаёт пользователь на странице КП:
+    статус, примечания, дата получения, срок поставки.
+
+    Отдельная таблица 1:1 к Quote; чтение — через procurement/services/quote_meta.py
+    (общий кэш + пакетная дочитка из БД).
+    """
+
+    quote = models.OneToOneField(
+        "procurement.Quote",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="meta",
+        verbose_name="КП",
+    )
+    status = models.CharField("Статус", max_length=32, blank=True, default="")
+    notes = models.TextField("Примечания", blank=True, default="")
+    received_at = models.DateTimeField("Получено", null=True, blank=True)
+    delivery_days = models.PositiveIntegerField("Срок поставки, дн.", null=True, blank=True)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Метаданные КП"
+        verbose_name_plural = "Метаданные КП"
+
+    def __str__(self):
+        return f"Метаданные КП #{self.quote_id}"
+
+
+class QuoteSummary(models.Model):
+    """
+    Итоги КП, которые раньше пересчитывались при каждой сериализации:
+    сумма (price * qty из заявки), число строк, исключённых строк, максимальный срок, валюта.
+
+    Пересчитывается точечно при изменении строк КП / строк заявки
+    (procurement/services/quote_summary.py, сигналы в procurement/signals.py);
+    полный пересчёт — manage.py rebuild_quote_summaries.
+    """
+
+    quote = models.OneToOneField(
+        "procurement.Quote",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="summary",
+        verbose_name="КП",
+    )
+    # Точность произведения price (2 знака) * qty заявки (6 знаков) — без округления, как прежний расчёт
+    # в сериализаторе: фильтры total_min/total_max и сортировка сравнивают точную сумму
+    total_price = models.DecimalField("Сумма", max_digits=30, decimal_places=8, default=0, db_index=True)
+    line_count = models.PositiveIntegerField("Строк", default=0)
+    blocked_line_count = models.PositiveIntegerField("Исключено строк", default=0)
+    max_lead_days = models.PositiveIntegerField("Макс. срок поставки, дн.", null=True, blank=True)
+    currency = models.CharField("Валюта", max_length=10, default="RUB")
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Итоги КП"
+        verbose_name_plural = "Итоги КП"
+
+    def __str__(self):
+        return f"Итоги КП #{self.quote_id}: {self.total_price} {self.currency}"
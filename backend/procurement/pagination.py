@@ -0,0 +1,50 @@
+"""
+Пагинация больших коллекций procurement.
+
+SwitchablePagination — режим выбирается запросом:
+- по умолчанию — прежний PageNumberPagination (?page=N, count/next/previous/results),
+  существующие клиенты работают без изменений;
+- ?pagination=cursor (или уже полученный ?cursor=...) — keyset-пагинация DRF CursorPagination:
+  непрозрачный курсор, без COUNT(*) и OFFSET — глубокие страницы стоят столько же, сколько первая.
+  Ответ: next/previous/results (count нет).
+
+Порядок курсора задаёт view атрибутом cursor_ordering (по умолчанию "-id");
+под него должен быть индекс (для PriceRecord — (-dt, -id)).
+"""
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class _ViewCursorPagination(CursorPagination):
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+class SwitchablePagination(PageNumberPagination):
+    mode_query_param = "pagination"
+    default_cursor_ordering = ("-id",)
+
+    def _use_cursor(self, request) -> bool:
+        qp = request.query_params
+        return qp.get(self.mode_query_param) == "cursor" or _ViewCursorPagination.cursor_query_param in qp
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._cursor = None
+        if self._use_cursor(request):
+            ordering = getattr(view, "cursor_ordering", None) or self.default_cursor_ordering
+            self._cursor = _ViewCursorPagination(ordering)
+            return self._cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self._cursor is not None:
+            return self._cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self._cursor is not None:
+            return self._cursor.get_html_context()
+        return super().get_html_context()
@@ -0,0 +1,34 @@
+"""
+Рассылка событий в группы Channels (websocket).
+
+Публикация «best effort»: если слой каналов недоступен (нет Redis, тесты без CHANNEL_LAYERS),
+бизнес-операция не должна падать — ошибка только пишется в лог.
+"""
+
+import logging
+from typing import Any, Dict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+
+def import_job_group(job_id: int) -> str:
+    """Имя группы, в которую публикуется прогресс задачи импорта."""
+    return f"import_job_{job_id}"
+
+
+def publish(group: str, event_type: str, payload: Dict[str, Any]) -> None:
+    """
+    Отправить событие в группу.
+
+    event_type — имя обработчика в consumer'е (точки заменяются на подчёркивания Channels).
+    """
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(group, {"type": event_type, "payload": payload})
+    except Exception:
+        logger.warning("channels publish failed: group=%s type=%s", group, event_type, exc_info=True)
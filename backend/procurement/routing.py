@@ -0,0 +1,10 @@
+"""Websocket-маршруты procurement (подключаются в snab/asgi.py)."""
+
+from django.urls import path
+
+from .consumers import ImportJobConsumer
+
+
+websocket_urlpatterns = [
+    path("ws/procurement/import-jobs/<int:job_id>/", ImportJobConsumer.as_asgi()),
+]
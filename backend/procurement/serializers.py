@@ -29,6 +29,7 @@ from .models import (
     PurchaseOrderLine,
     Quote,
     QuoteLine,
+    QuoteSummary,
     SupplierPriceList,
     SupplierPriceListLine,
     ItemSupplierMapping,
@@ -350,7 +351,15 @@ class PurchaseRequestWriteSerializer(serializers.ModelSerializer):
     def _upsert_lines(self, request_obj, lines_data):
         """
         Upsert + delete-missing для строк заявки.
+
+        Итоги КП и журнал обеспечения по заявке пересчитываются один раз, после всех строк.
         """
+        from procurement.services import coverage, quote_summary
+
+        with quote_summary.deferred(), coverage.deferred():
+            self._upsert_lines_inner(request_obj, lines_data)
+
+    def _upsert_lines_inner(self, request_obj, lines_data):
         existing = {line.id: line for line in request_obj.lines.all()}
         seen_ids = set()
 
@@ -531,31 +540,69 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
 # Quote / QuoteLine — коммерческие предложения
 # ============================================================
 
-from django.core.cache import cache
+from django.db.models import Sum
 from django.utils import timezone
 from decimal import Decimal
 
-
-def _quote_meta_key(quote_id: int) -> str:
-    return f"quote_meta:{quote_id}"
+from procurement.services import quote_meta
 
 
 def _quote_meta_get(quote_id: int) -> dict:
-    """Лёгкое хранилище метаданных по Quote без миграций (cache-based).
+    """Метаданные КП (status, notes, received_at, delivery_days), которых нет в самой модели Quote.
 
-    Используем для полей, которых пока нет в модели Quote, но которые нужны фронту:
-    status, notes, received_at, delivery_days.
+    Хранятся в QuoteMeta, читаются через общий кэш — см. procurement/services/quote_meta.py.
     """
-    val = cache.get(_quote_meta_key(quote_id))
-    return val if isinstance(val, dict) else {}
+    return quote_meta.get(quote_id)
 
 
 def _quote_meta_set(quote_id: int, **updates) -> dict:
-    cur = _quote_meta_get(quote_id)
-    cur.update({k: v for k, v in updates.items() if v is not None})
-    # TTL не ставим: это «память» на dev, до появления полей в модели.
-    cache.set(_quote_meta_key(quote_id), cur)
-    return cur
+    return quote_meta.update(quote_id, **updates)
+
+
+def _quote_meta_set_many(quote_ids, **values) -> None:
+    """Записать одинаковые метаданные для новых КП одним запросом."""
+    quote_meta.update_many(quote_ids, **values)
+
+
+def _pr_qty_by_item(pr_ids) -> dict:
+    """{purchase_request_id: {item_id: суммарное qty}} — одним агрегирующим запросом."""
+    result = {pr_id: {} for pr_id in pr_ids}
+    if not result:
+        return result
+    rows = (
+        PurchaseRequestLine.objects.filter(request_id__in=list(result), item_id__isnull=False)
+        .values("request_id", "item_id")
+        .annotate(total=Sum("qty"))
+    )
+    for row in rows:
+        result[row["request_id"]][row["item_id"]] = row["total"] or Decimal("0")
+    return result
+
+
+def _quote_summary(obj):
+    """QuoteSummary КП или None (итоги ещё не посчитаны — сериализатор считает сам)."""
+    try:
+        return obj.summary
+    except QuoteSummary.DoesNotExist:
+        return None
+
+
+class QuoteListSerializer(serializers.ListSerializer):
+    """
+    Список КП за фиксированное число запросов: метаданные всей страницы (quote_meta.get_many)
+    и количества по заявкам (_pr_qty_by_item) загружаются один раз и общие для всех КП.
+    """
+
+    def to_representation(self, data):
+        items = data.all() if hasattr(data, "all") else data
+        items = list(items)
+        self.child._quote_meta = quote_meta.get_many(obj.id for obj in items)
+        # Количества нужны только КП без сохранённых итогов (QuoteSummary)
+        self.child._pr_qty = _pr_qty_by_item({
+            obj.purchase_request_id for obj in items
+            if obj.purchase_request_id and _quote_summary(obj) is None
+        })
+        return super().to_representation(items)
 
 class QuoteLineSerializer(serializers.ModelSerializer):
     """
@@ -612,6 +659,8 @@ class QuoteSerializer(serializers.ModelSerializer):
     delivery_days = serializers.SerializerMethodField()
     currency = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
+    line_count = serializers.SerializerMethodField()
+    blocked_line_count = serializers.SerializerMethodField()
 
     project_id = serializers.SerializerMethodField()
     project_stage_id = serializers.SerializerMethodField()
@@ -622,54 +671,82 @@ class QuoteSerializer(serializers.ModelSerializer):
     purchase_order_id = serializers.SerializerMethodField()
     purchase_order_number = serializers.SerializerMethodField()
 
+    def _meta(self, obj) -> dict:
+        # В списке метаданные уже загружены QuoteListSerializer; для одиночного КП — один запрос
+        # и запоминаем, чтобы четыре поля ниже не ходили в кэш по отдельности.
+        loaded = getattr(self, "_quote_meta", None)
+        if loaded is None or obj.id not in loaded:
+            loaded = dict(loaded or {})
+            loaded[obj.id] = _quote_meta_get(obj.id)
+            self._quote_meta = loaded
+        return loaded[obj.id]
+
     def get_rfq_id(self, obj):
         return 0
 
+    def get_line_count(self, obj):
+        summary = _quote_summary(obj)
+        return summary.line_count if summary is not None else len(obj.lines.all())
+
+    def get_blocked_line_count(self, obj):
+        summary = _quote_summary(obj)
+        if summary is not None:
+            return summary.blocked_line_count
+        return sum(1 for ln in obj.lines.all() if ln.is_blocked)
+
     def get_status(self, obj):
-        return _quote_meta_get(obj.id).get("status") or "received"
+        return self._meta(obj).get("status") or "received"
 
     def get_notes(self, obj):
-        return _quote_meta_get(obj.id).get("notes") or ""
+        return self._meta(obj).get("notes") or ""
 
     def get_received_at(self, obj):
         # По умолчанию считаем, что КП получено в момент создания записи.
-        v = _quote_meta_get(obj.id).get("received_at")
+        v = self._meta(obj).get("received_at")
         return v or obj.created_at
 
     def get_delivery_days(self, obj):
         # Пессимистичная оценка: max(lead_days) по строкам
-        v = _quote_meta_get(obj.id).get("delivery_days")
+        v = self._meta(obj).get("delivery_days")
         if v is not None:
             return v
+        summary = _quote_summary(obj)
+        if summary is not None:
+            return summary.max_lead_days or 0
         days = [ln.lead_days for ln in getattr(obj, "lines", []).all() if ln.lead_days is not None]
         return max(days) if days else 0
 
     def get_currency(self, obj):
         # Валюта: первая валюта строк (если есть), иначе RUB
+        summary = _quote_summary(obj)
+        if summary is not None:
+            return summary.currency
         for ln in getattr(obj, "lines", []).all():
             if ln.currency:
                 return ln.currency
         return "RUB"
 
+    def _qty_by_item(self, pr_id) -> dict:
+        loaded = getattr(self, "_pr_qty", None)
+        if loaded is None or pr_id not in loaded:
+            loaded = dict(loaded or {})
+            loaded.update(_pr_qty_by_item([pr_id]))
+            self._pr_qty = loaded
+        return loaded[pr_id]
+
     def get_total_price(self, obj):
-        # Считаем сумму: price * qty из связанной заявки (если есть), иначе просто сумму price.
-        try:
-            pr = obj.purchase_request
-        except Exception:
-            pr = None
+        summary = _quote_summary(obj)
+        if summary is not None:
+            return summary.total_price
 
-        if pr is None:
+        # Итогов ещё нет — считаем: price * qty из связанной заявки (если есть), иначе просто сумму price.
+        if obj.purchase_request_id is None:
             total = Decimal("0")
             for ln in getattr(obj, "lines", []).all():
                 total += (ln.price or Decimal("0"))
             return total
 
-        qty_by_item = {}
-        for pr_ln in pr.lines.all():
-            if pr_ln.item_id is None:
-                continue
-            qty_by_item[pr_ln.item_id] = qty_by_item.get(pr_ln.item_id, Decimal("0")) + (pr_ln.qty or Decimal("0"))
-
+        qty_by_item = self._qty_by_item(obj.purchase_request_id)
         total = Decimal("0")
         for ql in getattr(obj, "lines", []).all():
             q = qty_by_item.get(ql.item_id, Decimal("0"))
@@ -739,23 +816,25 @@ class QuoteSerializer(serializers.ModelSerializer):
         return name or f"#{getattr(st, 'id', '')}"
 
     def _get_latest_purchase_order(self, obj):
-        """Возвращает последний заказ, сформированный из этого КП (если есть)."""
-        try:
-            qs = obj.purchase_orders.all().order_by("-id")
-            return qs.first()
-        except Exception:
-            return None
+        """(id, number) последнего заказа, сформированного из этого КП, или (None, None)."""
+        # QuoteViewSet аннотирует queryset (latest_po_id / latest_po_number)
+        if "latest_po_id" in obj.__dict__:
+            return obj.latest_po_id, obj.latest_po_number
+        cached = getattr(obj, "_latest_po", None)
+        if cached is None:
+            po = obj.purchase_orders.order_by("-id").values_list("id", "number").first()
+            cached = obj._latest_po = po or (None, None)
+        return cached
 
     def get_purchase_order_id(self, obj):
-        po = self._get_latest_purchase_order(obj)
-        return getattr(po, "id", None) if po else None
+        return self._get_latest_purchase_order(obj)[0]
 
     def get_purchase_order_number(self, obj):
-        po = self._get_latest_purchase_order(obj)
-        return getattr(po, "number", None) if po else None
+        return self._get_latest_purchase_order(obj)[1]
 
     class Meta:
         model = Quote
+        list_serializer_class = QuoteListSerializer
         fields = [
             "id",
             "supplier",
@@ -770,6 +849,8 @@ class QuoteSerializer(serializers.ModelSerializer):
             "rfq_id",
             "status",
             "total_price",
+            "line_count",
+            "blocked_line_count",
             "currency",
             "delivery_days",
             "notes",
@@ -1124,6 +1205,47 @@ class QuoteLineGenerationDataSerializer(serializers.Serializer):
 
 
 
+class PriceBatchLineSerializer(serializers.Serializer):
+    price_list_line_id = serializers.IntegerField()
+    quantity = serializers.DecimalField(max_digits=16, decimal_places=4)
+
+
+class PriceBatchRequestSerializer(serializers.Serializer):
+    """
+    Запрос на пакетный расчёт стоимости (services/pricing.py).
+
+    Пример:
+    {
+        "lines": [
+            {"price_list_line_id": 10, "quantity": "1000"},
+            {"price_list_line_id": 11, "quantity": "12.5"}
+        ]
+    }
+    """
+
+    MAX_LINES = 10000
+
+    lines = serializers.ListField(child=PriceBatchLineSerializer(), allow_empty=False)
+
+    def validate_lines(self, value):
+        if len(value) > self.MAX_LINES:
+            raise serializers.ValidationError(f"Не больше {self.MAX_LINES} строк за запрос")
+        return value
+
+
+class AllocationRequestSerializer(serializers.Serializer):
+    """
+    Запрос на подбор поставщиков по заявке (services/allocation.py).
+
+    Пример:
+    {"mode": "auto", "currency": "RUB", "line_ids": [1, 2, 3]}
+    """
+
+    mode = serializers.ChoiceField(choices=["auto", "heuristic", "exact"], default="auto")
+    currency = serializers.CharField(max_length=10, default="RUB")
+    line_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=True)
+
+
 class GenerateQuotesFromRequestSerializer(serializers.Serializer):
     """
     Serializer для запроса на автогенерацию КП.
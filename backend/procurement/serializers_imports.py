@@ -0,0 +1,35 @@
+from rest_framework import serializers
+
+from .models_imports import ImportJob
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Состояние фоновой задачи импорта (для опроса статуса)."""
+
+    progress_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "price_list",
+            "original_name",
+            "rows_done",
+            "created",
+            "updated",
+            "errors",
+            "errors_detail",
+            "rows_per_sec",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "progress_url",
+        ]
+        read_only_fields = fields
+
+    def get_progress_url(self, obj) -> str:
+        # websocket-канал прогресса (см. procurement/routing.py)
+        return f"/ws/procurement/import-jobs/{obj.id}/"
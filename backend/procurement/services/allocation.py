@@ -0,0 +1,462 @@
+"""
+Подбор поставщиков для строк заявки с минимальной итоговой стоимостью
+(POST /api/procurement/purchase-requests/{id}/allocate/).
+
+Данные — действующие предложения ItemSupplierMapping -> SupplierPriceListLine
+(тот же фильтр, что у матрицы цен: services/price_matrix.active_offers).
+
+Модель стоимости:
+- qty строки переводится в единицы поставщика (conversion_factor) и округляется вверх
+  до МОК (min_quantity_override — в единицах позиции, иначе min_quantity прайса)
+  и до кратности quantity_step (если шаг > 1 — как в calculate_total_for_quantity);
+- стоимость строки = qty_поставщика * (price + delivery_cost_per_unit) * НДС (если vat_included=False);
+- доставка delivery_cost_fixed — одна на заказ поставщику: берётся максимум по его строкам (с НДС);
+- минимальная сумма заказа: сумма строк поставщика >= максимального min_order_amount его строк;
+- срок: сегодня + lead_time_days рабочих дней <= need_date строки (если need_date задан).
+Предложения, не успевающие к сроку, не рассматриваются; строка без предложений попадает в unassigned.
+Валюты не смешиваются: подбор идёт по предложениям в одной валюте (currency, по умолчанию RUB).
+
+Режимы:
+- heuristic — два старта (жадный по предельной стоимости и «самая дешёвая строка») и локальное
+  улучшение: перенос отдельных строк и «закрытие» поставщика (все его строки — к другим), пока есть
+  выигрыш; остаётся лучший. Нарушение минимальной суммы во время поиска — штраф, в ответе оно
+  остаётся, только если без него решения нет (violations);
+- exact — перебор с отсечением по нижней границе (ветви и границы) для небольших задач;
+  при превышении EXACT_NODE_LIMIT узлов возвращается эвристика;
+- auto — exact, если строк не больше EXACT_MAX_LINES, иначе heuristic.
+
+solve() не ходит в БД (задача передаётся словарями) — её можно проверять на синтетических данных.
+"""
+
+import time
+from datetime import date, timedelta
+from decimal import ROUND_CEILING, ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional
+
+MODES = ("auto", "heuristic", "exact")
+
+EXACT_MAX_LINES = 12
+EXACT_NODE_LIMIT = 200_000
+
+# Ограничения локального улучшения
+MAX_ROUNDS = 50
+TIME_BUDGET = 5.0
+
+# Штраф за единицу недобора минимальной суммы заказа во время поиска
+PENALTY = Decimal("1000")
+
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+_QTY = Decimal("0.0001")
+
+
+def add_working_days(start: date, days: int) -> date:
+    """Дата через days рабочих дней (пн–пт) после start."""
+    d = start
+    left = max(0, int(days or 0))
+    while left > 0:
+        d += timedelta(days=1)
+        if d.weekday() < 5:
+            left -= 1
+    return d
+
+
+def order_qty(qty: Decimal, offer: Dict[str, Any]) -> Decimal:
+    """Количество к заказу в единицах поставщика с учётом МОК и кратности."""
+    factor = offer["conversion_factor"]
+    need = qty * factor
+    override = offer.get("min_quantity_override")
+    min_qty = override * factor if override is not None else offer["min_quantity"]
+    need = max(need, min_qty)
+    step = offer["quantity_step"]
+    if step > 1:
+        need = (need / step).to_integral_value(rounding=ROUND_CEILING) * step
+    return need
+
+
+def _vat(offer: Dict[str, Any]) -> Decimal:
+    return Decimal("1") if offer["vat_included"] else 1 + offer["vat_rate"] / 100
+
+
+# ----------------------------------------------------------------------------
+# Состояние решения
+# ----------------------------------------------------------------------------
+
+class _State:
+    """Текущее назначение и агрегаты по поставщикам (сумма строк, доставка, мин. сумма)."""
+
+    def __init__(self, options: List[List[tuple]]):
+        self.options = options
+        self.choice: List[Optional[int]] = [None] * len(options)
+        self.members: Dict[Any, set] = {}
+        self.sub: Dict[Any, Decimal] = {}
+
+    def _opt(self, i, k):
+        return self.options[i][k]
+
+    def supplier_value(self, s, members=None, sub=None) -> Decimal:
+        """Доставка + штраф за недобор минимальной суммы (сумма строк учитывается отдельно)."""
+        members = self.members.get(s, ()) if members is None else members
+        if not members:
+            return _ZERO
+        sub = self.sub.get(s, _ZERO) if sub is None else sub
+        fixed = max(self._opt(i, self.choice[i])[3] for i in members)
+        moa = max(self._opt(i, self.choice[i])[4] for i in members)
+        return fixed + (PENALTY * (moa - sub) if sub < moa else _ZERO)
+
+    def objective(self) -> Decimal:
+        return sum(self.sub.values(), _ZERO) + sum((self.supplier_value(s) for s in self.members), _ZERO)
+
+    def assign(self, i, k):
+        old = self.choice[i]
+        if old is not None:
+            s_old, cost_old = self._opt(i, old)[0], self._opt(i, old)[2]
+            self.members[s_old].discard(i)
+            self.sub[s_old] -= cost_old
+            if not self.members[s_old]:
+                del self.members[s_old]
+                del self.sub[s_old]
+        self.choice[i] = k
+        if k is not None:
+            s, cost = self._opt(i, k)[0], self._opt(i, k)[2]
+            self.members.setdefault(s, set()).add(i)
+            self.sub[s] = self.sub.get(s, _ZERO) + cost
+
+    def delta(self, i, k) -> Decimal:
+        """Изменение целевой функции при переносе строки i на вариант k."""
+        old = self.choice[i]
+        if old == k:
+            return _ZERO
+        before = after = _ZERO
+        touched = {self._opt(i, k)[0]}
+        if old is not None:
+            touched.add(self._opt(i, old)[0])
+        for s in touched:
+            before += self.sub.get(s, _ZERO) + self.supplier_value(s)
+        self.assign(i, k)
+        for s in touched:
+            after += self.sub.get(s, _ZERO) + self.supplier_value(s)
+        self.assign(i, old)
+        return after - before
+
+    def violations(self) -> List[Any]:
+        out = []
+        for s, members in self.members.items():
+            moa = max(self._opt(i, self.choice[i])[4] for i in members)
+            if self.sub[s] < moa:
+                out.append(s)
+        return out
+
+
+# ----------------------------------------------------------------------------
+# Эвристика
+# ----------------------------------------------------------------------------
+
+def _greedy(state: _State, order: List[int]) -> None:
+    for i in order:
+        best_k, best_d = None, None
+        for k in range(len(state.options[i])):
+            d = state.delta(i, k)
+            if best_d is None or d < best_d:
+                best_k, best_d = k, d
+        state.assign(i, best_k)
+
+
+def _improve(state: _State, deadline: float) -> int:
+    """Локальное улучшение до неподвижной точки; возвращает число раундов."""
+    idx = [i for i in range(len(state.options)) if state.options[i]]
+    rounds = 0
+    improved = True
+    while improved and rounds < MAX_ROUNDS and time.monotonic() < deadline:
+        improved = False
+        rounds += 1
+
+        # 1. Перенос отдельных строк
+        for i in idx:
+            best_k, best_d = None, _ZERO
+            for k in range(len(state.options[i])):
+                d = state.delta(i, k)
+                if d < best_d:
+                    best_k, best_d = k, d
+            if best_k is not None:
+                state.assign(i, best_k)
+                improved = True
+
+        # 2. Закрытие поставщика: все его строки — к лучшим вариантам у других
+        for s in list(state.members):
+            if s not in state.members:
+                continue
+            before = state.objective()
+            moved = []
+            ok = True
+            for i in list(state.members[s]):
+                alts = [k for k, opt in enumerate(state.options[i]) if opt[0] != s]
+                if not alts:
+                    ok = False
+                    break
+                prev = state.choice[i]
+                k = min(alts, key=lambda k: state.delta(i, k))
+                state.assign(i, k)
+                moved.append((i, prev))
+            if ok and state.objective() < before:
+                improved = True
+                continue
+            for i, prev in reversed(moved):
+                state.assign(i, prev)
+    return rounds
+
+
+# ----------------------------------------------------------------------------
+# Точный перебор
+# ----------------------------------------------------------------------------
+
+def _exact(options: List[List[tuple]], upper: Optional[Decimal]):
+    """
+    Ветви и границы. (завершён ли перебор, назначение) — назначение None,
+    если допустимого решения дешевле upper нет (или исчерпан лимит узлов).
+    """
+    idx = sorted((i for i in range(len(options)) if options[i]), key=lambda i: len(options[i]))
+    min_cost = [min(o[2] for o in options[i]) for i in idx]
+    rest = [_ZERO] * (len(idx) + 1)
+    for p in range(len(idx) - 1, -1, -1):
+        rest[p] = rest[p + 1] + min_cost[p]
+
+    choice: List[Optional[int]] = [None] * len(options)
+    sub: Dict[Any, Decimal] = {}
+    fixed: Dict[Any, Decimal] = {}
+    moa: Dict[Any, Decimal] = {}
+    best = {"cost": upper, "choice": None}
+    nodes = 0
+
+    def partial() -> Decimal:
+        return sum(sub.values(), _ZERO) + sum(fixed.values(), _ZERO)
+
+    def dfs(p: int) -> bool:
+        nonlocal nodes
+        nodes += 1
+        if nodes > EXACT_NODE_LIMIT:
+            return False
+        if p == len(idx):
+            if all(sub[s] >= moa[s] for s in sub):
+                cost = partial()
+                if best["cost"] is None or cost < best["cost"]:
+                    best["cost"], best["choice"] = cost, list(choice)
+            return True
+        i = idx[p]
+        for k in sorted(range(len(options[i])), key=lambda k: options[i][k][2]):
+            s, _q, cost, fx, mo = options[i][k]
+            saved = (sub.get(s), fixed.get(s), moa.get(s))
+            sub[s] = (saved[0] or _ZERO) + cost
+            fixed[s] = max(saved[1] or _ZERO, fx)
+            moa[s] = max(saved[2] or _ZERO, mo)
+            choice[i] = k
+            bound = partial() + rest[p + 1]
+            ok = True
+            if best["cost"] is None or bound < best["cost"]:
+                ok = dfs(p + 1)
+            for store, value in zip((sub, fixed, moa), saved):
+                if value is None:
+                    store.pop(s, None)
+                else:
+                    store[s] = value
+            choice[i] = None
+            if not ok:
+                return False
+        return True
+
+    completed = dfs(0)
+    return completed, best["choice"]
+
+
+# ----------------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------------
+
+def solve(lines: List[Dict[str, Any]], offers_by_item: Dict[int, List[Dict[str, Any]]], *,
+          mode: str = "auto", today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    lines: [{id, item_id, qty, need_date}];
+    offers_by_item: {item_id: [{supplier_id, conversion_factor, min_quantity, min_quantity_override,
+    quantity_step, min_order_amount, price, delivery_cost_fixed, delivery_cost_per_unit, vat_included,
+    vat_rate, lead_time_days, ...}]}.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode: допустимо {', '.join(MODES)}")
+    started = time.monotonic()
+    today = today or date.today()
+
+    # Варианты строки: (supplier_id, qty поставщика, стоимость, доставка, мин. сумма) + само предложение
+    options: List[List[tuple]] = []
+    offers_for: List[List[Dict[str, Any]]] = []
+    unassigned = []
+    for line in lines:
+        opts, offs = [], []
+        late = False
+        for offer in offers_by_item.get(line["item_id"], ()):
+            eta = add_working_days(today, offer["lead_time_days"])
+            if line.get("need_date") and eta > line["need_date"]:
+                late = True
+                continue
+            vat = _vat(offer)
+            q = order_qty(Decimal(line["qty"]), offer)
+            cost = q * (offer["price"] + offer["delivery_cost_per_unit"]) * vat
+            opts.append((offer["supplier_id"], q, cost, offer["delivery_cost_fixed"] * vat, offer["min_order_amount"]))
+            offs.append({**offer, "eta": eta})
+        if not opts:
+            unassigned.append({
+                "pr_line_id": line["id"],
+                "item_id": line["item_id"],
+                "reason": "Ни одно предложение не успевает к сроку" if late else "Нет действующих предложений",
+            })
+        options.append(opts)
+        offers_for.append(offs)
+
+    order = sorted(
+        (i for i in range(len(options)) if options[i]),
+        key=lambda i: (len(options[i]), -max(o[2] for o in options[i])),
+    )
+    # Два старта: жадный по предельной стоимости (собирает доставку) и «самая дешёвая строка»
+    # (не застревает на первом выбранном поставщике); остаётся лучший после улучшения.
+    state, rounds = None, 0
+    for start in ("greedy", "cheapest"):
+        candidate = _State(options)
+        if start == "greedy":
+            _greedy(candidate, order)
+        else:
+            for i in order:
+                candidate.assign(i, min(range(len(options[i])), key=lambda k: options[i][k][2]))
+        rounds += _improve(candidate, started + TIME_BUDGET)
+        if state is None or (bool(candidate.violations()), candidate.objective()) < (
+            bool(state.violations()), state.objective()
+        ):
+            state = candidate
+
+    used_mode = "heuristic"
+    if mode == "exact" or (mode == "auto" and len(order) <= EXACT_MAX_LINES):
+        upper = None if state.violations() else state.objective()
+        completed, choice = _exact(options, upper)
+        if choice is not None:
+            for i, k in enumerate(choice):
+                state.assign(i, k)
+        if completed:
+            # Перебор завершён: найденное решение (или эвристика, если лучше нет) оптимально
+            used_mode = "exact"
+
+    return _result(lines, state, offers_for, unassigned, used_mode, rounds, time.monotonic() - started)
+
+
+def _money(value: Decimal) -> str:
+    return str(value.quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def _result(lines, state: _State, offers_for, unassigned, mode, rounds, elapsed) -> Dict[str, Any]:
+    orders: Dict[Any, Dict[str, Any]] = {}
+    for i, k in enumerate(state.choice):
+        if k is None:
+            continue
+        s, q, cost, _fx, _moa = state.options[i][k]
+        offer = offers_for[i][k]
+        order = orders.setdefault(s, {
+            "supplier_id": s,
+            "supplier_name": offer.get("supplier_name", ""),
+            "currency": offer.get("currency", ""),
+            "lines": [],
+        })
+        order["lines"].append({
+            "pr_line_id": lines[i]["id"],
+            "item_id": lines[i]["item_id"],
+            "qty": str(Decimal(lines[i]["qty"]).quantize(_QTY)),
+            "mapping_id": offer.get("mapping_id"),
+            "price_list_line_id": offer.get("price_list_line_id"),
+            "supplier_qty": str(q.quantize(_QTY)),
+            "cost": _money(cost),
+            "lead_time_days": offer["lead_time_days"],
+            "eta": offer["eta"].isoformat(),
+        })
+
+    total = _ZERO
+    out = []
+    for s, order in orders.items():
+        members = state.members[s]
+        subtotal = state.sub[s]
+        delivery = max(state.options[i][state.choice[i]][3] for i in members)
+        min_amount = max(state.options[i][state.choice[i]][4] for i in members)
+        order.update({
+            "subtotal": _money(subtotal),
+            "delivery_fixed": _money(delivery),
+            "min_order_amount": _money(min_amount),
+            "total": _money(subtotal + delivery),
+        })
+        total += subtotal + delivery
+        out.append(order)
+    out.sort(key=lambda o: (-Decimal(o["total"]), str(o["supplier_id"])))
+
+    return {
+        "mode": mode,
+        "total_cost": _money(total),
+        "orders": out,
+        "unassigned": unassigned,
+        "violations": [
+            {"supplier_id": s, "detail": "Сумма заказа меньше минимальной суммы поставщика"}
+            for s in state.violations()
+        ],
+        "stats": {"rounds": rounds, "elapsed_ms": int(elapsed * 1000)},
+    }
+
+
+def load(pr_id: int, currency: str = "RUB", line_ids: Optional[List[int]] = None, today: Optional[date] = None):
+    """Строки заявки и действующие предложения по их позициям (два запроса)."""
+    from procurement.models import PurchaseRequestLine
+
+    from .price_matrix import active_offers
+
+    today = today or date.today()
+    qs = PurchaseRequestLine.objects.filter(request_id=pr_id, item_id__isnull=False, qty__gt=0)
+    if line_ids:
+        qs = qs.filter(id__in=line_ids)
+    lines = list(qs.order_by("id").values("id", "item_id", "qty", "need_date"))
+
+    offers_by_item: Dict[int, List[Dict[str, Any]]] = {}
+    rows = (
+        active_offers(today)
+        .filter(item_id__in={line["item_id"] for line in lines}, price_list_line__price_list__currency=currency)
+        .values(
+            "id", "item_id", "conversion_factor", "min_quantity_override", "price_list_line_id",
+            "price_list_line__price", "price_list_line__min_quantity", "price_list_line__quantity_step",
+            "price_list_line__min_order_amount", "price_list_line__delivery_cost_fixed",
+            "price_list_line__delivery_cost_per_unit", "price_list_line__vat_included",
+            "price_list_line__vat_rate", "price_list_line__lead_time_days",
+            "price_list_line__price_list__currency", "price_list_line__price_list__supplier_id",
+            "price_list_line__price_list__supplier__name",
+        )
+        .order_by("item_id", "id")
+    )
+    for r in rows:
+        offers_by_item.setdefault(r["item_id"], []).append({
+            "mapping_id": r["id"],
+            "price_list_line_id": r["price_list_line_id"],
+            "supplier_id": r["price_list_line__price_list__supplier_id"],
+            "supplier_name": r["price_list_line__price_list__supplier__name"],
+            "currency": r["price_list_line__price_list__currency"],
+            "conversion_factor": r["conversion_factor"],
+            "min_quantity_override": r["min_quantity_override"],
+            "min_quantity": r["price_list_line__min_quantity"],
+            "quantity_step": r["price_list_line__quantity_step"],
+            "min_order_amount": r["price_list_line__min_order_amount"],
+            "price": r["price_list_line__price"],
+            "delivery_cost_fixed": r["price_list_line__delivery_cost_fixed"],
+            "delivery_cost_per_unit": r["price_list_line__delivery_cost_per_unit"],
+            "vat_included": r["price_list_line__vat_included"],
+            "vat_rate": r["price_list_line__vat_rate"],
+            "lead_time_days": r["price_list_line__lead_time_days"],
+        })
+    return lines, offers_by_item
+
+
+def allocate(pr_id: int, *, mode: str = "auto", currency: str = "RUB",
+             line_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Предложение разбивки заявки на заказы поставщикам (в БД ничего не пишется)."""
+    today = date.today()
+    lines, offers_by_item = load(pr_id, currency=currency, line_ids=line_ids, today=today)
+    result = solve(lines, offers_by_item, mode=mode, today=today)
+    return {"purchase_request_id": pr_id, "currency": currency, **result}
@@ -0,0 +1,223 @@
+"""
+Таблица лучших предложений по позициям (ItemBestOffer).
+
+Выбор поставщика для позиции (генерация КП, find_alternative, опции поставщиков в импорте)
+каждый раз шёл JOIN'ом ItemSupplierMapping -> SupplierPriceListLine -> SupplierPriceList -> Supplier
+с сортировкой. Теперь по каждой позиции хранится готовая строка:
+предпочтительное, самое дешёвое (эффективная цена) и самое быстрое предложение, число предложений.
+
+- refresh(item_ids): один запрос за действующими предложениями пакета позиций и один upsert;
+  эффективная цена — тем же Decimal-расчётом, что и свойство модели (services/pricing.effective_price);
+- сигналы (procurement/signals.py) вызывают schedule() при изменении сопоставлений, позиций прайса
+  и самих прайс-листов (включение/выключение, даты); bulk-записи (импорт прайса, применение разницы
+  версий) вызывают schedule() явно;
+- внутри `with deferred():` пересчёт копится до конца блока;
+- for_items(item_ids) — один запрос по первичному ключу (IN) для целой корзины позиций;
+  lookup(item_ids) — то же с данными самих предложений (поставщик, артикул, цена, срок) для API.
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterable
+
+from django.db import transaction
+
+from .pricing import effective_price
+
+BATCH_SIZE = 500
+
+FIELDS = (
+    "preferred_mapping_id", "cheapest_mapping_id", "cheapest_effective_price",
+    "fastest_mapping_id", "fastest_lead_time_days", "offers_count", "suppliers_count",
+)
+
+_state = threading.local()
+
+
+def _clean_ids(ids: Iterable[int]):
+    return list(dict.fromkeys(int(i) for i in ids if i))
+
+
+def compute(item_ids: Iterable[int], today: date = None) -> Dict[int, Dict[str, Any]]:
+    """{item_id: поля ItemBestOffer} — только для позиций, у которых есть действующие предложения."""
+    from .price_matrix import active_offers
+
+    ids = _clean_ids(item_ids)
+    if not ids:
+        return {}
+    rows = active_offers(today or date.today()).filter(item_id__in=ids).order_by().values(
+        "id", "item_id", "is_preferred",
+        "price_list_line__price", "price_list_line__min_quantity", "price_list_line__lead_time_days",
+        "price_list_line__delivery_cost_fixed", "price_list_line__delivery_cost_per_unit",
+        "price_list_line__vat_included", "price_list_line__vat_rate",
+        "price_list_line__price_list__supplier_id",
+    )
+
+    by_item: Dict[int, list] = {}
+    for r in rows:
+        r["effective_price"] = effective_price({
+            "price": r["price_list_line__price"],
+            "min_quantity": r["price_list_line__min_quantity"],
+            "delivery_cost_fixed": r["price_list_line__delivery_cost_fixed"],
+            "delivery_cost_per_unit": r["price_list_line__delivery_cost_per_unit"],
+            "vat_included": r["price_list_line__vat_included"],
+            "vat_rate": r["price_list_line__vat_rate"],
+        })
+        by_item.setdefault(r["item_id"], []).append(r)
+
+    result = {}
+    for item_id, offers in by_item.items():
+        # Порядок «предпочтительного» — как в генерации КП: -is_preferred, цена прайса, id
+        preferred = min(offers, key=lambda o: (not o["is_preferred"], o["price_list_line__price"], o["id"]))
+        cheapest = min(offers, key=lambda o: (o["effective_price"], o["id"]))
+        fastest = min(offers, key=lambda o: (o["price_list_line__lead_time_days"], o["effective_price"], o["id"]))
+        result[item_id] = {
+            "preferred_mapping_id": preferred["id"],
+            "cheapest_mapping_id": cheapest["id"],
+            "cheapest_effective_price": cheapest["effective_price"],
+            "fastest_mapping_id": fastest["id"],
+            "fastest_lead_time_days": fastest["price_list_line__lead_time_days"],
+            "offers_count": len(offers),
+            "suppliers_count": len({o["price_list_line__price_list__supplier_id"] for o in offers}),
+        }
+    return result
+
+
+def refresh(item_ids: Iterable[int]) -> int:
+    """Пересчитать строки для позиций (без предложений — строка удаляется). Возвращает число записанных."""
+    from procurement.models import ItemBestOffer
+
+    ids = _clean_ids(item_ids)
+    written = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        part = ids[start:start + BATCH_SIZE]
+        computed = compute(part)
+        with transaction.atomic():
+            ItemBestOffer.objects.filter(item_id__in=[i for i in part if i not in computed]).delete()
+            if computed:
+                ItemBestOffer.objects.bulk_create(
+                    [ItemBestOffer(item_id=item_id, **fields) for item_id, fields in computed.items()],
+                    update_conflicts=True,
+                    unique_fields=["item"],
+                    update_fields=[*FIELDS, "updated_at"],
+                )
+        written += len(computed)
+    return written
+
+
+def for_items(item_ids: Iterable[int]) -> Dict[int, Any]:
+    """{item_id: ItemBestOffer} — один запрос по первичному ключу."""
+    from procurement.models import ItemBestOffer
+
+    ids = _clean_ids(item_ids)
+    if not ids:
+        return {}
+    return {b.item_id: b for b in ItemBestOffer.objects.filter(item_id__in=ids)}
+
+
+def lookup(item_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    {item_id: {offers_count, suppliers_count, preferred, cheapest, fastest}} для корзины позиций —
+    два запроса (строки таблицы по первичному ключу + сами предложения по id).
+    Позиции без действующих предложений в ответ не попадают.
+    """
+    from procurement.models import ItemSupplierMapping
+
+    rows = for_items(item_ids)
+    mapping_ids = {
+        mid for b in rows.values()
+        for mid in (b.preferred_mapping_id, b.cheapest_mapping_id, b.fastest_mapping_id) if mid
+    }
+    offers = {
+        m["id"]: {
+            "mapping_id": m["id"],
+            "supplier_id": m["price_list_line__price_list__supplier_id"],
+            "supplier_name": m["price_list_line__price_list__supplier__name"],
+            "price_list_line_id": m["price_list_line_id"],
+            "supplier_sku": m["price_list_line__supplier_sku"],
+            "price": str(m["price_list_line__price"]),
+            "currency": m["price_list_line__price_list__currency"],
+            "lead_time_days": m["price_list_line__lead_time_days"],
+            "conversion_factor": str(m["conversion_factor"]),
+            "is_preferred": m["is_preferred"],
+        }
+        for m in ItemSupplierMapping.objects.filter(id__in=mapping_ids).order_by().values(
+            "id", "price_list_line_id", "conversion_factor", "is_preferred",
+            "price_list_line__supplier_sku", "price_list_line__price", "price_list_line__lead_time_days",
+            "price_list_line__price_list__currency", "price_list_line__price_list__supplier_id",
+            "price_list_line__price_list__supplier__name",
+        )
+    } if mapping_ids else {}
+
+    out = {}
+    for item_id, b in rows.items():
+        cheapest = offers.get(b.cheapest_mapping_id)
+        if cheapest is not None:
+            cheapest = {**cheapest, "effective_price": str(b.cheapest_effective_price)}
+        out[item_id] = {
+            "item_id": item_id,
+            "offers_count": b.offers_count,
+            "suppliers_count": b.suppliers_count,
+            "preferred": offers.get(b.preferred_mapping_id),
+            "cheapest": cheapest,
+            "fastest": offers.get(b.fastest_mapping_id),
+        }
+    return out
+
+
+def items_for_lines(line_ids: Iterable[int]):
+    """Позиции номенклатуры, сопоставленные с позициями прайса."""
+    from procurement.models import ItemSupplierMapping
+
+    ids = _clean_ids(line_ids)
+    if not ids:
+        return []
+    return list(
+        ItemSupplierMapping.objects.filter(price_list_line_id__in=ids)
+        .order_by()
+        .values_list("item_id", flat=True)
+        .distinct()
+    )
+
+
+def items_for_price_lists(price_list_ids: Iterable[int]):
+    """Позиции номенклатуры, сопоставленные с позициями прайс-листов."""
+    from procurement.models import ItemSupplierMapping
+
+    ids = _clean_ids(price_list_ids)
+    if not ids:
+        return []
+    return list(
+        ItemSupplierMapping.objects.filter(price_list_line__price_list_id__in=ids)
+        .order_by()
+        .values_list("item_id", flat=True)
+        .distinct()
+    )
+
+
+def schedule(item_ids: Iterable[int]) -> None:
+    """Пересчитать сейчас или, внутри deferred(), — при выходе из блока."""
+    ids = _clean_ids(item_ids)
+    if not ids:
+        return
+    pending = getattr(_state, "pending", None)
+    if pending is not None:
+        pending.update(ids)
+        return
+    refresh(ids)
+
+
+@contextmanager
+def deferred():
+    """Копить пересчёты лучших предложений до конца блока (вложенные блоки сливаются во внешний)."""
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    schedule(pending)
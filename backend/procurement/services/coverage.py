@@ -0,0 +1,164 @@
+"""
+Обеспечение заявок (PurchaseRequestCoverage): требуется / заказано / подтверждено / доставлено
+по каждой позиции заявки.
+
+Раньше эти количества собирались «с нуля» при каждой смене статуса заказа
+(строки заявки + все строки заказов в Python, до трёх проходов). Теперь:
+- refresh(pr_ids) пересчитывает строки журнала для затронутых заявок тремя
+  агрегирующими запросами и одним upsert, под блокировкой строк заявок;
+- сигналы (procurement/signals.py) вызывают schedule() при изменении строк заявки,
+  строк и статусов заказов, доставок и их строк — в той же транзакции;
+- внутри `with deferred():` пересчёт откладывается до конца блока (одна заявка — один раз);
+- правила статуса заявки, проверка перезаказа и количества для строк заказа читают журнал
+  (for_request — один индексный запрос по заявке).
+
+compute() — тот же расчёт без записи; им пользуется manage.py check_pr_coverage.
+"""
+
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Iterable
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+# "Обеспечение" заявки считаем ТОЛЬКО по заказам, которые реально отправлены поставщику (sent) и дальше по цепочке.
+# Закрываем заявку ТОЛЬКО когда всё покрыто заказами со статусом confirmed (и дальше).
+PO_ORDERED_STATUSES = {"sent", "confirmed", "paid", "in_transit", "delivered", "closed"}
+PO_CONFIRMED_STATUSES = {"confirmed", "paid", "in_transit", "delivered", "closed"}
+
+QTY_FIELDS = ("required_qty", "ordered_qty", "confirmed_qty", "delivered_qty")
+
+BATCH_SIZE = 500
+
+_ZERO = Decimal("0")
+
+_state = threading.local()
+
+
+def _clean_ids(ids: Iterable[int]):
+    return list(dict.fromkeys(int(i) for i in ids if i))
+
+
+def compute(pr_ids: Iterable[int]) -> Dict[int, Dict[int, Dict[str, Decimal]]]:
+    """{pr_id: {item_id: {required_qty, ordered_qty, confirmed_qty, delivered_qty}}} — расчёт «с нуля»."""
+    from procurement.models import PurchaseOrderLine, PurchaseRequestLine, ShipmentLine, Shipment
+
+    pr_ids = _clean_ids(pr_ids)
+    result: Dict[int, Dict[int, Dict[str, Decimal]]] = {pr_id: {} for pr_id in pr_ids}
+    if not pr_ids:
+        return result
+
+    def row(pr_id, item_id):
+        return result[pr_id].setdefault(item_id, {f: _ZERO for f in QTY_FIELDS})
+
+    required = (
+        PurchaseRequestLine.objects.filter(request_id__in=pr_ids, item_id__isnull=False)
+        .values("request_id", "item_id")
+        .annotate(total=Sum("qty"))
+    )
+    for r in required:
+        row(r["request_id"], r["item_id"])["required_qty"] = r["total"] or _ZERO
+
+    ordered = (
+        PurchaseOrderLine.objects.filter(
+            order__purchase_request_id__in=pr_ids, order__status__in=PO_ORDERED_STATUSES,
+        )
+        .values("order__purchase_request_id", "item_id")
+        .annotate(
+            ordered=Sum("qty"),
+            confirmed=Sum("qty", filter=Q(order__status__in=PO_CONFIRMED_STATUSES)),
+        )
+    )
+    for r in ordered:
+        cov = row(r["order__purchase_request_id"], r["item_id"])
+        cov["ordered_qty"] = r["ordered"] or _ZERO
+        cov["confirmed_qty"] = r["confirmed"] or _ZERO
+
+    delivered = (
+        ShipmentLine.objects.filter(
+            order_line__order__purchase_request_id__in=pr_ids, shipment__status=Shipment.Status.DELIVERED,
+        )
+        .values("order_line__order__purchase_request_id", "order_line__item_id")
+        .annotate(total=Sum("qty"))
+    )
+    for r in delivered:
+        row(r["order_line__order__purchase_request_id"], r["order_line__item_id"])["delivered_qty"] = r["total"] or _ZERO
+
+    return result
+
+
+def refresh(pr_ids: Iterable[int]) -> int:
+    """Пересчитать журнал обеспечения для заявок. Возвращает число записанных строк."""
+    from procurement.models import PurchaseRequest, PurchaseRequestCoverage
+
+    ids = _clean_ids(pr_ids)
+    written = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        part = ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            # Параллельные пересчёты одной заявки выполняются по очереди
+            part = list(PurchaseRequest.objects.select_for_update().filter(id__in=part).values_list("id", flat=True))
+            if not part:
+                continue
+            computed = compute(part)
+            rows = [
+                PurchaseRequestCoverage(purchase_request_id=pr_id, item_id=item_id, **qty)
+                for pr_id, items in computed.items()
+                for item_id, qty in items.items()
+            ]
+            stale = Q()
+            for pr_id, items in computed.items():
+                stale |= Q(purchase_request_id=pr_id) & ~Q(item_id__in=list(items))
+            PurchaseRequestCoverage.objects.filter(stale).delete()
+            if rows:
+                PurchaseRequestCoverage.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["purchase_request", "item"],
+                    update_fields=[*QTY_FIELDS, "updated_at"],
+                )
+            written += len(rows)
+    return written
+
+
+def for_request(pr_id: int) -> dict:
+    """{item_id: PurchaseRequestCoverage} для заявки — один запрос по индексу (purchase_request, item)."""
+    from procurement.models import PurchaseRequestCoverage
+
+    if not pr_id:
+        return {}
+    return {c.item_id: c for c in PurchaseRequestCoverage.objects.filter(purchase_request_id=pr_id)}
+
+
+def required_by_item(cov: dict) -> Dict[int, Decimal]:
+    """{item_id: требуемое qty} по строкам журнала (позиции, которых нет в заявке, пропускаются)."""
+    return {item_id: c.required_qty for item_id, c in cov.items() if c.required_qty > 0}
+
+
+def schedule(pr_ids: Iterable[int]) -> None:
+    """Пересчитать сейчас или, внутри deferred(), — при выходе из блока."""
+    ids = _clean_ids(pr_ids)
+    if not ids:
+        return
+    pending = getattr(_state, "pending", None)
+    if pending is not None:
+        pending.update(ids)
+        return
+    refresh(ids)
+
+
+@contextmanager
+def deferred():
+    """Копить пересчёты обеспечения до конца блока (вложенные блоки сливаются во внешний)."""
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    schedule(pending)
@@ -0,0 +1,165 @@
+"""
+Хранилище загруженных документов по содержимому и кэш результатов разбора.
+
+Закупщики часто загружают один и тот же прайс или счёт повторно, и каждый раз файл разбирался
+заново (PDF через pdfminer — особенно долго). Теперь:
+- store(file) — SHA-256 считается потоково по чанкам загрузки; файл с тем же хэшем уже в хранилище —
+  возвращается существующий StoredDocument, новый не пишется (documents/ab/<sha256>.<ext> в MEDIA_ROOT);
+- parse_cached / sheet (и низкоуровневые cached / remember) — результат разбора (строки файла) в кэше Django
+  по ключу (парсер, версия парсера, хэш, параметры). Смена логики парсера — новая PARSER_VERSION
+  в его модуле, старые записи просто перестают читаться. sheet() строки не копит: они идут потоком,
+  в кэш попадают только таблицы до CACHE_MAX_ROWS строк (прайс на 200 тыс. строк в памяти
+  и в Redis не держим — он разбирается заново, потоково);
+- find_import / record_import — факт импорта документа в цель (kind + target):
+  повторная фиксация того же файла в ту же цель обнаруживается и не выполняется.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Optional
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+KEY_PREFIX = "documents:parsed:"
+
+# Разбор зависит только от содержимого и версии парсера — храним долго
+PARSE_TTL = 7 * 24 * 60 * 60
+
+# Таблицы длиннее — не кэшируются (значение кэша ограничено по размеру, memcached молча отбросит большое)
+CACHE_MAX_ROWS = 5000
+
+
+def sha256_of(file) -> str:
+    """SHA-256 содержимого загрузки (по чанкам, без чтения файла в память целиком)."""
+    digest = hashlib.sha256()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    chunks = file.chunks() if hasattr(file, "chunks") else iter(lambda: file.read(1024 * 1024), b"")
+    for chunk in chunks:
+        digest.update(chunk)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def store(file, *, user=None):
+    """(StoredDocument, created) — документ по содержимому загрузки; одинаковые файлы хранятся один раз."""
+    from procurement.models import StoredDocument
+
+    sha = sha256_of(file)
+    doc = StoredDocument.objects.filter(sha256=sha).first()
+    if doc is not None:
+        return doc, False
+
+    doc = StoredDocument(
+        sha256=sha,
+        size=getattr(file, "size", 0) or 0,
+        original_name=(getattr(file, "name", "") or "")[:255],
+        content_type=(getattr(file, "content_type", "") or "")[:100],
+        created_by=user if (user is not None and user.is_authenticated) else None,
+    )
+    try:
+        with transaction.atomic():
+            doc.file.save(doc.original_name or sha, file, save=False)
+            doc.save()
+    except IntegrityError:
+        # Тот же файл параллельно загрузил другой запрос — берём его запись
+        doc.file.delete(save=False)
+        doc, created = StoredDocument.objects.get(sha256=sha), False
+    else:
+        created = True
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return doc, created
+
+
+def _key(doc, parser: str, version: str, options: Optional[dict]) -> str:
+    opts = hashlib.sha1(json.dumps(options or {}, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{KEY_PREFIX}{parser}:{version}:{doc.sha256}:{opts}"
+
+
+def cached(doc, parser: str, version: str, options: Optional[dict] = None) -> Any:
+    """Результат разбора из кэша или None."""
+    return cache.get(_key(doc, parser, version, options))
+
+
+def remember(doc, parser: str, version: str, value: Any, options: Optional[dict] = None) -> Any:
+    """Положить результат разбора в кэш; возвращает value."""
+    cache.set(_key(doc, parser, version, options), value, PARSE_TTL)
+    return value
+
+
+def parse_cached(doc, parser: str, version: str, parse: Callable[[], Any], options: Optional[dict] = None):
+    """(результат, из_кэша): разбор документа из кэша, иначе parse() с записью в кэш."""
+    value = cached(doc, parser, version, options)
+    if value is not None:
+        return value, True
+    return remember(doc, parser, version, parse(), options), False
+
+
+def sheet(doc, parser: str, version: str, open_sheet: Callable, file, options: Optional[dict] = None):
+    """
+    (headers, rows, из_кэша) для таблицы файла: open_sheet(file) -> (headers, генератор строк)
+    (Excel-лист или таблица PDF).
+
+    Без кэша rows — тот же поток строк (номер, {поле: значение}); если он дочитан до конца
+    и строк не больше CACHE_MAX_ROWS, строки кэшируются списком.
+    """
+    value = cached(doc, parser, version, options)
+    if value is not None:
+        headers, rows = value
+        return headers, rows, True
+    headers, rows = open_sheet(file)
+    return headers, _remember_rows(doc, parser, version, options, headers, rows), False
+
+
+def _remember_rows(doc, parser, version, options, headers, rows):
+    """Строки насквозь; копия — только пока их не больше CACHE_MAX_ROWS, в кэш — по концу потока."""
+    kept = []
+    try:
+        for row in rows:
+            if kept is not None:
+                kept.append(row)
+                if len(kept) > CACHE_MAX_ROWS:
+                    kept = None
+            yield row
+    finally:
+        if hasattr(rows, "close"):
+            rows.close()
+    if kept is not None:
+        remember(doc, parser, version, (headers, kept), options)
+
+
+def find_import(doc, kind: str, target: str = ""):
+    """Предыдущий импорт документа в цель или None."""
+    from procurement.models import DocumentImport
+
+    return DocumentImport.objects.filter(document=doc, kind=kind, target=target).first()
+
+
+def record_import(doc, kind: str, target: str = "", result: Optional[dict] = None, *, user=None):
+    """Зафиксировать импорт документа в цель (повторная фиксация обновляет итог)."""
+    from procurement.models import DocumentImport
+
+    obj, _ = DocumentImport.objects.update_or_create(
+        document=doc,
+        kind=kind,
+        target=target,
+        defaults={
+            "result": result or {},
+            "created_by": user if (user is not None and user.is_authenticated) else None,
+        },
+    )
+    return obj
+
+
+def duplicate_payload(previous) -> dict:
+    """Ответ API на повторный импорт того же документа в ту же цель."""
+    return {
+        "duplicate": True,
+        "document_id": previous.document_id,
+        "imported_at": previous.created_at.isoformat(),
+        "previous_result": previous.result,
+        "detail": "Этот файл уже импортирован в эту цель (force=1 — импортировать повторно).",
+    }
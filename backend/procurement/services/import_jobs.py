@@ -0,0 +1,163 @@
+"""
+Фоновые задачи импорта (ImportJob).
+
+create_job() — сохранить загруженный файл и поставить задачу в очередь Celery
+(постановка — после коммита транзакции, чтобы worker увидел запись).
+run_job()    — выполнить импорт: потоковое чтение файла (Excel или таблица PDF), обработка пачками,
+запись прогресса в ImportJob и рассылка событий в группу import_job_<id>.
+Если в options есть document_id (файл из хранилища документов), успешный импорт
+фиксируется в DocumentImport — повторная загрузка того же файла будет распознана.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from procurement.importers.pdf_table import is_pdf, open_pdf_table, open_price_records_pdf
+from procurement.importers.price_list_excel import (
+    PRICE_LIST_HEADERS,
+    REQUIRED_HEADERS as PRICE_LIST_REQUIRED_HEADERS,
+    import_price_list_rows,
+    open_price_list_sheet,
+)
+from procurement.importers.price_records_excel import (
+    REQUIRED_HEADERS as PRICE_RECORDS_REQUIRED_HEADERS,
+    import_price_record_rows,
+    open_price_records_sheet,
+)
+from procurement.models import ImportJob
+from procurement.realtime import import_job_group, publish
+from procurement.services import documents
+
+# Сколько текстов ошибок хранить в задаче (счётчик errors при этом полный)
+ERRORS_DETAIL_LIMIT = 1000
+
+PROGRESS_FIELDS = ["rows_done", "created", "updated", "errors", "errors_detail", "rows_per_sec"]
+
+
+def job_payload(job: ImportJob) -> Dict[str, Any]:
+    """Компактное состояние задачи для websocket-событий."""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "rows_done": job.rows_done,
+        "created": job.created,
+        "updated": job.updated,
+        "errors": job.errors,
+        "rows_per_sec": job.rows_per_sec,
+        "error": job.error,
+    }
+
+
+def _publish(job: ImportJob) -> None:
+    publish(import_job_group(job.id), "import.progress", job_payload(job))
+
+
+def create_job(kind: str, file, *, user=None, price_list=None, options: Optional[Dict[str, Any]] = None) -> ImportJob:
+    """Сохранить файл, создать ImportJob и поставить run_import_job в очередь после коммита."""
+    from procurement.tasks import run_import_job
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    job = ImportJob.objects.create(
+        kind=kind,
+        price_list=price_list,
+        file=file,
+        original_name=getattr(file, "name", "") or "",
+        options=options or {},
+        created_by=user if (user is not None and user.is_authenticated) else None,
+    )
+    transaction.on_commit(lambda: run_import_job.delay(job.id))
+    return job
+
+
+def _apply_progress(job: ImportJob, processed: int, result: Dict[str, Any], started: float) -> None:
+    elapsed = max(time.monotonic() - started, 1e-6)
+    job.rows_done = processed
+    job.created = result.get("created", 0)
+    job.updated = result.get("updated", 0)
+    job.errors = result.get("errors", 0)
+    job.errors_detail = list(result.get("errors_detail", [])[:ERRORS_DETAIL_LIMIT])
+    job.rows_per_sec = round(processed / elapsed, 1)
+
+
+def _finish(job: ImportJob, status: str, error: str = "") -> None:
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=PROGRESS_FIELDS + ["status", "error", "finished_at"])
+    _publish(job)
+
+
+def _record_document_import(job: ImportJob) -> None:
+    from procurement.models import StoredDocument
+
+    doc = StoredDocument.objects.filter(pk=(job.options or {}).get("document_id")).first()
+    if doc is None:
+        return
+    documents.record_import(
+        doc,
+        job.kind,
+        str(job.price_list_id or ""),
+        {"job_id": job.id, "created": job.created, "updated": job.updated, "errors": job.errors},
+        user=job.created_by,
+    )
+
+
+def run_job(job_id: int) -> Optional[ImportJob]:
+    """
+    Выполнить задачу импорта.
+
+    Повторный вызов для завершённой задачи ничего не делает (защита от повторной доставки).
+    """
+    job = ImportJob.objects.select_related("price_list").filter(pk=job_id).first()
+    if job is None or job.status in (ImportJob.Status.DONE, ImportJob.Status.FAILED):
+        return job
+
+    job.status = ImportJob.Status.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+    _publish(job)
+
+    started = time.monotonic()
+
+    def on_chunk(processed, result):
+        _apply_progress(job, processed, result, started)
+        job.save(update_fields=PROGRESS_FIELDS)
+        _publish(job)
+
+    try:
+        with job.file.open("rb") as fh:
+            if job.kind == ImportJob.Kind.PRICE_LIST_LINES:
+                if job.price_list is None:
+                    raise ValueError("Не указан прайс-лист")
+                if is_pdf(fh):
+                    headers, rows = open_pdf_table(fh, mapping=PRICE_LIST_HEADERS)
+                else:
+                    headers, rows = open_price_list_sheet(fh)
+                missing = [h for h in PRICE_LIST_REQUIRED_HEADERS if h not in headers]
+                if missing:
+                    raise ValueError(f"Отсутствуют обязательные колонки: {missing}")
+                result = import_price_list_rows(job.price_list, rows, keep_rows=False, on_chunk=on_chunk)
+            elif job.kind == ImportJob.Kind.PRICE_RECORDS:
+                if is_pdf(fh):
+                    headers, rows = open_price_records_pdf(fh, supplier_name=job.options.get("supplier", ""))
+                else:
+                    headers, rows = open_price_records_sheet(fh)
+                missing = [h for h in PRICE_RECORDS_REQUIRED_HEADERS if h not in headers]
+                if missing:
+                    raise ValueError(f"Missing columns: {missing}")
+                result = import_price_record_rows(rows, keep_rows=False, on_chunk=on_chunk)
+            else:
+                raise ValueError(f"Неизвестный тип импорта: {job.kind}")
+    except Exception as e:
+        _finish(job, ImportJob.Status.FAILED, str(e))
+        return job
+
+    _apply_progress(job, job.rows_done, result, started)
+    _finish(job, ImportJob.Status.DONE)
+    _record_document_import(job)
+    return job
@@ -0,0 +1,106 @@
+"""
+Метрики дашборда (GET /api/procurement/metrics-overview/).
+
+- compute(): все показатели одним запросом — PurchaseRequest LEFT JOIN PurchaseRequestLine
+  с условными агрегатами (COUNT ... FILTER); строки заявок в Python не перебираются.
+- overview(): снимок в общем кэше на SNAPSHOT_TTL секунд. Пересчёт single-flight:
+  считает только тот, кто взял блокировку (cache.add); остальные отдают предыдущий снимок,
+  а если его нет — ждут до WAIT_TIMEOUT и только потом считают сами.
+- invalidate(): сменить версию снимка (сигналы PurchaseRequest / PurchaseRequestLine,
+  procurement/signals.py). Предыдущий снимок остаётся как «запасной» на время пересчёта.
+"""
+
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+KEY_PREFIX = "metrics_overview:"
+
+# Сколько живёт снимок (сек.)
+SNAPSHOT_TTL = 30
+
+# Сколько хранится последний снимок для отдачи во время пересчёта (сек.)
+STALE_TTL = 60 * 60
+
+# Блокировка пересчёта и ожидание чужого пересчёта (сек.)
+LOCK_TTL = 30
+WAIT_TIMEOUT = 3.0
+WAIT_STEP = 0.05
+
+# Строка заявки «warn», если срок наступит в ближайшие WARN_DAYS дней
+WARN_DAYS = 3
+
+
+def compute(today=None) -> dict:
+    """Показатели дашборда одним запросом."""
+    from procurement.models import PurchaseRequest
+
+    today = today or date.today()
+    warn_date = today + timedelta(days=WARN_DAYS)
+
+    # Каждая строка заявки входит в JOIN ровно один раз; заявки считаем через DISTINCT.
+    agg = PurchaseRequest.objects.aggregate(
+        purchase_requests_total=Count("id", distinct=True),
+        purchase_requests_open=Count("id", distinct=True, filter=Q(status="open")),
+        lines_waiting=Count("lines", filter=Q(lines__status="pending")),
+        sla_hot=Count("lines", filter=Q(lines__need_date__lte=today)),
+        sla_warn=Count("lines", filter=Q(lines__need_date__gt=today, lines__need_date__lte=warn_date)),
+        sla_ok=Count("lines", filter=Q(lines__need_date__gt=warn_date)),
+    )
+    return {k: v or 0 for k, v in agg.items()}
+
+
+def _version() -> str:
+    key = f"{KEY_PREFIX}ver"
+    ver = cache.get(key)
+    if ver is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        ver = cache.get(key)
+    return ver
+
+
+def invalidate() -> None:
+    """Снимок устарел (изменились заявки или их строки)."""
+    def bump():
+        cache.set(f"{KEY_PREFIX}ver", uuid.uuid4().hex, None)
+
+    bump()
+    # После коммита — чтобы снимок, посчитанный другим процессом до коммита, тоже устарел.
+    transaction.on_commit(bump)
+
+
+def overview() -> dict:
+    """Снимок метрик (см. модуль)."""
+    today = date.today()
+    fresh_key = f"{KEY_PREFIX}{_version()}:{today.isoformat()}"
+    stale_key = f"{KEY_PREFIX}last"
+    lock_key = f"{fresh_key}:lock"
+
+    data = cache.get(fresh_key)
+    if data is not None:
+        return data
+
+    if not cache.add(lock_key, 1, LOCK_TTL):
+        stale = cache.get(stale_key)
+        if stale is not None:
+            return stale
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            data = cache.get(fresh_key)
+            if data is not None:
+                return data
+        # Тот, кто держит блокировку, не успел — считаем сами, снимок не пишем.
+        return compute(today)
+
+    try:
+        data = compute(today)
+        cache.set(fresh_key, data, SNAPSHOT_TTL)
+        cache.set(stale_key, data, STALE_TTL)
+    finally:
+        cache.delete(lock_key)
+    return data
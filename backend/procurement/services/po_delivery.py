@@ -0,0 +1,108 @@
+"""
+Статус заказа поставщику по его доставкам (sent / in_transit / delivered).
+
+Правила — прежние (_recalc_po_status_from_shipments в views_shipments.py):
+- черновик не трогаем;
+- доставок нет: in_transit / delivered -> sent;
+- есть доставка «в пути» -> in_transit;
+- нет доставленных: delivered -> sent;
+- по каждой строке заказа доставлено (доставки в статусе delivered) не меньше заказанного -> delivered.
+
+Раньше на каждую строку заказа уходил отдельный Sum по ShipmentLine (заказ на 200 строк — 200+ запросов).
+Теперь evaluate() получает всё для пакета заказов одним запросом: счётчики доставок — условными
+агрегатами по JOIN, число недопоставленных строк — коррелированным подзапросом
+(строки заказа с qty > суммы доставленного).
+
+recalc(po_ids) — пакетный вариант для импорта и сверок (manage.py recalc_po_delivery_status):
+возвращает {po_id: (было, стало)} только для заказов, у которых статус изменился.
+"""
+
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import coverage
+
+BATCH_SIZE = 500
+
+
+def _clean_ids(ids: Iterable[int]):
+    return list(dict.fromkeys(int(i) for i in ids if i))
+
+
+def _target_status(status: str, shipments: int, in_transit: int, delivered: int, short_lines: int) -> Optional[str]:
+    """Новый статус заказа или None — оставить как есть."""
+    if status == "draft":
+        return None
+    if not shipments:
+        return "sent" if status in ("in_transit", "delivered") else None
+    if in_transit:
+        return "in_transit"
+    if not delivered:
+        return "sent" if status == "delivered" else None
+    if short_lines:
+        return None
+    return "delivered"
+
+
+def evaluate(po_ids: Iterable[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+    """{po_id: (текущий статус, новый статус или None)} — один запрос на пакет."""
+    from procurement.models import PurchaseOrder, PurchaseOrderLine, Shipment, ShipmentLine
+
+    ids = _clean_ids(po_ids)
+    if not ids:
+        return {}
+
+    delivered_qty = (
+        ShipmentLine.objects.filter(order_line=OuterRef("pk"), shipment__status=Shipment.Status.DELIVERED)
+        .values("order_line")
+        .annotate(s=Sum("qty"))
+        .values("s")
+    )
+    short_lines = (
+        PurchaseOrderLine.objects.filter(order=OuterRef("pk"))
+        .annotate(dlv=Coalesce(Subquery(delivered_qty), Value(Decimal("0")), output_field=DecimalField()))
+        .filter(qty__gt=F("dlv"))
+        .values("order")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    rows = (
+        PurchaseOrder.objects.filter(id__in=ids)
+        .annotate(
+            n_shipments=Count("shipments"),
+            n_in_transit=Count("shipments", filter=Q(shipments__status=Shipment.Status.IN_TRANSIT)),
+            n_delivered=Count("shipments", filter=Q(shipments__status=Shipment.Status.DELIVERED)),
+            n_short=Coalesce(Subquery(short_lines, output_field=IntegerField()), Value(0)),
+        )
+        .values_list("id", "status", "n_shipments", "n_in_transit", "n_delivered", "n_short")
+    )
+    return {
+        po_id: (status, _target_status(status, *counts))
+        for po_id, status, *counts in rows
+    }
+
+
+def recalc(po_ids: Iterable[int]) -> Dict[int, Tuple[str, str]]:
+    """Пересчитать статусы заказов; {po_id: (было, стало)} для изменившихся."""
+    from procurement.models import PurchaseOrder
+
+    ids = _clean_ids(po_ids)
+    changed: Dict[int, Tuple[str, str]] = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        part = ids[start:start + BATCH_SIZE]
+        with transaction.atomic(), coverage.deferred():
+            todo = {
+                po_id: (old, new)
+                for po_id, (old, new) in evaluate(part).items()
+                if new is not None and new != old
+            }
+            # save() по одному — только для изменившихся: сигналы (обеспечение, дашборд) должны сработать
+            for po in PurchaseOrder.objects.select_for_update().filter(id__in=list(todo)):
+                po.status = todo[po.id][1]
+                po.save(update_fields=["status"])
+            changed.update(todo)
+    return changed
@@ -0,0 +1,261 @@
+"""
+Сравнение версий прайс-листа и применение только изменений.
+
+Новая версия прайса от поставщика раньше означала полный повторный импорт, а сопоставления
+с номенклатурой (ItemSupplierMapping) приходилось делать заново.
+
+diff(old, new) — hash join по supplier_sku двух снимков {артикул: поля}:
+- added — артикул есть только в новой версии;
+- removed — только в старой;
+- price_changed — изменилась цена;
+- terms_changed — изменились прочие условия (единица, МОК, кратность, срок, НДС, доставка, описание).
+Сравниваются только поля, которые есть в новой версии (в файле нет, например, min_order_amount).
+
+apply(price_list, incoming) — применить файл к прайс-листу:
+- прайс-лист уже с позициями — правка на месте: новые артикулы — bulk_create, изменённые — bulk_update,
+  пропавшие — is_available=False (на позиции могут ссылаться сопоставления и заказы);
+  с явной базой (другой версией) отчёт строится относительно базы, а записывается
+  разница файла с самим прайс-листом;
+- пустой прайс-лист (новая версия) — база сравнения: текущий действующий прайс поставщика.
+  Позиции создаются пачкой (поля, которых нет в файле, переносятся из базы), сопоставления
+  базовых позиций переносятся на позиции с тем же артикулом тоже пачкой; базовый прайс
+  по умолчанию снимается с действия (is_active=False).
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import best_offers, price_matrix, resolution_index
+
+# Условия позиции (всё, кроме цены), которые сравниваются между версиями
+TERMS_FIELDS = (
+    "description", "unit_id", "min_quantity", "quantity_step", "min_order_amount", "package_quantity",
+    "lead_time_days", "vat_included", "vat_rate", "delivery_cost_fixed", "delivery_cost_per_unit",
+    "is_available",
+)
+
+BATCH_SIZE = 1000
+
+
+def _normalize(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Decimal — к точности поля модели, чтобы 10.005 из файла и 10.01 из БД не считались разными."""
+    from procurement.models import SupplierPriceListLine
+
+    out = dict(fields)
+    for name, value in fields.items():
+        if isinstance(value, Decimal):
+            field = SupplierPriceListLine._meta.get_field(name)
+            out[name] = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    return out
+
+
+def current_list(supplier_id: int, exclude_id: Optional[int] = None):
+    """Текущий действующий прайс-лист поставщика (самый поздний по дате начала) или None."""
+    from procurement.models import SupplierPriceList
+
+    today = date.today()
+    qs = SupplierPriceList.objects.filter(
+        Q(expiry_date__isnull=True) | Q(expiry_date__gte=today),
+        supplier_id=supplier_id,
+        is_active=True,
+        effective_date__lte=today,
+    )
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+    return qs.order_by("-effective_date", "-created_at", "-id").first()
+
+
+def snapshot(price_list_id: int) -> Dict[str, Dict[str, Any]]:
+    """{supplier_sku: поля позиции} прайс-листа — один запрос."""
+    from procurement.models import SupplierPriceListLine
+
+    rows = SupplierPriceListLine.objects.filter(price_list_id=price_list_id).order_by().values(
+        "id", "supplier_sku", "price", *TERMS_FIELDS,
+    )
+    return {r.pop("supplier_sku"): r for r in rows}
+
+
+def diff(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Разница двух снимков по артикулу (см. модуль)."""
+    added, removed, price_changed, terms_changed = [], [], [], []
+    unchanged = 0
+    for sku, row in new.items():
+        base = old.get(sku)
+        if base is None:
+            added.append(sku)
+            continue
+        row, base = _normalize(row), _normalize(base)
+        changed = False
+        if "price" in row and row["price"] != base["price"]:
+            price_changed.append({"supplier_sku": sku, "old": str(base["price"]), "new": str(row["price"])})
+            changed = True
+        fields = {
+            f: [_plain(base[f]), _plain(row[f])]
+            for f in TERMS_FIELDS
+            if f in row and row[f] != base[f]
+        }
+        if fields:
+            terms_changed.append({"supplier_sku": sku, "fields": fields})
+            changed = True
+        if not changed:
+            unchanged += 1
+    removed = [sku for sku in old if sku not in new]
+
+    return {
+        "counts": {
+            "added": len(added),
+            "removed": len(removed),
+            "price_changed": len(price_changed),
+            "terms_changed": len(terms_changed),
+            "unchanged": unchanged,
+        },
+        "added": sorted(added),
+        "removed": sorted(removed),
+        "price_changed": price_changed,
+        "terms_changed": terms_changed,
+    }
+
+
+def _plain(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+
+def _base(price_list, base=None):
+    """База сравнения: заданная, сам прайс-лист (если в нём есть позиции) или текущий прайс поставщика."""
+    if base is not None:
+        return base
+    if price_list.lines.exists():
+        return price_list
+    return current_list(price_list.supplier_id, exclude_id=price_list.id)
+
+
+def compare(price_list, base=None) -> Dict[str, Any]:
+    """Сравнить две сохранённые версии (по умолчанию — с текущим прайсом поставщика)."""
+    base = base or current_list(price_list.supplier_id, exclude_id=price_list.id)
+    old = snapshot(base.id) if base else {}
+    new = {sku: {k: v for k, v in row.items() if k != "id"} for sku, row in snapshot(price_list.id).items()}
+    return {
+        "price_list_id": price_list.id,
+        "base_price_list_id": base.id if base else None,
+        **diff(old, new),
+    }
+
+
+def apply(price_list, incoming: Dict[str, Dict[str, Any]], base=None, *, retire_base: bool = True) -> Dict[str, Any]:
+    """Применить строки файла incoming ({артикул: поля}) к прайс-листу — только разницу (см. модуль)."""
+    from procurement.models import ItemSupplierMapping, SupplierPriceListLine
+
+    # Правка на месте — по наличию позиций в самом прайс-листе, а не по тому, какая версия — база:
+    # иначе при ?base=<другой> в непустой прайс создавались бы дубли артикулов
+    in_place = price_list.lines.exists()
+    if base is None:
+        base = price_list if in_place else current_list(price_list.supplier_id, exclude_id=price_list.id)
+    elif not in_place and base.id == price_list.id:
+        base = None
+    old = snapshot(base.id) if base else {}
+    report = diff(old, incoming)
+    applied = {"created": 0, "updated": 0, "deactivated": 0, "mappings_copied": 0}
+
+    with transaction.atomic(), best_offers.deferred():
+        if in_place:
+            # Записываем разницу с самим прайс-листом (база может быть другой версией — только для отчёта)
+            own = old if base is not None and base.id == price_list.id else snapshot(price_list.id)
+            delta = report if own is old else diff(own, incoming)
+            changed = {c["supplier_sku"] for c in delta["price_changed"]}
+            changed |= {c["supplier_sku"] for c in delta["terms_changed"]}
+            SupplierPriceListLine.objects.bulk_create(
+                [
+                    SupplierPriceListLine(price_list=price_list, supplier_sku=sku, **incoming[sku])
+                    for sku in delta["added"]
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            if changed:
+                # bulk_update не трогает auto_now — updated_at проставляем сами
+                now = timezone.now()
+                objs = [SupplierPriceListLine(pk=own[sku]["id"], updated_at=now, **incoming[sku]) for sku in changed]
+                update_fields = sorted({f for sku in changed for f in incoming[sku]}) + ["updated_at"]
+                SupplierPriceListLine.objects.bulk_update(objs, update_fields, batch_size=BATCH_SIZE)
+            applied["deactivated"] = SupplierPriceListLine.objects.filter(
+                price_list=price_list, supplier_sku__in=delta["removed"], is_available=True,
+            ).update(is_available=False)
+            applied["created"], applied["updated"] = len(delta["added"]), len(changed)
+        else:
+            carried = ("min_order_amount", "package_quantity", "notes")
+            extra = {}
+            if base:
+                extra = {
+                    r.pop("supplier_sku"): r
+                    for r in SupplierPriceListLine.objects.filter(
+                        price_list=base, supplier_sku__in=list(incoming),
+                    ).order_by().values("supplier_sku", *carried)
+                }
+            SupplierPriceListLine.objects.bulk_create(
+                [
+                    SupplierPriceListLine(price_list=price_list, supplier_sku=sku, **{**extra.get(sku, {}), **fields})
+                    for sku, fields in incoming.items()
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            applied["created"] = len(incoming)
+
+            if base:
+                new_ids = dict(
+                    SupplierPriceListLine.objects.filter(price_list=price_list)
+                    .order_by()
+                    .values_list("supplier_sku", "id")
+                )
+                copies = [
+                    ItemSupplierMapping(
+                        item_id=m["item_id"],
+                        price_list_line_id=new_ids[m["price_list_line__supplier_sku"]],
+                        conversion_factor=m["conversion_factor"],
+                        is_preferred=m["is_preferred"],
+                        min_quantity_override=m["min_quantity_override"],
+                        notes=m["notes"],
+                        is_active=m["is_active"],
+                    )
+                    for m in ItemSupplierMapping.objects.filter(
+                        price_list_line__price_list=base, price_list_line__supplier_sku__in=list(incoming),
+                    ).order_by().values(
+                        "item_id", "price_list_line__supplier_sku", "conversion_factor", "is_preferred",
+                        "min_quantity_override", "notes", "is_active",
+                    )
+                ]
+                ItemSupplierMapping.objects.bulk_create(copies, batch_size=BATCH_SIZE, ignore_conflicts=True)
+                applied["mappings_copied"] = len(copies)
+
+                if retire_base and base.is_active:
+                    base.is_active = False
+                    base.save(update_fields=["is_active", "updated_at"])
+
+        # bulk-записи не шлют post_save — лучшие предложения по сопоставленным позициям пересчитываем явно
+        # (вместе со снятием базы с действия — одним пакетом на выходе из deferred)
+        best_offers.schedule(best_offers.items_for_price_lists([price_list.id, base.id if base else None]))
+
+    # bulk_create / bulk_update не шлют post_save — сбрасываем отображение поставщика и матрицу цен
+    resolution_index.invalidate_supplier(price_list.supplier_id)
+    price_matrix.invalidate()
+
+    return {
+        "price_list_id": price_list.id,
+        "base_price_list_id": base.id if base else None,
+        **report,
+        "applied": applied,
+    }
+
+
+def diff_incoming(price_list, incoming: Dict[str, Dict[str, Any]], base=None) -> Dict[str, Any]:
+    """Разница файла с прайс-листом без записи (база — как в apply)."""
+    base = _base(price_list, base)
+    old = snapshot(base.id) if base else {}
+    return {
+        "price_list_id": price_list.id,
+        "base_price_list_id": base.id if base else None,
+        **diff(old, incoming),
+    }
@@ -0,0 +1,273 @@
+"""
+Матрица цен «позиции × поставщики» (GET /api/procurement/item-supplier-mappings/matrix/).
+
+Раньше UI вызывал find_alternative на каждую позицию заявки (заявка на 400 строк — 400 запросов),
+а эффективная цена считалась Python-свойством SupplierPriceListLine.effective_price.
+Теперь все предложения по набору позиций — один запрос по ItemSupplierMapping:
+- действующие предложения: сопоставление активно, позиция прайса доступна,
+  прайс-лист активен и действует сегодня;
+- effective_price — выражением в БД по тем же правилам, что и свойство модели:
+  (price + delivery_cost_fixed / min_quantity + delivery_cost_per_unit) * (1 + vat_rate / 100), если НДС не включён;
+- для заявки: требуемое qty позиции (подзапрос по строкам заявки), qty в единицах поставщика
+  (qty * conversion_factor), сумма и флаги ограничений — ниже МОК, не кратно шагу, меньше мин. суммы.
+Второй запрос — только список позиций (названия, в т.ч. позиций без предложений).
+
+Ответ кэшируется: ключ — версия прайсов (меняется при изменении прайс-листов, их позиций и
+сопоставлений — procurement/signals.py и импорт прайса) + для заявки — версия её строк.
+"""
+
+import hashlib
+import uuid
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Case, DecimalField, ExpressionWrapper, F, Func, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Mod
+
+KEY_PREFIX = "price_matrix:"
+
+# Время жизни ответа в кэше (версии в ключе всё равно отсекают устаревшее)
+CACHE_TTL = 60 * 60
+
+MAX_ITEMS = 2000
+
+_MONEY = DecimalField(max_digits=20, decimal_places=6)
+_CENT = Decimal("0.01")
+_QTY = Decimal("0.0001")
+
+
+def _clean_ids(ids: Iterable[int]) -> List[int]:
+    return list(dict.fromkeys(int(i) for i in ids if i))
+
+
+# ----------------------------------------------------------------------------
+# Версии
+# ----------------------------------------------------------------------------
+
+def _version(name: str) -> str:
+    key = f"{KEY_PREFIX}ver:{name}"
+    ver = cache.get(key)
+    if ver is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        ver = cache.get(key)
+    return ver
+
+
+def _bump(*names: str) -> None:
+    def bump():
+        cache.set_many({f"{KEY_PREFIX}ver:{n}": uuid.uuid4().hex for n in names}, None)
+
+    bump()
+    # После коммита — чтобы ответ, посчитанный другим процессом до коммита, тоже устарел.
+    transaction.on_commit(bump)
+
+
+def invalidate() -> None:
+    """Изменились прайс-листы, их позиции или сопоставления."""
+    _bump("prices")
+
+
+def invalidate_request(pr_id: Optional[int]) -> None:
+    """Изменились строки заявки (требуемые количества)."""
+    if pr_id:
+        _bump(f"pr:{pr_id}")
+
+
+# ----------------------------------------------------------------------------
+# Выражения
+# ----------------------------------------------------------------------------
+
+class _Numeric(Func):
+    """Операнд деления: в PostgreSQL numeric и так точный, в SQLite целые числа делятся нацело — приводим к REAL."""
+
+    template = "%(expressions)s"
+    output_field = _MONEY
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template="CAST(%(expressions)s AS REAL)", **extra_context)
+
+
+def effective_price_expr(prefix: str = ""):
+    """SupplierPriceListLine.effective_price как выражение БД (prefix — путь до позиции прайса)."""
+    f = lambda name: F(f"{prefix}{name}")  # noqa: E731
+    delivery_per_unit = Case(
+        When(**{f"{prefix}min_quantity__gt": 0}, then=_Numeric(f("delivery_cost_fixed")) / f("min_quantity")),
+        default=Value(Decimal("0")),
+        output_field=_MONEY,
+    )
+    vat_multiplier = Case(
+        When(**{f"{prefix}vat_included": True}, then=Value(Decimal("1"))),
+        default=Value(Decimal("1")) + _Numeric(f("vat_rate")) / Value(Decimal("100")),
+        output_field=_MONEY,
+    )
+    return ExpressionWrapper(
+        (f("price") + delivery_per_unit + f("delivery_cost_per_unit")) * vat_multiplier,
+        output_field=_MONEY,
+    )
+
+
+def active_offers(today: date):
+    """Действующие предложения (сопоставления) на дату — общий фильтр матрицы и подбора поставщиков."""
+    from procurement.models import ItemSupplierMapping
+
+    return ItemSupplierMapping.objects.filter(
+        Q(price_list_line__price_list__expiry_date__isnull=True)
+        | Q(price_list_line__price_list__expiry_date__gte=today),
+        is_active=True,
+        price_list_line__is_available=True,
+        price_list_line__price_list__is_active=True,
+        price_list_line__price_list__effective_date__lte=today,
+    )
+
+
+def _money(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def _qty(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(Decimal(str(value)).quantize(_QTY, rounding=ROUND_HALF_UP))
+
+
+# ----------------------------------------------------------------------------
+# Расчёт
+# ----------------------------------------------------------------------------
+
+def compute(item_ids: Optional[List[int]] = None, pr_id: Optional[int] = None) -> Dict[str, Any]:
+    """Матрица без кэша: позиции заявки pr_id (с количествами) или позиции item_ids (без количеств)."""
+    from catalog.models import Item
+    from procurement.models import PurchaseRequestLine
+
+    today = date.today()
+    if pr_id:
+        items = list(
+            PurchaseRequestLine.objects.filter(request_id=pr_id, item_id__isnull=False)
+            .values("item_id", "item__sku", "item__name")
+            .order_by("item__sku", "item_id")
+            .distinct()
+        )
+        items = [{"id": r["item_id"], "sku": r["item__sku"], "name": r["item__name"]} for r in items]
+    else:
+        items = list(Item.objects.filter(id__in=item_ids or []).values("id", "sku", "name").order_by("sku", "id"))
+
+    offers = active_offers(today).filter(item_id__in=[i["id"] for i in items]).annotate(
+        effective_price=effective_price_expr("price_list_line__"),
+    )
+    fields = [
+        "id", "item_id", "is_preferred", "conversion_factor", "min_quantity_override",
+        "price_list_line_id", "price_list_line__supplier_sku", "price_list_line__unit__name",
+        "price_list_line__price", "price_list_line__lead_time_days",
+        "price_list_line__min_quantity", "price_list_line__quantity_step", "price_list_line__min_order_amount",
+        "price_list_line__price_list_id", "price_list_line__price_list__currency",
+        "price_list_line__price_list__supplier_id", "price_list_line__price_list__supplier__name",
+        "effective_price",
+    ]
+    if pr_id:
+        required = (
+            PurchaseRequestLine.objects.filter(request_id=pr_id, item_id=OuterRef("item_id"))
+            .values("item_id")
+            .annotate(s=Sum("qty"))
+            .values("s")
+        )
+        offers = offers.annotate(required_qty=Subquery(required, output_field=_MONEY)).annotate(
+            supplier_qty=ExpressionWrapper(F("required_qty") * F("conversion_factor"), output_field=_MONEY),
+        ).annotate(
+            total=ExpressionWrapper(F("supplier_qty") * F("effective_price"), output_field=_MONEY),
+            # МОК из сопоставления задан в единицах позиции, из прайса — в единицах поставщика
+            below_moq=Case(
+                When(
+                    Q(min_quantity_override__isnull=False, required_qty__lt=F("min_quantity_override")),
+                    then=Value(True),
+                ),
+                When(
+                    Q(min_quantity_override__isnull=True, supplier_qty__lt=F("price_list_line__min_quantity")),
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            step_rest=Mod(F("supplier_qty"), F("price_list_line__quantity_step")),
+        ).annotate(
+            step_mismatch=Case(
+                When(Q(price_list_line__quantity_step__gt=1) & ~Q(step_rest=0), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        ).annotate(
+            below_min_amount=Case(
+                When(
+                    Q(price_list_line__min_order_amount__gt=0, total__lt=F("price_list_line__min_order_amount")),
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+        fields += ["required_qty", "supplier_qty", "total", "below_moq", "step_mismatch", "below_min_amount"]
+
+    by_item: Dict[int, List[Dict[str, Any]]] = {}
+    for r in offers.order_by("item_id", "effective_price", "-is_preferred", "id").values(*fields):
+        offer = {
+            "mapping_id": r["id"],
+            "supplier_id": r["price_list_line__price_list__supplier_id"],
+            "supplier_name": r["price_list_line__price_list__supplier__name"],
+            "price_list_id": r["price_list_line__price_list_id"],
+            "price_list_line_id": r["price_list_line_id"],
+            "supplier_sku": r["price_list_line__supplier_sku"],
+            "unit": r["price_list_line__unit__name"],
+            "currency": r["price_list_line__price_list__currency"],
+            "price": _money(r["price_list_line__price"]),
+            "effective_price": _money(r["effective_price"]),
+            "conversion_factor": _qty(r["conversion_factor"]),
+            "lead_time_days": r["price_list_line__lead_time_days"],
+            "min_quantity": _qty(r["price_list_line__min_quantity"]),
+            "quantity_step": _qty(r["price_list_line__quantity_step"]),
+            "min_order_amount": _money(r["price_list_line__min_order_amount"]),
+            "is_preferred": r["is_preferred"],
+        }
+        if pr_id:
+            offer.update({
+                "supplier_qty": _qty(r["supplier_qty"]),
+                "total": _money(r["total"]),
+                "below_moq": bool(r["below_moq"]),
+                "step_mismatch": bool(r["step_mismatch"]),
+                "below_min_amount": bool(r["below_min_amount"]),
+            })
+        by_item.setdefault(r["item_id"], []).append(offer)
+
+    return {
+        "purchase_request_id": pr_id,
+        "items": [
+            {"item_id": i["id"], "sku": i["sku"], "name": i["name"], "offers": by_item.get(i["id"], [])}
+            for i in items
+        ],
+    }
+
+
+def matrix(item_ids: Iterable[int] = (), pr_id: Optional[int] = None) -> Dict[str, Any]:
+    """Матрица из кэша (см. модуль). Нужна заявка или хотя бы одна позиция."""
+    item_ids = sorted(_clean_ids(item_ids))
+    if not pr_id and not item_ids:
+        raise ValueError("Нужна заявка (pr) или список позиций (items)")
+    if len(item_ids) > MAX_ITEMS:
+        raise ValueError(f"Не больше {MAX_ITEMS} позиций за запрос")
+
+    today = date.today().isoformat()
+    if pr_id:
+        key = f"{KEY_PREFIX}pr:{pr_id}:{_version('prices')}:{_version(f'pr:{pr_id}')}:{today}"
+    else:
+        digest = hashlib.sha1(",".join(map(str, item_ids)).encode()).hexdigest()
+        key = f"{KEY_PREFIX}items:{digest}:{_version('prices')}:{today}"
+    data = cache.get(key)
+    if data is None:
+        data = compute(item_ids=item_ids, pr_id=pr_id)
+        cache.set(key, data, CACHE_TTL)
+    return data
@@ -0,0 +1,163 @@
+"""
+Временные ряды истории цен (GET /api/procurement/pricerecords/series/).
+
+Вместо десятков тысяч сырых PriceRecord клиент получает агрегаты по корзинам
+(день / неделя / месяц) для каждой пары (позиция, поставщик, валюта):
+min, max, avg, last (последняя цена в корзине по dt, id) и count.
+
+Всё считается одним запросом в БД оконными функциями:
+корзина — Trunc(dt) в текущей таймзоне, окно — PARTITION BY (item, supplier, currency, корзина);
+из каждого окна остаётся одна строка (RowNumber по dt DESC, id DESC = 1) — она и даёт last.
+Под выборку — составной индекс (item, supplier, dt) в PriceRecord.Meta.indexes.
+
+Кэш: ключ — отпечаток запроса (sha1 нормализованных параметров) + версии затронутых позиций
+(или поставщиков, если позиции не заданы). invalidate(item_ids, supplier_ids) меняет версии:
+вызывается сигналом PriceRecord (procurement/signals.py) и импортами, пишущими bulk_create.
+"""
+
+import hashlib
+import json
+import uuid
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, DateField, F, Max, Min, Window
+from django.db.models.functions import RowNumber, Trunc
+
+KEY_PREFIX = "price_series:"
+
+BUCKETS = ("day", "week", "month")
+
+# Время жизни ответа в кэше (версия в ключе всё равно отсекает устаревшее)
+CACHE_TTL = 60 * 60
+
+# Ограничение на число рядов в одном запросе (item x supplier x currency)
+MAX_IDS = 200
+
+_CENT = Decimal("0.01")
+
+
+def _money(value) -> str:
+    # Оконные агрегаты на разных СУБД возвращают Decimal/float с разной точностью — приводим к цене
+    return str(Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def _clean_ids(ids: Iterable[int]) -> List[int]:
+    return sorted({int(i) for i in ids if i})
+
+
+# ----------------------------------------------------------------------------
+# Версии
+# ----------------------------------------------------------------------------
+
+def _version_keys(kind: str, ids: List[int]) -> List[str]:
+    return [f"{KEY_PREFIX}ver:{kind}:{i}" for i in ids]
+
+
+def _versions(kind: str, ids: List[int]) -> List[str]:
+    keys = _version_keys(kind, ids)
+    got = cache.get_many(keys)
+    missing = {k: uuid.uuid4().hex for k in keys if k not in got}
+    for k, v in missing.items():
+        cache.add(k, v, None)
+    if missing:
+        got.update(cache.get_many(list(missing)))
+    return [got.get(k, "") for k in keys]
+
+
+def invalidate(item_ids: Iterable[int] = (), supplier_ids: Iterable[int] = ()) -> None:
+    """Ряды по этим позициям / поставщикам устарели (новые или изменённые PriceRecord)."""
+    keys = _version_keys("item", _clean_ids(item_ids)) + _version_keys("supplier", _clean_ids(supplier_ids))
+    if not keys:
+        return
+
+    def bump():
+        cache.set_many({k: uuid.uuid4().hex for k in keys}, None)
+
+    bump()
+    # После коммита — чтобы ответ, посчитанный другим процессом до коммита, тоже устарел.
+    transaction.on_commit(bump)
+
+
+# ----------------------------------------------------------------------------
+# Расчёт
+# ----------------------------------------------------------------------------
+
+def compute(item_ids: List[int], supplier_ids: List[int], bucket: str,
+            date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Ряды без кэша: [{item_id, supplier_id, currency, points: [{t, min, max, avg, last, count}]}]."""
+    from procurement.models import PriceRecord
+
+    qs = PriceRecord.objects.all()
+    if item_ids:
+        qs = qs.filter(item_id__in=item_ids)
+    if supplier_ids:
+        qs = qs.filter(supplier_id__in=supplier_ids)
+    if date_from:
+        qs = qs.filter(dt__date__gte=date_from)
+    if date_to:
+        qs = qs.filter(dt__date__lte=date_to)
+
+    partition = [F("item_id"), F("supplier_id"), F("currency"), Trunc("dt", bucket, output_field=DateField())]
+    rows = (
+        qs.annotate(
+            t=Trunc("dt", bucket, output_field=DateField()),
+            p_min=Window(Min("price"), partition_by=partition),
+            p_max=Window(Max("price"), partition_by=partition),
+            p_avg=Window(Avg("price"), partition_by=partition),
+            p_count=Window(Count("id"), partition_by=partition),
+            rn=Window(RowNumber(), partition_by=partition, order_by=[F("dt").desc(), F("id").desc()]),
+        )
+        .filter(rn=1)
+        .order_by("item_id", "supplier_id", "currency", "t")
+        .values_list("item_id", "supplier_id", "currency", "t", "p_min", "p_max", "p_avg", "price", "p_count")
+    )
+
+    series: Dict[tuple, Dict[str, Any]] = {}
+    for item_id, supplier_id, currency, t, p_min, p_max, p_avg, last, count in rows:
+        s = series.setdefault(
+            (item_id, supplier_id, currency),
+            {"item_id": item_id, "supplier_id": supplier_id, "currency": currency, "points": []},
+        )
+        s["points"].append({
+            "t": t.isoformat(),
+            "min": _money(p_min),
+            "max": _money(p_max),
+            "avg": _money(p_avg),
+            "last": _money(last),
+            "count": count,
+        })
+    return list(series.values())
+
+
+def series(item_ids: Iterable[int] = (), supplier_ids: Iterable[int] = (), bucket: str = "day",
+           date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, Any]:
+    """Ряды из кэша (см. модуль). Нужна хотя бы одна позиция или поставщик."""
+    item_ids, supplier_ids = _clean_ids(item_ids), _clean_ids(supplier_ids)
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket: допустимо {', '.join(BUCKETS)}")
+    if not item_ids and not supplier_ids:
+        raise ValueError("Нужна хотя бы одна позиция (item) или поставщик (supplier)")
+    if len(item_ids) > MAX_IDS or len(supplier_ids) > MAX_IDS:
+        raise ValueError(f"Не больше {MAX_IDS} позиций и {MAX_IDS} поставщиков за запрос")
+
+    params = {
+        "items": item_ids,
+        "suppliers": supplier_ids,
+        "bucket": bucket,
+        "from": date_from.isoformat() if date_from else None,
+        "to": date_to.isoformat() if date_to else None,
+    }
+    # Новые цены по позиции меняют её версию; без позиций — смотрим на версии поставщиков
+    versions = _versions("item", item_ids) if item_ids else _versions("supplier", supplier_ids)
+    fingerprint = hashlib.sha1(json.dumps([params, versions]).encode()).hexdigest()
+    key = f"{KEY_PREFIX}{fingerprint}"
+
+    data = cache.get(key)
+    if data is None:
+        data = {**params, "series": compute(item_ids, supplier_ids, bucket, date_from, date_to)}
+        cache.set(key, data, CACHE_TTL)
+    return data
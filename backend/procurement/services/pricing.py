@@ -0,0 +1,133 @@
+"""
+Пакетный расчёт стоимости по позициям прайс-листов.
+
+Правила расчёта (effective_price, evaluate) живут здесь, в одном месте: методы модели
+SupplierPriceListLine.effective_price и calculate_total_for_quantity вызывают их на своих полях
+(LineColumns). Построчно модель лениво догружает unit и price_list (два запроса на строку) —
+для «корзины» из тысяч пар (price_list_line_id, quantity) это тысячи запросов.
+
+price_many(pairs):
+- один запрос за нужными колонками всех позиций (включая unit.name и price_list.currency);
+- effective_price считается один раз на позицию, а не на пару;
+- правила и порядок проверок (МОК, кратность, мин. сумма) — те же функции, что у модели.
+
+Выигрыш — в числе запросов (один на пачку вместо двух на строку), а не в арифметике:
+сам расчёт по-прежнему построчный, на Decimal в цикле Python. Правила закреплены тестами
+с вручную посчитанными суммами (tests/test_pricing.py).
+
+Результат — список в порядке входных пар: {'valid': True, 'total': ...} или {'valid': False, 'error': ...},
+как у calculate_total_for_quantity.
+"""
+
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+FIELDS = (
+    "id", "price", "min_quantity", "quantity_step", "min_order_amount",
+    "vat_included", "vat_rate", "delivery_cost_fixed", "delivery_cost_per_unit",
+    "unit__name", "price_list__currency",
+)
+
+BATCH_SIZE = 1000
+
+
+class LineColumns(Mapping):
+    """
+    Колонки FIELDS экземпляра SupplierPriceListLine — для расчёта по полям модели.
+
+    Связанные колонки (unit__name, price_list__currency) читаются при обращении,
+    т.е. только в тексте ошибки, как и раньше в методах модели.
+    """
+
+    def __init__(self, line):
+        self._line = line
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        value = self._line
+        for attr in key.split("__"):
+            value = getattr(value, attr)
+        return value
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+
+def effective_price(row: Mapping) -> Decimal:
+    """Эффективная цена с учётом доставки и НДС по колонкам позиции."""
+    price_with_delivery = row["price"] + (
+        row["delivery_cost_fixed"] / row["min_quantity"] if row["min_quantity"] > 0 else 0
+    ) + row["delivery_cost_per_unit"]
+
+    if not row["vat_included"]:
+        price_with_delivery *= (1 + row["vat_rate"] / 100)
+
+    return price_with_delivery
+
+
+def evaluate(row: Mapping, eff_price: Decimal, quantity) -> Dict[str, Any]:
+    """
+    Стоимость количества по колонкам позиции: проверки МОК, кратности и мин. суммы заказа.
+
+    Returns:
+        dict: {'valid': bool, 'total': Decimal, 'error': str}
+    """
+    if quantity < row["min_quantity"]:
+        return {
+            'valid': False,
+            'error': f'Минимальный заказ {row["min_quantity"]} {row["unit__name"]}'
+        }
+
+    if row["quantity_step"] > 1:
+        remainder = quantity % row["quantity_step"]
+        if remainder != 0:
+            return {
+                'valid': False,
+                'error': f'Количество должно быть кратно {row["quantity_step"]}'
+            }
+
+    total = quantity * eff_price
+
+    if row["min_order_amount"] > 0 and total < row["min_order_amount"]:
+        return {
+            'valid': False,
+            'error': f'Минимальная сумма заказа {row["min_order_amount"]} {row["price_list__currency"]}'
+        }
+
+    return {
+        'valid': True,
+        'total': total
+    }
+
+
+def load_lines(line_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """{line_id: колонки позиции} — по запросу на BATCH_SIZE позиций."""
+    from procurement.models import SupplierPriceListLine
+
+    ids = list(dict.fromkeys(int(i) for i in line_ids if i))
+    rows: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        for r in SupplierPriceListLine.objects.filter(id__in=ids[start:start + BATCH_SIZE]).values(*FIELDS):
+            rows[r["id"]] = r
+    return rows
+
+
+def price_many(pairs: Iterable[Tuple[int, Decimal]]) -> List[Dict[str, Any]]:
+    """Стоимость для пар (price_list_line_id, quantity) — в порядке входа."""
+    pairs = [(int(line_id), quantity) for line_id, quantity in pairs]
+    rows = load_lines(line_id for line_id, _ in pairs)
+    prices = {line_id: effective_price(row) for line_id, row in rows.items()}
+
+    out = []
+    for line_id, quantity in pairs:
+        row = rows.get(line_id)
+        if row is None:
+            out.append({'valid': False, 'error': f'Позиция прайс-листа {line_id} не найдена'})
+            continue
+        out.append(evaluate(row, prices[line_id], quantity))
+    return out
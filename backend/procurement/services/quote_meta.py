@@ -0,0 +1,103 @@
+"""
+Метаданные коммерческих предложений (status, notes, received_at, delivery_days).
+
+Хранение — таблица QuoteMeta (procurement/models_quotes.py), поэтому значения общие
+для всех воркеров и переживают перезапуск. Перед БД — общий кэш Django
+(CACHES["default"]: Redis в docker) в режиме read-through:
+- get_many: один cache.get_many на весь список, промахи — одним запросом в БД,
+  результат кладётся обратно через cache.set_many (включая «метаданных нет»);
+- update / update_many: запись в БД, ключи кэша сбрасываются сразу и после коммита.
+
+Возвращаемый словарь содержит только заданные поля (пустые не включаются) —
+как у прежнего кэш-хранилища, значения по умолчанию подставляет сериализатор.
+"""
+
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = "quote_meta:v2:"
+
+# Время жизни записи в кэше: источник истины — БД, кэш только ускоряет чтение
+CACHE_TTL = 24 * 60 * 60
+
+FIELDS = ("status", "notes", "received_at", "delivery_days")
+
+
+def _key(quote_id: int) -> str:
+    return f"{KEY_PREFIX}{quote_id}"
+
+
+def _to_dict(row: dict) -> dict:
+    return {f: row[f] for f in FIELDS if row.get(f) not in (None, "")}
+
+
+def _forget(quote_ids) -> None:
+    keys = [_key(qid) for qid in quote_ids]
+    if not keys:
+        return
+    # Сразу — чтобы текущий запрос прочитал новое значение;
+    # после коммита — чтобы другой воркер не закэшировал данные до коммита.
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_many(quote_ids: Iterable[int]) -> Dict[int, dict]:
+    """{quote_id: {поле: значение}} для всех переданных id (нет метаданных — пустой словарь)."""
+    from procurement.models import QuoteMeta
+
+    ids = list(dict.fromkeys(int(q) for q in quote_ids if q))
+    if not ids:
+        return {}
+
+    keys = {_key(qid): qid for qid in ids}
+    got = cache.get_many(list(keys))
+    result = {keys[k]: v for k, v in got.items() if isinstance(v, dict)}
+
+    missing = [qid for qid in ids if qid not in result]
+    if missing:
+        loaded = {qid: {} for qid in missing}
+        for row in QuoteMeta.objects.filter(quote_id__in=missing).values("quote_id", *FIELDS):
+            loaded[row["quote_id"]] = _to_dict(row)
+        cache.set_many({_key(qid): meta for qid, meta in loaded.items()}, CACHE_TTL)
+        result.update(loaded)
+
+    return {qid: dict(result[qid]) for qid in ids}
+
+
+def get(quote_id: int) -> dict:
+    return get_many([quote_id]).get(quote_id, {})
+
+
+def update(quote_id: int, **updates) -> dict:
+    """Обновить переданные поля (None — не менять) и вернуть итоговые метаданные."""
+    from procurement.models import QuoteMeta
+
+    values = {k: v for k, v in updates.items() if k in FIELDS and v is not None}
+    if values:
+        with transaction.atomic():
+            meta, created = QuoteMeta.objects.select_for_update().get_or_create(quote_id=quote_id, defaults=values)
+            if not created:
+                for k, v in values.items():
+                    setattr(meta, k, v)
+                meta.save(update_fields=[*values, "updated_at"])
+        _forget([quote_id])
+    return get(quote_id)
+
+
+def update_many(quote_ids: Iterable[int], **values) -> None:
+    """Записать одинаковые метаданные для набора КП (один INSERT ... ON CONFLICT UPDATE)."""
+    from procurement.models import QuoteMeta
+
+    ids = list(dict.fromkeys(int(q) for q in quote_ids if q))
+    values = {k: v for k, v in values.items() if k in FIELDS and v is not None}
+    if not ids or not values:
+        return
+    QuoteMeta.objects.bulk_create(
+        [QuoteMeta(quote_id=qid, **values) for qid in ids],
+        update_conflicts=True,
+        unique_fields=["quote"],
+        update_fields=[*values, "updated_at"],
+    )
+    _forget(ids)
@@ -0,0 +1,124 @@
+"""
+Итоги КП (QuoteSummary): сумма, число строк, исключённые строки, максимальный срок, валюта.
+
+Правила расчёта — те же, что были в QuoteSerializer:
+- сумма: price * суммарное qty позиции в заявке; КП без заявки — просто сумма price;
+- валюта: валюта первой строки (по id), иначе RUB;
+- строки с is_blocked входят в сумму и считаются отдельно в blocked_line_count.
+
+Пересчёт точечный — только для затронутых КП:
+- refresh(quote_ids): два чтения (строки КП + количества заявок) и один upsert на пакет;
+- сигналы (procurement/signals.py) вызывают schedule() при изменении QuoteLine,
+  PurchaseRequestLine и Quote.purchase_request;
+- внутри `with deferred():` изменения копятся и пересчитываются одним пакетом на выходе
+  (сохранение заявки со всеми строками, генерация КП).
+"""
+
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import Sum
+
+BATCH_SIZE = 500
+
+_state = threading.local()
+
+
+def _clean_ids(quote_ids: Iterable[int]):
+    return list(dict.fromkeys(int(q) for q in quote_ids if q))
+
+
+def refresh(quote_ids: Iterable[int]) -> int:
+    """Пересчитать итоги для переданных КП. Возвращает число обновлённых записей."""
+    from procurement.models import PurchaseRequestLine, Quote, QuoteLine, QuoteSummary
+
+    ids = _clean_ids(quote_ids)
+    done = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        part = ids[start:start + BATCH_SIZE]
+        pr_by_quote = dict(Quote.objects.filter(id__in=part).values_list("id", "purchase_request_id"))
+        if not pr_by_quote:
+            continue
+
+        qty = {}
+        pr_ids = {pr_id for pr_id in pr_by_quote.values() if pr_id}
+        if pr_ids:
+            rows = (
+                PurchaseRequestLine.objects.filter(request_id__in=pr_ids, item_id__isnull=False)
+                .values("request_id", "item_id")
+                .annotate(total=Sum("qty"))
+            )
+            qty = {(r["request_id"], r["item_id"]): r["total"] or Decimal("0") for r in rows}
+
+        summaries = {qid: QuoteSummary(quote_id=qid, total_price=Decimal("0")) for qid in pr_by_quote}
+        lines = (
+            QuoteLine.objects.filter(quote_id__in=list(pr_by_quote))
+            .order_by("quote_id", "id")
+            .values_list("quote_id", "item_id", "price", "currency", "lead_days", "is_blocked")
+        )
+        currency_set = set()
+        for quote_id, item_id, price, currency, lead_days, is_blocked in lines:
+            s = summaries[quote_id]
+            pr_id = pr_by_quote[quote_id]
+            price = price or Decimal("0")
+            s.total_price += price if pr_id is None else price * qty.get((pr_id, item_id), Decimal("0"))
+            s.line_count += 1
+            if is_blocked:
+                s.blocked_line_count += 1
+            if lead_days is not None and (s.max_lead_days is None or lead_days > s.max_lead_days):
+                s.max_lead_days = lead_days
+            if quote_id not in currency_set and currency:
+                s.currency = currency
+                currency_set.add(quote_id)
+
+        QuoteSummary.objects.bulk_create(
+            list(summaries.values()),
+            update_conflicts=True,
+            unique_fields=["quote"],
+            update_fields=["total_price", "line_count", "blocked_line_count", "max_lead_days", "currency", "updated_at"],
+        )
+        done += len(summaries)
+    return done
+
+
+def _quote_ids_for_requests(pr_ids):
+    from procurement.models import Quote
+
+    pr_ids = [p for p in pr_ids if p]
+    if not pr_ids:
+        return []
+    return list(Quote.objects.filter(purchase_request_id__in=pr_ids).values_list("id", flat=True))
+
+
+def schedule(quote_ids: Iterable[int] = (), request_ids: Iterable[int] = ()) -> None:
+    """
+    Пересчитать итоги КП (и всех КП по заявкам request_ids) сейчас
+    или, внутри deferred(), — при выходе из блока.
+    """
+    quote_ids = _clean_ids(quote_ids)
+    request_ids = _clean_ids(request_ids)
+    if not quote_ids and not request_ids:
+        return
+    pending = getattr(_state, "pending", None)
+    if pending is not None:
+        pending["quotes"].update(quote_ids)
+        pending["requests"].update(request_ids)
+        return
+    refresh(quote_ids + _quote_ids_for_requests(request_ids))
+
+
+@contextmanager
+def deferred():
+    """Копить пересчёты итогов КП до конца блока (вложенные блоки сливаются во внешний)."""
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = {"quotes": set(), "requests": set()}
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    schedule(pending["quotes"], pending["requests"])
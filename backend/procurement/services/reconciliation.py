@@ -0,0 +1,270 @@
+"""
+Сверка счёта поставщика с открытыми заказами (строки счёта -> PurchaseOrderLine).
+
+Предпросмотр счёта (views_import_ext.import_invoice_preview) отдаёт сырые строки
+«артикул / цена / количество», сверку с заказами закупщик делал вручную. reconcile():
+- артикулы поставщика -> номенклатура одним пакетом (importers/_resolver.resolve_many);
+- открытые строки заказов поставщика по найденным позициям — одним запросом
+  (индексы PurchaseOrder(supplier, status) и PurchaseOrderLine(order, item)),
+  отгруженное по строке — подзапросом (доставки, кроме отменённых, как в set_lines);
+- количество счёта распределяется по открытым строкам в порядке заказов (FIFO),
+  остаток сверх открытого — расхождение по количеству; цена сравнивается с ценой заказа;
+- предлагаемые отгрузки — по заказам, в формате ShipmentViewSet.set_lines.
+
+Счёт на тысячи строк — фиксированное число запросов (поставщик/заказ, сопоставление, строки заказов).
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+# Заказы, по которым ещё ждём поставку и счёт: отправлен, подтверждён, оплачен, в пути
+PO_OPEN_STATUSES = {"sent", "confirmed", "paid", "in_transit"}
+
+# Допустимое отклонение цены счёта от цены заказа (доля цены заказа): 0.005 — полпроцента
+PRICE_TOLERANCE = Decimal("0.005")
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+
+
+class ReconciliationError(ValueError):
+    """Не задан или не найден поставщик/заказ для сверки."""
+
+
+def _decimal(value) -> Optional[Decimal]:
+    if value in (None, ""):
+        return None
+    try:
+        result = Decimal(str(value).replace(" ", "").replace(",", "."))
+    except (InvalidOperation, ValueError):
+        return None
+    return result if result.is_finite() else None
+
+
+def _target(supplier_id=None, po_number=None):
+    """(поставщик, заказ или None): по номеру заказа поставщик берётся из заказа."""
+    from procurement.models import PurchaseOrder
+    from suppliers.models import Supplier
+
+    if po_number:
+        po = PurchaseOrder.objects.select_related("supplier").filter(number=str(po_number).strip()).first()
+        if po is None:
+            raise ReconciliationError(f"Заказ {po_number} не найден")
+        if supplier_id and int(supplier_id) != po.supplier_id:
+            raise ReconciliationError(f"Заказ {po_number} оформлен у другого поставщика")
+        return po.supplier, po
+    if not supplier_id:
+        raise ReconciliationError("Укажите поставщика или номер заказа")
+    supplier = Supplier.objects.filter(id=supplier_id).first()
+    if supplier is None:
+        raise ReconciliationError(f"Поставщик id={supplier_id} не найден")
+    return supplier, None
+
+
+def _shipped_qty():
+    """Распределено в доставки по строке заказа (кроме отменённых) — подзапрос для annotate."""
+    from procurement.models import Shipment, ShipmentLine
+
+    shipped = (
+        ShipmentLine.objects.filter(order_line=OuterRef("pk"))
+        .exclude(shipment__status=Shipment.Status.CANCELLED)
+        .values("order_line")
+        .annotate(s=Sum("qty"))
+        .values("s")
+    )
+    return Coalesce(Subquery(shipped), Value(ZERO), output_field=DecimalField())
+
+
+def open_lines(supplier_id: int, item_ids: Iterable[int], po_id: Optional[int] = None) -> Dict[int, List[dict]]:
+    """{item_id: [открытая строка заказа, ...]} в порядке заказов — один запрос."""
+    from procurement.models import PurchaseOrderLine
+
+    ids = list(dict.fromkeys(int(i) for i in item_ids if i))
+    if not ids:
+        return {}
+    qs = PurchaseOrderLine.objects.filter(
+        order__supplier_id=supplier_id, order__status__in=PO_OPEN_STATUSES, item_id__in=ids, is_blocked=False,
+    )
+    if po_id is not None:
+        qs = qs.filter(order_id=po_id)
+    rows = (
+        qs.annotate(shipped=_shipped_qty())
+        .order_by("order_id", "id")
+        .values("id", "item_id", "order_id", "order__number", "qty", "price", "shipped")
+    )
+    lines: Dict[int, List[dict]] = {}
+    for r in rows:
+        lines.setdefault(r["item_id"], []).append({
+            "order_line_id": r["id"],
+            "order_id": r["order_id"],
+            "order_number": r["order__number"],
+            "ordered_qty": r["qty"],
+            "shipped_qty": r["shipped"],
+            # Сколько ещё можно отгрузить по строке; уменьшается по мере распределения счёта
+            "open_qty": max(r["qty"] - r["shipped"], ZERO),
+            "price": r["price"],
+        })
+    return lines
+
+
+def _price_issue(invoice_price: Optional[Decimal], po_price: Decimal) -> bool:
+    if invoice_price is None:
+        return False
+    return abs(invoice_price - po_price) > max(po_price * PRICE_TOLERANCE, CENT / 2)
+
+
+def reconcile(rows: Iterable[Dict[str, Any]], *, supplier_id=None, po_number=None) -> Dict[str, Any]:
+    """
+    Сверить строки счёта с открытыми заказами поставщика.
+
+    Args:
+        rows: строки предпросмотра счёта ({"row", "item_sku", "price", "qty"?, ...});
+              без количества сверяется только цена
+        supplier_id: поставщик счёта
+        po_number: номер заказа — сверка только с ним (поставщик — из заказа)
+
+    Returns:
+        {"supplier_id", "order_id", "lines", "unmatched", "shipments", "not_invoiced", "totals"}:
+        lines — сопоставленные строки с распределением по строкам заказов и расхождениями
+        (qty_variance = количество счёта - распределённое, price_variance = цена счёта - цена заказа);
+        unmatched — строки без позиции (reason="unknown_sku") или без открытого заказа ("no_open_order");
+        shipments — предлагаемые отгрузки [{"order_id", "order_number", "lines": [{"order_line_id", "qty"}]}];
+        not_invoiced — (только для po_number) строки заказа с открытым остатком, которых нет в счёте.
+
+    Raises:
+        ReconciliationError — поставщик/заказ не задан или не найден.
+    """
+    from procurement.importers._resolver import resolve_many
+
+    supplier, po = _target(supplier_id, po_number)
+    rows = [r for r in rows if isinstance(r, dict)]
+    skus = [str(r.get("item_sku") or "").strip() for r in rows]
+    resolved = resolve_many([(supplier.name, sku) for sku in skus])
+    lines = open_lines(supplier.id, [item_id for item_id, _ in resolved if item_id], po.id if po else None)
+
+    matched: List[Dict[str, Any]] = []
+    unmatched: List[Dict[str, Any]] = []
+    shipments: Dict[int, Dict[str, Any]] = {}
+    invoice_total = matched_total = ZERO
+    for row, sku, (item_id, confidence) in zip(rows, skus, resolved):
+        qty = _decimal(row.get("qty"))
+        price = _decimal(row.get("price"))
+        base = {"row": row.get("row"), "item_sku": sku, "qty": qty, "price": price}
+        if qty is not None and price is not None:
+            invoice_total += qty * price
+        if not sku or not item_id:
+            unmatched.append({**base, "item_id": None, "reason": "unknown_sku"})
+            continue
+        candidates = lines.get(item_id)
+        if not candidates:
+            unmatched.append({**base, "item_id": item_id, "reason": "no_open_order"})
+            continue
+
+        allocations = []
+        left = qty
+        for line in candidates:
+            if left is None:
+                # Количества в счёте нет — сверяем цену с первой открытой строкой
+                allocations.append({**_allocation(line, price), "qty": None})
+                break
+            if left <= 0:
+                break
+            take = min(left, line["open_qty"])
+            if take <= 0:
+                continue
+            line["open_qty"] -= take
+            left -= take
+            allocations.append({**_allocation(line, price), "qty": take})
+            shipment = shipments.setdefault(
+                line["order_id"], {"order_id": line["order_id"], "order_number": line["order_number"], "lines": {}},
+            )
+            shipment["lines"][line["order_line_id"]] = shipment["lines"].get(line["order_line_id"], ZERO) + take
+        if not allocations:
+            # Позиция в заказах есть, но всё уже отгружено — счёт сверх заказанного
+            allocations.append({**_allocation(candidates[0], price), "qty": ZERO})
+
+        allocated = sum((a["qty"] for a in allocations if a["qty"] is not None), ZERO)
+        po_price = _weighted_price(allocations)
+        qty_variance = qty - allocated if qty is not None else None
+        price_variance = (price - po_price).quantize(CENT) if price is not None else None
+        issues = []
+        if qty_variance:
+            issues.append("qty")
+        if any(a["price_issue"] for a in allocations):
+            issues.append("price")
+        if qty is not None and price is not None:
+            matched_total += allocated * price
+        matched.append({
+            **base,
+            "item_id": item_id,
+            "confidence": confidence,
+            "allocations": allocations,
+            "allocated_qty": allocated,
+            "po_price": po_price,
+            "qty_variance": qty_variance,
+            "price_variance": price_variance,
+            "issues": issues,
+        })
+
+    # Позиции счёта с открытыми строками заказа все попали в lines; остальные строки заказа — без счёта
+    not_invoiced = _po_lines_without_items(po.id, set(lines)) if po is not None else []
+
+    return {
+        "supplier_id": supplier.id,
+        "order_id": po.id if po else None,
+        "lines": matched,
+        "unmatched": unmatched,
+        "shipments": [
+            {**s, "lines": [{"order_line_id": ol_id, "qty": q} for ol_id, q in s["lines"].items()]}
+            for s in shipments.values()
+        ],
+        "not_invoiced": not_invoiced,
+        "totals": {
+            "rows": len(rows),
+            "matched": len(matched),
+            "unmatched": len(unmatched),
+            "with_issues": sum(1 for m in matched if m["issues"]),
+            "invoice_amount": invoice_total.quantize(CENT),
+            "matched_amount": matched_total.quantize(CENT),
+        },
+    }
+
+
+def _allocation(line: dict, invoice_price: Optional[Decimal]) -> Dict[str, Any]:
+    return {
+        "order_line_id": line["order_line_id"],
+        "order_id": line["order_id"],
+        "order_number": line["order_number"],
+        "ordered_qty": line["ordered_qty"],
+        "shipped_qty": line["shipped_qty"],
+        "po_price": line["price"],
+        "price_issue": _price_issue(invoice_price, line["price"]),
+    }
+
+
+def _weighted_price(allocations: List[Dict[str, Any]]) -> Decimal:
+    """Цена заказа, средневзвешенная по распределённому количеству (без количества — первой строки)."""
+    total = sum((a["qty"] or ZERO for a in allocations), ZERO)
+    if not total:
+        return allocations[0]["po_price"]
+    return (sum((a["qty"] * a["po_price"] for a in allocations if a["qty"]), ZERO) / total).quantize(CENT)
+
+
+def _po_lines_without_items(po_id: int, item_ids: set) -> List[Dict[str, Any]]:
+    """Открытые строки заказа по позициям, которых в счёте нет совсем (один запрос)."""
+    from procurement.models import PurchaseOrderLine
+
+    rows = (
+        PurchaseOrderLine.objects.filter(order_id=po_id, is_blocked=False)
+        .exclude(item_id__in=item_ids)
+        .annotate(shipped=_shipped_qty())
+        .order_by("id")
+        .values("id", "item_id", "qty", "shipped")
+    )
+    return [
+        {"order_line_id": r["id"], "item_id": r["item_id"], "open_qty": r["qty"] - r["shipped"]}
+        for r in rows if r["qty"] > r["shipped"]
+    ]
@@ -0,0 +1,399 @@
+"""
+Индекс сопоставления артикулов с номенклатурой (Item).
+
+Самый частый поиск в импорте прайсов и счетов — «артикул поставщика -> Item».
+Индекс держит три отображения:
+- (supplier_id, нормализованный артикул поставщика) -> item_id  (по ItemSupplierMapping);
+- нормализованный Item.sku -> item_id;
+- название поставщика -> supplier_id.
+
+Уровни хранения:
+1. память процесса (быстро, без сети);
+2. общий кэш Django (CACHES["default"]: Redis в docker, locmem по умолчанию);
+3. БД — только при промахе.
+
+Прогрев ленивый и поштучный: и артикулы поставщика, и артикулы Item кэшируются
+по ключу на артикул (включая «не найдено»), промахи пакета добираются одним запросом.
+Отображение поставщика целиком не грузится и не хранится одним значением: у крупного
+поставщика это сотни тысяч артикулов — и долгая перезагрузка после каждого сброса,
+и значение больше лимита кэш-бэкенда.
+
+Инвалидация — через версии в общем кэше (procurement/signals.py: ItemSupplierMapping,
+SupplierPriceListLine, Item, Supplier). Сменилась версия — старые ключи просто перестают
+читаться. Версия поставщика меняется только при изменениях, влияющих на отображение
+(сопоставления, артикул позиции; цена — только если артикул сопоставлен неоднозначно).
+Локальный слой сверяет версию с общим кэшем не чаще раза в LOCAL_TTL секунд;
+изменения в своём процессе видны сразу.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Trim, Upper
+
+KEY_PREFIX = "resolution:"
+
+# Как долго локальный слой доверяет версии без обращения к общему кэшу (сек.)
+LOCAL_TTL = 2.0
+
+# Время жизни записей в общем кэше (версия в ключе всё равно отсекает устаревшее)
+CACHE_TTL = 24 * 60 * 60
+
+# Ограничения локального слоя (LRU), записей: артикулы поставщиков и артикулы Item
+LOCAL_MAX_SUPPLIER_SKUS = 200_000
+LOCAL_MAX_SKUS = 100_000
+
+# Размер пачки артикулов в запросе при промахе
+QUERY_BATCH = 1000
+
+# «Не найдено» в кэше храним как 0 (None в кэше неотличим от промаха)
+_NOT_FOUND = 0
+
+_lock = threading.RLock()
+_versions: Dict[str, tuple] = {}          # name -> (version, checked_at)
+_supplier_skus: "OrderedDict[tuple, int]" = OrderedDict()   # (supplier_id, version, norm sku) -> item_id | 0
+_skus: "OrderedDict[str, int]" = OrderedDict()              # norm sku -> item_id | 0
+_skus_version = None
+_supplier_names: Dict[str, int] = {}       # name -> supplier_id | 0
+_supplier_names_version = None
+
+_stats = {"local_hits": 0, "cache_hits": 0, "misses": 0}
+
+
+def normalize_sku(sku) -> str:
+    """Ключ артикула: без пробелов по краям, верхний регистр."""
+    if sku is None:
+        return ""
+    return str(sku).strip().upper()
+
+
+# ----------------------------------------------------------------------------
+# Версии
+# ----------------------------------------------------------------------------
+
+def _version_key(name: str) -> str:
+    return f"{KEY_PREFIX}ver:{name}"
+
+
+def _version(name: str) -> str:
+    """Текущая версия раздела индекса (с локальной задержкой LOCAL_TTL)."""
+    now = time.monotonic()
+    with _lock:
+        cached = _versions.get(name)
+        if cached and now - cached[1] < LOCAL_TTL:
+            return cached[0]
+    key = _version_key(name)
+    ver = cache.get(key)
+    if ver is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        ver = cache.get(key)
+    with _lock:
+        _versions[name] = (ver, now)
+    return ver
+
+
+def _bump(name: str) -> None:
+    cache.set(_version_key(name), uuid.uuid4().hex, None)
+    with _lock:
+        _versions.pop(name, None)
+
+
+def _bump_now_and_on_commit(name: str) -> None:
+    # Сразу — чтобы текущий процесс не читал устаревшее;
+    # после коммита — чтобы другой процесс не прогрел индекс данными до коммита.
+    _bump(name)
+    transaction.on_commit(lambda: _bump(name))
+
+
+def items_version() -> str:
+    """Версия номенклатуры (меняется при любом изменении Item) — для производных индексов."""
+    return _version("items")
+
+
+def invalidate_supplier(supplier_id: Optional[int]) -> None:
+    """Сбросить отображение артикулов конкретного поставщика (None — всех)."""
+    if supplier_id is None:
+        _bump_now_and_on_commit("mappings")
+        with _lock:
+            _supplier_skus.clear()
+        return
+    # Локальные записи привязаны к версии — старые просто вытеснит LRU
+    _bump_now_and_on_commit(f"sup:{supplier_id}")
+
+
+def invalidate_items() -> None:
+    """Сбросить отображение Item.sku (после изменения/удаления номенклатуры)."""
+    _bump_now_and_on_commit("items")
+    with _lock:
+        _skus.clear()
+
+
+def invalidate_supplier_names() -> None:
+    """Сбросить отображение названий поставщиков."""
+    _bump_now_and_on_commit("supplier_names")
+    with _lock:
+        _supplier_names.clear()
+
+
+# ----------------------------------------------------------------------------
+# Счётчики
+# ----------------------------------------------------------------------------
+
+def _count(kind: str, n: int = 1) -> None:
+    if n:
+        with _lock:
+            _stats[kind] += n
+
+
+def stats() -> Dict[str, float]:
+    """Счётчики попаданий текущего процесса: local_hits / cache_hits / misses и hit_ratio."""
+    with _lock:
+        data = dict(_stats)
+    total = data["local_hits"] + data["cache_hits"] + data["misses"]
+    data["hit_ratio"] = round((data["local_hits"] + data["cache_hits"]) / total, 4) if total else 0.0
+    return data
+
+
+def reset_stats() -> None:
+    with _lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def clear_local() -> None:
+    """Очистить локальный слой процесса (общий кэш не трогаем)."""
+    global _skus_version, _supplier_names_version
+    with _lock:
+        _versions.clear()
+        _supplier_skus.clear()
+        _skus.clear()
+        _supplier_names.clear()
+        _skus_version = None
+        _supplier_names_version = None
+
+
+# ----------------------------------------------------------------------------
+# Поставщик: артикул поставщика -> item_id
+# ----------------------------------------------------------------------------
+
+def _supplier_version(supplier_id: int) -> str:
+    return f"{_version('mappings')}.{_version(f'sup:{supplier_id}')}"
+
+
+def _supplier_sku_key(supplier_id: int, ver: str, norm: str) -> str:
+    return f"{KEY_PREFIX}sup:{supplier_id}:{ver}:{hashlib.md5(norm.encode('utf-8')).hexdigest()}"
+
+
+def _load_supplier_skus(supplier_id: int, norms) -> Dict[str, int]:
+    from procurement.models import ItemSupplierMapping
+
+    found: Dict[str, int] = {}
+    for start in range(0, len(norms), QUERY_BATCH):
+        rows = ItemSupplierMapping.objects.filter(
+            is_active=True,
+            price_list_line__price_list__supplier_id=supplier_id,
+        ).annotate(_sku_norm=Upper(Trim('price_list_line__supplier_sku'))).filter(
+            _sku_norm__in=norms[start:start + QUERY_BATCH],
+        ).order_by('-is_preferred', 'price_list_line__price', 'id').values_list('_sku_norm', 'item_id')
+        # Порядок как у ItemSupplierMapping.Meta.ordering: побеждает первая (предпочтительная / дешевле)
+        for norm, item_id in rows:
+            found.setdefault(norm, item_id)
+    return found
+
+
+def item_ids_by_supplier_sku(supplier_id: int, skus: Iterable) -> Dict[str, Optional[int]]:
+    """
+    Пакетный поиск Item по артикулам поставщика (через ItemSupplierMapping).
+
+    Returns:
+        {нормализованный артикул: item_id или None}
+    """
+    norms = {normalize_sku(s) for s in skus}
+    norms.discard("")
+    if not supplier_id or not norms:
+        return {n: None for n in norms}
+
+    ver = _supplier_version(supplier_id)
+    result: Dict[str, Optional[int]] = {}
+    need = []
+    with _lock:
+        for n in norms:
+            local_key = (supplier_id, ver, n)
+            if local_key in _supplier_skus:
+                _supplier_skus.move_to_end(local_key)
+                result[n] = _supplier_skus[local_key] or None
+            else:
+                need.append(n)
+        _stats["local_hits"] += len(norms) - len(need)
+
+    if need:
+        keys = {_supplier_sku_key(supplier_id, ver, n): n for n in need}
+        got = cache.get_many(list(keys))
+        _count("cache_hits", len(got))
+        fetched = {keys[k]: v for k, v in got.items()}
+
+        missing = [n for n in need if n not in fetched]
+        if missing:
+            _count("misses", len(missing))
+            found = _load_supplier_skus(supplier_id, missing)
+            to_cache = {}
+            for n in missing:
+                fetched[n] = found.get(n, _NOT_FOUND)
+                to_cache[_supplier_sku_key(supplier_id, ver, n)] = fetched[n]
+            cache.set_many(to_cache, CACHE_TTL)
+
+        with _lock:
+            for n, item_id in fetched.items():
+                _supplier_skus[(supplier_id, ver, n)] = item_id
+                result[n] = item_id or None
+            while len(_supplier_skus) > LOCAL_MAX_SUPPLIER_SKUS:
+                _supplier_skus.popitem(last=False)
+
+    return result
+
+
+def item_id_by_supplier_sku(supplier_id: int, sku) -> Optional[int]:
+    """item_id по артикулу поставщика (через ItemSupplierMapping) или None."""
+    n = normalize_sku(sku)
+    if not supplier_id or not n:
+        return None
+    return item_ids_by_supplier_sku(supplier_id, [n]).get(n)
+
+
+# ----------------------------------------------------------------------------
+# Номенклатура: Item.sku -> item_id
+# ----------------------------------------------------------------------------
+
+def _sku_key(ver: str, norm: str) -> str:
+    # Артикул может содержать пробелы и спецсимволы — в ключ кладём хэш
+    return f"{KEY_PREFIX}item:{ver}:{hashlib.md5(norm.encode('utf-8')).hexdigest()}"
+
+
+def item_ids_by_sku(skus: Iterable) -> Dict[str, Optional[int]]:
+    """
+    Пакетный поиск Item по точному (нормализованному) артикулу.
+
+    Returns:
+        {нормализованный артикул: item_id или None}
+    """
+    global _skus_version
+    norms = {normalize_sku(s) for s in skus}
+    norms.discard("")
+    if not norms:
+        return {}
+
+    ver = _version("items")
+    result: Dict[str, Optional[int]] = {}
+    need = []
+    with _lock:
+        if _skus_version != ver:
+            _skus.clear()
+            _skus_version = ver
+        for n in norms:
+            if n in _skus:
+                _skus.move_to_end(n)
+                result[n] = _skus[n] or None
+            else:
+                need.append(n)
+        _stats["local_hits"] += len(norms) - len(need)
+
+    if need:
+        keys = {_sku_key(ver, n): n for n in need}
+        got = cache.get_many(list(keys))
+        _count("cache_hits", len(got))
+        fetched = {keys[k]: v for k, v in got.items()}
+
+        missing = [n for n in need if n not in fetched]
+        if missing:
+            _count("misses", len(missing))
+            from catalog.models import Item
+
+            found: Dict[str, int] = {}
+            for start in range(0, len(missing), QUERY_BATCH):
+                part = missing[start:start + QUERY_BATCH]
+                rows = Item.objects.annotate(_sku_norm=Upper(Trim('sku'))).filter(
+                    _sku_norm__in=part,
+                ).order_by('sku', 'id').values_list('_sku_norm', 'id')
+                for norm, item_id in rows:
+                    found.setdefault(norm, item_id)
+            to_cache = {}
+            for n in missing:
+                fetched[n] = found.get(n, _NOT_FOUND)
+                to_cache[_sku_key(ver, n)] = fetched[n]
+            cache.set_many(to_cache, CACHE_TTL)
+
+        with _lock:
+            for n, item_id in fetched.items():
+                _skus[n] = item_id
+                result[n] = item_id or None
+            while len(_skus) > LOCAL_MAX_SKUS:
+                _skus.popitem(last=False)
+
+    return result
+
+
+def item_id_by_sku(sku) -> Optional[int]:
+    n = normalize_sku(sku)
+    if not n:
+        return None
+    return item_ids_by_sku([n]).get(n)
+
+
+# ----------------------------------------------------------------------------
+# Поставщики по названию
+# ----------------------------------------------------------------------------
+
+def supplier_ids_by_name(names: Iterable[str]) -> Dict[str, int]:
+    """
+    {название: supplier_id} для найденных поставщиков (точное совпадение; при дублях — меньший id).
+    """
+    global _supplier_names_version
+    names = {n for n in names if n}
+    if not names:
+        return {}
+
+    ver = _version("supplier_names")
+    result: Dict[str, int] = {}
+    need = []
+    with _lock:
+        if _supplier_names_version != ver:
+            _supplier_names.clear()
+            _supplier_names_version = ver
+        for n in names:
+            if n in _supplier_names:
+                if _supplier_names[n]:
+                    result[n] = _supplier_names[n]
+            else:
+                need.append(n)
+        _stats["local_hits"] += len(names) - len(need)
+
+    if need:
+        key = f"{KEY_PREFIX}supplier_names:{ver}"
+        shared = cache.get(key) or {}
+        _count("cache_hits", sum(1 for n in need if n in shared))
+        missing = [n for n in need if n not in shared]
+        if missing:
+            _count("misses", len(missing))
+            from suppliers.models import Supplier
+
+            found: Dict[str, int] = {}
+            for sid, name in Supplier.objects.filter(name__in=missing).order_by('id').values_list('id', 'name'):
+                found.setdefault(name, sid)
+            shared = dict(shared)
+            for n in missing:
+                shared[n] = found.get(n, _NOT_FOUND)
+            cache.set(key, shared, CACHE_TTL)
+
+        with _lock:
+            for n in need:
+                _supplier_names[n] = shared[n]
+                if shared[n]:
+                    result[n] = shared[n]
+
+    return result
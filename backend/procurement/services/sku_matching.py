@@ -0,0 +1,263 @@
+"""
+Подбор номенклатуры по артикулу поставщика: нормализованные ключи + триграммное сходство.
+
+Заменяет `Item.objects.filter(sku__icontains=...)`:
+- артикулы сравниваются по ключу без разделителей и регистра ('KR-001' == 'kr 001' == 'KR001');
+- сходство — доля общих символьных триграмм (как similarity() в pg_trgm),
+  отдельно по ключу артикула и по наименованию;
+- кандидаты ранжируются, уверенность (confidence) выводится из сходства.
+
+Движки:
+- PostgreSQL: pg_trgm + GIN-индексы (catalog/migrations/0002_item_trigram_indexes.py);
+  пакетный режим — один запрос unnest(...) + LATERAL на все артикулы сразу;
+- остальные СУБД (SQLite в тестах): триграммный индекс в памяти процесса,
+  перестраивается при изменении номенклатуры (версия из resolution_index).
+
+Результат — список словарей {id, sku, name, score, confidence, match_type}.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from django.db import connection, transaction
+
+from catalog.models import Item
+from procurement.services import resolution_index
+
+# Минимальное сходство, с которого строка считается кандидатом (порог pg_trgm по умолчанию)
+MIN_SCORE = 0.3
+
+# С какого сходства нечёткий поиск resolver'а принимает кандидата без подтверждения
+AUTO_ACCEPT_SCORE = 0.6
+
+# Вклад совпадения по наименованию относительно артикула
+NAME_WEIGHT = 0.9
+
+# Уверенность: точное совпадение нормализованного ключа и множитель для остальных
+KEY_MATCH_CONFIDENCE = 0.9
+SIMILARITY_CONFIDENCE = 0.8
+
+# Минимальная длина ключа для поиска по вхождению (короче — слишком много совпадений)
+MIN_CONTAINS_LEN = 3
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_SEP_RE = re.compile(r"[\W_]+")
+
+# Выражение ключа в SQL — то же, что в индексе catalog_item_sku_key_trgm
+SKU_KEY_SQL = "upper(regexp_replace(i.sku, '[^[:alnum:]]+', '', 'g'))"
+
+
+def sku_key(value) -> str:
+    """Нормализованный ключ артикула: только буквы/цифры, верхний регистр."""
+    if value is None:
+        return ""
+    return _SEP_RE.sub("", str(value)).upper()
+
+
+def trigrams(text) -> FrozenSet[str]:
+    """Триграммы в стиле pg_trgm: по словам, слово дополняется двумя пробелами слева и одним справа."""
+    grams = set()
+    for word in _WORD_RE.findall(str(text or "").lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return frozenset(grams)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Доля общих триграмм (как pg_trgm similarity)."""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / float(len(a) + len(b) - shared)
+
+
+def _score(qkey: str, ikey: str, sku_sim: float, name_sim: float):
+    """(score, key_equal, key_contains, by_name) — общая формула для обоих движков."""
+    key_equal = bool(qkey) and qkey == ikey
+    key_contains = len(qkey) >= MIN_CONTAINS_LEN and qkey in ikey
+    if key_equal:
+        sku_score = 1.0
+    elif key_contains:
+        sku_score = max(sku_sim, 0.5 + 0.5 * len(qkey) / max(len(ikey), 1))
+    else:
+        sku_score = sku_sim
+    name_score = NAME_WEIGHT * name_sim
+    return max(sku_score, name_score), key_equal, key_contains, name_score > sku_score
+
+
+def _candidate(item_id, sku, name, score, key_equal, key_contains, by_name) -> Dict:
+    if key_equal:
+        match_type, confidence = "normalized_sku", KEY_MATCH_CONFIDENCE
+    else:
+        confidence = round(SIMILARITY_CONFIDENCE * score, 3)
+        if by_name:
+            match_type = "name_trigram"
+        elif key_contains:
+            match_type = "sku_contains"
+        else:
+            match_type = "sku_trigram"
+    return {
+        "id": item_id,
+        "sku": sku,
+        "name": name,
+        "score": round(float(score), 4),
+        "confidence": confidence,
+        "match_type": match_type,
+    }
+
+
+def _sort_key(c):
+    return (-c["score"], c["sku"], c["id"])
+
+
+# ----------------------------------------------------------------------------
+# Движок в памяти (не-PostgreSQL)
+# ----------------------------------------------------------------------------
+
+class _MemoryIndex:
+    """Инвертированный триграммный индекс по ключам артикулов и наименованиям."""
+
+    def __init__(self, rows):
+        self.ids, self.skus, self.names, self.keys = [], [], [], []
+        self.key_grams, self.name_grams = [], []
+        self.key_postings = defaultdict(list)
+        self.name_postings = defaultdict(list)
+        for idx, (item_id, sku, name) in enumerate(rows):
+            key = sku_key(sku)
+            kg, ng = trigrams(key), trigrams(name)
+            self.ids.append(item_id)
+            self.skus.append(sku)
+            self.names.append(name)
+            self.keys.append(key)
+            self.key_grams.append(kg)
+            self.name_grams.append(ng)
+            for g in kg:
+                self.key_postings[g].append(idx)
+            for g in ng:
+                self.name_postings[g].append(idx)
+
+    def search(self, query: str, limit: int, min_score: float) -> List[Dict]:
+        qkey = sku_key(query)
+        qkg, qng = trigrams(qkey), trigrams(query)
+        key_shared, name_shared = defaultdict(int), defaultdict(int)
+        for g in qkg:
+            for idx in self.key_postings.get(g, ()):
+                key_shared[idx] += 1
+        for g in qng:
+            for idx in self.name_postings.get(g, ()):
+                name_shared[idx] += 1
+
+        out = []
+        for idx in set(key_shared) | set(name_shared):
+            ks = key_shared.get(idx, 0)
+            ns = name_shared.get(idx, 0)
+            sku_sim = ks / float(len(qkg) + len(self.key_grams[idx]) - ks) if ks else 0.0
+            name_sim = ns / float(len(qng) + len(self.name_grams[idx]) - ns) if ns else 0.0
+            score, key_equal, key_contains, by_name = _score(qkey, self.keys[idx], sku_sim, name_sim)
+            if score >= min_score:
+                out.append(_candidate(
+                    self.ids[idx], self.skus[idx], self.names[idx], score, key_equal, key_contains, by_name,
+                ))
+        out.sort(key=_sort_key)
+        return out[:limit]
+
+
+_memory_lock = threading.Lock()
+_memory_index = (None, None)   # (версия номенклатуры, _MemoryIndex)
+
+
+def _get_memory_index() -> _MemoryIndex:
+    global _memory_index
+    ver = resolution_index.items_version()
+    with _memory_lock:
+        if _memory_index[0] != ver:
+            rows = Item.objects.order_by("id").values_list("id", "sku", "name").iterator(chunk_size=5000)
+            _memory_index = (ver, _MemoryIndex(rows))
+        return _memory_index[1]
+
+
+# ----------------------------------------------------------------------------
+# PostgreSQL (pg_trgm)
+# ----------------------------------------------------------------------------
+
+def _pg_batch_sql(table: str) -> str:
+    # %% — экранирование для параметров курсора (оператор pg_trgm '%' и шаблоны LIKE)
+    return f"""
+    SELECT q.ord, c.id, c.sku, c.name, c.skey, c.sku_sim, c.name_sim
+    FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS q(qkey, qtext, ord)
+    CROSS JOIN LATERAL (
+        SELECT s.* FROM (
+            SELECT i.id, i.sku, i.name, {SKU_KEY_SQL} AS skey,
+                   similarity({SKU_KEY_SQL}, q.qkey) AS sku_sim,
+                   similarity(i.name, q.qtext) AS name_sim
+            FROM {table} i
+            WHERE {SKU_KEY_SQL} %% q.qkey
+               OR (length(q.qkey) >= {MIN_CONTAINS_LEN} AND {SKU_KEY_SQL} LIKE '%%' || q.qkey || '%%')
+               OR i.name %% q.qtext
+        ) s
+        ORDER BY GREATEST(
+            CASE WHEN s.skey = q.qkey THEN 1.0
+                 WHEN length(q.qkey) >= {MIN_CONTAINS_LEN} AND strpos(s.skey, q.qkey) > 0
+                     THEN GREATEST(s.sku_sim, 0.5 + 0.5 * length(q.qkey)::float / GREATEST(length(s.skey), 1))
+                 ELSE s.sku_sim END,
+            {NAME_WEIGHT} * s.name_sim
+        ) DESC, s.sku, s.id
+        LIMIT %s
+    ) c
+    ORDER BY q.ord
+    """
+
+
+def _pg_search_many(queries: List[str], limit: int, min_score: float) -> Dict[str, List[Dict]]:
+    keys = [sku_key(q) for q in queries]
+    texts = [str(q).lower() for q in queries]
+    result: Dict[str, List[Dict]] = {q: [] for q in queries}
+    with transaction.atomic(), connection.cursor() as cur:
+        # Порог для оператора '%' (использует GIN-индекс); итоговый отбор — по score ниже
+        cur.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(min(min_score, MIN_SCORE))],
+        )
+        cur.execute(_pg_batch_sql(Item._meta.db_table), [keys, texts, limit])
+        for ord_, item_id, sku, name, skey, sku_sim, name_sim in cur.fetchall():
+            q = queries[ord_ - 1]
+            score, key_equal, key_contains, by_name = _score(keys[ord_ - 1], skey or "", sku_sim, name_sim)
+            if score >= min_score:
+                result[q].append(_candidate(item_id, sku, name, score, key_equal, key_contains, by_name))
+    for q in result:
+        result[q].sort(key=_sort_key)
+    return result
+
+
+# ----------------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------------
+
+def find_candidates_many(queries: Iterable[str], limit: int = 5, min_score: float = MIN_SCORE) -> Dict[str, List[Dict]]:
+    """
+    Пакетный подбор: {артикул: [кандидат, ...]} (по убыванию score, не более limit).
+
+    На PostgreSQL — один запрос на весь пакет, иначе — индекс в памяти.
+    """
+    uniq = []
+    seen = set()
+    for q in queries:
+        if q and q not in seen and (sku_key(q) or trigrams(q)):
+            seen.add(q)
+            uniq.append(q)
+    if not uniq:
+        return {}
+    if connection.vendor == "postgresql":
+        return _pg_search_many(uniq, limit, min_score)
+    index = _get_memory_index()
+    return {q: index.search(q, limit, min_score) for q in uniq}
+
+
+def find_candidates(query: str, limit: int = 5, min_score: float = MIN_SCORE,
+                    exclude_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    """Top-k кандидатов для одного артикула (exclude_ids — уже найденные другим способом)."""
+    exclude = set(exclude_ids or ())
+    found = find_candidates_many([query], limit=limit + len(exclude), min_score=min_score).get(query, [])
+    return [c for c in found if c["id"] not in exclude][:limit]
@@ -1,18 +1,11 @@
-
 from typing import Optional, List, Dict, Any
 from django.db import connection
 
+from procurement.services import resolution_index
+
 def find_item_id_by_map(supplier_id: int, supplier_sku: str) -> Optional[int]:
-    sql = """
-    SELECT item_id
-    FROM procurement_supplieritemmap
-    WHERE supplier_id = %s AND supplier_sku = %s AND is_active = TRUE
-    LIMIT 1
-    """
-    with connection.cursor() as cur:
-        cur.execute(sql, [supplier_id, supplier_sku])
-        row = cur.fetchone()
-        return row[0] if row else None
+    # Сопоставления хранятся в ItemSupplierMapping; поиск — через индекс (память/кэш, БД при промахе)
+    return resolution_index.item_id_by_supplier_sku(supplier_id, supplier_sku)
 
 def upsert_map(supplier_id: int, supplier_sku: str, item_id: int, supplier_name: str = None) -> int:
     sql = """
@@ -0,0 +1,319 @@
+"""
+Сигналы procurement.
+
+Инвалидация индекса сопоставления артикулов (services/resolution_index.py) — только при изменениях,
+влияющих на отображение (прежние значения полей запоминаются в pre_save):
+- ItemSupplierMapping — создание, удаление, смена позиции/Item, активности, «предпочтительного»;
+- SupplierPriceListLine — смена артикула или прайс-листа; смена цены — только если артикул
+  сопоставлен у поставщика больше одного раза (цена решает, какой Item победит);
+  удаление позиции — через каскадное удаление её сопоставлений;
+- Item — сброс отображения Item.sku;
+- Supplier — сброс отображения «название -> поставщик».
+
+Пересчёт итогов КП (services/quote_summary.py):
+- QuoteLine — итоги своего КП (цена, срок, валюта, is_blocked);
+- PurchaseRequestLine — итоги всех КП по заявке (количества);
+- Quote — при создании и смене заявки;
+- удаление PurchaseRequest — КП отвязываются (SET_NULL без сигналов), пересчитываем их.
+
+Журнал обеспечения заявок (services/coverage.py) — в той же транзакции:
+- PurchaseRequestLine — требуемые количества;
+- PurchaseOrder (статус, заявка), PurchaseOrderLine отправленных заказов — заказано/подтверждено;
+- Shipment (статус), ShipmentLine — доставлено.
+
+Снимок метрик дашборда (services/metrics.py) — сброс при изменении заявок и их строк.
+
+Ряды истории цен (services/price_series.py) — PriceRecord меняет версии своей позиции и поставщика.
+
+Матрица цен (services/price_matrix.py) — версия прайсов меняется при изменении SupplierPriceList,
+SupplierPriceListLine, ItemSupplierMapping; версия заявки — при изменении её строк.
+
+Лучшие предложения по позициям (services/best_offers.py) — в той же транзакции:
+- ItemSupplierMapping — своя позиция;
+- SupplierPriceListLine, SupplierPriceList — сопоставленные позиции (при удалении — собраны в pre_delete,
+  каскадные удаления сопоставлений пропускаются).
+
+Подключаются в ProcurementConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.db.models.functions import Trim, Upper
+from django.dispatch import receiver
+
+from catalog.models import Item
+from suppliers.models import Supplier
+
+from .models import (
+    ItemSupplierMapping,
+    PriceRecord,
+    PurchaseOrder,
+    PurchaseOrderLine,
+    PurchaseRequest,
+    PurchaseRequestLine,
+    Quote,
+    QuoteLine,
+    Shipment,
+    ShipmentLine,
+    SupplierPriceList,
+    SupplierPriceListLine,
+)
+from .services import best_offers, coverage, metrics, price_matrix, price_series, quote_summary, resolution_index
+
+
+def _supplier_id_for_price_list(price_list_id):
+    if not price_list_id:
+        return None
+    return SupplierPriceList.objects.filter(pk=price_list_id).values_list('supplier_id', flat=True).first()
+
+
+# Поля, от которых зависит отображение «артикул поставщика -> Item»
+_MAPPING_INDEX_FIELDS = ('item_id', 'price_list_line_id', 'is_active', 'is_preferred')
+_LINE_INDEX_FIELDS = ('price_list_id', 'supplier_sku', 'price')
+
+
+def _remember_fields(sender, instance, fields, update_fields):
+    """Прежние значения полей (один запрос) — если сохранение может их менять."""
+    instance._index_old = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not ({*fields, *(f.removesuffix('_id') for f in fields)} & set(update_fields)):
+        instance._index_old = {}
+        return
+    instance._index_old = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _changed(instance, fields):
+    """Изменившиеся поля: None — прежнее состояние неизвестно (новая запись или без pre_save)."""
+    old = getattr(instance, '_index_old', None)
+    if old is None:
+        return None
+    return {f for f in fields if f in old and old[f] != getattr(instance, f)}
+
+
+@receiver(pre_save, sender=ItemSupplierMapping, dispatch_uid="resolution_index_mapping_pre")
+def _mapping_saving(sender, instance, update_fields=None, **kwargs):
+    _remember_fields(sender, instance, _MAPPING_INDEX_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=ItemSupplierMapping, dispatch_uid="resolution_index_mapping")
+def _mapping_saved(sender, instance, created, **kwargs):
+    changed = None if created else _changed(instance, _MAPPING_INDEX_FIELDS)
+    if changed is not None and not changed:
+        # Коэффициент, примечания и т.п. на выбор Item не влияют
+        return
+    line_ids = {instance.price_list_line_id}
+    if changed and 'price_list_line_id' in changed:
+        line_ids.add(instance._index_old['price_list_line_id'])
+    for supplier_id in set(SupplierPriceListLine.objects.filter(
+        pk__in=line_ids,
+    ).values_list('price_list__supplier_id', flat=True)):
+        resolution_index.invalidate_supplier(supplier_id)
+
+
+@receiver(post_delete, sender=ItemSupplierMapping, dispatch_uid="resolution_index_mapping_deleted")
+def _mapping_deleted(sender, instance, **kwargs):
+    supplier_id = SupplierPriceListLine.objects.filter(
+        pk=instance.price_list_line_id,
+    ).values_list('price_list__supplier_id', flat=True).first()
+    # Позиция уже удалена (каскад) — поставщика не узнать, сбрасываем все отображения
+    resolution_index.invalidate_supplier(supplier_id)
+
+
+@receiver(pre_save, sender=SupplierPriceListLine, dispatch_uid="resolution_index_line_pre")
+def _price_list_line_saving(sender, instance, update_fields=None, **kwargs):
+    _remember_fields(sender, instance, _LINE_INDEX_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=SupplierPriceListLine, dispatch_uid="resolution_index_line")
+def _price_list_line_changed(sender, instance, created, **kwargs):
+    if created:
+        # У новой позиции ещё нет сопоставлений
+        return
+    changed = _changed(instance, _LINE_INDEX_FIELDS)
+    if changed is None or changed & {'price_list_id', 'supplier_sku'}:
+        price_list_ids = {instance.price_list_id}
+        if changed:
+            price_list_ids.add(instance._index_old['price_list_id'])
+        for supplier_id in set(SupplierPriceList.objects.filter(
+            pk__in=price_list_ids,
+        ).values_list('supplier_id', flat=True)):
+            resolution_index.invalidate_supplier(supplier_id)
+        return
+    if 'price' in changed:
+        supplier_id = _supplier_id_for_price_list(instance.price_list_id)
+        if _sku_mapped_ambiguously(instance, supplier_id):
+            resolution_index.invalidate_supplier(supplier_id)
+
+
+def _sku_mapped_ambiguously(line, supplier_id) -> bool:
+    """Позиция сопоставлена, и её артикул у поставщика сопоставлен больше одного раза."""
+    line_ids = list(ItemSupplierMapping.objects.filter(
+        is_active=True,
+        price_list_line__price_list__supplier_id=supplier_id,
+    ).annotate(_sku_norm=Upper(Trim('price_list_line__supplier_sku'))).filter(
+        _sku_norm=resolution_index.normalize_sku(line.supplier_sku),
+    ).values_list('price_list_line_id', flat=True))
+    return len(line_ids) > 1 and line.pk in line_ids
+
+
+@receiver([post_save, post_delete], sender=Item, dispatch_uid="resolution_index_item")
+def _item_changed(sender, instance, **kwargs):
+    resolution_index.invalidate_items()
+
+
+@receiver([post_save, post_delete], sender=Supplier, dispatch_uid="resolution_index_supplier")
+def _supplier_changed(sender, instance, **kwargs):
+    resolution_index.invalidate_supplier_names()
+
+
+def _deleting(kwargs, model) -> bool:
+    """Удаление пришло каскадом от model (сам объект или queryset) — пересчитывать нечего."""
+    origin = kwargs.get("origin")
+    return isinstance(origin, model) or getattr(origin, "model", None) is model
+
+
+@receiver(post_save, sender=Quote, dispatch_uid="quote_summary_quote")
+def _quote_saved(sender, instance, **kwargs):
+    quote_summary.schedule([instance.id])
+
+
+@receiver([post_save, post_delete], sender=QuoteLine, dispatch_uid="quote_summary_line")
+def _quote_line_changed(sender, instance, **kwargs):
+    if _deleting(kwargs, Quote):
+        return
+    quote_summary.schedule([instance.quote_id])
+
+
+@receiver([post_save, post_delete], sender=PurchaseRequestLine, dispatch_uid="quote_summary_request_line")
+def _request_line_changed(sender, instance, **kwargs):
+    if _deleting(kwargs, PurchaseRequest):
+        return
+    quote_summary.schedule(request_ids=[instance.request_id])
+
+
+@receiver(pre_delete, sender=PurchaseRequest, dispatch_uid="quote_summary_request_pre")
+def _request_deleting(sender, instance, **kwargs):
+    instance._summary_quote_ids = list(instance.quotes.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=PurchaseRequest, dispatch_uid="quote_summary_request")
+def _request_deleted(sender, instance, **kwargs):
+    quote_summary.schedule(getattr(instance, "_summary_quote_ids", ()))
+
+
+@receiver([post_save, post_delete], sender=PurchaseRequestLine, dispatch_uid="coverage_request_line")
+def _coverage_request_line(sender, instance, **kwargs):
+    if _deleting(kwargs, PurchaseRequest):
+        return
+    coverage.schedule([instance.request_id])
+
+
+@receiver(post_save, sender=PurchaseOrder, dispatch_uid="coverage_order")
+def _coverage_order_saved(sender, instance, update_fields=None, **kwargs):
+    # Обеспечение зависит только от статуса заказа и его заявки
+    if update_fields is not None and not {"status", "purchase_request"} & set(update_fields):
+        return
+    coverage.schedule([instance.purchase_request_id])
+
+
+@receiver(post_delete, sender=PurchaseOrder, dispatch_uid="coverage_order_deleted")
+def _coverage_order_deleted(sender, instance, **kwargs):
+    coverage.schedule([instance.purchase_request_id])
+
+
+@receiver([post_save, post_delete], sender=PurchaseOrderLine, dispatch_uid="coverage_order_line")
+def _coverage_order_line(sender, instance, **kwargs):
+    if _deleting(kwargs, PurchaseOrder):
+        return
+    row = PurchaseOrder.objects.filter(pk=instance.order_id).values_list("purchase_request_id", "status").first()
+    # Строки черновиков в обеспечение не входят
+    if row and row[0] and (row[1] or "").lower() in coverage.PO_ORDERED_STATUSES:
+        coverage.schedule([row[0]])
+
+
+def _shipment_request_id(shipment_id):
+    return Shipment.objects.filter(pk=shipment_id).values_list("order__purchase_request_id", flat=True).first()
+
+
+@receiver(post_save, sender=Shipment, dispatch_uid="coverage_shipment")
+def _coverage_shipment_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "status" not in update_fields:
+        return
+    coverage.schedule([_shipment_request_id(instance.pk)])
+
+
+@receiver(post_delete, sender=Shipment, dispatch_uid="coverage_shipment_deleted")
+def _coverage_shipment_deleted(sender, instance, **kwargs):
+    if _deleting(kwargs, PurchaseOrder):
+        return
+    pr_id = PurchaseOrder.objects.filter(pk=instance.order_id).values_list("purchase_request_id", flat=True).first()
+    coverage.schedule([pr_id])
+
+
+@receiver([post_save, post_delete], sender=ShipmentLine, dispatch_uid="coverage_shipment_line")
+def _coverage_shipment_line(sender, instance, **kwargs):
+    if _deleting(kwargs, Shipment) or _deleting(kwargs, PurchaseOrder):
+        return
+    coverage.schedule([_shipment_request_id(instance.shipment_id)])
+
+
+@receiver([post_save, post_delete], sender=PurchaseRequest, dispatch_uid="metrics_request")
+@receiver([post_save, post_delete], sender=PurchaseRequestLine, dispatch_uid="metrics_request_line")
+def _metrics_changed(sender, instance, **kwargs):
+    metrics.invalidate()
+
+
+@receiver([post_save, post_delete], sender=PriceRecord, dispatch_uid="price_series_record")
+def _price_record_changed(sender, instance, **kwargs):
+    price_series.invalidate([instance.item_id], [instance.supplier_id])
+
+
+@receiver([post_save, post_delete], sender=SupplierPriceList, dispatch_uid="price_matrix_price_list")
+@receiver([post_save, post_delete], sender=SupplierPriceListLine, dispatch_uid="price_matrix_line")
+@receiver([post_save, post_delete], sender=ItemSupplierMapping, dispatch_uid="price_matrix_mapping")
+def _price_matrix_changed(sender, instance, **kwargs):
+    price_matrix.invalidate()
+
+
+@receiver([post_save, post_delete], sender=PurchaseRequestLine, dispatch_uid="price_matrix_request_line")
+def _price_matrix_request_changed(sender, instance, **kwargs):
+    price_matrix.invalidate_request(instance.request_id)
+
+
+@receiver([post_save, post_delete], sender=ItemSupplierMapping, dispatch_uid="best_offers_mapping")
+def _best_offers_mapping(sender, instance, **kwargs):
+    if _deleting(kwargs, SupplierPriceListLine) or _deleting(kwargs, SupplierPriceList):
+        return
+    best_offers.schedule([instance.item_id])
+
+
+@receiver(post_save, sender=SupplierPriceListLine, dispatch_uid="best_offers_line")
+def _best_offers_line(sender, instance, **kwargs):
+    best_offers.schedule(best_offers.items_for_lines([instance.pk]))
+
+
+@receiver(pre_delete, sender=SupplierPriceListLine, dispatch_uid="best_offers_line_pre")
+def _best_offers_line_deleting(sender, instance, **kwargs):
+    instance._best_offer_item_ids = best_offers.items_for_lines([instance.pk])
+
+
+@receiver(post_delete, sender=SupplierPriceListLine, dispatch_uid="best_offers_line_deleted")
+def _best_offers_line_deleted(sender, instance, **kwargs):
+    if _deleting(kwargs, SupplierPriceList):
+        return
+    best_offers.schedule(getattr(instance, "_best_offer_item_ids", ()))
+
+
+@receiver(post_save, sender=SupplierPriceList, dispatch_uid="best_offers_price_list")
+def _best_offers_price_list(sender, instance, **kwargs):
+    best_offers.schedule(best_offers.items_for_price_lists([instance.pk]))
+
+
+@receiver(pre_delete, sender=SupplierPriceList, dispatch_uid="best_offers_price_list_pre")
+def _best_offers_price_list_deleting(sender, instance, **kwargs):
+    instance._best_offer_item_ids = best_offers.items_for_price_lists([instance.pk])
+
+
+@receiver(post_delete, sender=SupplierPriceList, dispatch_uid="best_offers_price_list_deleted")
+def _best_offers_price_list_deleted(sender, instance, **kwargs):
+    best_offers.schedule(getattr(instance, "_best_offer_item_ids", ()))
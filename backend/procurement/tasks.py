@@ -0,0 +1,16 @@
+"""
+Celery-задачи procurement.
+
+Worker: `celery -A tasks worker -l info` (приложение — tasks/celery.py).
+"""
+
+from celery import shared_task
+
+from .services.import_jobs import run_job
+
+
+@shared_task(name="procurement.run_import_job")
+def run_import_job(job_id: int) -> str:
+    """Выполнить фоновый импорт ImportJob; возвращает итоговый статус."""
+    job = run_job(job_id)
+    return job.status if job else "missing"
@@ -0,0 +1,210 @@
+import itertools
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import (
+    ItemSupplierMapping, PurchaseRequest, PurchaseRequestLine, SupplierPriceList, SupplierPriceListLine,
+)
+from procurement.services import allocation
+
+TODAY = date(2026, 10, 16)  # пятница
+
+
+def _offer(supplier_id, price, **kw):
+    offer = {
+        "supplier_id": supplier_id,
+        "conversion_factor": Decimal("1"),
+        "min_quantity": Decimal("1"),
+        "min_quantity_override": None,
+        "quantity_step": Decimal("1"),
+        "min_order_amount": Decimal("0"),
+        "price": Decimal(price),
+        "delivery_cost_fixed": Decimal("0"),
+        "delivery_cost_per_unit": Decimal("0"),
+        "vat_included": True,
+        "vat_rate": Decimal("20"),
+        "lead_time_days": 0,
+    }
+    offer.update({k: (Decimal(v) if isinstance(v, str) else v) for k, v in kw.items()})
+    return offer
+
+
+def _random_problem(rng, n_lines, n_suppliers, density=0.6):
+    lines, offers = [], {}
+    for i in range(n_lines):
+        lines.append({"id": i + 1, "item_id": i + 1, "qty": Decimal(rng.randint(1, 50)), "need_date": None})
+        for s in range(1, n_suppliers + 1):
+            if rng.random() < density:
+                offers.setdefault(i + 1, []).append(_offer(
+                    s, str(rng.randint(10, 200)),
+                    delivery_cost_fixed=str(rng.choice([0, 0, 100, 500])),
+                    min_order_amount=str(rng.choice([0, 0, 0, 1000, 3000])),
+                    quantity_step=str(rng.choice([1, 1, 5])),
+                    vat_included=rng.random() < 0.5,
+                ))
+    return lines, offers
+
+
+def _brute_force(lines, offers):
+    """Минимальная стоимость допустимого назначения полным перебором (None — допустимых нет)."""
+    choices = [offers.get(line["item_id"], []) for line in lines]
+    best = None
+    for combo in itertools.product(*choices):
+        sub, fixed, moa = {}, {}, {}
+        for line, o in zip(lines, combo):
+            vat = Decimal("1") if o["vat_included"] else 1 + o["vat_rate"] / 100
+            q = allocation.order_qty(line["qty"], o)
+            s = o["supplier_id"]
+            sub[s] = sub.get(s, Decimal("0")) + q * (o["price"] + o["delivery_cost_per_unit"]) * vat
+            fixed[s] = max(fixed.get(s, Decimal("0")), o["delivery_cost_fixed"] * vat)
+            moa[s] = max(moa.get(s, Decimal("0")), o["min_order_amount"])
+        if any(sub[s] < moa[s] for s in sub):
+            continue
+        cost = sum(sub.values()) + sum(fixed.values())
+        if best is None or cost < best:
+            best = cost
+    return best
+
+
+class AllocationSolverTests(APITestCase):
+    """Чистый решатель: ограничения, точный режим против перебора, масштаб 500 x 20."""
+
+    def test_order_qty_moq_and_step(self):
+        o = _offer(1, "10", min_quantity="10", quantity_step="4", conversion_factor="2")
+        self.assertEqual(allocation.order_qty(Decimal("3"), o), Decimal("12"))    # 6 -> МОК 10 -> кратно 4
+        o = _offer(1, "10", min_quantity="100", min_quantity_override="2", conversion_factor="2")
+        self.assertEqual(allocation.order_qty(Decimal("1"), o), Decimal("4"))     # МОК позиции 2 * 2
+
+    def test_fixed_delivery_consolidates_lines(self):
+        lines = [{"id": i, "item_id": i, "qty": Decimal("1"), "need_date": None} for i in (1, 2)]
+        offers = {
+            1: [_offer(1, "100", delivery_cost_fixed="500"), _offer(2, "150")],
+            2: [_offer(1, "100", delivery_cost_fixed="500"), _offer(3, "700")],
+        }
+        res = allocation.solve(lines, offers, mode="heuristic", today=TODAY)
+        # строке 2 выгоднее поставщик 1 (600 < 700); тогда и строку 1 дешевле добрать к нему (100 < 150)
+        self.assertEqual(res["total_cost"], "700.00")
+        self.assertEqual([o["supplier_id"] for o in res["orders"]], [1])
+
+    def test_min_order_amount(self):
+        lines = [{"id": 1, "item_id": 1, "qty": Decimal("5"), "need_date": None}]
+        offers = {1: [_offer(1, "10", min_order_amount="1000"), _offer(2, "30")]}
+        res = allocation.solve(lines, offers, mode="exact", today=TODAY)
+        self.assertEqual(res["orders"][0]["supplier_id"], 2)
+        self.assertEqual(res["violations"], [])
+
+        offers = {1: [_offer(1, "10", min_order_amount="1000")]}
+        res = allocation.solve(lines, offers, mode="heuristic", today=TODAY)
+        self.assertEqual(res["violations"][0]["supplier_id"], 1)
+
+    def test_deadline_in_working_days(self):
+        self.assertEqual(allocation.add_working_days(TODAY, 1), TODAY + timedelta(days=3))
+        lines = [
+            {"id": 1, "item_id": 1, "qty": Decimal("1"), "need_date": TODAY + timedelta(days=3)},
+            {"id": 2, "item_id": 2, "qty": Decimal("1"), "need_date": TODAY},
+        ]
+        offers = {
+            1: [_offer(1, "10", lead_time_days=2), _offer(2, "20", lead_time_days=1)],
+            2: [_offer(1, "10", lead_time_days=1)],
+        }
+        res = allocation.solve(lines, offers, today=TODAY)
+        self.assertEqual(res["orders"][0]["supplier_id"], 2)
+        self.assertEqual(res["orders"][0]["lines"][0]["eta"], (TODAY + timedelta(days=3)).isoformat())
+        self.assertEqual(res["unassigned"][0]["pr_line_id"], 2)
+        self.assertIn("срок", res["unassigned"][0]["reason"])
+
+    def test_exact_matches_brute_force(self):
+        rng = random.Random(19)
+        checked = 0
+        for _ in range(40):
+            lines, offers = _random_problem(rng, rng.randint(1, 5), rng.randint(1, 4))
+            if any(line["item_id"] not in offers for line in lines):
+                continue
+            expected = _brute_force(lines, offers)
+            res = allocation.solve(lines, offers, mode="exact", today=TODAY)
+            self.assertEqual(res["mode"], "exact")
+            if expected is None:
+                self.assertTrue(res["violations"])
+                continue
+            self.assertEqual(res["violations"], [])
+            self.assertEqual(Decimal(res["total_cost"]), expected.quantize(Decimal("0.01")))
+            checked += 1
+        self.assertGreater(checked, 10)
+
+    def test_heuristic_scale(self):
+        rng = random.Random(500)
+        lines, offers = _random_problem(rng, 500, 20)
+        started = time.monotonic()
+        res = allocation.solve(lines, offers, mode="auto", today=TODAY)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(res["mode"], "heuristic")
+        self.assertLess(elapsed, allocation.TIME_BUDGET + 5)
+        assigned = sum(len(o["lines"]) for o in res["orders"])
+        self.assertEqual(assigned + len(res["unassigned"]), 500)
+
+        # не хуже, чем «каждой строке — самое дешёвое предложение»
+        naive = {}
+        for line in lines:
+            opts = offers.get(line["item_id"])
+            if opts:
+                naive[line["item_id"]] = [min(opts, key=lambda o: o["price"] * (1 if o["vat_included"] else Decimal("1.2")))]
+        naive_res = allocation.solve(lines, naive, mode="heuristic", today=TODAY)
+        if not naive_res["violations"]:
+            self.assertLessEqual(Decimal(res["total_cost"]), Decimal(naive_res["total_cost"]))
+
+
+class AllocationApiTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.items = [Item.objects.create(sku=f"S{i}", name=f"I{i}", unit=unit, category=cat) for i in range(2)]
+        self.s1 = Supplier.objects.create(name="S1")
+        self.s2 = Supplier.objects.create(name="S2")
+        today = date.today()
+        pl1 = SupplierPriceList.objects.create(supplier=self.s1, name="P1", version="1", effective_date=today)
+        pl2 = SupplierPriceList.objects.create(supplier=self.s2, name="P2", version="1", effective_date=today)
+
+        def offer(pl, item, sku, **line):
+            ppl = SupplierPriceListLine.objects.create(
+                price_list=pl, supplier_sku=sku, description=sku, unit=unit, vat_included=True, **line,
+            )
+            return ItemSupplierMapping.objects.create(item=item, price_list_line=ppl)
+
+        self.a0 = offer(pl1, self.items[0], "A0", price="100", delivery_cost_fixed="300")
+        self.a1 = offer(pl1, self.items[1], "A1", price="50", delivery_cost_fixed="300")
+        self.b0 = offer(pl2, self.items[0], "B0", price="120")
+
+        self.pr = PurchaseRequest.objects.create(status="open")
+        for it in self.items:
+            PurchaseRequestLine.objects.create(
+                request=self.pr, item=it, qty="2", unit=unit, status="pending", priority="normal",
+            )
+
+    def test_allocate(self):
+        url = f"/api/procurement/purchase-requests/{self.pr.id}/allocate/"
+        resp = self.client.post(url, {"mode": "exact"}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, resp.data)
+        self.assertEqual(resp.data["mode"], "exact")
+        # 2*100 + 2*50 + доставка 300 = 600 дешевле, чем 2*120 + 2*50 + 300 = 640
+        self.assertEqual(resp.data["total_cost"], "600.00")
+        order = resp.data["orders"][0]
+        self.assertEqual(order["supplier_id"], self.s1.id)
+        self.assertEqual({ln["mapping_id"] for ln in order["lines"]}, {self.a0.id, self.a1.id})
+
+        resp = self.client.post(url, {"mode": "fast"}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
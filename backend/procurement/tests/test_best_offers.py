@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import ItemBestOffer, ItemSupplierMapping, SupplierPriceList, SupplierPriceListLine
+from procurement.services import best_offers
+
+URL = "/api/procurement/item-supplier-mappings/best-offers/"
+
+
+class ItemBestOfferTests(APITestCase):
+    """Таблица лучших предложений поддерживается сигналами и читается одним запросом по корзине."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.items = [Item.objects.create(sku=f"S{i}", name=f"I{i}", unit=self.unit, category=cat) for i in range(3)]
+        self.s1 = Supplier.objects.create(name="S1")
+        self.s2 = Supplier.objects.create(name="S2")
+        today = date.today()
+        self.pl1 = SupplierPriceList.objects.create(supplier=self.s1, name="P1", version="1", effective_date=today)
+        self.pl2 = SupplierPriceList.objects.create(supplier=self.s2, name="P2", version="1", effective_date=today)
+
+    def _offer(self, price_list, item, sku, preferred=False, **line):
+        ppl = SupplierPriceListLine.objects.create(
+            price_list=price_list, supplier_sku=sku, description=sku, unit=self.unit, **line,
+        )
+        return ItemSupplierMapping.objects.create(item=item, price_list_line=ppl, is_preferred=preferred)
+
+    def test_best_offer_fields(self):
+        item = self.items[0]
+        a = self._offer(self.pl1, item, "A", preferred=True, price="100", lead_time_days=10, vat_included=True)
+        b = self._offer(self.pl2, item, "B", price="90", lead_time_days=5, vat_rate="20")   # 108 с НДС
+        c = self._offer(self.pl2, item, "C", price="95", lead_time_days=2, vat_included=True)
+
+        best = ItemBestOffer.objects.get(item=item)
+        self.assertEqual(best.preferred_mapping_id, a.id)
+        self.assertEqual(best.cheapest_mapping_id, c.id)
+        self.assertEqual(best.cheapest_effective_price, Decimal("95"))
+        self.assertEqual((best.fastest_mapping_id, best.fastest_lead_time_days), (c.id, 2))
+        self.assertEqual((best.offers_count, best.suppliers_count), (3, 2))
+
+        # Изменение позиции прайса пересчитывает лучшее
+        line = b.price_list_line
+        line.vat_included = True
+        line.save()
+        self.assertEqual(ItemBestOffer.objects.get(item=item).cheapest_mapping_id, b.id)
+
+    def test_price_list_activation_and_deletion(self):
+        item = self.items[1]
+        a = self._offer(self.pl1, item, "A", price="10", vat_included=True)
+        self._offer(self.pl2, item, "B", price="20", vat_included=True)
+        self.assertEqual(ItemBestOffer.objects.get(item=item).cheapest_mapping_id, a.id)
+
+        self.pl1.is_active = False
+        self.pl1.save()
+        best = ItemBestOffer.objects.get(item=item)
+        self.assertEqual(best.offers_count, 1)
+        self.assertNotEqual(best.cheapest_mapping_id, a.id)
+
+        self.pl2.delete()
+        self.assertFalse(ItemBestOffer.objects.filter(item=item).exists())
+
+        self.pl1.is_active = True
+        self.pl1.save()
+        self.assertEqual(ItemBestOffer.objects.get(item=item).cheapest_mapping_id, a.id)
+
+        a.price_list_line.delete()
+        self.assertFalse(ItemBestOffer.objects.filter(item=item).exists())
+
+    def test_rebuild_command_drops_expired(self):
+        item = self.items[2]
+        self._offer(self.pl1, item, "A", price="10")
+        # Срок действия кончился «сам» — без записи в прайс-лист сигнал не сработал
+        SupplierPriceList.objects.filter(pk=self.pl1.pk).update(expiry_date=date.today() - timedelta(days=1))
+        self.assertTrue(ItemBestOffer.objects.filter(item=item).exists())
+
+        call_command("rebuild_best_offers", stdout=StringIO())
+        self.assertFalse(ItemBestOffer.objects.filter(item=item).exists())
+
+    def test_bulk_lookup(self):
+        for i, item in enumerate(self.items[:2]):
+            self._offer(self.pl1, item, f"A{i}", price="10", vat_included=True)
+            self._offer(self.pl2, item, f"B{i}", price="12", vat_included=True, lead_time_days=1)
+
+        with self.assertNumQueries(2):
+            found = best_offers.lookup([it.id for it in self.items])
+        self.assertEqual(set(found), {self.items[0].id, self.items[1].id})
+
+        ids = ",".join(str(it.id) for it in self.items)
+        res = self.client.get(f"{URL}?items={ids}")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first, _, missing = res.data["results"]
+        self.assertEqual(first["cheapest"]["supplier_id"], self.s1.id)
+        self.assertEqual(first["cheapest"]["effective_price"], "10.0000")
+        self.assertEqual(first["fastest"]["supplier_id"], self.s2.id)
+        self.assertEqual(missing, {
+            "item_id": self.items[2].id, "offers_count": 0, "suppliers_count": 0,
+            "preferred": None, "cheapest": None, "fastest": None,
+        })
+
+        res = self.client.post(URL, {"items": [self.items[1].id]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["offers_count"], 2)
@@ -0,0 +1,159 @@
+import io
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from catalog.models import Category, Item
+from core.models import Unit
+from suppliers.models import Supplier
+from procurement.models import (
+    DocumentImport,
+    ImportJob,
+    PriceRecord,
+    StoredDocument,
+    SupplierPriceList,
+    SupplierPriceListLine,
+)
+from procurement.services.import_jobs import run_job
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _xlsx_bytes(rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _upload(data, name="price.xlsx"):
+    return SimpleUploadedFile(name, data, content_type=XLSX)
+
+
+class DocumentStoreTests(APITestCase):
+    """Хранилище по SHA-256: один файл — одна запись, разбор из кэша, повторная фиксация не выполняется."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media, True)
+        cache.clear()
+
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        Item.objects.create(sku="I1", name="Item", unit=self.unit, category=cat)
+        self.supplier = Supplier.objects.create(name="Supp")
+        self.pl = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="1", effective_date=date.today(),
+        )
+
+    def test_price_records_preview_cached_and_duplicate_commit(self):
+        data = _xlsx_bytes([["item_sku", "supplier", "price"], ["I1", "Supp", 10], ["I1", "Other", 12]])
+        url = "/api/procurement/pricerecords/import_excel/"
+
+        first = self.client.post(url + "?preview=1", {"file": _upload(data)}, format="multipart")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(first.data["cached"])
+
+        # Повторная загрузка того же файла: та же запись хранилища, разбор не выполняется
+        with mock.patch("procurement.views_import.open_price_records_sheet") as opener:
+            again = self.client.post(url + "?preview=1", {"file": _upload(data, "copy.xlsx")}, format="multipart")
+        opener.assert_not_called()
+        self.assertTrue(again.data["cached"])
+        self.assertEqual(again.data["document_id"], first.data["document_id"])
+        self.assertEqual(again.data["rows"], first.data["rows"])
+        self.assertEqual(StoredDocument.objects.count(), 1)
+
+        res = self.client.post(url, {"file": _upload(data)}, format="multipart")
+        self.assertEqual(res.data["created"], 2)
+        self.assertTrue(res.data["cached"])
+
+        dup = self.client.post(url, {"file": _upload(data)}, format="multipart")
+        self.assertEqual(dup.status_code, status.HTTP_200_OK)
+        self.assertTrue(dup.data["duplicate"])
+        self.assertEqual(dup.data["previous_result"]["created"], 2)
+        self.assertEqual(PriceRecord.objects.count(), 2)
+
+        forced = self.client.post(url + "?force=1", {"file": _upload(data)}, format="multipart")
+        self.assertEqual(forced.data["created"], 2)
+        self.assertEqual(PriceRecord.objects.count(), 4)
+        self.assertEqual(DocumentImport.objects.count(), 1)
+
+    def test_price_list_duplicate_is_per_target(self):
+        data = _xlsx_bytes([["item_sku", "unit", "price"], ["A", "шт", "1.50"], ["B", "шт", "2.00"]])
+        other = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL2", version="2", effective_date=date.today(),
+        )
+
+        res = self.client.post(f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/", {"file": _upload(data)}, format="multipart")
+        self.assertEqual(res.data["created"], 2)
+        dup = self.client.post(f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/", {"file": _upload(data)}, format="multipart")
+        self.assertTrue(dup.data["duplicate"])
+
+        # Тот же файл в другой прайс-лист — обычный импорт (строки из кэша)
+        res = self.client.post(f"/api/procurement/supplier-price-lists/{other.id}/upload/", {"file": _upload(data)}, format="multipart")
+        self.assertEqual(res.data["created"], 2)
+        self.assertTrue(res.data["cached"])
+        self.assertEqual(SupplierPriceListLine.objects.count(), 4)
+
+    def test_large_sheet_streams_without_cache(self):
+        data = _xlsx_bytes([["item_sku", "unit", "price"], ["A", "шт", "1.50"], ["B", "шт", "2.00"]])
+        url = f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/"
+
+        with mock.patch("procurement.services.documents.CACHE_MAX_ROWS", 1):
+            res = self.client.post(url, {"file": _upload(data)}, format="multipart")
+            self.assertEqual(res.data["created"], 2)
+            again = self.client.post(url + "?force=1", {"file": _upload(data)}, format="multipart")
+        # Строк больше порога — в кэш не попали, повторная загрузка разбирается заново
+        self.assertFalse(again.data["cached"])
+        self.assertEqual(again.data["updated"], 2)
+
+    def test_async_import_records_document(self):
+        data = _xlsx_bytes([["item_sku", "unit", "price"], ["A", "шт", "1.50"]])
+        url = f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/"
+
+        with mock.patch("procurement.tasks.run_import_job.delay"):
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(url + "?async=1", {"file": _upload(data)}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        run_job(res.data["job_id"])
+        self.assertEqual(ImportJob.objects.get(pk=res.data["job_id"]).status, ImportJob.Status.DONE)
+
+        dup = self.client.post(url + "?async=1", {"file": _upload(data)}, format="multipart")
+        self.assertTrue(dup.data["duplicate"])
+        self.assertEqual(dup.data["previous_result"]["job_id"], res.data["job_id"])
+
+    def test_invoice_preview_cached(self):
+        data = _xlsx_bytes([["item_sku", "price"], ["A", 5]])
+        url = "/api/procurement/import/invoice-preview/"
+
+        first = self.client.post(url, {"file": _upload(data, "invoice.xlsx")}, format="multipart")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(first.data["cached"])
+        again = self.client.post(url, {"file": _upload(data, "invoice.xlsx")}, format="multipart")
+        self.assertTrue(again.data["cached"])
+        self.assertEqual(again.data["rows"], first.data["rows"])
+
+        # Параметры разбора входят в ключ кэша
+        other = self.client.post(url, {"file": _upload(data, "invoice.xlsx"), "supplier": "Supp"}, format="multipart")
+        self.assertFalse(other.data["cached"])
+        self.assertEqual(other.data["rows"][0]["supplier"], "Supp")
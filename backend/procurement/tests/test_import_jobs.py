@@ -0,0 +1,156 @@
+import io
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+import openpyxl
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from catalog.models import Category, Item
+from core.models import Unit
+from suppliers.models import Supplier
+from procurement.models import ImportJob, PriceRecord, SupplierPriceList, SupplierPriceListLine
+from procurement.realtime import import_job_group
+from procurement.services.import_jobs import run_job
+
+
+def _xlsx(rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return SimpleUploadedFile(
+        "price.xlsx",
+        buf.getvalue(),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ImportJobTests(APITestCase):
+    """Фоновый импорт: 202 + job_id, выполнение задачи, статус и события прогресса."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media, True)
+
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        self.cat = Category.objects.create(code="C", name="Cat")
+        self.supplier = Supplier.objects.create(name="Supp")
+        self.pl = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="1", effective_date=date.today(),
+        )
+
+    def _post_async(self, url, rows):
+        with mock.patch("procurement.tasks.run_import_job.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(url, {"file": _xlsx(rows)}, format="multipart")
+        return res, delay
+
+    def test_price_list_upload_async_returns_202_and_job_runs(self):
+        rows = [["item_sku", "unit", "price"]]
+        rows += [[f"SKU-{i}", "шт", "1.50"] for i in range(5)]
+        rows.append(["BAD", "шт", "abc"])
+
+        url = f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/?async=1"
+        res, delay = self._post_async(url, rows)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job_id = res.data["job_id"]
+        delay.assert_called_once_with(job_id)
+        self.assertEqual(res.data["status_url"], f"/api/procurement/import-jobs/{job_id}/")
+        self.assertEqual(SupplierPriceListLine.objects.count(), 0)
+
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ImportJob.Status.QUEUED)
+        self.assertEqual(job.kind, ImportJob.Kind.PRICE_LIST_LINES)
+
+        layer = get_channel_layer()
+        async_to_sync(layer.group_add)(import_job_group(job_id), "test-channel")
+
+        run_job(job_id)
+
+        self.assertEqual(SupplierPriceListLine.objects.filter(price_list=self.pl).count(), 5)
+        detail = self.client.get(res.data["status_url"])
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual(detail.data["status"], "done")
+        self.assertEqual(detail.data["rows_done"], 6)
+        self.assertEqual(detail.data["created"], 5)
+        self.assertEqual(detail.data["errors"], 1)
+        self.assertEqual(len(detail.data["errors_detail"]), 1)
+        self.assertIsNotNone(detail.data["finished_at"])
+
+        statuses = []
+        while True:
+            try:
+                msg = async_to_sync(layer.receive)("test-channel")
+            except Exception:
+                break
+            statuses.append(msg["payload"]["status"])
+            if msg["payload"]["status"] == "done":
+                break
+        self.assertEqual(statuses[0], "running")
+        self.assertEqual(statuses[-1], "done")
+
+        # повторная доставка задачи не выполняет импорт заново
+        run_job(job_id)
+        self.assertEqual(ImportJob.objects.get(pk=job_id).created, 5)
+
+    def test_price_records_import_async(self):
+        Item.objects.create(sku="I1", name="Item", unit=self.unit, category=self.cat)
+        rows = [["item_sku", "supplier", "price"], ["I1", "Supp", 10], ["I1", "Other", 12], ["NOPE", "Supp", 1]]
+
+        res, delay = self._post_async("/api/procurement/pricerecords/import_excel/?async=1", rows)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        delay.assert_called_once()
+
+        job = run_job(res.data["job_id"])
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.created, 2)
+        self.assertEqual(job.errors, 1)
+        self.assertEqual(PriceRecord.objects.count(), 2)
+
+    def test_sync_price_records_preview_still_works(self):
+        Item.objects.create(sku="I1", name="Item", unit=self.unit, category=self.cat)
+        rows = [["item_sku", "supplier", "price"], ["I1", "Supp", 10]]
+        res = self.client.post(
+            "/api/procurement/pricerecords/import_excel/?preview=1", {"file": _xlsx(rows)}, format="multipart",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["preview"])
+        self.assertEqual(len(res.data["rows"]), 1)
+        self.assertTrue(res.data["rows"][0]["valid"])
+        self.assertEqual(PriceRecord.objects.count(), 0)
+
+    def test_missing_columns_rejected_without_job(self):
+        url = f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/?async=1"
+        res, delay = self._post_async(url, [["foo", "bar"], [1, 2]])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        delay.assert_not_called()
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_failed_job_records_error(self):
+        job = ImportJob.objects.create(
+            kind=ImportJob.Kind.PRICE_LIST_LINES, price_list=self.pl, file=_xlsx([["foo"], ["x"]]),
+        )
+        run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertIn("item_sku", job.error)
@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from procurement.models import PurchaseRequest, PurchaseRequestLine
+from procurement.services import metrics
+
+URL = "/api/procurement/metrics-overview/"
+
+
+class MetricsOverviewTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        item = Item.objects.create(sku="A", name="A", unit=unit, category=cat)
+
+        today = date.today()
+        open_pr = PurchaseRequest.objects.create(status="open")
+        PurchaseRequest.objects.create(status="draft")     # без строк
+        closed_pr = PurchaseRequest.objects.create(status="closed")
+
+        def line(pr, status, need_date):
+            return PurchaseRequestLine.objects.create(
+                request=pr, item=item, qty="1", unit=unit, status=status, priority="normal", need_date=need_date,
+            )
+
+        self.pending = line(open_pr, "pending", today)                      # hot
+        line(open_pr, "pending", today + timedelta(days=2))                 # warn
+        line(open_pr, "ordered", today + timedelta(days=10))                # ok
+        line(closed_pr, "received", today - timedelta(days=30))             # hot
+        line(closed_pr, "received", None)
+        cache.clear()
+
+    def test_values_in_one_query_then_from_snapshot(self):
+        with self.assertNumQueries(1):
+            data = metrics.compute()
+        self.assertEqual(data, {
+            "purchase_requests_total": 3,
+            "purchase_requests_open": 1,
+            "lines_waiting": 2,
+            "sla_hot": 2,
+            "sla_warn": 1,
+            "sla_ok": 1,
+        })
+
+        self.assertEqual(self.client.get(URL).json(), data)
+        with mock.patch.object(metrics, "compute", wraps=metrics.compute) as compute:
+            self.assertEqual(self.client.get(URL).json(), data)
+        compute.assert_not_called()
+
+    def test_snapshot_invalidated_by_line_status(self):
+        self.assertEqual(self.client.get(URL).json()["lines_waiting"], 2)
+        self.pending.status = "ordered"
+        self.pending.save()
+        self.assertEqual(self.client.get(URL).json()["lines_waiting"], 1)
+
+    def test_single_flight(self):
+        first = metrics.overview()
+        metrics.invalidate()
+
+        # пересчёт уже идёт в другом процессе: отдаём прежний снимок, сами не считаем
+        fresh_key = f"{metrics.KEY_PREFIX}{metrics._version()}:{date.today().isoformat()}"
+        cache.add(f"{fresh_key}:lock", 1, metrics.LOCK_TTL)
+        with mock.patch.object(metrics, "compute") as compute:
+            self.assertEqual(metrics.overview(), first)
+        compute.assert_not_called()
+
+        cache.delete(f"{fresh_key}:lock")
+        with mock.patch.object(metrics, "compute", wraps=metrics.compute) as compute:
+            metrics.overview()
+            metrics.overview()
+        self.assertEqual(compute.call_count, 1)
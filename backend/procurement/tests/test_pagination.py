@@ -0,0 +1,92 @@
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import PriceRecord, PurchaseOrder, Shipment
+
+
+class SwitchablePaginationTests(APITestCase):
+    """?page=N — как раньше; ?pagination=cursor — keyset без COUNT/OFFSET."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.supplier = Supplier.objects.create(name="Supp")
+        self.orders = [
+            PurchaseOrder.objects.create(number=f"T-{i}", supplier=self.supplier) for i in range(7)
+        ]
+
+    def _get(self, url, params=None):
+        res = self.client.get(url, params or {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        return res.json()
+
+    def _walk(self, url, params):
+        ids, data = [], self._get(url, params)
+        while True:
+            self.assertNotIn("count", data)
+            ids += [r["id"] for r in data["results"]]
+            if not data["next"]:
+                return ids
+            q = {k: v[0] for k, v in parse_qs(urlparse(data["next"]).query).items()}
+            data = self._get(url, q)
+
+    def test_page_number_clients_unchanged(self):
+        data = self._get("/api/procurement/purchase-orders/", {"page": 1})
+        self.assertEqual(data["count"], 7)
+        self.assertEqual(len(data["results"]), 7)
+
+    def test_cursor_walks_purchase_orders_without_gaps(self):
+        ids = self._walk("/api/procurement/purchase-orders/", {"pagination": "cursor", "page_size": 3})
+        self.assertEqual(ids, sorted((o.id for o in self.orders), reverse=True))
+
+    def test_cursor_over_price_history_by_date(self):
+        unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        item = Item.objects.create(sku="A", name="A", unit=unit, category=cat)
+        now = timezone.now()
+        recs = [PriceRecord.objects.create(item=item, supplier=self.supplier, price=i) for i in range(5)]
+        # одинаковые даты — порядок внутри определяется id
+        for rec, days in zip(recs, (3, 1, 1, 2, 0)):
+            PriceRecord.objects.filter(pk=rec.pk).update(dt=now - timedelta(days=days))
+
+        ids = self._walk("/api/procurement/pricerecords/", {"pagination": "cursor", "page_size": 2})
+        self.assertEqual(ids, [recs[4].id, recs[2].id, recs[1].id, recs[3].id, recs[0].id])
+
+    def test_shipments_paginated_unless_filtered_by_order(self):
+        po = self.orders[0]
+        for _ in range(3):
+            Shipment.objects.create(order=po)
+        Shipment.objects.create(order=self.orders[1])
+
+        data = self._get("/api/procurement/shipments/")
+        self.assertEqual(data["count"], 4)
+
+        by_order = self._get("/api/procurement/shipments/", {"order": po.id})
+        self.assertIsInstance(by_order, list)
+        self.assertEqual(len(by_order), 3)
+
+        self.assertEqual(len(self._walk("/api/procurement/shipments/", {"pagination": "cursor", "page_size": 3})), 4)
+
+    def test_shipments_active_and_search_filters(self):
+        po = self.orders[0]
+        active = Shipment.objects.create(order=po, notes="кран на объект")
+        Shipment.objects.create(order=po, status=Shipment.Status.DELIVERED, notes="кран")
+        Shipment.objects.create(order=self.orders[1], status=Shipment.Status.CANCELLED)
+
+        data = self._get("/api/procurement/shipments/", {"active": 1})
+        self.assertEqual([s["id"] for s in data["results"]], [active.id])
+        data = self._get("/api/procurement/shipments/", {"q": "кран"})
+        self.assertEqual(data["count"], 2)
+        data = self._get("/api/procurement/shipments/", {"q": f"D-{active.id}", "active": 1})
+        self.assertEqual([s["id"] for s in data["results"]], [active.id])
@@ -0,0 +1,153 @@
+import io
+import multiprocessing
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from suppliers.models import Supplier
+from procurement.importers import pdf_price, pdf_stream, pdf_table
+from procurement.importers.price_list_excel import PRICE_LIST_HEADERS
+from procurement.management.commands.bench_pdf_import import _legacy_parse, build_pdf, build_price_pdf
+from procurement.models import SupplierPriceList, SupplierPriceListLine
+
+HEADER = [(40, 770, "item_sku"), (120, 770, "description"), (300, 770, "unit"), (360, 770, "price"), (420, 770, "lead_time_days")]
+
+
+def _table_pdf():
+    """Двухстраничная таблица: перенос наименования, итоговая строка, перенос через страницу."""
+    page1 = [(40, 800, "ACME price list"), *HEADER,
+             (40, 755, "A-1"), (120, 755, "Bolt galvanized"), (300, 755, "pcs"), (360, 755, "1 234,50"), (420, 755, "5"),
+             (120, 745, "M8 x 40"),
+             (40, 733, "A-2"), (120, 733, "Nut"), (300, 733, "pcs"), (360, 733, "12,00"), (420, 733, "3"),
+             (120, 723, "hex, zinc"),
+             (280, 40, "Page 1 of 2")]
+    page2 = [*HEADER,
+             (120, 755, "plated"),
+             (40, 743, "B-3"), (120, 743, "Washer"), (300, 743, "kg"), (360, 743, "0,75"), (420, 743, "2"),
+             (40, 700, "Total 3 positions")]
+    return build_pdf([page1, page2])
+
+
+def _cell(x0, y, text, width=30):
+    return (x0, y, x0 + width, y + 9, text)
+
+
+class PdfStreamTests(SimpleTestCase):
+    """Извлечение PDF по диапазонам страниц: тот же результат, что у разбора целиком, и лимиты."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.data = build_price_pdf(pages=7, rows_per_page=5)
+
+    def test_pool_matches_whole_document(self):
+        expected = _legacy_parse(self.data)
+        self.assertEqual(len(expected), 35)
+
+        for workers in (1, 2):
+            res = pdf_price.parse_pdf(io.BytesIO(self.data), workers=workers, pages_per_chunk=3)
+            self.assertTrue(res["ok"])
+            self.assertEqual(
+                [(r["row"], r["item_sku"], r["price"]) for r in res["rows"]],
+                [(r["row"], r["item_sku"], r["price"]) for r in expected],
+            )
+
+    def test_pages_stream_in_order(self):
+        pages = pdf_stream.iter_pages(self.data, workers=2, pages_per_chunk=2)
+        page_no, text = next(pages)
+        self.assertEqual(page_no, 0)
+        self.assertIn("SKU-000001", text)
+        self.assertEqual([p for p, _ in pages], list(range(1, 7)))
+
+    def test_default_is_sequential_and_early_close_stops_pool(self):
+        # По умолчанию пул не запускается — веб- и Celery-путь не платят за старт процессов
+        with mock.patch.object(multiprocessing, "Pool") as pool:
+            self.assertEqual(len(list(pdf_stream.iter_pages(self.data, pages_per_chunk=1))), 7)
+        pool.assert_not_called()
+
+        # Закрытый до конца генератор останавливает процессы пула
+        pages = pdf_stream.iter_pages(self.data, workers=2, pages_per_chunk=1)
+        next(pages)
+        pages.close()
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_max_rows_stops_early(self):
+        res = pdf_price.parse_pdf(io.BytesIO(self.data), max_rows=4, workers=2, pages_per_chunk=1)
+        self.assertTrue(res["truncated"])
+        self.assertEqual([r["item_sku"] for r in res["rows"]], [f"SKU-00000{i}" for i in range(1, 5)])
+
+    def test_limits(self):
+        res = pdf_price.parse_pdf(io.BytesIO(self.data), max_pages=5)
+        self.assertFalse(res["ok"])
+        self.assertIn("7", res["errors"][0])
+
+        with self.assertRaises(pdf_stream.PdfLimitError):
+            list(pdf_stream.iter_pages(self.data, workers=2, pages_per_chunk=1, timeout=1e-6))
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command("bench_pdf_import", pages=4, rows_per_page=3, workers=2, pages_per_chunk=1, stdout=out)
+        self.assertIn("4 pages, 12 rows", out.getvalue())
+        self.assertIn("Speedup", out.getvalue())
+
+
+class PdfTableTests(SimpleTestCase):
+    """Таблица PDF по координатам: колонки по x, переносы ячеек, заголовки из словаря Excel-импорта."""
+
+    def test_table_rows_like_excel(self):
+        headers, rows = pdf_table.open_pdf_table(io.BytesIO(_table_pdf()), mapping=PRICE_LIST_HEADERS, workers=1)
+        self.assertEqual(list(headers), ["item_sku", "description", "unit", "price", "lead_time_days"])
+        self.assertEqual(list(rows), [
+            (1, {"item_sku": "A-1", "description": "Bolt galvanized M8 x 40", "unit": "pcs", "price": "1234.50", "lead_time_days": "5"}),
+            (2, {"item_sku": "A-2", "description": "Nut hex, zinc plated", "unit": "pcs", "price": "12.00", "lead_time_days": "3"}),
+            (3, {"item_sku": "B-3", "description": "Washer", "unit": "kg", "price": "0.75", "lead_time_days": "2"}),
+        ])
+
+    def test_wrapped_russian_header(self):
+        table = pdf_table._Table(pdf_table.EXPECTED_HEADERS, "item_sku", {"supplier": "Supp"})
+        page = [
+            _cell(40, 770, "Номенклатура", 60), _cell(120, 770, "Цена"), _cell(200, 770, "Срок поставки", 60),
+            _cell(215, 760, "(дн.)"),
+            _cell(40, 745, "A-1"), _cell(118, 745, "1 200", 25), _cell(205, 745, "14", 10),
+        ]
+        rows = list(table.page(page)) + list(table.finish())
+        self.assertEqual(table.headers, {"item_sku": 0, "price": 1, "lead_days": 2, "supplier": None})
+        self.assertEqual(rows, [(1, {"supplier": "Supp", "item_sku": "A-1", "price": "1200", "lead_days": "14"})])
+
+
+class PdfPriceListUploadTests(APITestCase):
+    """PDF-прайс идёт в тот же потоковый импорт позиций, что и Excel."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media, True)
+
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        Unit.objects.create(code="pcs", name="pcs")
+        Unit.objects.create(code="kg", name="kg")
+        supplier = Supplier.objects.create(name="Supp")
+        self.pl = SupplierPriceList.objects.create(supplier=supplier, name="PL", version="1", effective_date=date.today())
+
+    def test_upload_pdf(self):
+        file = SimpleUploadedFile("price.pdf", _table_pdf(), content_type="application/pdf")
+        res = self.client.post(f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/", {"file": file}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual((res.data["created"], res.data["errors"]), (3, 0))
+        line = SupplierPriceListLine.objects.get(price_list=self.pl, supplier_sku="A-2")
+        self.assertEqual((line.description, line.price, line.lead_time_days), ("Nut hex, zinc plated", Decimal("12.00"), 3))
@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import PurchaseOrder, PurchaseOrderLine, Shipment, ShipmentLine
+from procurement.services import po_delivery
+
+
+class PurchaseOrderDeliveryStatusTests(APITestCase):
+    """Статус заказа по доставкам — одним запросом на пакет заказов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.items = [Item.objects.create(sku=f"S{i}", name=f"I{i}", unit=unit, category=cat) for i in range(30)]
+        self.supplier = Supplier.objects.create(name="Supp")
+
+    def _order(self, number, n_lines=2, status_="sent"):
+        po = PurchaseOrder.objects.create(number=number, supplier=self.supplier, status=status_)
+        lines = [PurchaseOrderLine.objects.create(order=po, item=it, qty="5", price="1") for it in self.items[:n_lines]]
+        return po, lines
+
+    def _ship(self, po, lines, qty="5", status_=Shipment.Status.DELIVERED):
+        sh = Shipment.objects.create(order=po, status=status_)
+        for ol in lines:
+            ShipmentLine.objects.create(shipment=sh, order_line=ol, qty=qty)
+        return sh
+
+    def test_rules_and_changed_report(self):
+        full, full_lines = self._order("T-1")
+        self._ship(full, full_lines)
+
+        partial, partial_lines = self._order("T-2")
+        self._ship(partial, partial_lines[:1])
+
+        moving, moving_lines = self._order("T-3")
+        self._ship(moving, moving_lines, status_=Shipment.Status.IN_TRANSIT)
+
+        orphan, _ = self._order("T-4", status_="delivered")
+        draft, draft_lines = self._order("T-5", status_="draft")
+        self._ship(draft, draft_lines)
+
+        changed = po_delivery.recalc([full.id, partial.id, moving.id, orphan.id, draft.id])
+        self.assertEqual(changed, {
+            full.id: ("sent", "delivered"),
+            moving.id: ("sent", "in_transit"),
+            orphan.id: ("delivered", "sent"),
+        })
+        full.refresh_from_db()
+        self.assertEqual(full.status, "delivered")
+        self.assertEqual(po_delivery.recalc([full.id, partial.id]), {})
+
+    def test_query_count_does_not_grow_with_lines(self):
+        po, lines = self._order("T-1", n_lines=30)
+        self._ship(po, lines)
+        with CaptureQueriesContext(connection) as ctx:
+            po_delivery.evaluate([po.id])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(po_delivery.evaluate([po.id])[po.id], ("sent", "delivered"))
+
+    def test_set_status_updates_order(self):
+        po, lines = self._order("T-1")
+        sh = self._ship(po, lines, status_=Shipment.Status.IN_TRANSIT)
+        res = self.client.post(f"/api/procurement/shipments/{sh.id}/set_status/", {"status": "delivered"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        po.refresh_from_db()
+        self.assertEqual(po.status, "delivered")
+
+    def test_command_dry_run(self):
+        po, lines = self._order("T-1")
+        self._ship(po, lines)
+        out = StringIO()
+        call_command("recalc_po_delivery_status", "--dry-run", stdout=out)
+        self.assertIn(f"PO#{po.id}: sent -> delivered", out.getvalue())
+        po.refresh_from_db()
+        self.assertEqual(po.status, "sent")
+
+        call_command("recalc_po_delivery_status", stdout=StringIO())
+        po.refresh_from_db()
+        self.assertEqual(po.status, "delivered")
@@ -0,0 +1,126 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import (
+    PurchaseOrder, PurchaseOrderLine, PurchaseRequest, PurchaseRequestCoverage, PurchaseRequestLine,
+    Quote, QuoteLine, Shipment, ShipmentLine,
+)
+
+
+class PurchaseRequestCoverageTests(APITestCase):
+    """Журнал обеспечения заявки и правила, которые на нём построены."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        self.cat = Category.objects.create(code="C", name="Cat")
+        self.item = Item.objects.create(sku="A", name="A", unit=self.unit, category=self.cat)
+        self.other = Item.objects.create(sku="B", name="B", unit=self.unit, category=self.cat)
+        self.supplier = Supplier.objects.create(name="Supp")
+
+        self.pr = PurchaseRequest.objects.create(status="draft")
+        self.pr_line = PurchaseRequestLine.objects.create(
+            request=self.pr, item=self.item, qty="10", unit=self.unit, status="pending", priority="normal",
+        )
+
+    def _cov(self, item=None):
+        return PurchaseRequestCoverage.objects.get(purchase_request=self.pr, item=item or self.item)
+
+    def _order(self, number, qty, status_="draft"):
+        po = PurchaseOrder.objects.create(
+            number=number, supplier=self.supplier, purchase_request=self.pr, status=status_,
+        )
+        PurchaseOrderLine.objects.create(order=po, item=self.item, qty=qty, price="1")
+        return po
+
+    def _set_status(self, po, new_status):
+        return self.client.patch(f"/api/procurement/purchase-orders/{po.id}/", {"status": new_status}, format="json")
+
+    def test_ledger_follows_request_orders_and_shipments(self):
+        self.assertEqual(self._cov().required_qty, Decimal("10"))
+
+        self.pr_line.qty = Decimal("12")
+        self.pr_line.save()
+        self.assertEqual(self._cov().required_qty, Decimal("12"))
+
+        po = self._order("T-1", "5")
+        self.assertEqual(self._cov().ordered_qty, Decimal("0"))   # черновик не считается
+
+        self.assertEqual(self._set_status(po, "sent").status_code, status.HTTP_200_OK)
+        self.assertEqual((self._cov().ordered_qty, self._cov().confirmed_qty), (Decimal("5"), Decimal("0")))
+
+        self._set_status(po, "confirmed")
+        self.assertEqual(self._cov().confirmed_qty, Decimal("5"))
+
+        sh = Shipment.objects.create(order=po)
+        ShipmentLine.objects.create(shipment=sh, order_line=po.lines.get(), qty="3")
+        self.assertEqual(self._cov().delivered_qty, Decimal("0"))
+        sh.status = Shipment.Status.DELIVERED
+        sh.save()
+        self.assertEqual(self._cov().delivered_qty, Decimal("3"))
+
+        sh.delete()
+        self.assertEqual(self._cov().delivered_qty, Decimal("0"))
+
+        # позиция пропала из заявки — строка журнала остаётся, пока её держат заказы
+        self.pr_line.delete()
+        self.assertEqual(self._cov().required_qty, Decimal("0"))
+
+    def test_status_rules_and_overorder_use_ledger(self):
+        first = self._order("T-1", "6")
+        second = self._order("T-2", "4")
+        extra = self._order("T-3", "1")
+
+        self._set_status(first, "sent")
+        self.pr.refresh_from_db()
+        self.assertEqual(self.pr.status, "draft")
+
+        self._set_status(second, "sent")
+        self.pr.refresh_from_db()
+        self.assertEqual(self.pr.status, "open")
+
+        res = self._set_status(extra, "sent")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Перезаказ", str(res.json()))
+
+        # sent -> confirmed: собственные строки заказа не считаются перезаказом
+        self.assertEqual(self._set_status(first, "confirmed").status_code, status.HTTP_200_OK)
+        self.assertEqual(self._set_status(second, "confirmed").status_code, status.HTTP_200_OK)
+        self.pr.refresh_from_db()
+        self.assertEqual(self.pr.status, "closed")
+
+    def test_create_po_orders_remaining_qty(self):
+        self._set_status(self._order("T-1", "7"), "sent")
+        quote = Quote.objects.create(supplier=self.supplier, purchase_request=self.pr)
+        QuoteLine.objects.create(quote=quote, item=self.item, price="2")
+        QuoteLine.objects.create(quote=quote, item=self.other, price="2")
+
+        res = self.client.post(f"/api/procurement/quotes/{quote.id}/create_po/", {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        po = PurchaseOrder.objects.get(number=f"PO-{quote.id}")
+        self.assertEqual([(ln.item_id, ln.qty) for ln in po.lines.all()], [(self.item.id, Decimal("3"))])
+
+    def test_check_command_reports_and_fixes(self):
+        out = StringIO()
+        call_command("check_pr_coverage", stdout=out)
+        self.assertIn("consistent", out.getvalue())
+
+        PurchaseRequestCoverage.objects.filter(purchase_request=self.pr).update(required_qty=1)
+        out = StringIO()
+        call_command("check_pr_coverage", stdout=out)
+        self.assertIn(f"PR#{self.pr.id} item={self.item.id}: required_qty 1.00 -> 10", out.getvalue())
+
+        call_command("check_pr_coverage", "--fix", stdout=StringIO())
+        self.assertEqual(self._cov().required_qty, Decimal("10"))
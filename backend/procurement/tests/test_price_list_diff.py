@@ -0,0 +1,166 @@
+import io
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import ItemSupplierMapping, SupplierPriceList, SupplierPriceListLine
+from procurement.services import price_list_diff
+
+
+def _xlsx(rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return SimpleUploadedFile(
+        "price.xlsx",
+        buf.getvalue(),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+HEADER = ["item_sku", "description", "unit", "price", "min_quantity", "lead_time_days"]
+
+
+class PriceListDiffTests(APITestCase):
+    """Разница версий прайса по артикулу; применяется только она, сопоставления переносятся."""
+
+    def setUp(self):
+        # Загрузки сохраняются в хранилище документов — во временный MEDIA_ROOT
+        self.media = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media, True)
+
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.items = [Item.objects.create(sku=f"I{i}", name=f"I{i}", unit=self.unit, category=cat) for i in range(3)]
+        self.supplier = Supplier.objects.create(name="Supp")
+        self.v1 = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="1", effective_date=date.today() - timedelta(days=10),
+        )
+        self.lines = {}
+        for i, sku in enumerate(("A", "B", "C")):
+            self.lines[sku] = SupplierPriceListLine.objects.create(
+                price_list=self.v1, supplier_sku=sku, description=f"Товар {sku}", unit=self.unit,
+                price="10.00", min_quantity="5", lead_time_days=3, min_order_amount="500",
+            )
+            ItemSupplierMapping.objects.create(
+                item=self.items[i], price_list_line=self.lines[sku], conversion_factor="2", is_preferred=True,
+            )
+
+    def _file(self):
+        return _xlsx([
+            HEADER,
+            ["A", "Товар A", "шт", "10.001", 5, 3],   # без изменений (цена округляется до копеек)
+            ["B", "Товар B", "шт", "12.00", 5, 3],    # цена
+            ["C", "Товар C", "шт", "10.00", 10, 7],   # условия
+            ["D", "Товар D", "шт", "1.00", 1, 1],     # новая
+        ])
+
+    def test_diff_only_reports(self):
+        url = f"/api/procurement/supplier-price-lists/{self.v1.id}/diff/"
+        res = self.client.post(url, {"file": self._file()}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(
+            res.data["counts"],
+            {"added": 1, "removed": 0, "price_changed": 1, "terms_changed": 1, "unchanged": 1},
+        )
+        self.assertEqual(res.data["added"], ["D"])
+        self.assertEqual(res.data["price_changed"], [{"supplier_sku": "B", "old": "10.00", "new": "12.00"}])
+        self.assertEqual(
+            res.data["terms_changed"][0]["fields"],
+            {"min_quantity": ["5.0000", "10.0000"], "lead_time_days": [3, 7]},
+        )
+        self.assertFalse(SupplierPriceListLine.objects.filter(supplier_sku="D").exists())
+
+    def test_apply_in_place(self):
+        file = _xlsx([HEADER, ["A", "Товар A", "шт", "10.00", 5, 3], ["B", "Товар B", "шт", "12.00", 5, 3]])
+        url = f"/api/procurement/supplier-price-lists/{self.v1.id}/diff/?apply=1"
+        before = {sku: line.updated_at for sku, line in self.lines.items()}
+        res = self.client.post(url, {"file": file}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(res.data["applied"], {"created": 0, "updated": 1, "deactivated": 1, "mappings_copied": 0})
+
+        lines = {ln.supplier_sku: ln for ln in SupplierPriceListLine.objects.filter(price_list=self.v1)}
+        self.assertEqual(lines["B"].price, Decimal("12.00"))
+        self.assertEqual(lines["B"].min_order_amount, Decimal("500"))   # нет в файле — не трогаем
+        self.assertEqual(lines["A"].updated_at, before["A"])             # без изменений — не пишем
+        self.assertFalse(lines["C"].is_available)
+
+    def test_new_version_carries_mappings(self):
+        v2 = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="2", effective_date=date.today(),
+        )
+        url = f"/api/procurement/supplier-price-lists/{v2.id}/diff/?apply=1"
+        with self.assertNumQueries(23):  # не зависит от числа позиций и сопоставлений
+            res = self.client.post(url, {"file": self._file()}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(res.data["base_price_list_id"], self.v1.id)
+        self.assertEqual(res.data["applied"]["created"], 4)
+        self.assertEqual(res.data["applied"]["mappings_copied"], 3)
+
+        new_lines = {ln.supplier_sku: ln for ln in SupplierPriceListLine.objects.filter(price_list=v2)}
+        self.assertEqual(new_lines["B"].price, Decimal("12.00"))
+        self.assertEqual(new_lines["A"].min_order_amount, Decimal("500"))  # перенесено из базы
+        m = ItemSupplierMapping.objects.get(price_list_line=new_lines["C"])
+        self.assertEqual((m.item_id, m.conversion_factor, m.is_preferred), (self.items[2].id, Decimal("2"), True))
+        self.assertFalse(ItemSupplierMapping.objects.filter(price_list_line=new_lines["D"]).exists())
+
+        self.v1.refresh_from_db()
+        self.assertFalse(self.v1.is_active)
+        self.assertEqual(price_list_diff.current_list(self.supplier.id), v2)
+
+        res = self.client.get(f"/api/procurement/supplier-price-lists/{v2.id}/compare/?base={self.v1.id}")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["counts"]["added"], 1)
+        self.assertEqual(res.data["counts"]["price_changed"], 1)
+
+    def test_apply_in_place_against_other_base(self):
+        # Непустой прайс с явной базой: отчёт — относительно базы, запись — на месте, без дублей артикулов
+        v2 = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="2", effective_date=date.today(),
+        )
+        SupplierPriceListLine.objects.create(
+            price_list=v2, supplier_sku="A", description="Товар A", unit=self.unit, price="11.00", min_quantity="5",
+            lead_time_days=3,
+        )
+        url = f"/api/procurement/supplier-price-lists/{v2.id}/diff/?apply=1&base={self.v1.id}"
+        res = self.client.post(url, {"file": self._file()}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(res.data["base_price_list_id"], self.v1.id)
+        self.assertEqual(res.data["counts"]["added"], 1)
+        self.assertEqual(res.data["applied"], {"created": 3, "updated": 1, "deactivated": 0, "mappings_copied": 0})
+
+        prices = dict(SupplierPriceListLine.objects.filter(price_list=v2).values_list("supplier_sku", "price"))
+        self.assertEqual(prices, {"A": Decimal("10.00"), "B": Decimal("12.00"), "C": Decimal("10.00"), "D": Decimal("1.00")})
+        self.v1.refresh_from_db()
+        self.assertTrue(self.v1.is_active)
+
+    def test_diff_snapshots(self):
+        old = {"X": {"price": Decimal("1"), "vat_rate": Decimal("20")}, "Y": {"price": Decimal("2")}}
+        new = {"X": {"price": Decimal("1.00"), "vat_rate": Decimal("10")}, "Z": {"price": Decimal("3")}}
+        out = price_list_diff.diff(old, new)
+        self.assertEqual(out["added"], ["Z"])
+        self.assertEqual(out["removed"], ["Y"])
+        self.assertEqual(out["price_changed"], [])
+        self.assertEqual(out["terms_changed"], [{"supplier_sku": "X", "fields": {"vat_rate": ["20.00", "10.00"]}}])
@@ -0,0 +1,126 @@
+import io
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from suppliers.models import Supplier
+from procurement.importers.price_list_excel import import_price_list_rows
+from procurement.models import SupplierPriceList, SupplierPriceListLine
+
+
+def _xlsx(rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return SimpleUploadedFile(
+        "price.xlsx",
+        buf.getvalue(),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+class SupplierPriceListUploadTests(APITestCase):
+    """Потоковая загрузка прайс-листа: upsert пачками, единицы из справочника."""
+
+    def setUp(self):
+        # Загрузки сохраняются в хранилище документов — во временный MEDIA_ROOT
+        self.media = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media, True)
+
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        Unit.objects.create(code="kg", name="кг")
+        self.supplier = Supplier.objects.create(name="Supp")
+        self.pl = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="1", effective_date=date.today(),
+        )
+        self.url = f"/api/procurement/supplier-price-lists/{self.pl.id}/upload/"
+
+    def _rows(self, n, price="10.50"):
+        rows = [["item_sku", "description", "unit", "price", "min_quantity", "lead_time_days"]]
+        for i in range(n):
+            rows.append([f"SKU-{i}", f"Товар {i}", "шт" if i % 2 else "кг", price, 5, 3])
+        return rows
+
+    def test_upload_creates_lines_and_reports_errors(self):
+        rows = self._rows(5)
+        rows.append(["BAD-PRICE", "x", "шт", "abc"])
+        rows.append(["BAD-UNIT", "x", "ведро", "1.00"])
+        rows.append([None, "пустая строка", "шт", "1.00"])
+
+        res = self.client.post(self.url, {"file": _xlsx(rows)}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.json()
+        self.assertFalse(data["preview"])
+        self.assertEqual(data["created"], 5)
+        self.assertEqual(data["errors"], 2)
+        self.assertEqual(len(data["rows"]), 7)
+        self.assertEqual(len(data["errors_detail"]), 2)
+
+        bad_unit = next(r for r in data["rows"] if r["supplier_sku"] == "BAD-UNIT")
+        self.assertFalse(bad_unit["valid"])
+        self.assertIn("unit", bad_unit["errors"])
+
+        line = SupplierPriceListLine.objects.get(price_list=self.pl, supplier_sku="SKU-1")
+        self.assertEqual(line.unit, self.unit)
+        self.assertEqual(line.price, Decimal("10.50"))
+        self.assertEqual(line.min_quantity, Decimal("5"))
+        self.assertEqual(line.lead_time_days, 3)
+
+    def test_preview_does_not_write(self):
+        res = self.client.post(self.url + "?preview=1", {"file": _xlsx(self._rows(3))}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.json()["preview"])
+        self.assertEqual(res.json()["created"], 0)
+        self.assertFalse(SupplierPriceListLine.objects.exists())
+
+    def test_reupload_updates_existing_lines(self):
+        self.client.post(self.url, {"file": _xlsx(self._rows(4))}, format="multipart")
+        res = self.client.post(self.url, {"file": _xlsx(self._rows(6, price="11.00"))}, format="multipart")
+        data = res.json()
+        self.assertEqual(data["created"], 2)
+        self.assertEqual(data["updated"], 4)
+        self.assertEqual(SupplierPriceListLine.objects.filter(price_list=self.pl).count(), 6)
+        self.assertEqual(
+            SupplierPriceListLine.objects.get(price_list=self.pl, supplier_sku="SKU-0").price,
+            Decimal("11.00"),
+        )
+
+    def test_duplicate_sku_counted_within_and_across_chunks(self):
+        rows = [
+            (2, {"item_sku": "DUP", "unit": "шт", "price": "1.00"}),
+            (3, {"item_sku": "ONE", "unit": "шт", "price": "2.00"}),
+            (4, {"item_sku": "DUP", "unit": "шт", "price": "3.00"}),
+            (5, {"item_sku": "DUP", "unit": "шт", "price": "4.00"}),
+        ]
+        # Одна пачка (повторы внутри) и пачки по две строки (повтор через границу) — одинаковый счёт
+        for chunk_size in (100, 2):
+            SupplierPriceListLine.objects.filter(price_list=self.pl).delete()
+            res = import_price_list_rows(self.pl, rows, chunk_size=chunk_size)
+            self.assertEqual((res["created"], res["updated"], res["errors"]), (2, 2, 0), chunk_size)
+            self.assertEqual(
+                SupplierPriceListLine.objects.get(price_list=self.pl, supplier_sku="DUP").price, Decimal("4.00"),
+            )
+
+    def test_missing_required_columns(self):
+        res = self.client.post(self.url, {"file": _xlsx([["sku", "cost"], ["A", 1]])}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
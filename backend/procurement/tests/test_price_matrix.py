@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import (
+    ItemSupplierMapping, PurchaseRequest, PurchaseRequestLine, SupplierPriceList, SupplierPriceListLine,
+)
+from procurement.services import price_matrix
+
+URL = "/api/procurement/item-supplier-mappings/matrix/"
+
+
+class PriceMatrixTests(APITestCase):
+    """Все предложения по позициям заявки — одним запросом, цена и флаги — в БД."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.items = [Item.objects.create(sku=f"S{i}", name=f"I{i}", unit=self.unit, category=cat) for i in range(3)]
+        self.s1 = Supplier.objects.create(name="S1")
+        self.s2 = Supplier.objects.create(name="S2")
+        today = date.today()
+        self.pl1 = SupplierPriceList.objects.create(supplier=self.s1, name="P1", version="1", effective_date=today)
+        self.pl2 = SupplierPriceList.objects.create(supplier=self.s2, name="P2", version="1", effective_date=today)
+        self.expired = SupplierPriceList.objects.create(
+            supplier=self.s2, name="Old", version="0", effective_date=today - timedelta(days=30),
+            expiry_date=today - timedelta(days=1),
+        )
+
+        self.pr = PurchaseRequest.objects.create(status="open")
+        for it, qty in zip(self.items, ("10", "7", "3")):
+            PurchaseRequestLine.objects.create(
+                request=self.pr, item=it, qty=qty, unit=self.unit, status="pending", priority="normal",
+            )
+
+    def _offer(self, price_list, item, sku, factor="1", **line):
+        ppl = SupplierPriceListLine.objects.create(
+            price_list=price_list, supplier_sku=sku, description=sku, unit=self.unit, **line,
+        )
+        return ItemSupplierMapping.objects.create(item=item, price_list_line=ppl, conversion_factor=factor)
+
+    def test_offers_prices_and_flags(self):
+        a = self._offer(self.pl1, self.items[0], "A1", price="100", delivery_cost_fixed="50", min_quantity="5",
+                        delivery_cost_per_unit="2", vat_rate="20")
+        b = self._offer(self.pl2, self.items[0], "B1", factor="0.5", price="90", vat_included=True,
+                        quantity_step="2", min_order_amount="1000")
+        c = self._offer(self.pl1, self.items[1], "A2", price="10", min_quantity="8")
+        self._offer(self.expired, self.items[1], "OLD", price="1")
+
+        data = price_matrix.compute(pr_id=self.pr.id)
+        by_item = {row["item_id"]: row["offers"] for row in data["items"]}
+        self.assertEqual(by_item[self.items[2].id], [])
+        self.assertEqual([o["mapping_id"] for o in by_item[self.items[1].id]], [c.id])
+
+        offers = {o["mapping_id"]: o for o in by_item[self.items[0].id]}
+        self.assertEqual([o["mapping_id"] for o in by_item[self.items[0].id]], [b.id, a.id])  # по эффективной цене
+        for m in (a, b):
+            expected = SupplierPriceListLine.objects.get(pk=m.price_list_line_id).effective_price.quantize(Decimal("0.01"))
+            self.assertEqual(Decimal(offers[m.id]["effective_price"]), expected)
+
+        self.assertEqual(offers[a.id]["total"], "1344.00")   # (100 + 50/5 + 2) * 1.2 * 10
+        self.assertFalse(offers[a.id]["below_moq"])
+        self.assertEqual(offers[b.id]["supplier_qty"], "5.0000")  # 10 * 0.5
+        self.assertTrue(offers[b.id]["step_mismatch"])            # 5 не кратно 2
+        self.assertTrue(offers[b.id]["below_min_amount"])         # 450 < 1000
+        self.assertTrue(by_item[self.items[1].id][0]["below_moq"])  # 7 < 8
+
+    def test_single_offers_query_and_cache(self):
+        for i, it in enumerate(self.items):
+            self._offer(self.pl1, it, f"A{i}", price="10")
+            self._offer(self.pl2, it, f"B{i}", price="11")
+
+        with CaptureQueriesContext(connection) as ctx:
+            price_matrix.compute(pr_id=self.pr.id)
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        res = self.client.get(URL, {"pr": self.pr.id})
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(URL, {"pr": self.pr.id}).json()
+        self.assertFalse([q for q in ctx.captured_queries if "procurement_itemsuppliermapping" in q["sql"]])
+        self.assertEqual(again, res.json())
+
+        # новая цена в прайсе — версия прайсов меняется
+        line = SupplierPriceListLine.objects.get(supplier_sku="A0")
+        line.price = Decimal("1")
+        line.save()
+        fresh = self.client.get(URL, {"pr": self.pr.id}).json()
+        self.assertEqual(fresh["items"][0]["offers"][0]["price"], "1.00")
+
+        by_items = self.client.get(URL, {"items": f"{self.items[0].id},{self.items[1].id}"}).json()
+        self.assertEqual(len(by_items["items"]), 2)
+        self.assertNotIn("total", by_items["items"][0]["offers"][0])
+        self.assertEqual(self.client.get(URL).status_code, 400)
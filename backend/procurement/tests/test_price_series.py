@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import PriceRecord
+from procurement.services import price_series
+
+URL = "/api/procurement/pricerecords/series/"
+
+
+class PriceSeriesTests(APITestCase):
+    """Агрегаты истории цен по корзинам — в SQL, с кэшем по отпечатку запроса."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+        unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.item = Item.objects.create(sku="A", name="A", unit=unit, category=cat)
+        self.other = Item.objects.create(sku="B", name="B", unit=unit, category=cat)
+        self.s1 = Supplier.objects.create(name="S1")
+        self.s2 = Supplier.objects.create(name="S2")
+
+        # Понедельник, 12:00 по местному времени
+        self.monday = timezone.make_aware(datetime(2026, 3, 2, 12, 0))
+
+    def _rec(self, supplier, price, when, item=None):
+        rec = PriceRecord.objects.create(item=item or self.item, supplier=supplier, price=price)
+        PriceRecord.objects.filter(pk=rec.pk).update(dt=when)
+        return rec
+
+    def _get(self, **params):
+        res = self.client.get(URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        return res.json()
+
+    def test_buckets_and_aggregates(self):
+        self._rec(self.s1, "10", self.monday)
+        self._rec(self.s1, "14", self.monday + timedelta(days=2))
+        self._rec(self.s1, "12", self.monday + timedelta(days=4))
+        self._rec(self.s1, "20", self.monday + timedelta(days=7))
+        self._rec(self.s2, "99", self.monday)
+        self._rec(self.s1, "1", self.monday, item=self.other)
+
+        data = self._get(item=self.item.id, supplier=self.s1.id, bucket="week")
+        self.assertEqual(len(data["series"]), 1)
+        points = data["series"][0]["points"]
+        self.assertEqual([p["t"] for p in points], ["2026-03-02", "2026-03-09"])
+        self.assertEqual(
+            {k: points[0][k] for k in ("min", "max", "avg", "last", "count")},
+            {"min": "10.00", "max": "14.00", "avg": "12.00", "last": "12.00", "count": 3},
+        )
+        self.assertEqual(points[1]["last"], "20.00")
+
+        # несколько поставщиков — отдельные ряды; фильтр по датам
+        both = self._get(item=f"{self.item.id}", bucket="day", date_to="2026-03-02")
+        self.assertEqual(sorted(s["supplier_id"] for s in both["series"]), [self.s1.id, self.s2.id])
+
+        self.assertEqual(self.client.get(URL, {"bucket": "day"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"item": self.item.id, "bucket": "year"}).status_code, 400)
+
+    def test_cached_until_new_record_for_item(self):
+        self._rec(self.s1, "10", self.monday)
+        with mock.patch.object(price_series, "compute", wraps=price_series.compute) as compute:
+            self._get(item=self.item.id, bucket="month")
+            self._get(item=self.item.id, bucket="month")
+            self.assertEqual(compute.call_count, 1)
+
+            # запись по другой позиции кэш не трогает
+            self._rec(self.s1, "5", self.monday, item=self.other)
+            self._get(item=self.item.id, bucket="month")
+            self.assertEqual(compute.call_count, 1)
+
+            self._rec(self.s1, "30", self.monday + timedelta(days=1))
+            data = self._get(item=self.item.id, bucket="month")
+            self.assertEqual(compute.call_count, 2)
+        self.assertEqual(data["series"][0]["points"][0]["max"], "30.00")
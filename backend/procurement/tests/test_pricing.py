@@ -0,0 +1,148 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from suppliers.models import Supplier
+from procurement.models import SupplierPriceList, SupplierPriceListLine
+from procurement.services import pricing
+
+
+def _dec(rnd, lo, hi, places):
+    scale = 10 ** places
+    return Decimal(rnd.randint(int(lo * scale), int(hi * scale))) / scale
+
+
+class BatchPricingTests(APITestCase):
+    """
+    Пакетный расчёт: правила — на вручную посчитанных случаях; пакетный путь (колонки из одного
+    запроса) совпадает с построчным calculate_total_for_quantity (поля экземпляра модели).
+    """
+
+    SEED = 20260118
+    CASES = 400
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.units = [Unit.objects.create(code="pcs", name="шт"), Unit.objects.create(code="kg", name="кг")]
+        supplier = Supplier.objects.create(name="Supp")
+        self.price_lists = [
+            SupplierPriceList.objects.create(
+                supplier=supplier, name=f"P{cur}", version=cur, currency=cur, effective_date=date.today(),
+            )
+            for cur in ("RUB", "USD")
+        ]
+
+    def _random_lines(self, rnd, n):
+        lines = []
+        for i in range(n):
+            lines.append(SupplierPriceListLine(
+                price_list=rnd.choice(self.price_lists),
+                supplier_sku=f"SKU-{i}",
+                description=f"Line {i}",
+                unit=rnd.choice(self.units),
+                price=_dec(rnd, 0.01, 5000, 2),
+                min_quantity=rnd.choice([Decimal("1"), Decimal("0.5"), _dec(rnd, 0.0001, 100, 4)]),
+                quantity_step=rnd.choice([Decimal("1"), Decimal("0.25"), Decimal("5"), _dec(rnd, 0.0001, 20, 4)]),
+                min_order_amount=rnd.choice([Decimal("0"), _dec(rnd, 0, 100000, 2)]),
+                vat_included=rnd.random() < 0.5,
+                vat_rate=rnd.choice([Decimal("0"), Decimal("10"), Decimal("20"), _dec(rnd, 0, 100, 2)]),
+                delivery_cost_fixed=rnd.choice([Decimal("0"), _dec(rnd, 0, 10000, 2)]),
+                delivery_cost_per_unit=rnd.choice([Decimal("0"), _dec(rnd, 0, 100, 2)]),
+            ))
+        SupplierPriceListLine.objects.bulk_create(lines)
+        return list(SupplierPriceListLine.objects.order_by("id"))
+
+    def _random_qty(self, rnd, line):
+        step = line.quantity_step
+        return rnd.choice([
+            line.min_quantity,                                   # ровно МОК
+            line.min_quantity - Decimal("0.0001"),               # чуть меньше МОК
+            step * rnd.randint(1, 500),                          # кратно шагу
+            step * rnd.randint(1, 500) + Decimal("0.001"),       # не кратно
+            _dec(rnd, 0, 10000, 4),
+        ])
+
+    def test_matches_scalar_methods_on_random_baskets(self):
+        rnd = random.Random(self.SEED)
+        lines = self._random_lines(rnd, 60)
+        pairs = []
+        for _ in range(self.CASES):
+            line = rnd.choice(lines)
+            pairs.append((line.id, self._random_qty(rnd, line)))
+
+        batch = pricing.price_many(pairs)
+
+        by_id = {line.id: line for line in lines}
+        seen = set()
+        for (line_id, qty), got in zip(pairs, batch):
+            expected = by_id[line_id].calculate_total_for_quantity(qty)
+            self.assertEqual(got, expected, f"line={line_id} qty={qty}")
+            seen.add(got.get("error", "ok").split(" ")[0])
+        # все ветки правил действительно проверены
+        self.assertEqual(seen, {"ok", "Минимальный", "Количество", "Минимальная"})
+
+    def test_rules_on_hand_computed_cases(self):
+        # Ожидаемые суммы посчитаны вручную — правила закреплены независимо от реализации
+        cases = [
+            # (поля позиции, количество, сумма или начало текста ошибки)
+            ({"price": "100", "vat_included": True}, "3", Decimal("300")),
+            ({"price": "100", "vat_rate": "20"}, "3", Decimal("360")),                      # 100 * 1.2 * 3
+            ({"price": "100", "vat_included": True, "min_quantity": "5",
+              "delivery_cost_fixed": "50", "delivery_cost_per_unit": "2"}, "5", Decimal("560")),   # (100 + 50/5 + 2) * 5
+            ({"price": "10", "vat_rate": "10", "min_quantity": "4",
+              "delivery_cost_fixed": "20", "delivery_cost_per_unit": "1"}, "4", Decimal("70.4")),  # (10 + 5 + 1) * 1.1 * 4
+            ({"price": "10", "vat_included": True, "min_quantity": "5"}, "4", "Минимальный заказ 5"),
+            ({"price": "10", "vat_included": True, "quantity_step": "2.5"}, "7.5", Decimal("75")),
+            ({"price": "10", "vat_included": True, "quantity_step": "2.5"}, "6", "Количество должно быть кратно 2.5"),
+            ({"price": "10", "vat_included": True, "min_order_amount": "100"}, "9", "Минимальная сумма заказа 100"),
+            ({"price": "10", "vat_included": True, "min_order_amount": "100"}, "10", Decimal("100")),
+        ]
+        for i, (fields, qty, expected) in enumerate(cases):
+            line = SupplierPriceListLine.objects.create(
+                price_list=self.price_lists[0], supplier_sku=f"FIX-{i}", description="x", unit=self.units[0], **fields,
+            )
+            line = SupplierPriceListLine.objects.get(pk=line.pk)
+            qty = Decimal(qty)
+            for got in (pricing.price_many([(line.id, qty)])[0], line.calculate_total_for_quantity(qty)):
+                if isinstance(expected, Decimal):
+                    self.assertEqual(got, {"valid": True, "total": expected}, (fields, qty))
+                else:
+                    self.assertFalse(got["valid"], (fields, qty))
+                    self.assertTrue(got["error"].startswith(expected), got["error"])
+
+    def test_one_query_for_whole_basket(self):
+        rnd = random.Random(self.SEED)
+        lines = self._random_lines(rnd, 50)
+        pairs = [(line.id, line.min_quantity * 3) for line in lines] * 4 + [(10 ** 9, Decimal("1"))]
+        with CaptureQueriesContext(connection) as ctx:
+            result = pricing.price_many(pairs)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(result[-1]["valid"], False)
+
+    def test_endpoint(self):
+        line = SupplierPriceListLine.objects.create(
+            price_list=self.price_lists[0], supplier_sku="A", description="A", unit=self.units[0],
+            price="10", min_quantity="2", quantity_step="2", vat_rate="20",
+        )
+        res = self.client.post("/api/procurement/price-list-lines/price-batch/", {
+            "lines": [
+                {"price_list_line_id": line.id, "quantity": "4"},
+                {"price_list_line_id": line.id, "quantity": "3"},
+            ],
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        first, second = res.json()["results"]
+        self.assertEqual((first["valid"], Decimal(first["total"])), (True, Decimal("48")))
+        self.assertEqual(second["valid"], False)
+        self.assertIn("кратно", second["error"])
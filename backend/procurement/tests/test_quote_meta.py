@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import Quote, QuoteLine, QuoteMeta
+from procurement.services import quote_meta
+
+
+class QuoteMetaTests(APITestCase):
+    """Метаданные КП хранятся в БД, список читает их одним обращением к кэшу."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        self.cat = Category.objects.create(code="C", name="Cat")
+        self.item = Item.objects.create(sku="I1", name="Item", unit=self.unit, category=self.cat)
+        self.supplier = Supplier.objects.create(name="Supp")
+
+        self.quotes = [Quote.objects.create(supplier=self.supplier) for _ in range(5)]
+        for q in self.quotes:
+            QuoteLine.objects.create(quote=q, item=self.item, name="Item", unit=self.unit, price="5.0", lead_days=3)
+        cache.clear()
+
+    def test_patch_persists_across_cache_loss(self):
+        q = self.quotes[0]
+        res = self.client.patch(f"/api/procurement/quotes/{q.id}/", {"status": "accepted", "notes": "ok"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["status"], "accepted")
+
+        meta = QuoteMeta.objects.get(quote=q)
+        self.assertEqual((meta.status, meta.notes), ("accepted", "ok"))
+
+        # другой воркер / перезапуск: кэш пуст, значение берётся из БД
+        cache.clear()
+        res = self.client.get(f"/api/procurement/quotes/{q.id}/")
+        self.assertEqual(res.json()["status"], "accepted")
+        self.assertEqual(res.json()["notes"], "ok")
+
+        # частичное обновление не затирает остальные поля
+        self.client.patch(f"/api/procurement/quotes/{q.id}/", {"status": "rejected"}, format="json")
+        self.assertEqual(quote_meta.get(q.id), {"status": "rejected", "notes": "ok"})
+
+    def test_defaults_without_meta(self):
+        res = self.client.get(f"/api/procurement/quotes/{self.quotes[1].id}/")
+        data = res.json()
+        self.assertEqual(data["status"], "received")
+        self.assertEqual(data["notes"], "")
+        self.assertEqual(data["delivery_days"], 3)
+
+    def test_list_reads_meta_in_one_round_trip(self):
+        quote_meta.update_many([q.id for q in self.quotes[:3]], status="received")
+        quote_meta.update(self.quotes[3].id, status="accepted")
+        cache.clear()
+
+        with mock.patch.object(quote_meta, "get_many", wraps=quote_meta.get_many) as get_many, \
+                mock.patch.object(quote_meta, "get", wraps=quote_meta.get) as get_one:
+            res = self.client.get("/api/procurement/quotes/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(get_one.call_count, 0)
+
+        data = res.json()
+        rows = data.get("results", data) if isinstance(data, dict) else data
+        by_id = {r["id"]: r["status"] for r in rows}
+        self.assertEqual(by_id[self.quotes[3].id], "accepted")
+        self.assertEqual(by_id[self.quotes[4].id], "received")
+
+        # повторное чтение страницы — из кэша, без запроса к QuoteMeta
+        self.assertEqual(quote_meta.get_many(q.id for q in self.quotes)[self.quotes[3].id], {"status": "accepted"})
+        with self.assertNumQueries(0):
+            quote_meta.get_many(q.id for q in self.quotes)
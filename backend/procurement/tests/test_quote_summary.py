@@ -0,0 +1,126 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import PurchaseRequest, PurchaseRequestLine, Quote, QuoteLine, QuoteSummary
+from procurement.services import quote_summary
+
+
+class QuoteSummaryTests(APITestCase):
+    """Итоги КП хранятся в QuoteSummary и пересчитываются точечно."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        self.unit = Unit.objects.create(code="pcs", name="шт")
+        self.cat = Category.objects.create(code="C", name="Cat")
+        self.item_a = Item.objects.create(sku="A", name="A", unit=self.unit, category=self.cat)
+        self.item_b = Item.objects.create(sku="B", name="B", unit=self.unit, category=self.cat)
+        self.supplier = Supplier.objects.create(name="Supp")
+
+        self.pr = PurchaseRequest.objects.create(status="draft")
+        self.pr_line = PurchaseRequestLine.objects.create(
+            request=self.pr, item=self.item_a, qty="10", unit=self.unit, status="pending", priority="normal",
+        )
+        PurchaseRequestLine.objects.create(
+            request=self.pr, item=self.item_b, qty="2", unit=self.unit, status="pending", priority="normal",
+        )
+
+        self.quote = Quote.objects.create(supplier=self.supplier, purchase_request=self.pr)
+        self.line_a = QuoteLine.objects.create(
+            quote=self.quote, item=self.item_a, price="5", currency="USD", lead_days=3,
+        )
+
+    def _summary(self, quote=None):
+        return QuoteSummary.objects.get(quote=quote or self.quote)
+
+    def test_quote_line_changes_update_summary(self):
+        s = self._summary()
+        self.assertEqual((s.total_price, s.line_count, s.max_lead_days, s.currency), (Decimal("50"), 1, 3, "USD"))
+
+        line_b_id = QuoteLine.objects.create(quote=self.quote, item=self.item_b, price="100", lead_days=9).id
+        s = self._summary()
+        self.assertEqual((s.total_price, s.line_count, s.max_lead_days), (Decimal("250"), 2, 9))
+
+        res = self.client.patch(f"/api/procurement/quote-lines/{line_b_id}/", {"price": "50"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._summary().total_price, Decimal("150"))
+
+        res = self.client.patch(f"/api/procurement/quote-lines/{line_b_id}/", {"is_blocked": True}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._summary().blocked_line_count, 1)
+
+        self.client.delete(f"/api/procurement/quote-lines/{line_b_id}/")
+        s = self._summary()
+        self.assertEqual((s.total_price, s.line_count, s.blocked_line_count), (Decimal("50"), 1, 0))
+        self.assertEqual(s.max_lead_days, 3)
+
+    def test_request_line_changes_update_summary(self):
+        self.pr_line.qty = Decimal("4")
+        self.pr_line.save()
+        self.assertEqual(self._summary().total_price, Decimal("20"))
+
+        # сохранение заявки со строками — один пересчёт на все строки
+        payload = {"lines": [
+            {"id": self.pr_line.id, "item": self.item_a.id, "qty": "6", "unit": self.unit.id,
+             "status": "pending", "priority": "normal"},
+            {"item": self.item_a.id, "qty": "1", "unit": self.unit.id, "status": "pending", "priority": "normal"},
+        ]}
+        with mock.patch.object(quote_summary, "refresh", wraps=quote_summary.refresh) as refresh:
+            res = self.client.patch(f"/api/procurement/purchase-requests/{self.pr.id}/", payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(self._summary().total_price, Decimal("35"))
+
+        # заявка удалена — КП отвязано, сумма по ценам строк
+        self.pr.delete()
+        self.assertEqual(self._summary().total_price, Decimal("5"))
+
+    def test_list_ordering_and_total_filter(self):
+        cheap = Quote.objects.create(supplier=self.supplier, purchase_request=self.pr)
+        QuoteLine.objects.create(quote=cheap, item=self.item_a, price="1")
+        pricey = Quote.objects.create(supplier=self.supplier, purchase_request=self.pr)
+        QuoteLine.objects.create(quote=pricey, item=self.item_a, price="30")
+
+        res = self.client.get("/api/procurement/quotes/?ordering=total_price")
+        self.assertEqual([r["id"] for r in res.json()["results"]], [cheap.id, self.quote.id, pricey.id])
+        self.assertEqual(Decimal(str(res.json()["results"][0]["total_price"])), Decimal("10"))
+
+        res = self.client.get("/api/procurement/quotes/?ordering=-total_price&total_min=20")
+        self.assertEqual([r["id"] for r in res.json()["results"]], [pricey.id, self.quote.id])
+
+        self.assertEqual(self.client.get("/api/procurement/quotes/?ordering=nope").status_code, 400)
+        self.assertEqual(self.client.get("/api/procurement/quotes/?total_min=abc").status_code, 400)
+
+    def test_total_keeps_fractional_quantity_precision(self):
+        self.pr_line.qty = Decimal("0.333333")
+        self.pr_line.save()
+        self.assertEqual(self._summary().total_price, Decimal("1.666665"))
+
+        # Граница фильтра — по точной сумме, а не по округлённой до копеек (1.67)
+        ids = lambda q: [r["id"] for r in self.client.get(f"/api/procurement/quotes/?{q}").json()["results"]]
+        self.assertEqual(ids("total_min=1.667"), [])
+        self.assertEqual(ids("total_max=1.666665"), [self.quote.id])
+        res = self.client.get(f"/api/procurement/quotes/{self.quote.id}/")
+        self.assertEqual(Decimal(str(res.json()["total_price"])), Decimal("1.666665"))
+
+    def test_rebuild_command_and_fallback(self):
+        QuoteSummary.objects.all().delete()
+
+        # без итогов сериализатор считает сам
+        res = self.client.get(f"/api/procurement/quotes/{self.quote.id}/")
+        self.assertEqual(Decimal(str(res.json()["total_price"])), Decimal("50"))
+        self.assertEqual(res.json()["currency"], "USD")
+
+        call_command("rebuild_quote_summaries", "--missing-only", stdout=mock.MagicMock())
+        self.assertEqual(self._summary().total_price, Decimal("50"))
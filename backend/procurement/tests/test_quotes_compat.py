@@ -1,4 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
@@ -87,6 +90,51 @@ class QuotesCompatAPITests(APITestCase):
         self.assertEqual(str(ln.qty), "10.00")
         self.assertEqual(str(ln.price), "5.00")
 
+    def _seed_quotes(self, n):
+        """n КП, у каждого своя заявка (проект+этап), две строки и два заказа."""
+        start = Quote.objects.count()
+        for i in range(start, start + n):
+            stage = ProjectStage.objects.create(project=self.project, order=100 + i, name=f"S{i}", status="planned")
+            pr = PurchaseRequest.objects.create(project_stage=stage, status="draft")
+            PurchaseRequestLine.objects.create(
+                request=pr, item=self.item, qty="2", unit=self.unit, status="pending", priority="normal",
+            )
+            PurchaseRequestLine.objects.create(
+                request=pr, item=self.item, qty="3", unit=self.unit, status="pending", priority="normal",
+            )
+            q = Quote.objects.create(supplier=self.supplier, purchase_request=pr)
+            QuoteLine.objects.create(quote=q, item=self.item, name="Item", unit=self.unit, price="4.0", lead_days=i)
+            QuoteLine.objects.create(quote=q, item=self.item, name="Item", unit=None, price="1.0")
+            for suffix in ("a", "b"):
+                PurchaseOrder.objects.create(number=f"PO-{q.id}-{suffix}", quote=q, supplier=self.supplier)
+
+    def _list_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/procurement/quotes/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx), res.json()["results"]
+
+    def test_quotes_list_query_count_is_constant(self):
+        self._seed_quotes(2)
+        small, _ = self._list_queries()
+        self._seed_quotes(20)
+        large, rows = self._list_queries()
+
+        self.assertEqual(len(rows), 23)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 6)
+
+        seeded = rows[0]
+        self.assertEqual(seeded["purchase_order_number"], f"PO-{seeded['id']}-b")
+        self.assertEqual(seeded["project_name"], "P — Project")
+        self.assertEqual(seeded["stage_name"], "S22")
+        # (4 + 1) * (2 + 3)
+        self.assertEqual(Decimal(str(seeded["total_price"])), Decimal("25"))
+        self.assertIsNone(rows[-1]["purchase_order_id"])
+        self.assertEqual(Decimal(str(rows[-1]["total_price"])), Decimal("50"))
+
+
 def test_generate_from_request_creates_quotes_and_lines(self):
     """Generate-from-request не должен падать (500) и должен уметь работать с mapping."""
     from datetime import date
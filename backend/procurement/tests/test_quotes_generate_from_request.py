@@ -1,18 +1,24 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
 from core.models import Unit
 from catalog.models import Category, Item
+from dashboard import changes
 from projects.models import Project, ProjectStage
 from suppliers.models import Supplier
 from procurement.models import (
     PurchaseRequest, PurchaseRequestLine, Quote,
-    SupplierPriceList, SupplierPriceListLine, ItemSupplierMapping,
+    SupplierPriceList, SupplierPriceListLine, ItemSupplierMapping, ItemBestOffer,
 )
+from procurement.services import best_offers
 
 
 class QuotesGenerateFromRequestTests(APITestCase):
@@ -87,3 +93,87 @@ class QuotesGenerateFromRequestTests(APITestCase):
         self.assertEqual(str(ln.price), "5.00")
         self.assertEqual(ln.currency, "RUB")
         self.assertEqual(ln.lead_days, 7)
+
+    def _generate(self, supplier_ids):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(
+                "/api/procurement/quotes/generate-from-request/",
+                {"purchase_request_id": self.pr.id, "supplier_ids": supplier_ids},
+                format="json",
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.json(), len(ctx)
+
+    def test_generate_from_request_query_count_is_constant(self):
+        _, small = self._generate([self.supplier.id])
+
+        suppliers = [self.supplier] + [Supplier.objects.create(name=f"S{i}") for i in range(3)]
+        for i in range(5):
+            item = Item.objects.create(sku=f"X{i}", name=f"X{i}", unit=self.unit, category=self.cat)
+            PurchaseRequestLine.objects.create(
+                request=self.pr, item=item, qty="1", unit=self.unit, status="pending", priority="normal",
+            )
+        # предпочтительное сопоставление побеждает более дешёвое
+        pl = SupplierPriceList.objects.create(
+            supplier=suppliers[1], name="PL", version="1", effective_date=date.today(), is_active=True,
+        )
+        for sku, price, preferred in (("CHEAP", "1.00", False), ("PREF", "9.00", True)):
+            pll = SupplierPriceListLine.objects.create(
+                price_list=pl, supplier_sku=sku, description=sku, unit=self.unit, price=Decimal(price),
+            )
+            ItemSupplierMapping.objects.create(item=self.item, price_list_line=pll, is_preferred=preferred)
+
+        data, large = self._generate([s.id for s in suppliers])
+
+        self.assertEqual(large, small)
+        self.assertEqual(data["quotes_created"], 4)
+        self.assertEqual(len(data["warnings"]), 4 * 6 - 1)
+
+        q = Quote.objects.get(id=next(x["id"] for x in data["quotes"] if x["supplier_id"] == suppliers[1].id))
+        self.assertEqual(q.lines.count(), 6)
+        self.assertEqual(q.lines.get(item=self.item).vendor_sku, "PREF")
+        self.assertEqual(self.client.get(f"/api/procurement/quotes/{q.id}/").json()["status"], "received")
+
+    def test_offers_follow_price_list_dates_after_best_offer_refresh(self):
+        def offer(sku, price, preferred, effective_date):
+            pl = SupplierPriceList.objects.create(
+                supplier=self.supplier, name=sku, version=sku, effective_date=effective_date, is_active=True,
+            )
+            pll = SupplierPriceListLine.objects.create(
+                price_list=pl, supplier_sku=sku, description=sku, unit=self.unit, price=Decimal(price),
+            )
+            ItemSupplierMapping.objects.create(item=self.item, price_list_line=pll, is_preferred=preferred)
+            return pl
+
+        def vendor_sku():
+            data, _ = self._generate([self.supplier.id])
+            return Quote.objects.get(id=data["quotes"][0]["id"]).lines.get().vendor_sku
+
+        tomorrow = date.today() + timedelta(days=1)
+        future = offer("NEW", "9.00", True, tomorrow)
+        old = offer("OLD", "5.00", False, date.today())
+        best_offers.refresh([self.item.id])
+        self.assertEqual(ItemBestOffer.objects.get(item=self.item).preferred_mapping.price_list_line.supplier_sku, "OLD")
+
+        # Прайс вступил в силу после пересчёта ItemBestOffer (update — без сигналов, как смена даты)
+        SupplierPriceList.objects.filter(id=future.id).update(effective_date=date.today())
+        self.assertEqual(vendor_sku(), "NEW")
+
+        # Предпочтительный прайс истёк — берётся оставшееся действующее предложение
+        best_offers.refresh([self.item.id])
+        SupplierPriceList.objects.filter(id=future.id).update(expiry_date=date.today() - timedelta(days=1))
+        self.assertEqual(vendor_sku(), "OLD")
+
+        # Действующих не осталось — строка без сопоставления
+        SupplierPriceList.objects.filter(id=old.id).update(effective_date=tomorrow)
+        self.assertEqual(vendor_sku(), "")
+
+    @override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+    def test_generated_quotes_reach_dashboard(self):
+        # bulk_create не шлёт post_save — дашборд уведомляется явно
+        cache.clear()
+        start = changes.cursor()
+        with self.captureOnCommitCallbacks(execute=True):
+            data, _ = self._generate([self.supplier.id])
+        deltas = changes.since(start, ["quote"])["deltas"]
+        self.assertEqual([(d["op"], d["id"]) for d in deltas], [("added", data["quotes"][0]["id"])])
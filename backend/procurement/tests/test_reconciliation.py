@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.models import (
+    ItemSupplierMapping, PurchaseOrder, PurchaseOrderLine, Shipment, ShipmentLine, SupplierPriceList, SupplierPriceListLine,
+)
+from procurement.services import reconciliation
+from procurement.tests.test_documents import _upload, _xlsx_bytes
+
+
+class InvoiceReconciliationTests(APITestCase):
+    """Сверка счёта с открытыми заказами: распределение FIFO, расхождения, фиксированное число запросов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="u", password="p")
+        self.client.force_authenticate(user=self.user)
+
+        unit = Unit.objects.create(code="pcs", name="шт")
+        cat = Category.objects.create(code="C", name="Cat")
+        self.items = [Item.objects.create(sku=f"S{i}", name=f"I{i}", unit=unit, category=cat) for i in range(4)]
+        self.supplier = Supplier.objects.create(name="Supp")
+        other = Supplier.objects.create(name="Other")
+        pl = SupplierPriceList.objects.create(supplier=self.supplier, name="PL", version="1", effective_date=date.today())
+        ppl = SupplierPriceListLine.objects.create(
+            price_list=pl, supplier_sku="V-0", description="V-0", unit=unit, price="100",
+        )
+        ItemSupplierMapping.objects.create(item=self.items[0], price_list_line=ppl)
+
+        self.po1 = PurchaseOrder.objects.create(number="R-1", supplier=self.supplier, status="sent")
+        self.po2 = PurchaseOrder.objects.create(number="R-2", supplier=self.supplier, status="confirmed")
+        closed = PurchaseOrder.objects.create(number="R-3", supplier=self.supplier, status="closed")
+        foreign = PurchaseOrder.objects.create(number="R-4", supplier=other, status="sent")
+        self.l1 = PurchaseOrderLine.objects.create(order=self.po1, item=self.items[0], qty="10", price="100")
+        self.l2 = PurchaseOrderLine.objects.create(order=self.po2, item=self.items[0], qty="10", price="110")
+        self.l3 = PurchaseOrderLine.objects.create(order=self.po1, item=self.items[1], qty="5", price="20")
+        self.l4 = PurchaseOrderLine.objects.create(order=self.po1, item=self.items[3], qty="2", price="7")
+        PurchaseOrderLine.objects.create(order=closed, item=self.items[2], qty="5", price="1")
+        PurchaseOrderLine.objects.create(order=foreign, item=self.items[2], qty="5", price="1")
+
+        # Из первой строки 4 уже в доставке; отменённая доставка не считается
+        sh = Shipment.objects.create(order=self.po1, status=Shipment.Status.IN_TRANSIT)
+        ShipmentLine.objects.create(shipment=sh, order_line=self.l1, qty="4")
+        cancelled = Shipment.objects.create(order=self.po1, status=Shipment.Status.CANCELLED)
+        ShipmentLine.objects.create(shipment=cancelled, order_line=self.l3, qty="5")
+
+    def test_allocation_and_variances(self):
+        rows = [
+            {"row": 2, "item_sku": "V-0", "qty": "9", "price": "100.00"},
+            {"row": 3, "item_sku": "S1", "qty": 6, "price": 25},
+            {"row": 4, "item_sku": "S2", "qty": 1, "price": 1},
+            {"row": 5, "item_sku": "NOPE", "qty": 1, "price": 1},
+        ]
+        res = reconciliation.reconcile(rows, supplier_id=self.supplier.id)
+
+        first, second = res["lines"]
+        # 6 открыто по R-1 (10 - 4 в доставке), остальные 3 — по R-2
+        self.assertEqual(
+            [(a["order_line_id"], a["qty"]) for a in first["allocations"]],
+            [(self.l1.id, Decimal("6")), (self.l2.id, Decimal("3"))],
+        )
+        self.assertEqual(first["qty_variance"], Decimal("0"))
+        self.assertEqual(first["po_price"], Decimal("103.33"))
+        self.assertEqual([a["price_issue"] for a in first["allocations"]], [False, True])
+        self.assertEqual(first["issues"], ["price"])
+
+        self.assertEqual(second["allocated_qty"], Decimal("5"))
+        self.assertEqual((second["qty_variance"], second["price_variance"]), (Decimal("1"), Decimal("5.00")))
+        self.assertEqual(second["issues"], ["qty", "price"])
+
+        self.assertEqual(
+            [(u["row"], u["reason"]) for u in res["unmatched"]], [(4, "no_open_order"), (5, "unknown_sku")],
+        )
+        self.assertEqual(res["shipments"], [
+            {"order_id": self.po1.id, "order_number": "R-1",
+             "lines": [{"order_line_id": self.l1.id, "qty": Decimal("6")}, {"order_line_id": self.l3.id, "qty": Decimal("5")}]},
+            {"order_id": self.po2.id, "order_number": "R-2",
+             "lines": [{"order_line_id": self.l2.id, "qty": Decimal("3")}]},
+        ])
+        self.assertEqual(res["not_invoiced"], [])
+        self.assertEqual(res["totals"]["invoice_amount"], Decimal("1052.00"))
+
+    def test_po_number_limits_to_order(self):
+        res = reconciliation.reconcile([{"row": 1, "item_sku": "S0", "qty": 20, "price": 100}], po_number="R-1")
+        self.assertEqual(res["supplier_id"], self.supplier.id)
+        (line,) = res["lines"]
+        self.assertEqual((line["allocated_qty"], line["qty_variance"]), (Decimal("6"), Decimal("14")))
+        self.assertEqual(
+            res["not_invoiced"],
+            [{"order_line_id": self.l3.id, "item_id": self.items[1].id, "open_qty": Decimal("5")},
+             {"order_line_id": self.l4.id, "item_id": self.items[3].id, "open_qty": Decimal("2")}],
+        )
+
+        with self.assertRaises(reconciliation.ReconciliationError):
+            reconciliation.reconcile([], po_number="NOPE")
+
+    def test_large_invoice_query_count(self):
+        rows = [{"row": i, "item_sku": f"S{i % 4}", "qty": 1, "price": 1} for i in range(3000)]
+        reconciliation.reconcile(rows[:1], supplier_id=self.supplier.id)
+        # Поставщик, артикулы вне прогретого индекса (сопоставления и Item.sku — по запросу на пачку),
+        # открытые строки заказов
+        with self.assertNumQueries(4):
+            res = reconciliation.reconcile(rows, supplier_id=self.supplier.id)
+        self.assertEqual(res["totals"]["rows"], 3000)
+
+    def test_endpoint(self):
+        url = "/api/procurement/import/invoice-reconcile/"
+        res = self.client.post(
+            url, {"rows": [{"row": 1, "item_sku": "S3", "qty": 2, "price": 7}], "po_number": "R-1"}, format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(res.data["totals"]["with_issues"], 0)
+        self.assertEqual(res.data["shipments"][0]["lines"], [{"order_line_id": self.l4.id, "qty": Decimal("2")}])
+
+        res = self.client.post(url, {"rows": []}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invoice_preview_with_reconciliation(self):
+        media = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, media, True)
+
+        data = _xlsx_bytes([["item_sku", "price", "Количество"], ["V-0", 100, 4], ["NOPE", 1, 1]])
+        res = self.client.post(
+            "/api/procurement/import/invoice-preview/",
+            {"file": _upload(data, "invoice.xlsx"), "supplier_id": self.supplier.id},
+            format="multipart",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(res.data["rows"][0]["qty"], 4)
+        rec = res.data["reconciliation"]
+        self.assertEqual([(m["row"], m["allocated_qty"]) for m in rec["lines"]], [(2, Decimal("4"))])
+        self.assertEqual([u["row"] for u in rec["unmatched"]], [3])
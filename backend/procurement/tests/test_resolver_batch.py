@@ -0,0 +1,186 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.importers._resolver import (
+    create_or_update_price_records_from_import,
+    resolve_item_id_by_supplier_context,
+    resolve_many,
+)
+from procurement.models import ItemSupplierMapping, PriceRecord, SupplierPriceList, SupplierPriceListLine
+from procurement.services import resolution_index
+from procurement.services.supplier_map import find_item_id_by_map
+
+
+class ResolveManyTests(TestCase):
+    """Пакетный resolver: те же результаты, что у построчного, за фиксированное число запросов."""
+
+    def setUp(self):
+        self.unit = Unit.objects.create(code="PCS", name="шт")
+        self.cat = Category.objects.create(code="C1", name="Leaf")
+        self.item_a = Item.objects.create(sku="KR-001", name="Кирпич", unit=self.unit, category=self.cat)
+        self.item_b = Item.objects.create(sku="CEM-500", name="Цемент", unit=self.unit, category=self.cat)
+        self.item_c = Item.objects.create(sku="XX-LONG-777", name="Прочее", unit=self.unit, category=self.cat)
+
+        self.supplier = Supplier.objects.create(name="ООО Поставщик")
+        self.pl = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL", version="1", effective_date=date.today(),
+        )
+        line = SupplierPriceListLine.objects.create(
+            price_list=self.pl, supplier_sku="SUP-1", description="x", unit=self.unit, price=Decimal("5"),
+        )
+        ItemSupplierMapping.objects.create(item=self.item_b, price_list_line=line, is_preferred=True)
+
+    def test_results_match_single_resolver(self):
+        pairs = [
+            ("ООО Поставщик", "SUP-1"),       # mapping -> item_b, 1.0
+            ("ООО Поставщик", "KR-001"),      # exact sku -> item_a, 1.0
+            ("Неизвестный", "SUP-1"),         # другой поставщик: маппинг не применяется
+            ("ООО Поставщик", "long"),        # вхождение в артикул -> item_c, confidence из сходства
+            ("ООО Поставщик", "NOPE"),        # ничего
+            ("", "KR-001"),                   # без поставщика — как у одиночной функции
+            ("ООО Поставщик", "SUP-1"),       # дубль сохраняет позицию
+        ]
+        batch = resolve_many(pairs)
+
+        self.assertEqual(batch[0], (self.item_b.id, 1.0))
+        self.assertEqual(batch[1], (self.item_a.id, 1.0))
+        self.assertEqual(batch[2], (None, 0.0))
+        self.assertEqual(batch[3][0], self.item_c.id)
+        self.assertTrue(0.4 < batch[3][1] < 0.8)
+        self.assertEqual(batch[4], (None, 0.0))
+        self.assertEqual(batch[5], (None, 0.0))
+        self.assertEqual(batch[6], batch[0])
+
+        for pair, res in zip(pairs, batch):
+            self.assertEqual(resolve_item_id_by_supplier_context(*pair), res)
+
+    def _cold(self):
+        cache.clear()
+        resolution_index.clear_local()
+
+    def test_query_count_does_not_grow_with_rows(self):
+        small = [("ООО Поставщик", f"MISS-{i}") for i in range(5)]
+        large = [("ООО Поставщик", f"MISS-{i}") for i in range(150)] + [("ООО Поставщик", "SUP-1")] * 50
+
+        self._cold()
+        with CaptureQueriesContext(connection) as q_small:
+            resolve_many(small)
+        self._cold()
+        with CaptureQueriesContext(connection) as q_large:
+            resolve_many(large)
+
+        self.assertEqual(len(q_small), len(q_large))
+        self.assertLessEqual(len(q_large), 4)
+
+    def test_index_serves_repeat_lookups_without_queries(self):
+        self._cold()
+        resolution_index.reset_stats()
+        pairs = [("ООО Поставщик", "SUP-1"), ("ООО Поставщик", "kr-001 ")]
+        first = resolve_many(pairs)
+        self.assertEqual(first, [(self.item_b.id, 1.0), (self.item_a.id, 1.0)])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_many(pairs), first)
+            self.assertEqual(find_item_id_by_map(self.supplier.id, " sup-1"), self.item_b.id)
+
+        st = resolution_index.stats()
+        self.assertGreater(st["local_hits"], 0)
+        self.assertGreater(st["misses"], 0)
+
+        # общий кэш переживает очистку памяти процесса
+        resolution_index.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_many(pairs), first)
+        self.assertGreater(resolution_index.stats()["cache_hits"], 0)
+
+    def test_index_invalidated_by_signals(self):
+        self._cold()
+        self.assertEqual(resolve_many([("ООО Поставщик", "SUP-2")]), [(None, 0.0)])
+        self.assertEqual(resolve_item_id_by_supplier_context("ООО Поставщик", "NEW-1"), (None, 0.0))
+
+        # новое сопоставление
+        line = SupplierPriceListLine.objects.create(
+            price_list=self.pl, supplier_sku="SUP-2", description="x", unit=self.unit, price=Decimal("3"),
+        )
+        mapping = ItemSupplierMapping.objects.create(item=self.item_a, price_list_line=line)
+        self.assertEqual(resolve_many([("ООО Поставщик", "SUP-2")]), [(self.item_a.id, 1.0)])
+
+        # более дешёвая позиция для того же артикула меняет выбор
+        line.price = Decimal("1")
+        line.save()
+        other_pl = SupplierPriceList.objects.create(
+            supplier=self.supplier, name="PL2", version="2", effective_date=date.today(),
+        )
+        cheaper = SupplierPriceListLine.objects.create(
+            price_list=other_pl, supplier_sku="SUP-2", description="x", unit=self.unit, price=Decimal("0.5"),
+        )
+        ItemSupplierMapping.objects.create(item=self.item_c, price_list_line=cheaper)
+        self.assertEqual(resolve_many([("ООО Поставщик", "SUP-2")]), [(self.item_c.id, 1.0)])
+
+        # удаление сопоставления
+        ItemSupplierMapping.objects.filter(item=self.item_c).delete()
+        mapping.delete()
+        self.assertEqual(resolve_many([("ООО Поставщик", "SUP-2")]), [(None, 0.0)])
+
+        # новый Item
+        Item.objects.create(sku="NEW-1", name="Новый", unit=self.unit, category=self.cat)
+        self.assertEqual(resolve_item_id_by_supplier_context("ООО Поставщик", "NEW-1")[1], 1.0)
+
+    def test_index_ignores_changes_outside_mapping(self):
+        version = lambda: cache.get(f"{resolution_index.KEY_PREFIX}ver:sup:{self.supplier.id}")
+        resolve_many([("ООО Поставщик", "SUP-1")])
+        before = version()
+        line = SupplierPriceListLine.objects.get(supplier_sku="SUP-1")
+        mapping = ItemSupplierMapping.objects.get(price_list_line=line)
+
+        # Цена однозначного артикула, описание позиции, примечания сопоставления — отображение то же
+        line.price = Decimal("7")
+        line.description = "другое описание"
+        line.save()
+        mapping.notes = "примечание"
+        mapping.save()
+        self.assertEqual(version(), before)
+
+        # Смена артикула и деактивация сопоставления — сброс
+        line.supplier_sku = "SUP-1A"
+        line.save()
+        self.assertNotEqual(version(), before)
+        self.assertEqual(resolve_many([("ООО Поставщик", "SUP-1A")]), [(self.item_b.id, 1.0)])
+        before = version()
+        mapping.is_active = False
+        mapping.save(update_fields=["is_active"])
+        self.assertNotEqual(version(), before)
+        self.assertEqual(resolve_many([("ООО Поставщик", "SUP-1A")]), [(None, 0.0)])
+
+    def test_supplier_skus_cached_per_key(self):
+        self._cold()
+        resolve_many([("ООО Поставщик", "SUP-1"), ("ООО Поставщик", "NOPE")])
+        resolution_index.clear_local()
+        # Каждый артикул — свой ключ: новый артикул добирается одним запросом, известные — из кэша
+        with self.assertNumQueries(1):
+            got = resolution_index.item_ids_by_supplier_sku(self.supplier.id, ["sup-1", "NOPE", "SUP-9"])
+        self.assertEqual(got, {"SUP-1": self.item_b.id, "NOPE": None, "SUP-9": None})
+
+    def test_create_or_update_price_records_batches(self):
+        line = SupplierPriceListLine.objects.create(
+            price_list=self.pl, supplier_sku="KR-001", description="x", unit=self.unit, price=Decimal("7"),
+        )
+        lines = SupplierPriceListLine.objects.select_related("price_list__supplier").filter(price_list=self.pl)
+
+        self.assertEqual(create_or_update_price_records_from_import(lines), 2)
+        self.assertEqual(PriceRecord.objects.count(), 2)
+
+        # повторный вызов в тот же день обновляет записи, а не плодит новые
+        line.price = Decimal("8")
+        line.save()
+        self.assertEqual(create_or_update_price_records_from_import(lines.all()), 2)
+        self.assertEqual(PriceRecord.objects.count(), 2)
+        self.assertEqual(PriceRecord.objects.get(item=self.item_a).price, Decimal("8"))
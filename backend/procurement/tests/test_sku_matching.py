@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from core.models import Unit
+from catalog.models import Category, Item
+from suppliers.models import Supplier
+from procurement.importers._resolver import find_possible_items_for_sku, resolve_many
+from procurement.importers.price_records_excel import import_price_record_rows
+from procurement.services import sku_matching
+
+
+class SkuMatchingTests(TestCase):
+    """Подбор номенклатуры: нормализованный ключ, триграммы по артикулу и наименованию, ранжирование."""
+
+    def setUp(self):
+        self.unit = Unit.objects.create(code="PCS", name="шт")
+        self.cat = Category.objects.create(code="C1", name="Leaf")
+        self.kr = Item.objects.create(sku="KR-001", name="Кирпич красный полнотелый", unit=self.unit, category=self.cat)
+        self.kr2 = Item.objects.create(sku="KR-002", name="Кирпич силикатный", unit=self.unit, category=self.cat)
+        self.cem = Item.objects.create(sku="CEM-M500", name="Цемент М500 мешок 50 кг", unit=self.unit, category=self.cat)
+        self.other = Item.objects.create(sku="ZZZ-9", name="Прочее", unit=self.unit, category=self.cat)
+        Supplier.objects.create(name="Supp")
+
+    def test_similarity_matches_pg_trgm(self):
+        # пример из документации pg_trgm: similarity('word', 'two words') = 0.363636
+        sim = sku_matching.similarity(sku_matching.trigrams("word"), sku_matching.trigrams("two words"))
+        self.assertAlmostEqual(sim, 4 / 11, places=6)
+        self.assertEqual(sku_matching.sku_key(" kr-001 "), "KR001")
+
+    def test_separator_and_case_insensitive_match(self):
+        found = sku_matching.find_candidates("kr001")
+        self.assertEqual(found[0]["id"], self.kr.id)
+        self.assertEqual(found[0]["match_type"], "normalized_sku")
+        self.assertEqual(found[0]["confidence"], 0.9)
+        # похожий артикул ниже по списку и с меньшей уверенностью
+        self.assertIn(self.kr2.id, [c["id"] for c in found])
+        self.assertLess(found[1]["confidence"], found[0]["confidence"])
+        self.assertNotIn(self.other.id, [c["id"] for c in found])
+
+    def test_match_by_name(self):
+        found = sku_matching.find_candidates("Цемент М500")
+        self.assertEqual(found[0]["id"], self.cem.id)
+        self.assertEqual(found[0]["match_type"], "name_trigram")
+
+    def test_batch_mode_and_limit(self):
+        res = sku_matching.find_candidates_many(["KR 001", "cem m500", "NOTHING-LIKE-IT"], limit=1)
+        self.assertEqual([c["id"] for c in res["KR 001"]], [self.kr.id])
+        self.assertEqual([c["id"] for c in res["cem m500"]], [self.cem.id])
+        self.assertEqual(res["NOTHING-LIKE-IT"], [])
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(sku_matching.find_candidates("NEW-777"), [])
+        item = Item.objects.create(sku="NEW777", name="Новинка", unit=self.unit, category=self.cat)
+        self.assertEqual(sku_matching.find_candidates("NEW-777")[0]["id"], item.id)
+
+    def test_resolver_uses_ranking(self):
+        [(item_id, conf)] = resolve_many([("Supp", "kr 001")])
+        self.assertEqual((item_id, conf), (self.kr.id, 0.9))
+
+        options = find_possible_items_for_sku("KR-00")
+        self.assertEqual({o["id"] for o in options[:2]}, {self.kr.id, self.kr2.id})
+        self.assertTrue(all(o["match_type"] == "sku_contains" for o in options[:2]))
+
+    def test_import_commit_skips_candidate_search(self):
+        rows = [(2, {"item_sku": "NOTHING-LIKE-IT", "supplier": "Supp", "price": 1})]
+        with mock.patch.object(sku_matching, "find_candidates_many", wraps=sku_matching.find_candidates_many) as spy:
+            res = import_price_record_rows(rows, preview=True)
+        # Предпросмотр: нечёткий шаг resolve_many и кандидаты для строки
+        self.assertEqual(spy.call_count, 2)
+        self.assertEqual(res["rows"][0]["candidates"], [])
+
+        with mock.patch.object(sku_matching, "find_candidates_many", wraps=sku_matching.find_candidates_many) as spy:
+            res = import_price_record_rows(rows, keep_rows=False)
+        # Запись без строк предпросмотра — только нечёткий шаг resolve_many
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual((res["created"], res["errors"]), (0, 1))
@@ -14,7 +14,10 @@ from .views import (
 from .views_shipments import ShipmentViewSet
 from .quote_lines_api import QuoteLineViewSet
 from .quote_po_api import QuotePurchaseOrderView
-from .views_supplier_map import supplier_map_preview, supplier_map_upsert
+from .views_supplier_map import supplier_map_preview, supplier_map_upsert, supplier_map_index_stats
+from .views_import import import_price_excel
+from .views_import_ext import import_invoice_preview, import_invoice_reconcile
+from .views_import_jobs import ImportJobViewSet
 
 
 router = DefaultRouter()
@@ -29,11 +32,17 @@ router.register("shipments", ShipmentViewSet, basename="shipment")
 router.register("supplier-price-lists", SupplierPriceListViewSet, basename="supplier-price-list")
 router.register("price-list-lines", SupplierPriceListLineViewSet, basename="price-list-line")
 router.register("item-supplier-mappings", ItemSupplierMappingViewSet, basename="item-supplier-mapping")
+router.register("import-jobs", ImportJobViewSet, basename="import-job")
 
 urlpatterns = [
     path("metrics-overview/", metrics_overview, name="metrics-overview"),
     path("supplier-map/preview/", supplier_map_preview, name="supplier-map-preview"),
     path("supplier-map/upsert/", supplier_map_upsert, name="supplier-map-upsert"),
+    path("supplier-map/index-stats/", supplier_map_index_stats, name="supplier-map-index-stats"),
+    # до router: иначе pricerecords/<pk>/ перехватит маршрут
+    path("pricerecords/import_excel/", import_price_excel, name="pricerecords-import-excel"),
+    path("import/invoice-preview/", import_invoice_preview, name="import-invoice-preview"),
+    path("import/invoice-reconcile/", import_invoice_reconcile, name="import-invoice-reconcile"),
     path("", include(router.urls)),
 ]
 
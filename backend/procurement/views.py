@@ -13,9 +13,12 @@ views.py — вьюхи для модуля закупок (procurement) и уп
 - import_price_excel() — загрузка прайс-листа из файла (из views_import.py)
 """
 
+import functools
+
 from django.db import transaction
-from django.db.models import Q, F, Prefetch
+from django.db.models import Q, F, OuterRef, Prefetch, Subquery
 from django.utils import timezone
+from django.urls import reverse
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.permissions import IsAuthenticated
@@ -36,6 +39,7 @@ from .models import (
     SupplierPriceList, 
     SupplierPriceListLine, 
     ItemSupplierMapping,
+    ImportJob,
 )
 
 from .serializers import (
@@ -54,41 +58,40 @@ from .serializers import (
     ItemSupplierMappingSerializer,
     ItemSupplierOptionsSerializer,
     GenerateQuotesFromRequestSerializer,
+    PriceBatchRequestSerializer,
+    AllocationRequestSerializer,
     GenerateQuotesResponseSerializer,)
 
 from projects.models import Project, ProjectStage
 from suppliers.models import Supplier
-from datetime import date, timedelta, datetime
-from collections import defaultdict
-from decimal import Decimal
-import openpyxl
-
-# --- PR status recalculation rules ---
-# "Обеспечение" заявки считаем ТОЛЬКО по заказам, которые реально отправлены поставщику (sent) и дальше по цепочке.
-# Закрываем заявку ТОЛЬКО когда всё покрыто заказами со статусом confirmed (и дальше).
-PO_ORDERED_STATUSES = {"sent", "confirmed", "paid", "in_transit", "delivered", "closed"}
-PO_CONFIRMED_STATUSES = {"confirmed", "paid", "in_transit", "delivered", "closed"}
-
-
-def _pr_required_qty_by_item(pr: PurchaseRequest) -> dict:
-    req: dict[int, Decimal] = {}
-    for ln in pr.lines.all():
-        if ln.item_id is None:
-            continue
-        req[ln.item_id] = req.get(ln.item_id, Decimal("0")) + (ln.qty or Decimal("0"))
-    return req
+from catalog.models import Item
+from core.models import Unit
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from .importers.pdf_table import PARSER_VERSION as PDF_TABLE_PARSER_VERSION, is_pdf, open_pdf_table
+from .importers.price_list_excel import (
+    PARSER_VERSION as PRICE_LIST_PARSER_VERSION,
+    PRICE_LIST_HEADERS,
+    REQUIRED_HEADERS as PRICE_LIST_REQUIRED_HEADERS,
+    collect_rows as collect_price_list_rows,
+    import_price_list_rows,
+    open_price_list_sheet,
+)
+from .services.import_jobs import create_job as create_import_job
+from .pagination import SwitchablePagination
+from .services import allocation, best_offers, coverage, documents, metrics, price_list_diff, price_matrix, price_series, pricing, quote_summary
+from .importers._coerce import to_bool
+from .importers._resolver import resolve_many
 
+# Имя разбора позиций прайс-листа в кэше документов (services/documents.py)
+PRICE_LIST_PARSER = 'price_list_excel'
+PRICE_LIST_PDF_PARSER = 'price_list_pdf'
 
-def _pr_ordered_qty_by_item(pr: PurchaseRequest, statuses: set[str], exclude_po_id: int | None = None) -> dict:
-    q = PurchaseOrderLine.objects.filter(order__purchase_request=pr, order__status__in=statuses)
-    if exclude_po_id:
-        q = q.exclude(order_id=exclude_po_id)
-    out: dict[int, Decimal] = {}
-    for ln in q:
-        if ln.item_id is None:
-            continue
-        out[ln.item_id] = out.get(ln.item_id, Decimal("0")) + (ln.qty or Decimal("0"))
-    return out
+# --- PR status recalculation rules ---
+# Количества по заявке читаем из журнала обеспечения (services/coverage.py), а не пересчитываем.
+PO_ORDERED_STATUSES = coverage.PO_ORDERED_STATUSES
+PO_CONFIRMED_STATUSES = coverage.PO_CONFIRMED_STATUSES
 
 
 def _is_fully_covered(required: dict, covered: dict) -> bool:
@@ -106,15 +109,19 @@ def _validate_po_not_overorder(po: PurchaseOrder, new_status: str) -> None:
     - сравниваем по item_id (агрегированно), т.к. в PO lines нет ссылки на конкретную строку заявки.
     - проверяем только при переводе в статус из PO_ORDERED_STATUSES/PO_CONFIRMED_STATUSES.
     """
-    pr = po.purchase_request
-    if pr is None:
+    if not po.purchase_request_id:
         return
 
-    required = _pr_required_qty_by_item(pr)
+    cov = coverage.for_request(po.purchase_request_id)
+    required = coverage.required_by_item(cov)
     if not required:
         return
 
-    already = _pr_ordered_qty_by_item(pr, PO_ORDERED_STATUSES, exclude_po_id=po.id)
+    # Журнал уже учитывает этот заказ, если он отправлен, — вычитаем его собственные строки.
+    own = {}
+    if (po.status or "").lower() in PO_ORDERED_STATUSES:
+        for ln in po.lines.all():
+            own[ln.item_id] = own.get(ln.item_id, Decimal("0")) + (ln.qty or Decimal("0"))
 
     errors: list[str] = []
     for ln in po.lines.all():
@@ -123,11 +130,11 @@ def _validate_po_not_overorder(po: PurchaseOrder, new_status: str) -> None:
             continue
 
         if item_id not in required:
-            errors.append(f"Товар item_id={item_id} отсутствует в заявке PR#{pr.id}.")
+            errors.append(f"Товар item_id={item_id} отсутствует в заявке PR#{po.purchase_request_id}.")
             continue
 
         need = required[item_id]
-        have = already.get(item_id, Decimal("0"))
+        have = cov[item_id].ordered_qty - own.get(item_id, Decimal("0"))
         after = have + (ln.qty or Decimal("0"))
 
         if after > need:
@@ -145,12 +152,13 @@ def _recalc_purchase_request_status(pr: PurchaseRequest) -> None:
     if (pr.status or "").lower() in {"cancelled", "canceled"}:
         return
 
-    required = _pr_required_qty_by_item(pr)
+    cov = coverage.for_request(pr.id)
+    required = coverage.required_by_item(cov)
     if not required:
         return
 
-    ordered = _pr_ordered_qty_by_item(pr, PO_ORDERED_STATUSES)
-    confirmed = _pr_ordered_qty_by_item(pr, PO_CONFIRMED_STATUSES)
+    ordered = {item_id: c.ordered_qty for item_id, c in cov.items()}
+    confirmed = {item_id: c.confirmed_qty for item_id, c in cov.items()}
 
     if _is_fully_covered(required, confirmed):
         new_status = "closed"
@@ -182,11 +190,52 @@ class PriceRecordViewSet(viewsets.ReadOnlyModelViewSet):
     /api/procurement/pricerecords/
 
     Только чтение истории цен.
+    Страницы: ?page=N или ?pagination=cursor (keyset по (-dt, -id), procurement/pagination.py).
+    Графики: series/ — агрегаты по дням / неделям / месяцам (services/price_series.py).
     """
 
     queryset = PriceRecord.objects.all().select_related("supplier", "item")
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PriceRecordSerializer
+    pagination_class = SwitchablePagination
+    cursor_ordering = ("-dt", "-id")
+
+    @action(detail=False, methods=["get"], url_path="series")
+    def series(self, request):
+        """
+        GET /api/procurement/pricerecords/series/?item=1,2&supplier=3&bucket=week&date_from=&date_to=
+
+        item / supplier — id через запятую или повторением параметра (нужен хотя бы один из них);
+        bucket — day (по умолчанию) | week | month; date_from / date_to — YYYY-MM-DD включительно.
+        """
+        qp = request.query_params
+
+        def ids(name):
+            try:
+                return [int(v) for raw in qp.getlist(name) for v in raw.split(",") if v.strip()]
+            except ValueError:
+                raise ValidationError({name: "Ожидаются целые id через запятую"})
+
+        def day(name):
+            raw = qp.get(name)
+            if not raw:
+                return None
+            try:
+                return date.fromisoformat(raw)
+            except ValueError:
+                raise ValidationError({name: "Ожидается дата YYYY-MM-DD"})
+
+        try:
+            data = price_series.series(
+                item_ids=ids("item"),
+                supplier_ids=ids("supplier"),
+                bucket=qp.get("bucket") or "day",
+                date_from=day("date_from"),
+                date_to=day("date_to"),
+            )
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+        return Response(data)
 
 
 class PurchaseRequestViewSet(viewsets.ModelViewSet):
@@ -283,11 +332,32 @@ class PurchaseRequestViewSet(viewsets.ModelViewSet):
         )
         return Response({"projects": projects, "stages": stages})
 
+    @action(detail=True, methods=["post"], url_path="allocate")
+    def allocate(self, request, pk=None):
+        """
+        POST /api/procurement/purchase-requests/<id>/allocate/
+        {"mode": "auto" | "heuristic" | "exact", "currency": "RUB", "line_ids": [...]}
+
+        Подбор поставщиков с минимальной итоговой стоимостью (МОК, кратность, мин. сумма заказа,
+        доставка, сроки) — предлагаемая разбивка на заказы. Заказы не создаются.
+        """
+        pr: PurchaseRequest = self.get_object()
+        ser = AllocationRequestSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        data = ser.validated_data
+        return Response(allocation.allocate(
+            pr.id,
+            mode=data["mode"],
+            currency=data["currency"],
+            line_ids=data.get("line_ids") or None,
+        ))
+
 class PurchaseOrderViewSet(viewsets.ModelViewSet):
     """
     /api/procurement/purchase-orders/
 
     CRUD по заказам поставщикам.
+    Страницы: ?page=N или ?pagination=cursor (keyset по -id).
     """
 
     queryset = (
@@ -304,6 +374,7 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
     )
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PurchaseOrderSerializer
+    pagination_class = SwitchablePagination
 
     def partial_update(self, request, *args, **kwargs):
         instance: PurchaseOrder = self.get_object()
@@ -398,11 +469,14 @@ class PurchaseOrderLineViewSet(viewsets.ModelViewSet):
 
     Ограничение:
     - редактирование qty/price допускается ТОЛЬКО пока заказ в статусе 'draft'.
+
+    Страницы: ?page=N или ?pagination=cursor (keyset по -id).
     """
 
     queryset = PurchaseOrderLine.objects.select_related("order", "item").order_by("-id")
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PurchaseOrderLineSerializer
+    pagination_class = SwitchablePagination
 
     def partial_update(self, request, *args, **kwargs):
         instance: PurchaseOrderLine = self.get_object()
@@ -425,40 +499,11 @@ def metrics_overview(request):
     GET /api/procurement/metrics-overview/
 
     Краткие метрики для дашборда.
-    """
-    # заявки
-    total_pr = PurchaseRequest.objects.count()
-    open_pr = PurchaseRequest.objects.filter(status="open").count()
-
-    # строки заявок в ожидании
-    waiting_lines = PurchaseRequestLine.objects.filter(status="pending").count()
-
-    # простая раскладка по статусам сроков (ETA/SLAs) — можно доработать позже
-    today = date.today()
-    warn_date = today + timedelta(days=3)
-
-    sla = defaultdict(int)
-    qs = PurchaseRequestLine.objects.all().only("need_date", "status")
-    for ln in qs:
-        if not ln.need_date:
-            continue
-        if ln.need_date <= today:
-            sla["hot"] += 1
-        elif ln.need_date <= warn_date:
-            sla["warn"] += 1
-        else:
-            sla["ok"] += 1
-
-    data = {
-        "purchase_requests_total": total_pr,
-        "purchase_requests_open": open_pr,
-        "lines_waiting": waiting_lines,
-        "sla_hot": sla["hot"],
-        "sla_warn": sla["warn"],
-        "sla_ok": sla["ok"],
-    }
 
-    return Response(data)
+    Считаются одним агрегирующим запросом и отдаются из короткоживущего снимка в кэше
+    (services/metrics.py).
+    """
+    return Response(metrics.overview())
 
 class QuoteViewSet(viewsets.ModelViewSet):
     """
@@ -466,25 +511,36 @@ class QuoteViewSet(viewsets.ModelViewSet):
 
     Маршруты:
     - GET /api/procurement/quotes/        — список КП
+      (?ordering=total_price|-total_price|created_at|id, ?total_min=, ?total_max=)
     - GET /api/procurement/quotes/{id}/   — детали КП
     - PATCH /api/procurement/quotes/{id}/ — смена статуса/notes
     - POST /api/procurement/quotes/{id}/create_po/ — создать заказ из КП
     """
 
-    queryset = Quote.objects.all().select_related("supplier").prefetch_related("lines__item")
+    queryset = Quote.objects.all().select_related(
+        "supplier",
+        "summary",
+        "purchase_request__project",
+        "purchase_request__project_stage__project",
+    ).prefetch_related(
+        Prefetch("lines", queryset=QuoteLine.objects.select_related("item", "unit")),
+    )
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = QuoteSerializer
 
-
-
-
-
-
-
-
+    ORDERING_FIELDS = {
+        "total_price": "summary__total_price",
+        "created_at": "created_at",
+        "id": "id",
+    }
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        # Последний заказ по КП — подзапросом, а не отдельным запросом на каждое КП в списке.
+        latest_po = PurchaseOrder.objects.filter(quote=OuterRef("pk")).order_by("-id")
+        qs = super().get_queryset().annotate(
+            latest_po_id=Subquery(latest_po.values("id")[:1]),
+            latest_po_number=Subquery(latest_po.values("number")[:1]),
+        )
         pr_id = (
             self.request.query_params.get("purchase_request_id")
             or self.request.query_params.get("purchase_request")
@@ -495,6 +551,23 @@ class QuoteViewSet(viewsets.ModelViewSet):
                 qs = qs.filter(purchase_request_id=int(pr_id))
             except Exception:
                 pass
+
+        # Фильтр и сортировка по сумме — по сохранённым итогам (QuoteSummary, точная сумма без округления)
+        for param, lookup in (("total_min", "summary__total_price__gte"), ("total_max", "summary__total_price__lte")):
+            raw = self.request.query_params.get(param)
+            if raw not in (None, ""):
+                try:
+                    qs = qs.filter(**{lookup: Decimal(str(raw).replace(",", "."))})
+                except (InvalidOperation, ValueError):
+                    raise ValidationError({param: "Ожидается число"})
+
+        ordering = self.request.query_params.get("ordering")
+        if ordering:
+            field = self.ORDERING_FIELDS.get(ordering.lstrip("-"))
+            if field is None:
+                raise ValidationError({"ordering": f"Допустимо: {', '.join(self.ORDERING_FIELDS)}"})
+            expr = F(field).desc(nulls_last=True) if ordering.startswith("-") else F(field).asc(nulls_last=True)
+            qs = qs.order_by(expr, "-id")
         return qs
 
     def partial_update(self, request, *args, **kwargs):
@@ -505,7 +578,7 @@ class QuoteViewSet(viewsets.ModelViewSet):
         status_val = request.data.get("status")
         notes_val = request.data.get("notes")
 
-        # В модели Quote пока нет полей status/notes — сохраняем в cache-based метаданных.
+        # status/notes хранятся в QuoteMeta (services/quote_meta.py), не в самой модели Quote.
         from procurement.serializers import _quote_meta_set
         _quote_meta_set(instance.id, status=status_val, notes=notes_val)
 
@@ -564,18 +637,8 @@ class QuoteViewSet(viewsets.ModelViewSet):
             delivery_address=delivery_address,
         )
 
-        # Считаем требуемое количество по заявке (агрегировано по item)
-        required_qty = {}
-        if pr is not None:
-            for pr_ln in pr.lines.all():
-                if pr_ln.item_id is None:
-                    continue
-                required_qty[pr_ln.item_id] = required_qty.get(pr_ln.item_id, Decimal("0")) + (pr_ln.qty or Decimal("0"))
-
-        # Уже обеспечено отправленными/подтверждёнными заказами
-        already_ordered = {}
-        if pr is not None:
-            already_ordered = _pr_ordered_qty_by_item(pr, PO_ORDERED_STATUSES)
+        # Требуемое и уже обеспеченное отправленными/подтверждёнными заказами — из журнала обеспечения
+        cov = coverage.for_request(pr.id) if pr is not None else {}
 
         for ln in quote.lines.all():
             if getattr(ln, "is_blocked", False):
@@ -584,9 +647,8 @@ class QuoteViewSet(viewsets.ModelViewSet):
             if item_id is None:
                 continue
 
-            need = required_qty.get(item_id, Decimal("0"))
-            have = already_ordered.get(item_id, Decimal("0"))
-            remaining = need - have
+            c = cov.get(item_id)
+            remaining = (c.required_qty - c.ordered_qty) if c is not None else Decimal("0")
 
             if remaining <= 0:
                 continue
@@ -634,32 +696,40 @@ class QuoteViewSet(viewsets.ModelViewSet):
         warnings = []
         created = []
 
-        from procurement.serializers import _quote_meta_set
+        from dashboard.signals import quotes_changed
+        from procurement.serializers import _quote_meta_set_many
+
+        # Действующие на сегодня сопоставления (позиции заявки × выбранные поставщики) — одним запросом.
+        # Лучшее на пару (поставщик, item) — первое в порядке "-is_preferred, price, id".
+        # ItemBestOffer здесь не подходит: он пересчитывается по событиям, а не по датам прайсов,
+        # и на сегодня может не знать о вступившем в силу или истёкшем прайс-листе.
+        best_mapping = {}
+        mappings = price_matrix.active_offers(date.today()).filter(
+            item_id__in={ln.item_id for ln in pr_lines},
+            price_list_line__price_list__supplier_id__in=[s.id for s in suppliers],
+        ).select_related("price_list_line", "price_list_line__unit", "price_list_line__price_list").order_by(
+            "-is_preferred", "price_list_line__price", "id"
+        )
+        for m in mappings:
+            best_mapping.setdefault((m.price_list_line.price_list.supplier_id, m.item_id), m)
 
-        for s in suppliers:
-            q = Quote.objects.create(
-                supplier=s,
-                purchase_request=pr,
-                source=f"RFQ from PR#{pr.id}",
-            )
+        quotes = Quote.objects.bulk_create([
+            Quote(supplier=s, purchase_request=pr, source=f"RFQ from PR#{pr.id}")
+            for s in suppliers
+        ])
 
-            # дефолтный статус для UI
-            _quote_meta_set(q.id, status="received")
+        # дефолтный статус для UI
+        _quote_meta_set_many([q.id for q in quotes], status="received")
 
+        quote_lines = []
+        for q, s in zip(quotes, suppliers):
             for pr_ln in pr_lines:
-                # Попробуем найти сопоставление item↔supplier_sku для автозаполнения
-                mapping = ItemSupplierMapping.objects.filter(
-                    item_id=pr_ln.item_id,
-                    is_active=True,
-                    price_list_line__price_list__supplier_id=s.id,
-                    price_list_line__price_list__is_active=True,
-                ).select_related("price_list_line", "price_list_line__unit", "price_list_line__price_list").order_by(
-                    "-is_preferred", "price_list_line__price"
-                ).first()
+                # Сопоставление item↔supplier_sku для автозаполнения
+                mapping = best_mapping.get((s.id, pr_ln.item_id))
 
                 if mapping:
                     pll = mapping.price_list_line
-                    QuoteLine.objects.create(
+                    quote_lines.append(QuoteLine(
                         quote=q,
                         item=pr_ln.item,
                         vendor_sku=pll.supplier_sku,
@@ -671,12 +741,12 @@ class QuoteViewSet(viewsets.ModelViewSet):
                         moq_qty=getattr(pll, 'min_quantity', None),
                         pack_qty=getattr(pll, 'package_quantity', None),
                         lot_step=getattr(pll, 'quantity_step', None),
-                    )
+                    ))
                 else:
                     warnings.append(
                         f'Нет сопоставления для "{pr_ln.item.name}" у поставщика "{s.name}" — цена = 0'
                     )
-                    QuoteLine.objects.create(
+                    quote_lines.append(QuoteLine(
                         quote=q,
                         item=pr_ln.item,
                         vendor_sku="",
@@ -684,7 +754,7 @@ class QuoteViewSet(viewsets.ModelViewSet):
                         unit=pr_ln.unit,
                         price=Decimal("0"),
                         currency="RUB",
-                    )
+                    ))
 
             created.append({
                 "id": q.id,
@@ -692,6 +762,12 @@ class QuoteViewSet(viewsets.ModelViewSet):
                 "supplier_name": s.name,
             })
 
+        QuoteLine.objects.bulk_create(quote_lines)
+        # bulk_create не шлёт сигналы — итоги новых КП считаем явно, одним пакетом
+        quote_summary.refresh([q.id for q in quotes])
+        # ...и дашборд: новые КП в группе «КП», сброс снимка и delta для подписчиков
+        quotes_changed([q.id for q in quotes])
+
         # Для удобства фронта вернём полный список созданных КП в том же формате,
         # что и QuoteSerializer (но без тяжёлых строк — фронт при необходимости доберёт detail).
         return Response({
@@ -774,44 +850,6 @@ class ShipmentViewSet(viewsets.ReadOnlyModelViewSet):
         }
 
 
-# ============================================================================
-# HELPER FUNCTIONS (вспомогательные функции)
-# ============================================================================
-
-def _to_decimal(val, default=None):
-    """Конвертировать значение в Decimal"""
-    if val in (None, ''):
-        return default
-    try:
-        return Decimal(str(val))
-    except:
-        return default
-
-
-def _to_int(val, default=None):
-    """Конвертировать значение в int"""
-    if val in (None, ''):
-        return default
-    try:
-        return int(val)
-    except:
-        return default
-
-
-def _to_bool(val, default=None):
-    """Конвертировать значение в bool"""
-    if val is None:
-        return default
-    if isinstance(val, bool):
-        return val
-    s = str(val).strip().lower()
-    if s in ('1', 'true', 'yes', 'да', 'y', 'истина', 'вкл'):
-        return True
-    if s in ('0', 'false', 'no', 'нет', 'n', 'ложь', 'откл'):
-        return False
-    return default
-
-
 def resolve_item_id_by_supplier_context(supplier_name, sku):
     """
     Разрешить Item ID по контексту поставщика и SKU.
@@ -829,31 +867,9 @@ def resolve_item_id_by_supplier_context(supplier_name, sku):
     Returns:
         int или None
     """
-    if not supplier_name or not sku:
-        return None
-    
-    try:
-        supplier = Supplier.objects.get(name=supplier_name)
-    except Supplier.DoesNotExist:
-        supplier = None
-    
-    # Попытка 1: ItemSupplierMapping (если найден поставщик)
-    if supplier:
-        mapping = ItemSupplierMapping.objects.filter(
-            price_list_line__price_list__supplier=supplier,
-            price_list_line__supplier_sku=sku,
-            is_active=True
-        ).first()
-        
-        if mapping:
-            return mapping.item_id
-    
-    # Попытка 2: Item по SKU
-    item = Item.objects.filter(sku=sku).first()
-    if item:
-        return item.id
-    
-    return None
+    # Та же логика, что в importers/_resolver (стратегия exact), через индекс сопоставления
+    item_id, _conf = resolve_many([(supplier_name, sku)], strategy='exact')[0]
+    return item_id
 
 
 # ============================================================================
@@ -871,6 +887,8 @@ class SupplierPriceListViewSet(viewsets.ModelViewSet):
     - PUT /api/procurement/supplier-price-lists/{id}/ — редактирование
     - DELETE /api/procurement/supplier-price-lists/{id}/ — удаление
     - POST /api/procurement/supplier-price-lists/{id}/upload/ — загрузка из файла
+    - POST /api/procurement/supplier-price-lists/{id}/diff/ — сравнение файла и применение изменений
+    - GET /api/procurement/supplier-price-lists/{id}/compare/ — сравнение двух версий
     
     Query parameters:
     - supplier_id: фильтр по поставщику
@@ -891,6 +909,9 @@ class SupplierPriceListViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Фильтрация по параметрам запроса"""
         queryset = super().get_queryset()
+        if self.action in ('diff', 'compare'):
+            # Сравнение читает позиции одним запросом сам — не тянем их все через prefetch
+            queryset = queryset.prefetch_related(None)
         
         # Фильтр по поставщику
         supplier_id = self.request.query_params.get('supplier_id')
@@ -900,7 +921,7 @@ class SupplierPriceListViewSet(viewsets.ModelViewSet):
         # Фильтр по статусу
         is_active = self.request.query_params.get('is_active')
         if is_active is not None:
-            queryset = queryset.filter(is_active=_to_bool(is_active))
+            queryset = queryset.filter(is_active=to_bool(is_active))
         
         # Фильтр по валюте
         currency = self.request.query_params.get('currency')
@@ -912,13 +933,19 @@ class SupplierPriceListViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], parser_classes=(MultiPartParser, FormParser))
     def upload(self, request, pk=None):
         """
-        Загрузить прайс-лист из Excel файла.
+        Загрузить прайс-лист из Excel или PDF файла (таблица PDF — importers/pdf_table.py).
         
         POST /api/procurement/supplier-price-lists/{id}/upload/
         
         Параметры:
-        - file: Excel файл (.xlsx)
+        - file: Excel файл (.xlsx) или PDF с таблицей (те же заголовки колонок)
         - preview: 1/0 — режим предпросмотра (без сохранения в БД)
+        - async: 1/0 — фоновый импорт (Celery); ответ 202 с job_id,
+          прогресс — GET /api/procurement/import-jobs/{job_id}/ или websocket
+          ws/procurement/import-jobs/{job_id}/. С preview=1 не применяется.
+        - force: 1/0 — импортировать файл, уже загруженный в этот прайс-лист
+          (без force повторная загрузка того же файла возвращает duplicate=true и ничего не пишет).
+          Разобранные строки файла кэшируются по его SHA-256 (services/documents.py).
         
         Ожидаемые колонки в Excel:
         - item_sku (артикул товара)
@@ -954,6 +981,8 @@ class SupplierPriceListViewSet(viewsets.ModelViewSet):
         price_list = self.get_object()
         file = request.FILES.get('file')
         preview = request.query_params.get('preview') in ('1', 'true', 'True')
+        run_async = request.query_params.get('async') in ('1', 'true', 'True')
+        force = request.query_params.get('force') in ('1', 'true', 'True')
         
         if not file:
             return Response(
@@ -961,136 +990,161 @@ class SupplierPriceListViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if is_pdf(file):
+            source, parser, version = 'PDF', PRICE_LIST_PDF_PARSER, PDF_TABLE_PARSER_VERSION
+            opener = functools.partial(open_pdf_table, mapping=PRICE_LIST_HEADERS)
+        else:
+            source, parser, version = 'Excel', PRICE_LIST_PARSER, PRICE_LIST_PARSER_VERSION
+            opener = open_price_list_sheet
+        
+        doc, _ = documents.store(file, user=request.user)
+        target = str(price_list.id)
+        if not preview and not force:
+            previous = documents.find_import(doc, ImportJob.Kind.PRICE_LIST_LINES, target)
+            if previous is not None:
+                return Response(
+                    {'ok': True, 'preview': False, 'price_list_id': price_list.id, **documents.duplicate_payload(previous)},
+                    status=status.HTTP_200_OK
+                )
+        
+        if run_async and not preview:
+            # Фоновый импорт читает файл сам — в запросе только проверка заголовков
+            parsed = documents.cached(doc, parser, version)
+            if parsed is not None:
+                headers = parsed[0]
+            else:
+                try:
+                    headers, rows = opener(file)
+                except Exception as e:
+                    return Response(
+                        {'detail': f'Ошибка при чтении {source}: {str(e)}'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                rows.close()
+            if any(h not in headers for h in PRICE_LIST_REQUIRED_HEADERS):
+                return Response(
+                    {'detail': 'Не найдены обязательные колонки: item_sku, price'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            job = create_import_job(
+                ImportJob.Kind.PRICE_LIST_LINES, file, user=request.user, price_list=price_list,
+                options={'document_id': doc.id},
+            )
+            return Response(
+                {
+                    'ok': True,
+                    'async': True,
+                    'job_id': job.id,
+                    'document_id': doc.id,
+                    'status_url': reverse('procurement:import-job-detail', args=[job.id]),
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        
         try:
-            # Парсинг Excel
-            wb = openpyxl.load_workbook(file, data_only=True)
-            ws = wb.active
+            # Разбор файла; строки — из кэша по хэшу, если он уже разбирался
+            headers, rows, cache_hit = documents.sheet(doc, parser, version, opener, file)
         except Exception as e:
             return Response(
-                {'detail': f'Ошибка при чтении Excel: {str(e)}'},
+                {'detail': f'Ошибка при чтении {source}: {str(e)}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Определить колонки
-        headers = {}
-        mapping = {
-            'item_sku': 'item_sku',
-            'description': 'description',
-            'unit': 'unit',
-            'price': 'price',
-            'min_quantity': 'min_quantity',
-            'quantity_step': 'quantity_step',
-            'lead_time_days': 'lead_time_days',
-            'vat_included': 'vat_included',
-            'vat_rate': 'vat_rate',
-            'delivery_cost_fixed': 'delivery_cost_fixed',
-            'delivery_cost_per_unit': 'delivery_cost_per_unit',
-        }
-        
-        for col in range(1, ws.max_column + 1):
-            v = ws.cell(1, col).value
-            if v is None:
-                continue
-            k = str(v).strip().lower()
-            if k in mapping:
-                headers[mapping[k]] = col
-        
-        if 'item_sku' not in headers or 'price' not in headers:
+        if any(h not in headers for h in PRICE_LIST_REQUIRED_HEADERS):
             return Response(
                 {'detail': 'Не найдены обязательные колонки: item_sku, price'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Обработка строк
-        preview_rows = []
-        created = 0
-        errors = 0
-        errors_detail = []
-        
-        with transaction.atomic():
-            for r in range(2, ws.max_row + 1):
-                sku_raw = ws.cell(r, headers.get('item_sku', 0)).value
-                if sku_raw in (None, ''):
-                    continue
-                
-                sku = str(sku_raw).strip()
-                price = _to_decimal(ws.cell(r, headers.get('price', 0)).value)
-                
-                row_data = {
-                    'row': r,
-                    'supplier_sku': sku,
-                    'description': str(ws.cell(r, headers.get('description', 0)).value or ''),
-                    'price': price,
-                    'valid': price is not None,
-                    'errors': {}
-                }
-                
-                if not row_data['valid']:
-                    row_data['errors']['price'] = 'Не найдена или некорректна'
-                    errors += 1
-                    errors_detail.append(f'Строка {r}: {sku} — неверная цена')
-                else:
-                    # Получить Unit
-                    unit_name = str(ws.cell(r, headers.get('unit', 0)).value or 'шт').strip()
-                    try:
-                        unit = Unit.objects.get(name=unit_name)
-                    except Unit.DoesNotExist:
-                        row_data['errors']['unit'] = f'Единица "{unit_name}" не найдена'
-                        errors += 1
-                        errors_detail.append(f'Строка {r}: {sku} — неверная единица {unit_name}')
-                        row_data['valid'] = False
-                    
-                    if row_data['valid']:
-                        # Создать SupplierPriceListLine
-                        if not preview:
-                            try:
-                                line = SupplierPriceListLine.objects.create(
-                                    price_list=price_list,
-                                    supplier_sku=sku,
-                                    description=row_data['description'],
-                                    unit=unit,
-                                    price=price,
-                                    min_quantity=_to_decimal(
-                                        ws.cell(r, headers.get('min_quantity', 0)).value, Decimal('1')
-                                    ),
-                                    quantity_step=_to_decimal(
-                                        ws.cell(r, headers.get('quantity_step', 0)).value, Decimal('1')
-                                    ),
-                                    lead_time_days=_to_int(
-                                        ws.cell(r, headers.get('lead_time_days', 0)).value, 14
-                                    ),
-                                    vat_included=_to_bool(
-                                        ws.cell(r, headers.get('vat_included', 0)).value, False
-                                    ),
-                                    vat_rate=_to_decimal(
-                                        ws.cell(r, headers.get('vat_rate', 0)).value, Decimal('20')
-                                    ),
-                                    delivery_cost_fixed=_to_decimal(
-                                        ws.cell(r, headers.get('delivery_cost_fixed', 0)).value, Decimal('0')
-                                    ),
-                                    delivery_cost_per_unit=_to_decimal(
-                                        ws.cell(r, headers.get('delivery_cost_per_unit', 0)).value, Decimal('0')
-                                    ),
-                                )
-                                created += 1
-                            except Exception as e:
-                                row_data['errors']['create'] = str(e)
-                                row_data['valid'] = False
-                                errors += 1
-                                errors_detail.append(f'Строка {r}: {sku} — {str(e)}')
-                
-                preview_rows.append(row_data)
+        # Обработка строк: единицы из словаря, запись пачками (upsert по price_list + supplier_sku)
+        result = import_price_list_rows(price_list, rows, preview=preview)
+        if not preview:
+            documents.record_import(
+                doc, ImportJob.Kind.PRICE_LIST_LINES, target,
+                {'created': result['created'], 'updated': result['updated'], 'errors': result['errors']},
+                user=request.user,
+            )
         
         return Response({
             'ok': True,
             'preview': preview,
             'price_list_id': price_list.id,
-            'rows': preview_rows,
-            'created': created,
-            'errors': errors,
-            'errors_detail': errors_detail,
+            'document_id': doc.id,
+            'cached': cache_hit,
+            'rows': result['rows'],
+            'created': result['created'],
+            'updated': result['updated'],
+            'errors': result['errors'],
+            'errors_detail': result['errors_detail'],
         }, status=status.HTTP_200_OK)
     
+    def _diff_base(self, request, price_list):
+        """?base=<id> — прайс-лист того же поставщика, с которым сравнивать (иначе — по умолчанию)."""
+        base_id = request.query_params.get('base')
+        if not base_id:
+            return None
+        base = SupplierPriceList.objects.filter(pk=base_id, supplier_id=price_list.supplier_id).first()
+        if base is None:
+            raise ValidationError({'base': 'Прайс-лист этого поставщика не найден'})
+        return base
+
+    @action(detail=True, methods=['post'], parser_classes=(MultiPartParser, FormParser))
+    def diff(self, request, pk=None):
+        """
+        Сравнить файл с прайс-листом и (опц.) применить только изменения.
+
+        POST /api/procurement/supplier-price-lists/{id}/diff/?apply=1&base=<id>
+
+        - file: Excel файл (.xlsx), колонки как у upload;
+        - база сравнения: сам прайс-лист, если в нём есть позиции, иначе текущий прайс поставщика
+          (новая версия: позиции и сопоставления переносятся, база снимается с действия);
+          base=<id> у прайса с позициями — отчёт относительно base, изменения пишутся на месте;
+        - apply: 1/0 — применить разницу (по умолчанию только отчёт).
+
+        Возвращает counts (added / removed / price_changed / terms_changed / unchanged), списки
+        артикулов и изменений, errors_detail по строкам файла; с apply — ещё applied.
+        """
+        price_list = self.get_object()
+        file = request.FILES.get('file')
+        apply_delta = request.query_params.get('apply') in ('1', 'true', 'True')
+        base = self._diff_base(request, price_list)
+
+        if not file:
+            return Response({'detail': 'Файл не загружен'}, status=status.HTTP_400_BAD_REQUEST)
+        doc, _ = documents.store(file, user=request.user)
+        try:
+            headers, rows, _cached = documents.sheet(
+                doc, PRICE_LIST_PARSER, PRICE_LIST_PARSER_VERSION, open_price_list_sheet, file,
+            )
+        except Exception as e:
+            return Response(
+                {'detail': f'Ошибка при чтении Excel: {str(e)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if any(h not in headers for h in PRICE_LIST_REQUIRED_HEADERS):
+            return Response(
+                {'detail': 'Не найдены обязательные колонки: item_sku, price'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        incoming, errors_detail = collect_price_list_rows(rows)
+        if apply_delta:
+            result = price_list_diff.apply(price_list, incoming, base=base)
+        else:
+            result = price_list_diff.diff_incoming(price_list, incoming, base=base)
+        return Response({**result, 'applied_delta': apply_delta, 'errors_detail': errors_detail})
+
+    @action(detail=True, methods=['get'])
+    def compare(self, request, pk=None):
+        """
+        Сравнить версию прайс-листа с другой версией того же поставщика.
+
+        GET /api/procurement/supplier-price-lists/{id}/compare/?base=<id>
+        Без base — с текущим действующим прайсом поставщика.
+        """
+        price_list = self.get_object()
+        return Response(price_list_diff.compare(price_list, base=self._diff_base(request, price_list)))
+
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Получить список активных прайс-листов"""
@@ -1113,6 +1167,7 @@ class SupplierPriceListLineViewSet(viewsets.ModelViewSet):
     - POST /api/procurement/price-list-lines/
     - PUT /api/procurement/price-list-lines/{id}/
     - DELETE /api/procurement/price-list-lines/{id}/
+    - POST /api/procurement/price-list-lines/price-batch/
     
     Query parameters:
     - price_list_id: фильтр по прайс-листу
@@ -1145,7 +1200,7 @@ class SupplierPriceListLineViewSet(viewsets.ModelViewSet):
         # Фильтр по доступности
         is_available = self.request.query_params.get('is_available')
         if is_available is not None:
-            queryset = queryset.filter(is_available=_to_bool(is_available))
+            queryset = queryset.filter(is_available=to_bool(is_available))
         
         # Фильтр по поиску
         search = self.request.query_params.get('search')
@@ -1158,6 +1213,34 @@ class SupplierPriceListLineViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+    @action(detail=False, methods=['post'], url_path='price-batch')
+    def price_batch(self, request):
+        """
+        Стоимость для множества пар (позиция прайса, количество) за один запрос к БД.
+
+        POST /api/procurement/price-list-lines/price-batch/
+        {"lines": [{"price_list_line_id": 10, "quantity": "1000"}, ...]}
+
+        Возвращает {"results": [...]} в порядке входа: поля как у calculate_total_for_quantity
+        ({valid, total} или {valid, error}) плюс price_list_line_id и quantity.
+        """
+        ser = PriceBatchRequestSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        lines = ser.validated_data['lines']
+
+        results = pricing.price_many((line['price_list_line_id'], line['quantity']) for line in lines)
+        return Response({
+            'results': [
+                {
+                    'price_list_line_id': line['price_list_line_id'],
+                    'quantity': str(line['quantity']),
+                    **{k: (str(v) if k == 'total' else v) for k, v in r.items()},
+                }
+                for line, r in zip(lines, results)
+            ],
+        })
+
+
 # ============================================================================
 # 3. ItemSupplierMappingViewSet
 # ============================================================================
@@ -1173,6 +1256,7 @@ class ItemSupplierMappingViewSet(viewsets.ModelViewSet):
     - PUT /api/procurement/item-supplier-mappings/{id}/
     - DELETE /api/procurement/item-supplier-mappings/{id}/
     - GET /api/procurement/item-supplier-mappings/find-alternative/
+    - GET /api/procurement/item-supplier-mappings/matrix/
     
     Query parameters:
     - item_id: фильтр по Item
@@ -1206,12 +1290,12 @@ class ItemSupplierMappingViewSet(viewsets.ModelViewSet):
         # Фильтр по статусу
         is_active = self.request.query_params.get('is_active')
         if is_active is not None:
-            queryset = queryset.filter(is_active=_to_bool(is_active))
+            queryset = queryset.filter(is_active=to_bool(is_active))
         
         # Фильтр по предпочтению
         is_preferred = self.request.query_params.get('is_preferred')
         if is_preferred is not None:
-            queryset = queryset.filter(is_preferred=_to_bool(is_preferred))
+            queryset = queryset.filter(is_preferred=to_bool(is_preferred))
         
         return queryset
     
@@ -1287,6 +1371,67 @@ class ItemSupplierMappingViewSet(viewsets.ModelViewSet):
         return Response(data)
 
 
+    @action(detail=False, methods=['get', 'post'], url_path='best-offers')
+    def best_offers(self, request):
+        """
+        Лучшие действующие предложения по позициям из таблицы ItemBestOffer (services/best_offers.py).
+
+        GET  /api/procurement/item-supplier-mappings/best-offers/?items=1,2,3
+        POST /api/procurement/item-supplier-mappings/best-offers/  {"items": [1, 2, 3]}
+
+        Возвращает {"results": [{item_id, offers_count, suppliers_count, preferred, cheapest, fastest}]}
+        в порядке запроса; для позиций без предложений — offers_count = 0 и пустые предложения.
+        """
+        try:
+            if request.method == 'POST':
+                raw = request.data.get('items') or []
+                item_ids = [int(v) for v in raw]
+            else:
+                item_ids = [
+                    int(v) for raw in request.query_params.getlist('items') for v in raw.split(',') if v.strip()
+                ]
+        except (TypeError, ValueError):
+            raise ValidationError({'detail': 'items — список целых id'})
+        if not item_ids:
+            raise ValidationError({'detail': 'Нужен хотя бы один item'})
+        if len(item_ids) > price_matrix.MAX_ITEMS:
+            raise ValidationError({'detail': f'Не больше {price_matrix.MAX_ITEMS} позиций за запрос'})
+
+        found = best_offers.lookup(item_ids)
+        empty = {'offers_count': 0, 'suppliers_count': 0, 'preferred': None, 'cheapest': None, 'fastest': None}
+        return Response({
+            'results': [found.get(i) or {'item_id': i, **empty} for i in dict.fromkeys(item_ids)],
+        })
+
+    @action(detail=False, methods=['get'])
+    def matrix(self, request):
+        """
+        Матрица цен «позиции × поставщики» одним запросом (services/price_matrix.py).
+
+        GET /api/procurement/item-supplier-mappings/matrix/?pr=<id>
+        GET /api/procurement/item-supplier-mappings/matrix/?items=1,2,3
+
+        Для заявки у предложений есть qty в единицах поставщика, сумма и флаги
+        below_moq / step_mismatch / below_min_amount.
+        """
+        pr = request.query_params.get('pr') or request.query_params.get('purchase_request_id')
+        try:
+            pr_id = int(pr) if pr else None
+            item_ids = [
+                int(v) for raw in request.query_params.getlist('items') for v in raw.split(',') if v.strip()
+            ]
+        except ValueError:
+            raise ValidationError({'detail': 'pr и items — целые id (items через запятую)'})
+
+        if pr_id and not PurchaseRequest.objects.filter(id=pr_id).exists():
+            return Response({'detail': f'Заявка {pr_id} не найдена'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            data = price_matrix.matrix(item_ids=item_ids, pr_id=pr_id)
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+        return Response(data)
+
+
 # ============================================================================
 # 4. GENERATE QUOTES (Автогенерация КП)
 # ============================================================================
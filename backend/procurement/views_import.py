@@ -2,95 +2,39 @@
 Импорт прайс‑листов в procurement.
 
 Реализует загрузку Excel‑файла прайса от поставщика и преобразование строк в PriceRecord.
-Поддерживает режим preview, чтобы пользователь увидел результат сопоставления до сохранения.
+Поддерживает режим preview, чтобы пользователь увидел результат сопоставления до сохранения,
+и фоновый режим async=1 (задача ImportJob, ответ 202).
+
+Файл сохраняется в хранилище документов по содержимому (services/documents.py): разобранные строки
+кэшируются по хэшу, повторная фиксация того же файла не выполняется без force=1.
+
+Разбор и запись — в importers/price_records_excel.py (общий код с фоновой задачей).
+PDF-прайс (таблица) разбирается importers/pdf_table.py в те же строки и идёт в тот же импорт.
 """
 
+from functools import partial
+
+from django.urls import reverse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import transaction
-from catalog.models import Item
-from suppliers.models import Supplier
-from procurement.models import PriceRecord
-from datetime import date, datetime as dtmod
-import openpyxl
-
-
-from .importers._resolver import resolve_item_id_by_supplier_context
-
-
-EXPECTED_HEADERS = {
-    "item_sku":"item_sku", "supplier":"supplier", "price":"price", "currency":"currency",
-    "lead_days":"lead_days", "pack_qty":"pack_qty", "moq_qty":"moq_qty", "mo_amount":"mo_amount",
-    "lot_step":"lot_step", "vat_included":"vat_included", "vat_rate":"vat_rate",
-    "delivery_fixed":"delivery_fixed", "delivery_per_unit":"delivery_per_unit", "dt":"dt",
-    "номенклатура":"item_sku", "поставщик":"supplier", "цена":"price", "валюта":"currency",
-    "срок поставки (дн.)":"lead_days", "кратность упаковки":"pack_qty",
-    "мин. кол-во (moq)":"moq_qty", "мин. сумма заказа":"mo_amount", "кратность заказа поставщика":"lot_step",
-    "цена с ндс":"vat_included", "ставка ндс, %":"vat_rate", "доставка фикс.":"delivery_fixed",
-    "доставка за ед.":"delivery_per_unit", "дата":"dt",
-}
-
-
-def _lower_map(ws):
-    """
-    Функция _lower_map относится к бизнес‑логике SNAB. См. код и параметры вызова.
-    """
-
-    headers = {}
-    for col in range(1, ws.max_column + 1):
-        v = ws.cell(1, col).value
-        if v is None: continue
-        key = str(v).strip().lower()
-        if key in EXPECTED_HEADERS:
-            headers[EXPECTED_HEADERS[key]] = col
-    return headers
-
-
-def _to_bool(val, default=None):
-    """
-    Функция _to_bool относится к бизнес‑логике SNAB. См. код и параметры вызова.
-    """
-
-    if val is None: return default
-    if isinstance(val, bool): return val
-    s = str(val).strip().lower()
-    if s in ("1","true","yes","да","y","истина"): return True
-    if s in ("0","false","no","нет","n","ложь"): return False
-    return default
-
-
-def _to_decimal(val, default=None):
-    """
-    Функция _to_decimal относится к бизнес‑логике SNAB. См. код и параметры вызова.
-    """
-
-    if val in (None, ""): return default
-    try: return float(val)
-    except: return default
-
-
-def _to_int(val, default=None):
-    """
-    Функция _to_int относится к бизнес‑логике SNAB. См. код и параметры вызова.
-    """
-
-    if val in (None, ""): return default
-    try: return int(val)
-    except: return default
 
+from procurement.models import ImportJob
 
-def _to_date(val, default=None):
-    """
-    Функция _to_date относится к бизнес‑логике SNAB. См. код и параметры вызова.
-    """
+from .importers.price_records_excel import (  # noqa: F401 — EXPECTED_HEADERS реэкспортируется
+    EXPECTED_HEADERS,
+    PARSER_VERSION,
+    REQUIRED_HEADERS,
+    import_price_record_rows,
+    open_price_records_sheet,
+)
+from .importers.pdf_table import PARSER_VERSION as PDF_PARSER_VERSION, is_pdf, open_price_records_pdf
+from .services import documents
+from .services.import_jobs import create_job
 
-    if val in (None, ""): return default
-    if isinstance(val, date): return val
-    if isinstance(val, dtmod): return val.date()
-    try: return date.fromisoformat(str(val)[:10])
-    except: return default
+PARSER = "price_records_excel"
+PDF_PARSER = "price_records_pdf"
 
 
 @api_view(["POST"])
@@ -99,114 +43,78 @@ def import_price_excel(request):
     """
     Импорт прайс‑листа поставщика из Excel (openpyxl).
     Поддерживает режим preview=1: вернуть распознанные строки без записи в БД.
-    Ожидает файл в multipart/form-data под ключом 'file'.
+    Режим async=1: файл сохраняется, импорт выполняет Celery, ответ 202 с job_id.
+    Файл, уже импортированный ранее, повторно не записывается (ответ duplicate=true); force=1 — записать.
+    Ожидает файл в multipart/form-data под ключом 'file': Excel или PDF с таблицей
+    (заголовки — те же, что в Excel; supplier — поставщик, если в таблице нет такой колонки).
     Сопоставление номенклатуры выполняется через resolver (по артикулу/контексту поставщика).
     """
 
     preview = request.query_params.get("preview") in ("1","true","True")
+    run_async = request.query_params.get("async") in ("1","true","True")
+    force = request.query_params.get("force") in ("1","true","True")
     file = request.FILES.get("file")
     if not file:
         return Response({"detail":"Нет файла"}, status=400)
+
+    if is_pdf(file):
+        supplier = request.data.get("supplier") or request.query_params.get("supplier") or ""
+        kind, parser, version, options = "PDF", PDF_PARSER, PDF_PARSER_VERSION, {"supplier": supplier}
+        opener = partial(open_price_records_pdf, supplier_name=supplier)
+    else:
+        kind, parser, version, options = "Excel", PARSER, PARSER_VERSION, None
+        opener = open_price_records_sheet
+
+    doc, _ = documents.store(file, user=request.user)
+    if not preview and not force:
+        previous = documents.find_import(doc, ImportJob.Kind.PRICE_RECORDS)
+        if previous is not None:
+            return Response({"ok": True, "preview": False, **documents.duplicate_payload(previous)}, status=200)
+
+    if run_async and not preview:
+        # Фоновый импорт читает файл сам — в запросе только проверка заголовков
+        parsed = documents.cached(doc, parser, version, options)
+        if parsed is not None:
+            headers = parsed[0]
+        else:
+            try:
+                headers, rows = opener(file)
+            except Exception as e:
+                return Response({"detail": f"{kind} error: {e}"}, status=400)
+            rows.close()
+        missing = [h for h in REQUIRED_HEADERS if h not in headers]
+        if missing:
+            return Response({"detail": f"Missing columns: {missing}"}, status=400)
+        job = create_job(
+            ImportJob.Kind.PRICE_RECORDS, file, user=request.user, options={"document_id": doc.id, **(options or {})},
+        )
+        return Response(
+            {
+                "ok": True,
+                "async": True,
+                "job_id": job.id,
+                "document_id": doc.id,
+                "status_url": reverse("procurement:import-job-detail", args=[job.id]),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
     try:
-        wb = openpyxl.load_workbook(file, data_only=True)
-        ws = wb.active
+        headers, rows, cache_hit = documents.sheet(doc, parser, version, opener, file, options)
     except Exception as e:
-        return Response({"detail": f"Excel error: {e}"}, status=400)
+        return Response({"detail": f"{kind} error: {e}"}, status=400)
 
-
-    headers = _lower_map(ws)
-    required = ["item_sku", "supplier", "price"]
-    missing = [h for h in required if h not in headers]
+    missing = [h for h in REQUIRED_HEADERS if h not in headers]
     if missing:
         return Response({"detail": f"Missing columns: {missing}"}, status=400)
 
-
-    preview_rows = []
-    valid_rows = []
-    errors = 0
-
-
-    for r in range(2, ws.max_row + 1):
-        sku_raw = ws.cell(r, headers["item_sku"]).value
-        if sku_raw in (None, ""): 
-            continue
-        supplier_val = ws.cell(r, headers["supplier"]).value if "supplier" in headers else None
-        price = _to_decimal(ws.cell(r, headers["price"]).value)
-        currency = (ws.cell(r, headers["currency"]).value if "currency" in headers else "RUB") or "RUB"
-        supplier_name = str(supplier_val).strip() if supplier_val else ""
-
-
-        row_err = {}
-        if price is None:
-            row_err["price"] = "invalid"
-
-
-        sku = str(sku_raw).strip()
-        item_id, _conf = resolve_item_id_by_supplier_context(supplier_name, sku)
-
-
-        candidates = []
-        if not item_id:
-            row_err["item_sku"] = f"unmapped: {sku}"
-            candidates = list(Item.objects.filter(sku__icontains=sku).values_list('id','sku')[:5])
-
-
-        lead_days = _to_int(ws.cell(r, headers.get("lead_days", 0)).value, 0) if "lead_days" in headers else 0
-        pack_qty = _to_decimal(ws.cell(r, headers.get("pack_qty", 0)).value, 1) if "pack_qty" in headers else 1
-        moq_qty = _to_decimal(ws.cell(r, headers.get("moq_qty", 0)).value, 0) if "moq_qty" in headers else 0
-        mo_amount = _to_decimal(ws.cell(r, headers.get("mo_amount", 0)).value, 0) if "mo_amount" in headers else 0
-        lot_step = _to_decimal(ws.cell(r, headers.get("lot_step", 0)).value, 1) if "lot_step" in headers else 1
-        vat_included = _to_bool(ws.cell(r, headers.get("vat_included", 0)).value, True) if "vat_included" in headers else True
-        vat_rate = _to_decimal(ws.cell(r, headers.get("vat_rate", 0)).value, 20) if "vat_rate" in headers else 20
-        delivery_fixed = _to_decimal(ws.cell(r, headers.get("delivery_fixed", 0)).value, 0) if "delivery_fixed" in headers else 0
-        delivery_per_unit = _to_decimal(ws.cell(r, headers.get("delivery_per_unit", 0)).value, 0) if "delivery_per_unit" in headers else 0
-        dt_val = _to_date(ws.cell(r, headers.get("dt", 0)).value, date.today()) if "dt" in headers else date.today()
-
-
-        row_out = {
-            "row": r,
-            "valid": len(row_err) == 0,
-            "errors": row_err or None,
-            "supplier": supplier_name,
-            "item_sku": sku,
-            "item": item_id,
-            "candidates": [{"id": c[0], "sku": c[1]} for c in candidates],
-            "price": price,
-            "currency": currency,
-            "lead_days": lead_days,
-            "pack_qty": pack_qty,
-            "moq_qty": moq_qty,
-            "mo_amount": mo_amount,
-            "lot_step": lot_step,
-            "vat_included": vat_included,
-            "vat_rate": vat_rate,
-            "delivery_fixed": delivery_fixed,
-            "delivery_per_unit": delivery_per_unit,
-            "dt": dt_val.isoformat(),
-        }
-        preview_rows.append(row_out)
-        if row_out["valid"]:
-            valid_rows.append(row_out)
-        else:
-            errors += 1
-
+    result = import_price_record_rows(rows, preview=preview, keep_rows=preview)
+    meta = {"document_id": doc.id, "cached": cache_hit}
 
     if preview:
-        return Response({"ok": True, "preview": True, "rows": preview_rows, "errors": errors}, status=200)
-
-
-    created = 0
-    with transaction.atomic():
-        for r in valid_rows:
-            PriceRecord.objects.create(
-                item_id=r["item"],
-                supplier=Supplier.objects.get_or_create(name=r["supplier"])[0],
-                price=r["price"],
-                currency=r["currency"],
-                                pack_qty=r["pack_qty"],
-                lead_days=r["lead_days"],
-                moq_qty=r["moq_qty"],
-                lot_step=r["lot_step"],
-            )
-            created += 1
-    return Response({"ok": True, "preview": False, "created": created, "errors": errors}, status=200)
\ No newline at end of file
+        return Response({"ok": True, "preview": True, "rows": result["rows"], "errors": result["errors"], **meta}, status=200)
+    documents.record_import(
+        doc, ImportJob.Kind.PRICE_RECORDS,
+        result={"created": result["created"], "errors": result["errors"]}, user=request.user,
+    )
+    return Response({"ok": True, "preview": False, "created": result["created"], "errors": result["errors"], **meta}, status=200)
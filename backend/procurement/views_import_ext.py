@@ -3,6 +3,12 @@
 
 Содержит ручки, которые помогают загрузить и предварительно разобрать документы (счета/накладные),
 чтобы затем сопоставить их с заявками, заказами и номенклатурой.
+
+Файлы сохраняются в хранилище документов по содержимому, результат разбора кэшируется по хэшу
+и версии парсера (services/documents.py) — повторная загрузка того же счёта отвечает из кэша.
+
+Сверка строк счёта с открытыми заказами поставщика — services/reconciliation.py
+(в предпросмотре по supplier_id / po_number или отдельной ручкой по уже разобранным строкам).
 """
 
 from rest_framework.decorators import api_view, permission_classes
@@ -17,7 +23,11 @@ from datetime import date
 import openpyxl, mimetypes
 
 
-from .importers.pdf_price import parse_pdf as parse_price_pdf
+from .importers.pdf_price import PARSER_VERSION as PDF_PARSER_VERSION, parse_pdf as parse_price_pdf
+from .services import documents, reconciliation
+
+# Версия разбора Excel-счёта (_parse_invoice_excel) для кэша документов
+INVOICE_EXCEL_PARSER_VERSION = "2"
 
 
 @api_view(["POST"])
@@ -26,29 +36,99 @@ def import_invoice_preview(request):
     """
     Предпросмотр импорта счёта/накладной: разбирает файл и возвращает структуру строк.
     Используется для сверки позиций счёта с расчётами/заявками до фактической загрузки.
+    limit=N (PDF) — только первые N строк (truncated=true): остальные страницы не извлекаются.
+    supplier_id / po_number — в ответ добавляется сверка с открытыми заказами (reconciliation).
     """
 
     file = request.FILES.get("file")
     supplier = request.data.get("supplier") or request.query_params.get("supplier") or ""
     if not file:
         return Response({"detail": "Нет файла"}, status=400)
+    doc, _ = documents.store(file, user=request.user)
+    options = {"supplier": supplier}
+    try:
+        limit = max(1, int(request.query_params.get("limit")))
+    except (TypeError, ValueError):
+        limit = None
     ctype = (file.content_type or mimetypes.guess_type(file.name)[0] or "").lower()
     if "pdf" in ctype or file.name.lower().endswith(".pdf"):
         # Для счётов используем тот же базовый PDF-парсер как превью (SKU / name / price)
-        parsed = parse_price_pdf(file, supplier_name=supplier)
-        parsed["document_type"] = "invoice"
-        return Response(parsed, status=200 if parsed.get("ok") else 400)
+        parsed = documents.cached(doc, "pdf_price", PDF_PARSER_VERSION, options)
+        cache_hit = parsed is not None
+        if parsed is None:
+            parsed = parse_price_pdf(file, supplier_name=supplier, max_rows=limit)
+            if parsed.get("ok") and not parsed.get("truncated"):
+                # Ошибки окружения (нет pdfminer) и неполный разбор не кэшируем
+                documents.remember(doc, "pdf_price", PDF_PARSER_VERSION, parsed, options)
+        elif limit and len(parsed["rows"]) > limit:
+            parsed = {**parsed, "rows": parsed["rows"][:limit], "truncated": True}
+        parsed = {**parsed, "document_type": "invoice", "document_id": doc.id, "cached": cache_hit}
+        if not parsed.get("ok"):
+            return Response(parsed, status=400)
+        return _with_reconciliation(request, parsed)
     # Excel-счёт: используем простую схему — те же заголовки, что и прайс
     try:
-        wb = openpyxl.load_workbook(file, data_only=True)
-        ws = wb.active
+        rows, cache_hit = documents.parse_cached(
+            doc, "invoice_excel", INVOICE_EXCEL_PARSER_VERSION, lambda: _parse_invoice_excel(file, supplier), options,
+        )
     except Exception as e:
         return Response({"detail": f"Excel error: {e}"}, status=400)
+    return _with_reconciliation(
+        request,
+        {"ok": True, "preview": True, "document_type": "invoice", "rows": rows, "document_id": doc.id, "cached": cache_hit},
+    )
+
+
+def _reconcile_params(request):
+    supplier_id = request.data.get("supplier_id") or request.query_params.get("supplier_id")
+    po_number = request.data.get("po_number") or request.query_params.get("po_number")
+    return supplier_id, po_number
+
+
+def _with_reconciliation(request, payload):
+    """Ответ предпросмотра; при supplier_id / po_number — со сверкой строк с заказами."""
+    supplier_id, po_number = _reconcile_params(request)
+    if not (supplier_id or po_number):
+        return Response(payload, status=200)
+    try:
+        payload["reconciliation"] = reconciliation.reconcile(
+            payload["rows"], supplier_id=supplier_id, po_number=po_number,
+        )
+    except (reconciliation.ReconciliationError, TypeError, ValueError) as e:
+        return Response({"detail": str(e)}, status=400)
+    return Response(payload, status=200)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def import_invoice_reconcile(request):
+    """
+    Сверка строк счёта с открытыми заказами поставщика (без загрузки файла).
+
+    Тело: {"rows": [{"row", "item_sku", "price", "qty"}, ...], "supplier_id" | "po_number"} —
+    строки предпросмотра, возможно поправленные закупщиком.
+    """
+    rows = request.data.get("rows")
+    if not isinstance(rows, list):
+        return Response({"detail": "rows: ожидается список строк счёта"}, status=400)
+    supplier_id, po_number = _reconcile_params(request)
+    try:
+        result = reconciliation.reconcile(rows, supplier_id=supplier_id, po_number=po_number)
+    except (reconciliation.ReconciliationError, TypeError, ValueError) as e:
+        return Response({"detail": str(e)}, status=400)
+    return Response(result, status=200)
+
+
+def _parse_invoice_excel(file, supplier):
+    """Строки Excel-счёта (заголовки — как у прайса); ошибка чтения книги — исключение."""
+    wb = openpyxl.load_workbook(file, data_only=True)
+    ws = wb.active
     headers = {}
     mapping = {
         "item_sku":"item_sku", "supplier":"supplier", "price":"price", "currency":"currency",
         "lead_days":"lead_days", "pack_qty":"pack_qty", "moq_qty":"moq_qty", "mo_amount":"mo_amount",
         "lot_step":"lot_step", "dt":"dt",
+        "qty":"qty", "количество":"qty", "кол-во":"qty",
     }
     for col in range(1, ws.max_column+1):
         v = ws.cell(1, col).value
@@ -66,5 +146,6 @@ def import_invoice_preview(request):
             "row": r, "valid": price is not None,
             "item_sku": str(sku), "supplier": supplier or (ws.cell(r, headers.get("supplier",0)).value if "supplier" in headers else ""),
             "price": price, "currency": (ws.cell(r, headers.get("currency",0)).value if "currency" in headers else "RUB"),
+            "qty": ws.cell(r, headers["qty"]).value if "qty" in headers else None,
         })
-    return Response({"ok": True, "preview": True, "document_type":"invoice", "rows": rows}, status=200)
\ No newline at end of file
+    return rows
@@ -0,0 +1,22 @@
+"""
+Статус фоновых задач импорта.
+
+GET /api/procurement/import-jobs/            — список (фильтры: status, kind, price_list)
+GET /api/procurement/import-jobs/{id}/       — состояние задачи
+"""
+
+from rest_framework import permissions, viewsets
+
+from .models_imports import ImportJob
+from .serializers_imports import ImportJobSerializer
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Задачи импорта (только чтение: создаются upload-эндпоинтами с async=1)."""
+
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ["status", "kind", "price_list"]
+
+    def get_queryset(self):
+        return ImportJob.objects.order_by("-id")
@@ -4,7 +4,7 @@ from decimal import Decimal
 from typing import Dict, List
 
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Q, Sum
 from django.utils import timezone
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
@@ -13,6 +13,8 @@ from rest_framework.exceptions import ValidationError
 
 from .models import PurchaseOrder, PurchaseOrderLine
 from .models_shipments import Shipment, ShipmentLine
+from .pagination import SwitchablePagination
+from .services import coverage, po_delivery
 from .serializers_shipments import (
     ShipmentCreateSerializer,
     ShipmentSerializer,
@@ -22,48 +24,25 @@ from .serializers_shipments import (
 
 
 def _recalc_po_status_from_shipments(po: PurchaseOrder) -> None:
-    """Минимальный пересчёт статуса заказа по доставкам (для отката/демо)."""
-    if po.status == "draft":
-        return
-
-    qs = Shipment.objects.filter(order=po)
-    if not qs.exists():
-        if po.status in ("in_transit", "delivered"):
-            po.status = "sent"
-            po.save(update_fields=["status"])
-        return
-
-    if qs.filter(status=Shipment.Status.IN_TRANSIT).exists():
-        if po.status != "in_transit":
-            po.status = "in_transit"
-            po.save(update_fields=["status"])
-        return
-
-    delivered_shipments = qs.filter(status=Shipment.Status.DELIVERED)
-    if not delivered_shipments.exists():
-        if po.status == "delivered":
-            po.status = "sent"
-            po.save(update_fields=["status"])
-        return
-
-    order_lines = PurchaseOrderLine.objects.filter(order=po)
-    for ol in order_lines:
-        delivered_qty = (
-            ShipmentLine.objects.filter(shipment__in=delivered_shipments, order_line=ol).aggregate(s=Sum("qty"))["s"]
-            or Decimal("0")
-        )
-        if delivered_qty < ol.qty:
-            return
-
-    if po.status != "delivered":
-        po.status = "delivered"
-        po.save(update_fields=["status"])
+    """Минимальный пересчёт статуса заказа по доставкам (для отката/демо) — см. services/po_delivery.py."""
+    changed = po_delivery.recalc([po.id])
+    if po.id in changed:
+        po.status = changed[po.id][1]
 
 
 class ShipmentViewSet(viewsets.ModelViewSet):
-    """Доставки (партии) по заказам. Дробление по позициям."""
+    """
+    Доставки (партии) по заказам. Дробление по позициям.
+
+    Список:
+    - ?order=<id> (или po_id) — все доставки заказа одним массивом (их немного);
+    - без фильтра — постранично: ?page=N или ?pagination=cursor (keyset по -id);
+      ?active=1 — без завершённых (доставлена / отменена), ?q= — поиск по номеру доставки, заказу,
+      поставщику, проекту, этапу и комментарию (фильтры — на сервере, чтобы они видели все страницы).
+    """
 
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SwitchablePagination
 
     def get_queryset(self):
         qs = Shipment.objects.select_related(
@@ -79,8 +58,26 @@ class ShipmentViewSet(viewsets.ModelViewSet):
                 qs = qs.filter(order_id=int(order_id))
             except Exception:
                 pass
+        if self.action == "list":
+            qs = self._filter_list(qs)
         return qs.order_by("-id")
 
+    def _filter_list(self, qs):
+        qp = self.request.query_params
+        if qp.get("active") in ("1", "true", "True"):
+            qs = qs.exclude(status__in=[Shipment.Status.DELIVERED, Shipment.Status.CANCELLED])
+        q = (qp.get("q") or "").strip()
+        if q:
+            cond = Q(notes__icontains=q) | Q(order__number__icontains=q) | Q(order__supplier__name__icontains=q)
+            for prefix in ("", "order__", "order__purchase_request__"):
+                cond |= Q(**{f"{prefix}project__name__icontains": q})
+                cond |= Q(**{f"{prefix}project_stage__name__icontains": q})
+            number = q.upper().removeprefix("D-")
+            if number.isdigit():
+                cond |= Q(pk=int(number))
+            qs = qs.filter(cond).distinct()
+        return qs
+
     def get_serializer_class(self):
         if self.action == "create":
             return ShipmentCreateSerializer
@@ -91,7 +88,11 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         return ShipmentSerializer
 
     def list(self, request, *args, **kwargs):
-        return Response(ShipmentSerializer(self.get_queryset(), many=True).data)
+        qs = self.get_queryset()
+        if request.query_params.get("order") or request.query_params.get("po_id"):
+            return Response(ShipmentSerializer(qs, many=True).data)
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(ShipmentSerializer(page, many=True).data)
 
     def retrieve(self, request, *args, **kwargs):
         obj = self.get_queryset().get(pk=kwargs["pk"])
@@ -155,10 +156,13 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         if errors:
             return Response({"detail": "Нельзя распределить больше, чем заказано.", "errors": errors}, status=400)
 
-        ShipmentLine.objects.filter(shipment=sh).delete()
-        bulk = [ShipmentLine(shipment=sh, order_line_id=r["order_line_id"], qty=r["qty"]) for r in rows]
-        if bulk:
-            ShipmentLine.objects.bulk_create(bulk)
+        with coverage.deferred():
+            ShipmentLine.objects.filter(shipment=sh).delete()
+            bulk = [ShipmentLine(shipment=sh, order_line_id=r["order_line_id"], qty=r["qty"]) for r in rows]
+            if bulk:
+                ShipmentLine.objects.bulk_create(bulk)
+            # bulk_create не шлёт сигналы — журнал обеспечения заявки пересчитываем явно
+            coverage.schedule([sh.order.purchase_request_id])
 
         _recalc_po_status_from_shipments(sh.order)
 
@@ -12,6 +12,7 @@ from core.models import Unit
 from catalog.models import Item
 from suppliers.models import Supplier
 from procurement.models import ItemSupplierMapping, SupplierPriceList, SupplierPriceListLine
+from procurement.services import resolution_index
 
 
 def _ensure_unit() -> Unit:
@@ -129,3 +130,10 @@ def supplier_map_upsert(request):
         upserted += 1
 
     return Response({"upserted": upserted}, status=200)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def supplier_map_index_stats(request):
+    """GET /api/procurement/supplier-map/index-stats/ — счётчики индекса сопоставления (текущий процесс)."""
+    return Response(resolution_index.stats(), status=200)
@@ -1,10 +1,15 @@
 import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from django.urls import path
+from channels.auth import AuthMiddlewareStack
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'snab.settings')
 django_asgi_app = get_asgi_application()
+
+# Импорт маршрутов — только после инициализации Django (consumer'ы тянут модели)
+from procurement.routing import websocket_urlpatterns as procurement_ws  # noqa: E402
+from dashboard.routing import websocket_urlpatterns as dashboard_ws  # noqa: E402
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    # websockets routes can go here later
+    "websocket": AuthMiddlewareStack(URLRouter(procurement_ws + dashboard_ws)),
 })
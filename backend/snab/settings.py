@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     "tasks",
     "catalog",
     "suppliers",
+    "dashboard.apps.DashboardConfig",
 ]
 
 MIDDLEWARE = [
@@ -100,9 +101,26 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Общий кэш: в docker — Redis (CACHE_URL=redis://redis:6379/1), локально — память процесса.
+# Используется индексом сопоставления артикулов, метаданными КП и т.п.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
 STATIC_URL = "static/"
 STATIC_ROOT = "app/staticfiles/"
 
+# Загруженные файлы (в т.ч. файлы фоновых импортов)
+MEDIA_URL = "media/"
+MEDIA_ROOT = env("MEDIA_ROOT", default=str(BASE_DIR / "media"))
+
+# --- Celery ---
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default=env("REDIS_URL"))
+CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=None)
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", default=False)
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -0,0 +1,4 @@
+# Celery-приложение подгружается вместе с Django, чтобы @shared_task регистрировались в нём.
+from .celery import app as celery_app  # noqa: F401
+
+__all__ = ("celery_app",)
@@ -3,6 +3,9 @@
  *
  * Для MVP: без двухпанельного UI (который ломает таблицу на разных ширинах).
  * Детали доставки открываются на отдельной странице: /shipments/:id
+ *
+ * Список постраничный (?page=N): фильтр завершённых (?active=1) и поиск (?q=) выполняет сервер,
+ * иначе они видели бы только текущую страницу.
  */
 
 import * as React from 'react';
@@ -22,6 +25,7 @@ import {
   TableCell,
   TableContainer,
   TableHead,
+  TablePagination,
   TableRow,
   TextField,
   Tooltip,
@@ -30,7 +34,7 @@ import {
 
 import OpenInNewIcon from '@mui/icons-material/OpenInNew';
 
-import { useQuery } from '@tanstack/react-query';
+import { keepPreviousData, useQuery } from '@tanstack/react-query';
 
 import { http, fixPath } from '../api/_http';
 import StatusChip from '../components/StatusChip';
@@ -57,9 +61,13 @@ type Shipment = {
   updated_at: string;
 };
 
-function isShipmentCompleted(s: Shipment): boolean {
-  return s.status === 'delivered' || s.status === 'cancelled';
-}
+type ShipmentPage = {
+  count: number;
+  results: Shipment[];
+};
+
+// Размер страницы — PAGE_SIZE бэкенда (REST_FRAMEWORK в settings.py)
+const PAGE_SIZE = 50;
 
 export default function ShipmentsPage() {
   const navigate = useNavigate();
@@ -93,24 +101,34 @@ export default function ShipmentsPage() {
   }, [showCompleted]);
 
   const [qText, setQText] = React.useState('');
+  const [search, setSearch] = React.useState('');
+  const [page, setPage] = React.useState(0);
+
+  // Поиск уходит на сервер — не на каждое нажатие клавиши
+  React.useEffect(() => {
+    const t = window.setTimeout(() => setSearch(qText.trim()), 300);
+    return () => window.clearTimeout(t);
+  }, [qText]);
 
-  const { data: shipments = [], isLoading } = useQuery<Shipment[]>({
-    queryKey: ['shipments'],
+  // Смена фильтров — с первой страницы
+  React.useEffect(() => {
+    setPage(0);
+  }, [search, showCompleted]);
+
+  const { data, isLoading } = useQuery<ShipmentPage>({
+    queryKey: ['shipments', { page, search, showCompleted }],
     queryFn: async () => {
-      const res = await http.get(fixPath('/api/procurement/shipments/'));
-      return Array.isArray(res.data) ? res.data : res.data?.results || [];
+      const params: Record<string, string | number> = { page: page + 1 };
+      if (!showCompleted) params.active = 1;
+      if (search) params.q = search;
+      const res = await http.get(fixPath('/api/procurement/shipments/'), { params });
+      if (Array.isArray(res.data)) return { count: res.data.length, results: res.data };
+      return { count: res.data?.count ?? 0, results: res.data?.results || [] };
     },
+    placeholderData: keepPreviousData,
   });
-
-  const filteredShipments = React.useMemo(() => {
-    const q = qText.trim().toLowerCase();
-    return shipments.filter((s) => {
-      if (!showCompleted && isShipmentCompleted(s)) return false;
-      if (!q) return true;
-      const hay = `${s.id} ${s.short_number ?? ''} ${s.order_number ?? ''} ${s.supplier_name ?? ''} ${s.project_name ?? ''} ${s.stage_name ?? ''} ${s.notes ?? ''}`.toLowerCase();
-      return hay.includes(q);
-    });
-  }, [shipments, qText, showCompleted]);
+  const shipments = data?.results ?? [];
+  const total = data?.count ?? 0;
 
   return (
     <Box p={2}>
@@ -144,7 +162,7 @@ export default function ShipmentsPage() {
           <Box p={2} display="flex" justifyContent="center">
             <CircularProgress />
           </Box>
-        ) : filteredShipments.length === 0 ? (
+        ) : shipments.length === 0 ? (
           <Box p={2}>
             <Typography color="text.secondary">Доставок не найдено</Typography>
           </Box>
@@ -170,7 +188,7 @@ export default function ShipmentsPage() {
                 </TableRow>
               </TableHead>
               <TableBody>
-                {filteredShipments.map((s) => (
+                {shipments.map((s) => (
                   <TableRow
                     key={s.id}
                     hover
@@ -282,6 +300,16 @@ export default function ShipmentsPage() {
             </Table>
           </TableContainer>
         )}
+        {total > PAGE_SIZE && (
+          <TablePagination
+            component="div"
+            count={total}
+            page={page}
+            onPageChange={(_, p) => setPage(p)}
+            rowsPerPage={PAGE_SIZE}
+            rowsPerPageOptions={[PAGE_SIZE]}
+          />
+        )}
       </Paper>
     </Box>
   );